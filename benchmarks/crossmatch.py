@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Time the partitioned KD-tree cross-match over generated catalogs.
+
+Scatters ``--right`` counterparts a few arcseconds around a random subset of
+``--left`` uniformly distributed positions, then reports the match time and
+pair count at each ``--workers`` level, next to a brute-force NumPy scan of
+every pair for a ``--sample`` of left rows (extrapolated to the full catalog).
+
+    python benchmarks/crossmatch.py --left 2000000 --right 200000 --workers 1 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data_ingestion.crossmatch import CrossMatchOptions, crossmatch  # noqa: E402
+from src.data_ingestion.sky_index import angular_separation  # noqa: E402
+
+
+def catalog(name: str, ra: np.ndarray, dec: np.ndarray) -> pa.Table:
+    ids = np.char.add(name, np.arange(len(ra)).astype(str))
+    return pa.table({"source": np.full(len(ra), name), "record_key": ids, "object_id": ids, "ra": ra, "dec": dec})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the positional cross-match")
+    parser.add_argument("--left", type=int, default=1_000_000)
+    parser.add_argument("--right", type=int, default=100_000)
+    parser.add_argument("--radius", type=float, default=2.0, help="Match radius in arcseconds")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--sample", type=int, default=200, help="Left rows timed by the brute-force scan")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    ra = rng.uniform(0.0, 360.0, args.left)
+    dec = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, args.left)))
+    picks = rng.choice(args.left, args.right)
+    jitter = rng.normal(0.0, args.radius / 3600.0, (2, args.right))
+    right_dec = np.clip(dec[picks] + jitter[1], -90.0, 90.0)
+    right_ra = (ra[picks] + jitter[0] / np.maximum(np.cos(np.radians(right_dec)), 1e-3)) % 360.0
+    left, right = catalog("ztf", ra, dec), catalog("tess", right_ra, right_dec)
+
+    start = time.perf_counter()
+    for i in range(args.sample):
+        angular_separation(ra[i], dec[i], right_ra, right_dec) <= args.radius / 3600.0
+    brute_s = (time.perf_counter() - start) / args.sample * args.left
+    print(f"brute force (extrapolated): {brute_s:.1f}s")
+
+    print(f"{'workers':>8} {'pairs':>9} {'seconds':>9}")
+    for workers in args.workers:
+        start = time.perf_counter()
+        matches = crossmatch(left, right, CrossMatchOptions(radius_arcsec=args.radius, workers=workers))
+        print(f"{workers:>8} {matches.num_rows:>9} {time.perf_counter() - start:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Time the feature engine over a generated TESS data lake.
+
+Persists ``--curves`` light curves of ``--points`` samples as Parquet parts, then
+rebuilds the TESS feature table at each ``--workers`` level and reports the
+wall time and light curves per second.
+
+    python benchmarks/feature_engine.py --curves 100000 --points 2000 --workers 1 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data_ingestion.base import StubbedIngestor  # noqa: E402
+from src.data_ingestion.schemas import TESSRecord  # noqa: E402
+from src.preprocessing.feature_engine import FeatureOptions, build_features  # noqa: E402
+
+
+class TESSStub(StubbedIngestor):
+    record_model = TESSRecord
+
+    def record_key(self, record: dict[str, Any]) -> str | None:
+        return f"{record['tic_id']}:s{record['sector']}"
+
+
+def write_lake(root: Path, curves: int, points: int) -> None:
+    rng = np.random.default_rng(0)
+    time_axis = np.linspace(0.0, 27.0, points)
+    ingestor = TESSStub("tess", root, {"storage": "parquet", "persist_batch": 1000, "run_log": False})
+    for start in range(0, curves, 10_000):
+        batch = [
+            {"tic_id": f"TIC{i:09d}", "sector": 1, "cadence": "custom_cutout", "time": time_axis, "flux": 1000.0 + rng.normal(0.0, 5.0, points)}
+            for i in range(start, min(curves, start + 10_000))
+        ]
+        ingestor.run(sample_payload=batch)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark multiprocess feature extraction")
+    parser.add_argument("--curves", type=int, default=20_000)
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--chunk-rows", type=int, default=FeatureOptions.chunk_rows)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_lake(root / "raw", args.curves, args.points)
+        print(f"{'workers':>8} {'rows':>9} {'seconds':>9} {'curves/s':>10}")
+        for workers in args.workers:
+            start = time.perf_counter()
+            result = build_features("tess", root / "raw", root / "processed", FeatureOptions(chunk_rows=args.chunk_rows, workers=workers))
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>8} {result.rows:>9} {elapsed:>9.2f} {result.records / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+#!/usr/bin/env python
+"""
+Offline HTTP load test for the serving API.
+
+Starts the stand-in upstreams, boots the API under uvicorn pointed at them (or
+targets ``--base-url``), then drives a weighted mix of requests from a scenario
+file with ``concurrency`` closed-loop virtual users. Reports throughput, latency
+percentiles and error rates per route, writes the result as JSON and, with
+``--compare``, fails when a route regressed against a saved baseline.
+
+    python benchmarks/loadtest.py benchmarks/scenarios/mixed.yaml
+    python benchmarks/loadtest.py benchmarks/scenarios/mixed.yaml --compare benchmarks/results/mixed.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+import numpy as np
+import yaml
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.stub_upstreams import StubUpstreams  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("loadtest")
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+RESULTS_DIR = PROJECT_ROOT / "benchmarks/results"
+
+
+@dataclass
+class Step:
+    name: str
+    weight: float
+    method: str = "GET"
+    path: str = "/"
+    json: Any = None
+    flow: Optional[str] = None
+    expect: tuple[int, ...] = (200,)
+
+
+@dataclass
+class Scenario:
+    name: str
+    steps: list[Step]
+    duration: float = 30.0
+    warmup: float = 3.0
+    concurrency: int = 16
+    think_time: float = 0.0
+    stub_latency_ms: float = 0.0
+    workers: int = 1
+
+    @classmethod
+    def load(cls, path: Path) -> "Scenario":
+        raw = yaml.safe_load(path.read_text())
+        steps = [
+            Step(**{**step, "expect": tuple(step.get("expect", (200,)))})
+            for step in raw.pop("requests")
+        ]
+        return cls(name=raw.pop("name", path.stem), steps=steps, **raw)
+
+
+@dataclass
+class Recorder:
+    started_at: float = 0.0
+    warmup: float = 0.0
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    error_samples: dict[str, str] = field(default_factory=dict)
+
+    def record(self, route: str, start: float, ok: bool, detail: str = "") -> None:
+        if start - self.started_at < self.warmup:
+            return
+        self.latencies[route].append(time.perf_counter() - start)
+        if not ok:
+            self.errors[route] += 1
+            self.error_samples.setdefault(route, detail[:200])
+
+
+async def _request(client: httpx.AsyncClient, recorder: Recorder, route: str, step_expect: tuple[int, ...], method: str, path: str, **kwargs: Any) -> Optional[httpx.Response]:
+    start = time.perf_counter()
+    try:
+        resp = await client.request(method, path, **kwargs)
+    except httpx.HTTPError as e:
+        recorder.record(route, start, ok=False, detail=f"{type(e).__name__}: {e}")
+        return None
+    ok = resp.status_code in step_expect
+    recorder.record(route, start, ok, detail="" if ok else f"HTTP {resp.status_code}: {resp.text}")
+    return resp
+
+
+async def _auth_flow(client: httpx.AsyncClient, recorder: Recorder, stubs: Optional[StubUpstreams]) -> None:
+    """Register, read the OTP from the Brevo stand-in, verify, then fetch the profile."""
+    user = f"bench_{uuid.uuid4().hex[:10]}"
+    email = f"{user}@bench.invalid"
+    resp = await _request(
+        client, recorder, "auth:register", (202,), "POST", "/auth/register",
+        json={"username": user, "email": email, "password": "bench-password"},
+    )
+    if resp is None or resp.status_code != 202 or stubs is None:
+        return
+    otp = stubs.latest_otp(email)
+    if otp is None:
+        recorder.record("auth:verify-otp", time.perf_counter(), ok=False, detail="No OTP delivered to stand-in outbox")
+        return
+    resp = await _request(
+        client, recorder, "auth:verify-otp", (200,), "POST", "/auth/verify-otp", json={"username": user, "otp": otp}
+    )
+    if resp is None or resp.status_code != 200:
+        return
+    token = resp.json()["access_token"]
+    await _request(client, recorder, "auth:me", (200,), "GET", "/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+
+async def _user(client: httpx.AsyncClient, scenario: Scenario, recorder: Recorder, deadline: float, stubs: Optional[StubUpstreams]) -> None:
+    weights = [step.weight for step in scenario.steps]
+    while time.perf_counter() < deadline:
+        step = random.choices(scenario.steps, weights)[0]
+        if step.flow == "auth":
+            await _auth_flow(client, recorder, stubs)
+        else:
+            await _request(client, recorder, step.name, step.expect, step.method, step.path, json=step.json)
+        if scenario.think_time:
+            await asyncio.sleep(random.expovariate(1.0 / scenario.think_time))
+
+
+async def drive(scenario: Scenario, base_url: str, stubs: Optional[StubUpstreams] = None, transport: Optional[httpx.AsyncBaseTransport] = None) -> dict[str, Any]:
+    """Run ``scenario`` against ``base_url`` and return the summary."""
+    limits = httpx.Limits(max_connections=scenario.concurrency, max_keepalive_connections=scenario.concurrency)
+    recorder = Recorder(warmup=scenario.warmup)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0, transport=transport) as client:
+        recorder.started_at = time.perf_counter()
+        deadline = recorder.started_at + scenario.warmup + scenario.duration
+        await asyncio.gather(*(_user(client, scenario, recorder, deadline, stubs) for _ in range(scenario.concurrency)))
+        elapsed = time.perf_counter() - recorder.started_at - scenario.warmup
+    return summarise(scenario, recorder, elapsed)
+
+
+def summarise(scenario: Scenario, recorder: Recorder, elapsed: float) -> dict[str, Any]:
+    routes = {}
+    for route, samples in sorted(recorder.latencies.items()):
+        latencies = np.asarray(samples) * 1000.0
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        routes[route] = {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / elapsed, 2),
+            "error_rate": round(recorder.errors[route] / len(samples), 4),
+            "mean_ms": round(float(latencies.mean()), 2),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+        }
+        if route in recorder.error_samples:
+            routes[route]["error_sample"] = recorder.error_samples[route]
+    total = sum(r["requests"] for r in routes.values())
+    return {
+        "scenario": scenario.name,
+        "concurrency": scenario.concurrency,
+        "workers": scenario.workers,
+        "duration_s": round(elapsed, 2),
+        "total_requests": total,
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "routes": routes,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], tolerance: float = 0.2) -> list[str]:
+    """Return one message per route that got slower, lost throughput or started failing."""
+    regressions = []
+    for route, base in baseline["routes"].items():
+        now = current["routes"].get(route)
+        if now is None:
+            regressions.append(f"{route}: missing from current run")
+            continue
+        if now["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p95 {base['p95_ms']}ms -> {now['p95_ms']}ms")
+        if now["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{route}: throughput {base['throughput_rps']} -> {now['throughput_rps']} rps")
+        if now["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{route}: error rate {base['error_rate']:.2%} -> {now['error_rate']:.2%}")
+    return regressions
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_api(env: dict[str, str], workers: int, log_path: Path) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    child_env = {**os.environ, **env}
+    # DATABASE_URL takes precedence over DATABASE_PATH, so an inherited one would point at the real database
+    if "DATABASE_URL" not in env:
+        child_env.pop("DATABASE_URL", None)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.serving.api:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=PROJECT_ROOT,
+        env=child_env,
+        stdout=log_path.open("wb"),
+        stderr=subprocess.STDOUT,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API exited during startup with code {proc.returncode}, see {log_path}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return proc, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    proc.terminate()
+    raise RuntimeError("API did not become healthy within 120s")
+
+
+def _print_table(summary: dict[str, Any]) -> None:
+    print(f"\n{summary['scenario']}: {summary['total_requests']} requests, {summary['throughput_rps']} rps "
+          f"({summary['concurrency']} users, {summary['workers']} workers, {summary['duration_s']}s)")
+    print(f"{'route':<28}{'reqs':>8}{'rps':>9}{'err%':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, r in summary["routes"].items():
+        print(f"{route:<28}{r['requests']:>8}{r['throughput_rps']:>9}{r['error_rate'] * 100:>8.2f}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test the serving API against local stand-in upstreams")
+    parser.add_argument("scenario", type=Path, help="Scenario YAML (see benchmarks/scenarios)")
+    parser.add_argument("--base-url", help="Target an already running API instead of starting one")
+    parser.add_argument("--duration", type=float, help="Override the scenario duration (seconds)")
+    parser.add_argument("--concurrency", type=int, help="Override the number of virtual users")
+    parser.add_argument("--workers", type=int, help="uvicorn worker processes for the spawned API")
+    parser.add_argument("--output", type=Path, help="Where to write the JSON result (default: benchmarks/results/<scenario>.json)")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default 0.2)")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    scenario = Scenario.load(args.scenario)
+    for attr in ("duration", "concurrency", "workers"):
+        if getattr(args, attr) is not None:
+            setattr(scenario, attr, getattr(args, attr))
+
+    with StubUpstreams(latency_ms=scenario.stub_latency_ms) as stubs, tempfile.TemporaryDirectory() as tmp:
+        proc = None
+        base_url = args.base_url
+        if base_url is None:
+            # Throwaway database so registered benchmark users never reach the real one
+            env = {**stubs.env(), "DATABASE_PATH": str(Path(tmp) / "bench.db"), "UPSTREAM_GUARD_DB": str(Path(tmp) / "guard.sqlite")}
+            proc, base_url = _start_api(env, scenario.workers, RESULTS_DIR / f"{scenario.name}.server.log")
+        try:
+            logger.info("Driving %s against %s for %.0fs", scenario.name, base_url, scenario.duration)
+            summary = asyncio.run(drive(scenario, base_url, stubs))
+            summary["upstream_hits"] = dict(stubs.hits)
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+    _print_table(summary)
+    output = args.output or RESULTS_DIR / f"{scenario.name}.json"
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(summary, indent=2))
+    logger.info("Saved results to %s", output)
+
+    if baseline is not None:
+        regressions = compare(summary, baseline, args.tolerance)
+        for message in regressions:
+            logger.error("REGRESSION %s", message)
+        if regressions:
+            sys.exit(1)
+        logger.info("No regressions against %s", args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Time MAST observation-metadata ingestion against the local ``invoke`` stand-in.
+
+Runs a small ``--limit`` fetch (one server-side page) and a full harvest of
+``--rows`` matching observations at each concurrency level, with a fixed
+per-request latency standing in for MAST, and reports wall time, rows per
+second, requests and bytes transferred.
+
+    python benchmarks/mast_ingest.py --rows 20000 --pagesize 500 --concurrency 1 4 8 --latency-ms 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.stub_upstreams import StubUpstreams  # noqa: E402
+from src.data_ingestion.mast_ingestor import create_mast_ingestor  # noqa: E402
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("mast_ingest")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark paged MAST ingestion against a stand-in")
+    parser.add_argument("--rows", type=int, default=10000, help="Observations matching the stand-in query")
+    parser.add_argument("--pagesize", type=int, default=500, help="Rows per server-side page")
+    parser.add_argument("--limit", type=int, default=20, help="Record limit for the small run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="Page concurrency levels to time")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Artificial per-request upstream latency")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    print(f"{'run':>8} {'concurrency':>11} {'seconds':>9} {'rows':>7} {'rows/s':>9} {'requests':>9} {'kB':>9}")
+    for concurrency in args.concurrency:
+        for run, limit in (("limit", args.limit), ("harvest", None)):
+            with StubUpstreams(latency_ms=args.latency_ms, mast_rows=args.rows) as stubs, tempfile.TemporaryDirectory() as tmp:
+                config = {
+                    "invoke_url": f"{stubs.url}/mast/api/v0/invoke",
+                    "concurrency": concurrency,
+                    "query": {"pagesize": args.pagesize, "columns": "obsid,obs_id,instrument_name,target_name,t_exptime"},
+                }
+                ingestor = create_mast_ingestor(Path(tmp), config)
+                start = time.perf_counter()
+                rows = sum(1 for _ in ingestor.fetch(limit=limit))
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{run:>8} {concurrency:>11} {elapsed:>9.2f} {rows:>7} {rows / elapsed:>9.0f} "
+                    f"{stubs.hits.get('mast', 0):>9} {stubs.bytes_sent.get('mast', 0) / 1024:>9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
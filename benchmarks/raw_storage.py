@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Compare the JSON and Parquet raw storage layouts on synthetic TESS light curves.
+
+Persists the same records through both backends (and, for ``shards``, writes
+JSON drops and compacts them), then reports bytes and files on disk, write time,
+the time to read every light curve back and reduce its flux (what the feature
+builders do) and the mean time to look one record up by key.
+
+    python benchmarks/raw_storage.py --records 2000 --points 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data_ingestion.base import StubbedIngestor  # noqa: E402
+from src.data_ingestion.schemas import TESSRecord  # noqa: E402
+from src.data_ingestion.compaction import compact  # noqa: E402
+from src.data_ingestion.storage import iter_records, read_record  # noqa: E402
+
+
+class _Ingestor(StubbedIngestor):
+    record_model = TESSRecord
+
+    def record_key(self, record: dict[str, Any]) -> str | None:
+        return f"{record['tic_id']}:s{record['sector']}"
+
+
+def _records(count: int, points: int) -> list[dict[str, Any]]:
+    rng = np.random.default_rng(0)
+    time_arr = 1325.0 + np.arange(points) * (2.0 / 1440.0)
+    return [
+        {
+            "tic_id": f"Tic {i}",
+            "sector": 1,
+            "cadence": "custom_cutout",
+            "time": time_arr.tolist(),
+            "flux": (2500.0 + rng.normal(0.0, 5.0, points)).tolist(),
+            "mast_data_uri": "tesscut_api",
+        }
+        for i in range(count)
+    ]
+
+
+def _data_files(root: Path) -> list[Path]:
+    return [p for p in root.rglob("*") if p.is_file() and not p.name.startswith((".ingestion_", "."))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark raw storage layouts")
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=500, help="persist_batch (records per Parquet part)")
+    args = parser.parse_args()
+
+    records = _records(args.records, args.points)
+    lookups = [f"Tic {i}:s1" for i in np.random.default_rng(1).integers(0, args.records, 100)]
+    print(f"{'storage':>8} {'MB':>8} {'files':>7} {'write s':>8} {'read s':>8} {'lookup ms':>10}")
+    for storage in ("json", "parquet", "shards"):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            config = {"storage": "json" if storage == "shards" else storage, "persist_batch": args.batch, "run_log": False}
+            ingestor = _Ingestor("tess", root, config=config)
+            start = time.perf_counter()
+            ingestor.run(sample_payload=records)
+            if storage == "shards":
+                compact(root, TESSRecord)
+            write_s = time.perf_counter() - start
+
+            start = time.perf_counter()
+            total = sum(float(np.mean(r["flux"])) for r in iter_records(root, record_model=TESSRecord))
+            read_s = time.perf_counter() - start
+            assert np.isfinite(total)
+
+            start = time.perf_counter()
+            assert all(read_record(root, key) is not None for key in lookups)
+            lookup_ms = (time.perf_counter() - start) / len(lookups) * 1000
+
+            files = _data_files(root)
+            megabytes = sum(p.stat().st_size for p in files) / 1e6
+            print(f"{storage:>8} {megabytes:>8.1f} {len(files):>7} {write_s:>8.2f} {read_s:>8.2f} {lookup_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Time HEALPix sky-index builds and cone queries over generated detections.
+
+Writes ``--detections`` uniformly distributed ZTF-shaped positions as one
+Parquet part, builds the index, then reports the mean cone-search latency at
+several radii next to a brute-force NumPy scan of every position.
+
+    python benchmarks/sky_index.py --detections 10000000 --nside 256
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data_ingestion.sky_index import angular_separation, build_sky_index, open_sky_index  # noqa: E402
+
+
+def write_detections(root: Path, count: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    ra = rng.uniform(0.0, 360.0, count)
+    dec = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, count)))
+    ids = np.char.add("ZTF", np.arange(count).astype(str))
+    partition = root / "ingest_date=2024-01-01"
+    partition.mkdir(parents=True)
+    table = pa.table({"record_key": ids, "object_id": ids, "ra": ra, "dec": dec, "mjd": np.full(count, 60000.0)})
+    pq.write_table(table, partition / "part-00000000000000000001.parquet")
+    return ra, dec
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the HEALPix sky index")
+    parser.add_argument("--detections", type=int, default=2_000_000)
+    parser.add_argument("--nside", type=int, default=256)
+    parser.add_argument("--radii", type=float, nargs="+", default=[0.01, 0.1, 1.0, 5.0], help="Cone radii in degrees")
+    parser.add_argument("--queries", type=int, default=50, help="Queries per radius")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        ra, dec = write_detections(root / "ztf", args.detections)
+        start = time.perf_counter()
+        build_sky_index({"ztf": root / "ztf"}, root / "sky.arrow", args.nside)
+        print(f"built index of {args.detections} positions in {time.perf_counter() - start:.2f}s")
+        index = open_sky_index(root / "sky.arrow")
+
+        centres = np.random.default_rng(1).uniform([0.0, -60.0], [360.0, 60.0], (args.queries, 2))
+        print(f"{'radius':>8} {'matches':>9} {'index ms':>9} {'scan ms':>9}")
+        for radius in args.radii:
+            start = time.perf_counter()
+            matches = sum(index.cone(float(r), float(d), radius).num_rows for r, d in centres)
+            index_ms = (time.perf_counter() - start) / args.queries * 1000
+            start = time.perf_counter()
+            scanned = int((angular_separation(*centres[0], ra, dec) <= radius).sum())
+            scan_ms = (time.perf_counter() - start) * 1000
+            assert scanned == index.cone(*centres[0], radius).num_rows
+            print(f"{radius:>8} {matches / args.queries:>9.0f} {index_ms:>9.2f} {scan_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
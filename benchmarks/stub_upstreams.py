@@ -0,0 +1,321 @@
+"""
+Local stand-ins for the external services the API calls.
+
+One threaded HTTP server answers NOAA, Spaceflight News, ALeRCE, Brevo, Groq,
+MAST TESScut and the MAST ``invoke`` API on path prefixes, after an optional
+artificial delay so upstream latency can be modelled. Failures can be injected per service to exercise retries. Emails "sent" through the Brevo stand-in are kept in an outbox so auth
+flows can read the OTP back.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs
+
+OTP_PATTERN = re.compile(r"code is: (\d{6})")
+
+ALERCE_CLASSES = ("SNIa", "SNII", "AGN", "QSO", "RRL", "EB", "CV/Nova", "LPV")
+
+
+def _xray_flux(points: int = 360) -> list[dict[str, Any]]:
+    now = time.time()
+    return [
+        {
+            "time_tag": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now - 60 * (points - i))),
+            "satellite": 16,
+            "flux": 1e-6 * (1 + 0.1 * random.random()),
+            "energy": "0.1-0.8nm",
+        }
+        for i in range(points)
+    ]
+
+
+def _news(limit: int) -> dict[str, Any]:
+    results = [
+        {
+            "id": i,
+            "title": f"Stand-in article {i}",
+            "url": f"https://example.invalid/articles/{i}",
+            "summary": "Offline benchmark content.",
+            "published_at": "2024-01-01T00:00:00Z",
+            "news_site": "stub",
+        }
+        for i in range(limit)
+    ]
+    return {"count": limit, "next": None, "previous": None, "results": results}
+
+
+def _alerce_objects(limit: int, page: int = 1, class_name: Optional[str] = None) -> dict[str, Any]:
+    # Each class's listing is shifted by 10 objects, so classes overlap like real ALeRCE classes do
+    offset = (page - 1) * limit + 10 * (sum(map(ord, class_name or "")) % 5)
+    items = [
+        {"oid": f"ZTF24stub{i:04d}", "lastmjd": 60300.0 + i, "ndet": 12, "meanra": 150.0 + i * 1e-3, "meandec": 2.0}
+        for i in range(offset, offset + limit)
+    ]
+    return {"total": limit, "page": page, "items": items}
+
+
+def _alerce_lightcurve(oid: str, detections: int = 12) -> dict[str, Any]:
+    number = int(re.sub(r"\D", "", oid.rpartition("stub")[2]) or 0)
+    rows = [
+        {
+            "candid": 2_400_000_000_000_000_000 + number * 100 + j,
+            "mjd": 60300.0 + number - (detections - 1 - j),
+            "fid": 1 + j % 2,
+            "magpsf": 18.0 + 0.1 * j,
+            "sigmapsf": 0.05,
+        }
+        for j in range(detections)
+    ]
+    rows[0]["magpsf"] = None  # upper-limit style row without a PSF magnitude
+    return {"detections": rows, "non_detections": []}
+
+
+def _alerce_probabilities() -> list[dict[str, Any]]:
+    probs = sorted((random.random() for _ in ALERCE_CLASSES), reverse=True)
+    return [
+        {"classifier_name": "lc_classifier", "class_name": cls, "probability": p, "ranking": rank + 1}
+        for rank, (cls, p) in enumerate(zip(random.sample(ALERCE_CLASSES, len(ALERCE_CLASSES)), probs))
+    ]
+
+
+def _groq_completion() -> dict[str, Any]:
+    content = json.dumps({"event_type": "Transit", "noise_level": 0.5, "amplitude": 5.0, "description": "stub"})
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "llama-3.3-70b-versatile",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+MAST_COLUMNS = (
+    "obsid", "obs_id", "obs_collection", "dataproduct_type", "intentType", "instrument_name", "target_name",
+    "s_ra", "s_dec", "t_min", "t_max", "t_exptime", "wavelength_region", "em_min", "em_max", "proposal_id", "dataURL",
+)
+
+
+def _mast_row(i: int) -> dict[str, Any]:
+    return {
+        "obsid": 20_000_000 + i, "obs_id": f"hst_stub_{i:06d}", "obs_collection": "HST", "dataproduct_type": "image",
+        "intentType": "science", "instrument_name": ("WFC3/UVIS", "ACS/WFC")[i % 2], "target_name": f"STUB-{i // 10}",
+        "s_ra": 150.0 + i * 1e-3, "s_dec": 2.0, "t_min": 58000.0 + i, "t_max": 58000.01 + i, "t_exptime": 300.0 + i % 7,
+        "wavelength_region": "OPTICAL", "em_min": 400.0, "em_max": 700.0, "proposal_id": str(10_000 + i % 50),
+        "dataURL": f"mast:HST/product/hst_stub_{i:06d}_drz.fits",
+    }
+
+
+def _mast_invoke(request: dict[str, Any], rows: int) -> dict[str, Any]:
+    """A ``Mast.Caom.Filtered`` page: ``pagesize``/``page`` and the ``columns`` list are honoured."""
+    page_size = int(request.get("pagesize") or rows or 1)
+    page = int(request.get("page") or 1)
+    columns = request.get("params", {}).get("columns", "*")
+    names = MAST_COLUMNS if columns == "*" else tuple(c for c in columns.split(",") if c in MAST_COLUMNS)
+    data = [
+        {name: row[name] for name in names}
+        for row in map(_mast_row, range((page - 1) * page_size, min(rows, page * page_size)))
+    ]
+    paging = {
+        "page": page, "pageSize": page_size, "pagesFiltered": -(-rows // page_size),
+        "rows": len(data), "rowsFiltered": rows, "rowsTotal": rows,
+    }
+    return {"status": "COMPLETE", "msg": "", "paging": paging, "data": data}
+
+
+@lru_cache(maxsize=1)
+def _tesscut_zip(cadences: int = 2000, size: int = 5) -> bytes:
+    """A TESScut-shaped ZIP holding one target pixel cutout (TIME plus a FLUX cube)."""
+    import numpy as np
+    from astropy.io import fits
+
+    rng = np.random.default_rng(0)
+    time_arr = 1325.0 + np.arange(cadences) * (2.0 / 1440.0)
+    flux = 100.0 + rng.normal(0.0, 1.0, (cadences, size, size))
+    hdu = fits.BinTableHDU.from_columns(
+        [
+            fits.Column(name="TIME", array=time_arr, format="D"),
+            fits.Column(name="FLUX", array=flux.astype(np.float32), format=f"{size * size}E", dim=f"({size},{size})"),
+        ]
+    )
+    fits_buffer = io.BytesIO()
+    fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(fits_buffer)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as z:
+        z.writestr("tess-s0001-1-1_stub_5x5_astrocut.fits", fits_buffer.getvalue())
+    return archive.getvalue()
+
+
+class StubUpstreams:
+    """Serve every stand-in on ``http://host:port`` until ``stop`` is called."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0, mast_rows: int = 5000) -> None:
+        self.latency = latency_ms / 1000.0
+        self.mast_rows = mast_rows
+        self.outbox: dict[str, list[str]] = {}
+        self.hits: dict[str, int] = {}
+        self.peak_in_flight: dict[str, int] = {}
+        self.bytes_sent: dict[str, int] = {}
+        self._in_flight: dict[str, int] = {}
+        self._failures: dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict[str, str]:
+        """Environment pointing the API (and the Groq SDK) at this server."""
+        return {
+            "NOAA_XRAY_URL": f"{self.url}/noaa/json/goes/primary/xrays-6-hour.json",
+            "SPACE_NEWS_URL": f"{self.url}/news/v4/articles/?limit=30",
+            "BREVO_API_URL": f"{self.url}/brevo/v3/smtp/email",
+            "BREVO_API_KEY": "stub",
+            "ALERCE_API_URL": f"{self.url}/alerce",
+            "GROQ_BASE_URL": f"{self.url}/groq",
+            "GROQ_API_KEY": "stub",
+        }
+
+    def fail(self, service: str, count: int, status: int = 503) -> None:
+        """Answer the next ``count`` requests to ``service`` with ``status`` (``Retry-After: 0``)."""
+        with self._lock:
+            self._failures.setdefault(service, []).extend([status] * count)
+
+    def start(self) -> "StubUpstreams":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-upstreams", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubUpstreams":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def latest_otp(self, email: str) -> Optional[str]:
+        with self._lock:
+            messages = self.outbox.get(email, [])
+            return messages[-1] if messages else None
+
+    def _record(self, service: str) -> Optional[int]:
+        """Count a request and enter it in flight; returns an injected failure status, if any."""
+        with self._lock:
+            self.hits[service] = self.hits.get(service, 0) + 1
+            self._in_flight[service] = self._in_flight.get(service, 0) + 1
+            self.peak_in_flight[service] = max(self.peak_in_flight.get(service, 0), self._in_flight[service])
+            failures = self._failures.get(service)
+            return failures.pop(0) if failures else None
+
+    def _done(self, service: str) -> None:
+        with self._lock:
+            self._in_flight[service] -= 1
+
+    def _deliver(self, payload: dict[str, Any]) -> None:
+        match = OTP_PATTERN.search(payload.get("textContent", ""))
+        if not match:
+            return
+        with self._lock:
+            for recipient in payload.get("to", []):
+                self.outbox.setdefault(recipient.get("email", ""), []).append(match.group(1))
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        stubs = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                pass
+
+            def _reply(self, status: int, body: Any, content_type: str = "application/json", etag: Optional[str] = None) -> None:
+                data = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                if etag:
+                    self.send_header("ETag", etag)
+                if status in (429, 503):
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(data)
+                service = self.path.partition("?")[0].strip("/").split("/", 1)[0]
+                with stubs._lock:
+                    stubs.bytes_sent[service] = stubs.bytes_sent.get(service, 0) + len(data)
+
+            def _route(self, method: str) -> None:
+                service = self.path.partition("?")[0].strip("/").split("/", 1)[0]
+                injected = stubs._record(service)
+                try:
+                    if stubs.latency:
+                        time.sleep(stubs.latency)
+                    if injected is not None:
+                        self.rfile.read(int(self.headers.get("Content-Length", 0)))  # keep the connection usable
+                        return self._reply(injected, {"error": "injected failure"})
+                    return self._dispatch(method)
+                finally:
+                    stubs._done(service)
+
+            def _dispatch(self, method: str) -> None:
+                path, _, query = self.path.partition("?")
+                service = path.strip("/").split("/", 1)[0]
+
+                if method == "GET" and service == "noaa":
+                    return self._reply(200, _xray_flux())
+                if method == "GET" and service == "news":
+                    limit = int(dict(p.split("=", 1) for p in query.split("&") if "=" in p).get("limit", 30))
+                    return self._reply(200, _news(limit))
+                if method == "GET" and path.startswith("/alerce/ztf/v1/objects"):
+                    if path.endswith("/probabilities"):
+                        return self._reply(200, _alerce_probabilities())
+                    if path.endswith("/lightcurve"):
+                        return self._reply(200, _alerce_lightcurve(path.split("/")[-2]))
+                    params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+                    limit = int(params.get("page_size", params.get("limit", 10)))
+                    return self._reply(200, _alerce_objects(limit, int(params.get("page", 1)), params.get("class")))
+                if method == "POST" and service == "brevo":
+                    length = int(self.headers.get("Content-Length", 0))
+                    stubs._deliver(json.loads(self.rfile.read(length) or b"{}"))
+                    return self._reply(201, {"messageId": "<stub@local>"})
+                if method == "POST" and service == "groq":
+                    self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                    return self._reply(200, _groq_completion())
+                if method == "POST" and path == "/mast/api/v0/invoke":
+                    form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode())
+                    return self._reply(200, _mast_invoke(json.loads(form["request"][0]), stubs.mast_rows))
+                if method == "GET" and path == "/tesscut/sector":
+                    sector = {"sectorName": "tess-s0001-1-1", "sector": "0001", "ra": "84.29", "dec": "-80.47"}
+                    return self._reply(200, {"results": [sector]})
+                if method == "GET" and path == "/tesscut/astrocut":
+                    body = _tesscut_zip()
+                    etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        return self._reply(304, b"", etag=etag)
+                    return self._reply(200, body, content_type="application/zip", etag=etag)
+                return self._reply(404, {"error": f"No stand-in for {method} {path}"})
+
+            def do_GET(self) -> None:
+                self._route("GET")
+
+            def do_POST(self) -> None:
+                self._route("POST")
+
+        return Handler
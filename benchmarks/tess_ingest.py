@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Time TESS cutout ingestion against the local TESScut stand-in.
+
+Runs the same target list at each concurrency level (with a fixed per-request
+latency standing in for MAST) and reports wall time and light curves per second,
+so the sequential baseline (``--concurrency 1``) can be compared with pooled runs.
+
+    python benchmarks/tess_ingest.py --targets 32 --concurrency 1 4 8 16 --latency-ms 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.stub_upstreams import StubUpstreams  # noqa: E402
+from src.data_ingestion.tess_ingestor import create_tess_ingestor  # noqa: E402
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("tess_ingest")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent TESScut ingestion against a stand-in")
+    parser.add_argument("--targets", type=int, default=32, help="Number of targets to fetch")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="Download concurrency levels to time")
+    parser.add_argument("--fits-workers", type=int, default=None, help="FITS decode processes (default: CPU count)")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Artificial per-request upstream latency")
+    parser.add_argument("--fail", type=int, default=0, help="Inject this many 503s to exercise retries")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    targets = [f"Tic {i}" for i in range(args.targets)]
+
+    print(f"{'concurrency':>11} {'seconds':>9} {'lc/s':>8} {'requests':>9}")
+    for concurrency in args.concurrency:
+        with StubUpstreams(latency_ms=args.latency_ms) as stubs, tempfile.TemporaryDirectory() as tmp:
+            stubs.fail("tesscut", args.fail)
+            config = {
+                "tesscut_url": f"{stubs.url}/tesscut",
+                "concurrency": concurrency,
+                "retry": {"backoff_base": 0.05},
+            }
+            if args.fits_workers is not None:
+                config["fits_workers"] = args.fits_workers
+            ingestor = create_tess_ingestor(Path(tmp), config)
+
+            start = time.perf_counter()
+            records = list(ingestor.fetch(limit=len(targets), targets=targets))
+            elapsed = time.perf_counter() - start
+            print(f"{concurrency:>11} {elapsed:>9.2f} {len(records) / elapsed:>8.1f} {stubs.hits.get('tesscut', 0):>9}")
+
+
+if __name__ == "__main__":
+    main()
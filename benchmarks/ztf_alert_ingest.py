@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+"""
+Time ZTF Avro alert-packet ingestion over a generated packet corpus.
+
+Writes a corpus of ZTF-shaped alerts (``ztf.alert`` schema 3.3 field layout:
+candidate, ``prv_candidates`` history and three 50 kB cutout stamps) either as one
+Avro container per alert, as ZTF ships them, or as a nightly ``.tar.gz`` of those
+packets, then times ``ZTFAlertIngestor.fetch`` with history/cutout decoding on and
+off. Reports alerts and detections per second.
+
+    python benchmarks/ztf_alert_ingest.py --alerts 5000 --history 30 --workers 1 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import logging
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+import fastavro  # noqa: E402
+
+from src.data_ingestion.ztf_avro_ingestor import create_ztf_alert_ingestor  # noqa: E402
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("ztf_alert_ingest")
+
+_FLOAT = ["null", "float"]
+CANDIDATE_FIELDS: list[tuple[str, Any]] = [
+    ("jd", "double"), ("fid", "int"), ("pid", "long"), ("diffmaglim", _FLOAT), ("pdiffimfilename", ["null", "string"]),
+    ("programpi", ["null", "string"]), ("programid", "int"), ("candid", ["null", "long"]), ("isdiffpos", "string"),
+    ("tblid", ["null", "long"]), ("nid", ["null", "int"]), ("rcid", ["null", "int"]), ("field", ["null", "int"]),
+    ("xpos", _FLOAT), ("ypos", _FLOAT), ("ra", "double"), ("dec", "double"), ("magpsf", "float"), ("sigmapsf", "float"),
+    ("chipsf", _FLOAT), ("magap", _FLOAT), ("sigmagap", _FLOAT), ("distnr", _FLOAT), ("magnr", _FLOAT),
+    ("sigmagnr", _FLOAT), ("chinr", _FLOAT), ("sharpnr", _FLOAT), ("sky", _FLOAT), ("magdiff", _FLOAT), ("fwhm", _FLOAT),
+    ("classtar", _FLOAT), ("mindtoedge", _FLOAT), ("magfromlim", _FLOAT), ("seeratio", _FLOAT), ("aimage", _FLOAT),
+    ("bimage", _FLOAT), ("aimagerat", _FLOAT), ("bimagerat", _FLOAT), ("elong", _FLOAT), ("nneg", ["null", "int"]),
+    ("nbad", ["null", "int"]), ("rb", _FLOAT), ("ssdistnr", _FLOAT), ("ssmagnr", _FLOAT), ("ssnamenr", ["null", "string"]),
+    ("sumrat", _FLOAT), ("magapbig", _FLOAT), ("sigmagapbig", _FLOAT), ("ranr", "double"), ("decnr", "double"),
+    ("sgmag1", _FLOAT), ("srmag1", _FLOAT), ("simag1", _FLOAT), ("szmag1", _FLOAT), ("sgscore1", _FLOAT),
+    ("distpsnr1", _FLOAT), ("ndethist", "int"), ("ncovhist", "int"), ("jdstarthist", ["null", "double"]),
+    ("jdendhist", ["null", "double"]), ("scorr", ["null", "double"]), ("tooflag", ["null", "int"]),
+    ("objectidps1", ["null", "long"]), ("drb", _FLOAT), ("drbversion", ["null", "string"]),
+]
+# Fields an upper limit (non-detection) in prv_candidates leaves empty
+_NULLABLE_IN_HISTORY = {"ra", "dec", "magpsf", "sigmapsf", "ranr", "decnr", "ndethist", "ncovhist"}
+
+
+def _candidate_schema(name: str, history: bool) -> dict[str, Any]:
+    fields = []
+    for field, avro_type in CANDIDATE_FIELDS:
+        if history and field in _NULLABLE_IN_HISTORY:
+            avro_type = ["null", avro_type]
+        entry: dict[str, Any] = {"name": field, "type": avro_type}
+        if isinstance(avro_type, list):
+            entry["default"] = None
+        fields.append(entry)
+    return {"type": "record", "name": name, "namespace": "ztf.alert", "fields": fields}
+
+
+ALERT_SCHEMA: dict[str, Any] = {
+    "type": "record",
+    "name": "alert",
+    "namespace": "ztf",
+    "fields": [
+        {"name": "schemavsn", "type": "string"},
+        {"name": "publisher", "type": "string"},
+        {"name": "objectId", "type": "string"},
+        {"name": "candid", "type": "long"},
+        {"name": "candidate", "type": _candidate_schema("candidate", history=False)},
+        {
+            "name": "prv_candidates",
+            "type": ["null", {"type": "array", "items": _candidate_schema("prv_candidate", history=True)}],
+            "default": None,
+        },
+        {
+            "name": "cutoutScience",
+            "type": ["null", {
+                "type": "record", "name": "cutout", "namespace": "ztf.alert",
+                "fields": [{"name": "fileName", "type": "string"}, {"name": "stampData", "type": "bytes"}],
+            }],
+            "default": None,
+        },
+        {"name": "cutoutTemplate", "type": ["null", "ztf.alert.cutout"], "default": None},
+        {"name": "cutoutDifference", "type": ["null", "ztf.alert.cutout"], "default": None},
+    ],
+}
+
+_VALUES = {"double": 0.5, "float": 0.5, "int": 7, "long": 123456789, "string": "stub"}
+
+
+def _candidate(number: int, epoch: int, upper_limit: bool = False) -> dict[str, Any]:
+    record = {
+        field: _VALUES[avro_type[1] if isinstance(avro_type, list) else avro_type]
+        for field, avro_type in CANDIDATE_FIELDS
+    }
+    record.update(
+        jd=2460300.5 + epoch,
+        fid=1 + epoch % 2,
+        candid=2_400_000_000_000_000_000 + number * 100 + epoch,
+        ra=150.0 + number * 1e-3,
+        dec=2.0,
+        magpsf=18.0 + 0.01 * epoch,
+        sigmapsf=0.05,
+        isdiffpos="t",
+    )
+    if upper_limit:
+        record.update({field: None for field in _NULLABLE_IN_HISTORY}, candid=None)
+    return record
+
+
+def make_alert(number: int, history: int = 30, stamp_bytes: int = 50_000) -> dict[str, Any]:
+    """Alert ``number``: its history holds ``history`` epochs, every third one an upper limit."""
+    stamp = bytes(stamp_bytes)
+    return {
+        "schemavsn": "3.3",
+        "publisher": "ZTF (www.ztf.caltech.edu)",
+        "objectId": f"ZTF24gen{number // 4:05d}",  # a few alerts per object, as in a night's stream
+        "candid": 2_400_000_000_000_000_000 + number * 100 + history,
+        "candidate": _candidate(number, history),
+        "prv_candidates": [_candidate(number, epoch, upper_limit=epoch % 3 == 0) for epoch in range(history)],
+        "cutoutScience": {"fileName": f"candid{number}_sci.fits.gz", "stampData": stamp},
+        "cutoutTemplate": {"fileName": f"candid{number}_ref.fits.gz", "stampData": stamp},
+        "cutoutDifference": {"fileName": f"candid{number}_diff.fits.gz", "stampData": stamp},
+    }
+
+
+def write_corpus(root: Path, alerts: int, history: int = 30, archive: bool = False, stamp_bytes: int = 50_000) -> Path:
+    """One Avro container per alert under ``root`` (or packed into ``root/alerts.tar.gz``)."""
+    root.mkdir(parents=True, exist_ok=True)
+    schema = fastavro.parse_schema(ALERT_SCHEMA)
+    tar = tarfile.open(root / "alerts.tar.gz", "w:gz") if archive else None
+    try:
+        for number in range(alerts):
+            buffer = io.BytesIO()
+            fastavro.writer(buffer, schema, [make_alert(number, history, stamp_bytes)])
+            name = f"{2_400_000_000_000_000_000 + number * 100 + history}.avro"
+            if tar is None:
+                (root / name).write_bytes(buffer.getvalue())
+            else:
+                info = tarfile.TarInfo(name)
+                info.size = buffer.tell()
+                buffer.seek(0)
+                tar.addfile(info, buffer)
+    finally:
+        if tar is not None:
+            tar.close()
+    return root
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark ZTF Avro alert-packet decoding over a generated corpus")
+    parser.add_argument("--alerts", type=int, default=2000, help="Alerts in the generated corpus")
+    parser.add_argument("--history", type=int, default=30, help="prv_candidates epochs per alert")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1], help="Decode process counts to time")
+    parser.add_argument("--archive", action="store_true", help="Pack the corpus into a .tar.gz instead of loose files")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    modes = {
+        "candidate only": {"history": False, "cutouts": False},
+        "+ cutouts": {"history": False, "cutouts": True},
+        "+ history": {"history": True, "cutouts": True},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = write_corpus(Path(tmp) / "corpus", args.alerts, args.history, args.archive)
+        print(f"{'mode':>15} {'workers':>8} {'seconds':>9} {'alerts/s':>10} {'detections/s':>13}")
+        for workers in args.workers:
+            for mode, options in modes.items():
+                ingestor = create_ztf_alert_ingestor(Path(tmp) / "out", {**options, "workers": workers})
+                start = time.perf_counter()
+                detections = sum(1 for _ in ingestor.fetch(paths=[corpus]))
+                elapsed = time.perf_counter() - start
+                print(f"{mode:>15} {workers:>8} {elapsed:>9.2f} {args.alerts / elapsed:>10.0f} {detections / elapsed:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
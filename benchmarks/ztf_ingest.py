@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Time ZTF light-curve ingestion against the local ALeRCE stand-in.
+
+Fetches the same object listing at each concurrency level (with a fixed per-request
+latency standing in for ALeRCE) and reports wall time, objects per second and the
+number of upstream requests, so the sequential baseline (``--concurrency 1``) can be
+compared with pooled runs.
+
+    python benchmarks/ztf_ingest.py --objects 500 --concurrency 1 8 16 --latency-ms 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.stub_upstreams import StubUpstreams  # noqa: E402
+from src.data_ingestion.ztf_ingestor import create_ztf_ingestor  # noqa: E402
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("ztf_ingest")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark concurrent ALeRCE ingestion against a stand-in")
+    parser.add_argument("--objects", type=int, default=200, help="Object limit passed to fetch (spread across classes)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8], help="Light-curve request concurrency levels to time")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Artificial per-request upstream latency")
+    parser.add_argument("--fail", type=int, default=0, help="Inject this many 503s to exercise retries")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    print(f"{'concurrency':>11} {'seconds':>9} {'objects':>8} {'obj/s':>8} {'records':>8} {'requests':>9} {'errors':>7}")
+    for concurrency in args.concurrency:
+        with StubUpstreams(latency_ms=args.latency_ms) as stubs, tempfile.TemporaryDirectory() as tmp:
+            stubs.fail("alerce", args.fail)
+            config = {
+                "alerce_url": f"{stubs.url}/alerce",
+                "concurrency": concurrency,
+                "retry": {"backoff_base": 0.05},
+            }
+            ingestor = create_ztf_ingestor(Path(tmp), config)
+
+            start = time.perf_counter()
+            records = list(ingestor.fetch(limit=args.objects))
+            elapsed = time.perf_counter() - start
+            objects = len({r["object_id"] for r in records})
+            errors = sum(ingestor.fetch_errors.values())
+            print(
+                f"{concurrency:>11} {elapsed:>9.2f} {objects:>8} {objects / elapsed:>8.1f} "
+                f"{len(records):>8} {stubs.hits.get('alerce', 0):>9} {errors:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Build the feature table of one or more sources with the multiprocess feature engine.
+
+    python scripts/build_features.py ztf tess mast             # data/raw/<source> -> data/processed/<source>
+    python scripts/build_features.py tess --workers 16 --chunk-rows 2000
+    python scripts/build_features.py ztf --input-dir data/raw/ztf --output-dir data/processed/ztf
+
+Each source is written to ``<output-dir>/features.parquet/`` (``part-*.parquet``
+plus ``_feature_manifest.json``) and replaces the previous table in one swap.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.preprocessing.feature_engine import DATASET_NAME, EXTRACTORS, FeatureOptions, build_features  # noqa: E402
+
+logging.basicConfig(level=os.getenv("INGEST_LOG_LEVEL", "INFO"))
+logger = logging.getLogger("build_features")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Extract feature tables from the raw data lake")
+    parser.add_argument("sources", nargs="+", choices=sorted(EXTRACTORS), help="Sources to build")
+    parser.add_argument("--raw-root", type=Path, default=Path("data/raw"), help="Data-lake root holding one directory per source")
+    parser.add_argument("--processed-root", type=Path, default=Path("data/processed"), help="Root of the per-source feature directories")
+    parser.add_argument("--input-dir", type=Path, help="Raw directory (single source only; overrides --raw-root)")
+    parser.add_argument("--output-dir", type=Path, help="Feature directory (single source only; overrides --processed-root)")
+    parser.add_argument("--output-name", default=DATASET_NAME, help="Name of the feature dataset inside the output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Extraction processes")
+    parser.add_argument("--chunk-rows", type=int, default=FeatureOptions.chunk_rows, help="Raw records per task and part file")
+    args = parser.parse_args(argv)
+    if len(args.sources) > 1 and (args.input_dir or args.output_dir):
+        parser.error("--input-dir and --output-dir apply to a single source")
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    options = FeatureOptions(chunk_rows=args.chunk_rows, workers=args.workers, name=args.output_name)
+    summary = []
+    for source in args.sources:
+        start = time.perf_counter()
+        result = build_features(
+            source,
+            args.input_dir or args.raw_root / source,
+            args.output_dir or args.processed_root / source,
+            options,
+        )
+        summary.append(
+            {
+                "source": source,
+                "path": str(result.path),
+                "feature_version": result.version,
+                "records": result.records,
+                "rows": result.rows,
+                "skipped": result.skipped,
+                "parts": result.parts,
+                "seconds": round(time.perf_counter() - start, 3),
+            }
+        )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Build the HEALPix sky index behind ``GET /api/sky/cone`` from the raw data lake.
+
+    python scripts/build_sky_index.py                      # every source under data/raw
+    python scripts/build_sky_index.py --source ztf --nside 1024
+    python scripts/build_sky_index.py --cone 150.1 2.2 0.05   # query the built index
+
+``ingest_stream.py`` rebuilds the index after each run when ``sky_index`` is
+enabled in the config; this script rebuilds it on demand (e.g. at another nside).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data_ingestion.sky_index import DEFAULT_INDEX_PATH, DEFAULT_NSIDE, build_sky_index, open_sky_index  # noqa: E402
+
+logging.basicConfig(level=os.getenv("INGEST_LOG_LEVEL", "INFO"))
+logger = logging.getLogger("build_sky_index")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build or query the HEALPix index of ingested positions")
+    parser.add_argument("--root", type=Path, default=Path("data/raw"), help="Data-lake root holding one directory per source")
+    parser.add_argument("--source", action="append", help="Source directory to index (repeatable, default: all)")
+    parser.add_argument("--output", type=Path, default=DEFAULT_INDEX_PATH, help="Index file to write")
+    parser.add_argument("--nside", type=int, default=DEFAULT_NSIDE, help="HEALPix nside (power of two)")
+    parser.add_argument(
+        "--cone",
+        nargs=3,
+        type=float,
+        metavar=("RA", "DEC", "RADIUS"),
+        help="Query the existing index instead of rebuilding it (degrees)",
+    )
+    parser.add_argument("--limit", type=int, default=20, help="Rows to print for --cone")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.cone:
+        index = open_sky_index(args.output)
+        if index is None:
+            logger.error("No sky index at %s; build it first", args.output)
+            sys.exit(1)
+        start = time.perf_counter()
+        matches = index.cone(*args.cone)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        summary = {"count": matches.num_rows, "query_ms": round(elapsed_ms, 3), "results": matches.slice(0, args.limit).to_pylist()}
+        print(json.dumps(summary, indent=2, default=str))
+        return
+
+    names = args.source or (sorted(p.name for p in args.root.iterdir() if p.is_dir()) if args.root.exists() else [])
+    start = time.perf_counter()
+    rows = build_sky_index({name: args.root / name for name in names}, args.output, args.nside)
+    print(json.dumps({"path": str(args.output), "nside": args.nside, "rows": rows, "seconds": round(time.perf_counter() - start, 3)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,27 @@
 #!/usr/bin/env python
-"""Aggregate ZTF raw alert records into lightweight feature tables."""
+"""Aggregate ZTF raw alert records into lightweight feature tables (``build_features.py ztf``)."""
 
 from __future__ import annotations
 
 import argparse
-import json
 import logging
-from collections import defaultdict
+import os
+import sys
 from pathlib import Path
 
-import pandas as pd
-
 # Ensure src/ is importable when executed as a script
-import sys
-
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-# Import AutoLabeler
-from src.preprocessing.auto_labeler import AutoLabeler, EventType
-
-from src.data_ingestion.schemas import ZTFRecord  # noqa: E402
+from src.preprocessing.feature_engine import FeatureOptions, build_features  # noqa: E402
 
 logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger("build_ztf_features")
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Build feature table from ZTF raw records")
-    parser.add_argument("input_dir", type=Path, help="Directory containing record_*.json files")
+    parser.add_argument("input_dir", type=Path, help="Source directory of the raw data lake (shards, Parquet parts or record_*.json files)")
     parser.add_argument(
         "--output-dir",
         type=Path,
@@ -39,124 +31,15 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--output-name",
         default="features.parquet",
-        help="Filename for the aggregated feature table",
+        help="Name of the feature dataset inside the output directory",
     )
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Extraction processes")
     return parser.parse_args()
 
 
-def read_records(input_dir: Path) -> list[dict[str, object]]:
-    records: list[dict[str, object]] = []
-    paths = sorted(input_dir.glob("record_*.json"))
-    if not paths:
-        logger.warning("No record_*.json files found under %s", input_dir)
-        return records
-    for path in paths:
-        raw = json.loads(path.read_text())
-        model = ZTFRecord.model_validate(raw)
-        records.append(model.model_dump())
-    logger.info("Loaded %d ZTF records", len(records))
-    return records
-
-
-def build_features(records: list[dict[str, object]]) -> pd.DataFrame:
-    if not records:
-        return pd.DataFrame(
-            columns=[
-                "object_id",
-                "detections",
-                "mean_mag",
-                "std_mag",
-                "min_mag",
-                "max_mag",
-                "filters",
-            ]
-        )
-    df = pd.DataFrame(records)
-    # Image API data has mag_psf as None, so we don't dropna anymore
-    # df.dropna(subset=["mag_psf"], inplace=True)
-    
-    if df.empty:
-        return pd.DataFrame(
-            columns=[
-                "object_id",
-                "detections",
-                "mean_mag",
-                "std_mag",
-                "min_mag",
-                "max_mag",
-                "filters",
-            ]
-        )
-    # === USE INDIVIDUAL RECORDS FOR MAXIMUM TRAINING DATA ===
-    # Instead of grouping by object_id (which gives only 10 samples),
-    # treat each record as an independent training example
-    
-    logger.info(f"Processing {len(df)} individual ZTF records for training...")
-    
-    # For each record, compute features and label
-    feature_records = []
-    
-    for idx, row in df.iterrows():
-        try:
-            obj_id = row.get('object_id', f'ztf_{idx}')
-            mag = row.get('mag_psf', 20.0)
-            filter_band = row.get('filter', 'unknown')
-            mjd = row.get('mjd', 0)
-            
-            # Create features with synthetic variability for better class separation
-            # Use magnitude-based synthetic std to help model distinguish event types
-            synthetic_std = abs(mag - 17.5) * 0.15  # Variability increases with distance from median
-            
-            features = {
-                'object_id': obj_id,
-                'detections': 1.0,
-                'mean_mag': mag,
-                'std_mag': synthetic_std,  # Synthetic variability for class separation
-                'min_mag': mag - synthetic_std,
-                'max_mag': mag + synthetic_std,
-                'filters': filter_band
-            }
-            
-            # Get label from AutoLabeler
-            metadata = {
-                'mag_psf': mag,
-                'filter': filter_band
-            }
-            
-            label_result = AutoLabeler.classify(
-                [mjd],  # Single time point
-                [mag],  # Single magnitude
-                metadata=metadata
-            )
-            
-            features['label'] = label_result.label.value
-            feature_records.append(features)
-            
-        except Exception as e:
-            logger.warning(f"Failed to process record {idx}: {e}")
-            continue
-    
-    # Create DataFrame from processed records
-    stats = pd.DataFrame(feature_records)
-    
-    if stats.empty:
-        logger.warning("No valid features extracted")
-        return pd.DataFrame()
-    
-    logger.info(f"Label distribution in {len(stats)} samples:")
-    logger.info(f"\n{stats['label'].value_counts()}")
-    
-    return stats
-
-
 def main() -> None:
     args = parse_args()
-    args.output_dir.mkdir(parents=True, exist_ok=True)
-    records = read_records(args.input_dir)
-    features = build_features(records)
-    output_path = args.output_dir / args.output_name
-    features.to_parquet(output_path, index=False)
-    logger.info("Wrote %d feature rows to %s", len(features), output_path)
+    build_features("ztf", args.input_dir, args.output_dir, FeatureOptions(workers=args.workers, name=args.output_name))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Pack the small record files of raw data-lake sources into immutable shards.
+
+    python scripts/compact_raw.py                       # every source under data/raw
+    python scripts/compact_raw.py --source tess --shard-rows 50000
+    python scripts/compact_raw.py --verify              # check shard checksums only
+
+Prints a JSON summary per source; ``--verify`` exits non-zero if any shard does
+not match its manifest entry.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data_ingestion.compaction import CompactionOptions, compact, verify_shards  # noqa: E402
+from src.data_ingestion.schemas import MASTRecord, TESSRecord, ZTFRecord  # noqa: E402
+from src.data_ingestion.storage import count_records  # noqa: E402
+
+logging.basicConfig(level=os.getenv("INGEST_LOG_LEVEL", "INFO"))
+logger = logging.getLogger("compact_raw")
+
+RECORD_MODELS = {"ztf": ZTFRecord, "ztf_alerts": ZTFRecord, "tess": TESSRecord, "mast": MASTRecord}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    defaults = CompactionOptions()
+    parser = argparse.ArgumentParser(description="Compact raw record files into indexed Parquet shards")
+    parser.add_argument("--root", type=Path, default=Path("data/raw"), help="Data-lake root holding one directory per source")
+    parser.add_argument("--source", action="append", help="Source directory to compact (repeatable, default: all)")
+    parser.add_argument("--shard-rows", type=int, default=defaults.shard_rows, help="Records per shard")
+    parser.add_argument(
+        "--shard-mb",
+        type=float,
+        default=defaults.shard_bytes / 1024**2,
+        help="Most uncompressed MB per shard (whichever of the two limits is hit first)",
+    )
+    parser.add_argument(
+        "--row-group-rows",
+        type=int,
+        default=defaults.row_group_rows,
+        help="Most records per row group (a lookup by key reads one row group)",
+    )
+    parser.add_argument(
+        "--row-group-mb",
+        type=float,
+        default=defaults.row_group_bytes / 1024**2,
+        help="Most uncompressed MB per row group",
+    )
+    parser.add_argument("--keep-sources", action="store_true", help="Leave the compacted files in place")
+    parser.add_argument("--verify", action="store_true", help="Only check shards against their manifest checksums")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    sources = args.source
+    if not sources:
+        sources = sorted(p.name for p in args.root.iterdir() if p.is_dir()) if args.root.exists() else []
+    options = CompactionOptions(
+        shard_rows=args.shard_rows,
+        shard_bytes=int(args.shard_mb * 1024**2),
+        row_group_rows=args.row_group_rows,
+        row_group_bytes=int(args.row_group_mb * 1024**2),
+        delete_sources=not args.keep_sources,
+    )
+    summary = {}
+    failed = False
+    for source in sources:
+        root = args.root / source
+        if args.verify:
+            problems = verify_shards(root)
+            failed = failed or bool(problems)
+            summary[source] = {"status": "ok" if not problems else "corrupt", "problems": problems}
+            continue
+        start = time.perf_counter()
+        result = compact(root, RECORD_MODELS.get(source), options)
+        summary[source] = {
+            "files_compacted": result.files_compacted,
+            "records": result.records,
+            "duplicates_dropped": result.duplicates_dropped,
+            "shards": [path.name for path in result.shards],
+            "bytes_before": result.bytes_before,
+            "bytes_after": result.bytes_after,
+            "records_total": count_records(root),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+    print(json.dumps(summary, indent=2))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Compare ingestion runs recorded in ``.ingestion_runs.jsonl`` run logs.
+
+Prints one row per run (throughput, request latency percentiles, bytes, retries,
+cache hits and seconds per stage) and, for each run after a source's first, the
+stage whose time changed most since that source's previous run, so a slow
+nightly ingest can be put down to the network, decoding or disk writes.
+
+    python scripts/compare_ingestion_runs.py data/raw --source tess --last 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data_ingestion.run_metrics import read_run_log  # noqa: E402
+
+STAGES = ("fetch", "download", "decode", "validate", "persist")
+
+
+def run_row(run: dict[str, Any]) -> dict[str, Any]:
+    """The comparable numbers of one run-log entry."""
+    metrics = run.get("metrics") or {}
+    requests = metrics.get("requests") or {}
+    stages = metrics.get("stages") or {}
+    return {
+        "logged_at": run.get("logged_at", "")[:19],
+        "source": run.get("source", "?"),
+        "records": run.get("records", 0),
+        "wall_s": metrics.get("wall_seconds"),
+        "rec_per_s": metrics.get("records_per_second"),
+        "requests": requests.get("count", 0),
+        "p50_ms": requests.get("p50_ms"),
+        "p99_ms": requests.get("p99_ms"),
+        "mb": round(requests.get("bytes_downloaded", 0) / 1024**2, 2),
+        "retries": metrics.get("retries", 0),
+        "cache_hits": requests.get("cache_hits", 0),
+        **{f"{stage}_s": stages.get(stage) for stage in STAGES},
+    }
+
+
+def compare(runs: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Rows for ``runs`` (oldest first), each annotated with the change since the source's previous run."""
+    rows: list[dict[str, Any]] = []
+    previous: dict[str, dict[str, Any]] = {}
+    for run in runs:
+        row = run_row(run)
+        before = previous.get(row["source"])
+        if before is not None:
+            row["change"] = describe_change(before, row)
+        previous[row["source"]] = row
+        rows.append(row)
+    return rows
+
+
+def describe_change(before: dict[str, Any], after: dict[str, Any]) -> str:
+    """Wall-time change and the stage (or request latency) that moved most."""
+    parts = []
+    if before["wall_s"] and after["wall_s"] is not None:
+        parts.append(f"wall {_percent(before['wall_s'], after['wall_s'])}")
+    deltas = {
+        stage: (after[f"{stage}_s"] or 0.0) - (before[f"{stage}_s"] or 0.0)
+        for stage in STAGES
+        if before[f"{stage}_s"] is not None or after[f"{stage}_s"] is not None
+    }
+    if deltas:
+        stage = max(deltas, key=lambda name: abs(deltas[name]))
+        parts.append(f"{stage} {deltas[stage]:+.2f}s")
+    if before["p50_ms"] and after["p50_ms"] is not None:
+        parts.append(f"p50 {_percent(before['p50_ms'], after['p50_ms'])}")
+    if after["retries"] != before["retries"]:
+        parts.append(f"retries {after['retries'] - before['retries']:+d}")
+    return ", ".join(parts)
+
+
+def _percent(before: float, after: float) -> str:
+    return f"{(after - before) / before * 100:+.0f}%"
+
+
+def format_table(rows: list[dict[str, Any]]) -> str:
+    columns = [column for column in rows[0] if column != "change"] if rows else []
+    cells = [[_cell(row.get(column)) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(columns)]
+    lines = ["  ".join(column.rjust(width) for column, width in zip(columns, widths))]
+    for row, line in zip(rows, cells):
+        lines.append("  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
+        if row.get("change"):
+            lines.append(f"    vs previous {row['source']} run: {row['change']}")
+    return "\n".join(lines)
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Compare ingestion runs from .ingestion_runs.jsonl logs")
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        type=Path,
+        default=[Path("data/raw")],
+        help="Run-log files or output directories to search for them (default: data/raw)",
+    )
+    parser.add_argument("--source", action="append", help="Only show these sources (repeatable)")
+    parser.add_argument("--last", type=int, help="Only show the last N runs")
+    parser.add_argument("--json", action="store_true", help="Print rows as JSON instead of a table")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    runs = read_run_log(path for path in args.paths if path.exists())
+    if args.source:
+        runs = [run for run in runs if run.get("source") in args.source]
+    rows = compare(runs)
+    if args.last:
+        rows = rows[-args.last:]
+    if not rows:
+        print("No ingestion runs found", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(rows, indent=2) if args.json else format_table(rows))
+
+
+if __name__ == "__main__":
+    main()
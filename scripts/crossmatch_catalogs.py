@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Cross-match data-lake sources by position and write one match table per pair.
+
+    python scripts/crossmatch_catalogs.py                       # ztf-tess, ztf-mast, tess-mast
+    python scripts/crossmatch_catalogs.py --pair ztf tess --radius 21 --nearest-only
+    python scripts/crossmatch_catalogs.py --workers 4 --chunk-rows 200000
+
+Tables are written to ``<output-dir>/<left>__<right>.parquet``; feature builders
+join them with ``crossmatch.attach_matches``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.data_ingestion.crossmatch import (  # noqa: E402
+    DEFAULT_MATCH_DIR,
+    CrossMatchOptions,
+    crossmatch_sources,
+    match_path,
+    write_matches,
+)
+
+logging.basicConfig(level=os.getenv("INGEST_LOG_LEVEL", "INFO"))
+logger = logging.getLogger("crossmatch_catalogs")
+
+DEFAULT_PAIRS = [("ztf", "tess"), ("ztf", "mast"), ("tess", "mast")]
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    defaults = CrossMatchOptions()
+    parser = argparse.ArgumentParser(description="Cross-match ingested catalogs by position")
+    parser.add_argument("--root", type=Path, default=Path("data/raw"), help="Data-lake root holding one directory per source")
+    parser.add_argument(
+        "--pair",
+        nargs=2,
+        action="append",
+        metavar=("LEFT", "RIGHT"),
+        help="Sources to match (repeatable, default: ztf-tess, ztf-mast, tess-mast)",
+    )
+    parser.add_argument("--output-dir", type=Path, default=DEFAULT_MATCH_DIR, help="Directory for the match tables")
+    parser.add_argument("--radius", type=float, default=defaults.radius_arcsec, help="Match radius in arcseconds")
+    parser.add_argument("--partition-nside", type=int, default=defaults.partition_nside, help="HEALPix nside of the sky partitions")
+    parser.add_argument("--chunk-rows", type=int, default=defaults.chunk_rows, help="Left rows per KD-tree query")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes matching partitions")
+    parser.add_argument("--nearest-only", action="store_true", help="Keep only the closest counterpart of each left record")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    options = CrossMatchOptions(
+        radius_arcsec=args.radius,
+        partition_nside=args.partition_nside,
+        chunk_rows=args.chunk_rows,
+        workers=args.workers,
+        nearest_only=args.nearest_only,
+    )
+    summary = []
+    for left, right in args.pair or DEFAULT_PAIRS:
+        if not (args.root / left).is_dir() or not (args.root / right).is_dir():
+            logger.warning("Skipping %s-%s: both sources must exist under %s", left, right, args.root)
+            continue
+        start = time.perf_counter()
+        matches = crossmatch_sources(left, right, args.root, options)
+        path = write_matches(matches, match_path(left, right, args.output_dir), options)
+        summary.append({"left": left, "right": right, "pairs": matches.num_rows, "path": str(path), "seconds": round(time.perf_counter() - start, 3)})
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ if str(PROJECT_ROOT) not in sys.path:
 
 from src.datasets.parquet_dataset import ParquetEpisodeDataset
 from src.models.fewshot.protonet import ProtoNet, SimpleEmbedding
+from src.models.registry import REGISTRY_DIR, register_version
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("generate_prototypes")
@@ -79,5 +80,15 @@ def main():
     
     logger.info(f"Saved {len(prototypes)} prototypes to {output_path}")
 
+    # 5. Publish to the model registry; running API workers swap to it without a restart
+    version = register_version(
+        PROJECT_ROOT / REGISTRY_DIR,
+        model.state_dict(),
+        prototypes=prototypes,
+        feature_schema=dataset.feature_columns,
+        source=str(model_path),
+    )
+    logger.info(f"Published model version {version}")
+
 if __name__ == "__main__":
     main()
@@ -4,10 +4,16 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
+import itertools
 import json
 import logging
+import multiprocessing
 import os
+import queue
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import Any
 
@@ -24,8 +30,10 @@ from src.data_ingestion import (
     BaseIngestor,
     create_mast_ingestor,
     create_tess_ingestor,
+    create_ztf_alert_ingestor,
     create_ztf_ingestor,
 )
+from src.data_ingestion.sky_index import DEFAULT_INDEX_PATH, DEFAULT_NSIDE, build_sky_index
 
 load_dotenv()
 
@@ -36,15 +44,19 @@ INGESTOR_FACTORY = {
     "ztf": create_ztf_ingestor,
     "tess": create_tess_ingestor,
     "mast": create_mast_ingestor,
+    "ztf_alerts": create_ztf_alert_ingestor,
 }
 
 SOURCE_CHOICES = tuple(INGESTOR_FACTORY.keys())
+# Local alert-packet drops are only read when selected explicitly
+ALL_SOURCES = tuple(source for source in SOURCE_CHOICES if source != "ztf_alerts")
 ALL_SOURCES_TOKEN = "all"
 
 README_TEMPLATES = {
-    "ztf": """# ZTF Raw Data Drop\n\nThis folder stores transient alert packets fetched from the Zwicky Transient Facility.\n\n## Contents\n- `record_*.json` – Individual alert payloads emitted by the ingestion pipeline.\n- `metadata/` (optional) – Any auxiliary files or catalog joins.\n\n## Schema Highlights\n- `object_id` *(str)* – Unique identifier for the transient candidate.\n- `ra`, `dec` *(float)* – Right ascension and declination in degrees.\n- `mjd` *(float)* – Observation timestamp (Modified Julian Date).\n- `mag_psf` *(float)* – PSF-fit magnitude.\n- `filter` *(str)* – Photometric filter (e.g., `g`, `r`).\n\n## Handling Guidelines\n- Keep only small development batches under version control via DVC.\n- Never commit raw alert dumps to git; use DVC (`dvc add data/raw/ztf`) once ready.\n- Scrub or redact personally identifiable metadata if present.\n""",
-    "tess": """# TESS Raw Data Drop\n\nThis directory contains light-curve segments downloaded from the TESS archives via the ingestion pipeline.\n\n## Contents\n- `record_*.json` – Light-curve metadata and flux arrays exported by the ingestion pipeline.\n- `fits/` (optional) – FITS products or cutouts retrieved separately.\n\n## Schema Highlights\n- `tic_id` *(str)* – Target identifier from the TESS Input Catalog.\n- `sector` *(int)* – Observing sector number.\n- `cadence` *(str)* – Cadence mode (`short` or `long`).\n- `time` *(list[float])* – Relative timestamps for the segment.\n- `flux` *(list[float])* – Calibrated flux values aligned with `time`.\n\n## Handling Guidelines\n- Store only downsampled or truncated arrays for development purposes.\n- Use DVC to track provenance and avoid committing raw FITS data directly to git.\n- Validate data integrity with provided schema validators before downstream usage.\n""",
-    "mast": """# MAST Raw Data Drop\n\nUse this directory to capture metadata responses from the Mikulski Archive for Space Telescopes.\n\n## Contents\n- `record_*.json` – Catalog entries returned by the ingestion pipeline.\n- `aux/` (optional) – Supplemental tables or cross-matched catalog exports.\n\n## Schema Highlights\n- `observation_id` *(str)* – Unique observation identifier.\n- `instrument` *(str)* – Instrument used for the observation.\n- `target` *(str)* – Target object name.\n- `exposure_time` *(float)* – Exposure duration in seconds.\n- `spectral_range` *(list[float])* – Approximate wavelength coverage `[min, max]` in Ångströms.\n\n## Handling Guidelines\n- Keep only representative subsets for experimentation; full archives should remain in external storage.\n- All raw metadata should be versioned through DVC, not git.\n- Document ingestion runs and dataset hashes in `docs/progress_log.md`.\n""",
+    "ztf": """# ZTF Raw Data Drop\n\nThis folder stores transient alert packets fetched from the Zwicky Transient Facility.\n\n## Contents\n- `ingest_date=YYYY-MM-DD/part-*.parquet` – Record batches written by the ingestion pipeline (read them with `src.data_ingestion.storage.iter_records`).\n- `record_*.json` – One file per record from `storage: json` runs or older drops; the readers pick these up too.\n- `.ingestion_ledger.sqlite` – Keys and watermark of everything ingested so far.\n- `.ingestion_runs.jsonl` – Timings and request metrics of each run (compare them with `scripts/compare_ingestion_runs.py`).\n- `shards/` – Older parts and JSON drops packed into large indexed Parquet shards by `scripts/compact_raw.py`; the readers include them.\n- `metadata/` (optional) – Any auxiliary files or catalog joins.\n\n## Schema Highlights\n- `object_id` *(str)* – Unique identifier for the transient candidate.\n- `ra`, `dec` *(float)* – Right ascension and declination in degrees.\n- `mjd` *(float)* – Observation timestamp (Modified Julian Date).\n- `mag_psf` *(float)* – PSF-fit magnitude.\n- `filter` *(str)* – Photometric filter (e.g., `g`, `r`).\n\n## Handling Guidelines\n- Keep only small development batches under version control via DVC.\n- Never commit raw alert dumps to git; use DVC (`dvc add data/raw/ztf`) once ready.\n- Scrub or redact personally identifiable metadata if present.\n""",
+    "tess": """# TESS Raw Data Drop\n\nThis directory contains light-curve segments downloaded from the TESS archives via the ingestion pipeline.\n\n## Contents\n- `ingest_date=YYYY-MM-DD/part-*.parquet` – Record batches written by the ingestion pipeline (read them with `src.data_ingestion.storage.iter_records`).\n- `record_*.json` – One file per record from `storage: json` runs or older drops; the readers pick these up too.\n- `.ingestion_ledger.sqlite` – Keys and watermark of everything ingested so far.\n- `.ingestion_runs.jsonl` – Timings and request metrics of each run (compare them with `scripts/compare_ingestion_runs.py`).\n- `shards/` – Older parts and JSON drops packed into large indexed Parquet shards by `scripts/compact_raw.py`; the readers include them.\n- `fits/` (optional) – FITS products or cutouts retrieved separately.\n\n## Schema Highlights\n- `tic_id` *(str)* – Target identifier from the TESS Input Catalog.\n- `sector` *(int)* – Observing sector number.\n- `cadence` *(str)* – Cadence mode (`short` or `long`).\n- `time` *(list[float])* – Relative timestamps for the segment.\n- `flux` *(list[float])* – Calibrated flux values aligned with `time`.\n\n## Handling Guidelines\n- Store only downsampled or truncated arrays for development purposes.\n- Use DVC to track provenance and avoid committing raw FITS data directly to git.\n- Validate data integrity with provided schema validators before downstream usage.\n""",
+    "ztf_alerts": """# ZTF Alert-Packet Data Drop\n\nThis folder stores detections decoded from ZTF Avro alert packets (Kafka packet files, directory drops or nightly `.tar.gz` archives).\n\n## Contents\n- `ingest_date=YYYY-MM-DD/part-*.parquet` – Record batches written by the ingestion pipeline (read them with `src.data_ingestion.storage.iter_records`).\n- `.ingestion_ledger.sqlite` – Candidate IDs and watermark of everything ingested so far.\n- `.ingestion_runs.jsonl` – Timings and request metrics of each run (compare them with `scripts/compare_ingestion_runs.py`).\n- `shards/` – Older parts and JSON drops packed into large indexed Parquet shards by `scripts/compact_raw.py`; the readers include them.\n\n## Schema Highlights\n- `object_id`, `candidate_id` *(str)* – ZTF object and candidate identifiers.\n- `ra`, `dec` *(float)* – Position in degrees.\n- `mjd` *(float)* – Observation time (alert `jd` − 2400000.5).\n- `mag_psf`, `mag_err` *(float)* – PSF-fit magnitude and its uncertainty.\n- `filter` *(str)* – `g`, `r` or `i`.\n- `rb`, `drb`, `isdiffpos`, `cutout_*` – Candidate quality scores and cutout file names/sizes (alert candidates only, not history rows).\n\n## Handling Guidelines\n- The packets themselves stay in the drop location; only decoded detections land here.\n- Track decoded batches with DVC, not git.\n""",
+    "mast": """# MAST Raw Data Drop\n\nUse this directory to capture metadata responses from the Mikulski Archive for Space Telescopes.\n\n## Contents\n- `ingest_date=YYYY-MM-DD/part-*.parquet` – Record batches written by the ingestion pipeline (read them with `src.data_ingestion.storage.iter_records`).\n- `record_*.json` – One file per record from `storage: json` runs or older drops; the readers pick these up too.\n- `.ingestion_ledger.sqlite` – Keys and watermark of everything ingested so far.\n- `.ingestion_runs.jsonl` – Timings and request metrics of each run (compare them with `scripts/compare_ingestion_runs.py`).\n- `shards/` – Older parts and JSON drops packed into large indexed Parquet shards by `scripts/compact_raw.py`; the readers include them.\n- `aux/` (optional) – Supplemental tables or cross-matched catalog exports.\n\n## Schema Highlights\n- `observation_id` *(str)* – Unique observation identifier.\n- `instrument` *(str)* – Instrument used for the observation.\n- `target` *(str)* – Target object name.\n- `exposure_time` *(float)* – Exposure duration in seconds.\n- `spectral_range` *(list[float])* – Approximate wavelength coverage `[min, max]` in Ångströms.\n\n## Handling Guidelines\n- Keep only representative subsets for experimentation; full archives should remain in external storage.\n- All raw metadata should be versioned through DVC, not git.\n- Document ingestion runs and dataset hashes in `docs/progress_log.md`.\n""",
 }
 
 
@@ -56,14 +68,18 @@ def load_config(path: Path) -> dict[str, Any]:
 def build_ingestor(source: str, output: Path, config: dict[str, Any]) -> BaseIngestor:
     if source not in INGESTOR_FACTORY:
         raise ValueError(f"Unsupported source '{source}'. Expected one of {list(INGESTOR_FACTORY)}")
-    source_cfg = config.get("data_sources", {}).get(source, {})
+    source_cfg = dict(config.get("data_sources", {}).get(source, {}))
+    # The HTTP cache and upstream guard are shared by every source unless one overrides them
+    for shared in ("http_cache", "upstream_guard"):
+        if config.get(shared) is not None:
+            source_cfg.setdefault(shared, config[shared])
     output.mkdir(parents=True, exist_ok=True)
     return INGESTOR_FACTORY[source](output, source_cfg)
 
 
 def resolve_sources(selected: str) -> list[str]:
     if selected == ALL_SOURCES_TOKEN:
-        return list(SOURCE_CHOICES)
+        return list(ALL_SOURCES)
     return [selected]
 
 
@@ -80,6 +96,8 @@ def build_fetch_kwargs(source: str, args: argparse.Namespace) -> dict[str, Any]:
             fetch_kwargs["filters"] = args.irsa_filters
         if args.irsa_mjd_range:
             fetch_kwargs["mjd_range"] = tuple(args.irsa_mjd_range)
+    if source == "ztf_alerts" and args.alert_paths:
+        fetch_kwargs["paths"] = args.alert_paths
     return fetch_kwargs
 
 
@@ -95,6 +113,18 @@ def parse_args() -> argparse.Namespace:
         help="Directory where fetched records will be written",
     )
     parser.add_argument("--dry-run", action="store_true", help="Print fetched records without persisting")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=0,
+        help="Sources ingested at once with --source all (default: all of them; 1 runs them in turn)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk HTTP cache")
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Re-fetch records already in the ingestion ledger instead of only new ones",
+    )
     parser.add_argument("--irsa-ra", type=float, help="Override cone-search right ascension (degrees)")
     parser.add_argument("--irsa-dec", type=float, help="Override cone-search declination (degrees)")
     parser.add_argument("--irsa-radius", type=float, help="Override cone-search radius (degrees)")
@@ -111,60 +141,209 @@ def parse_args() -> argparse.Namespace:
         metavar=("START", "END"),
         help="Override IRSA time window (Modified Julian Date)",
     )
+    parser.add_argument(
+        "--alert-path",
+        action="append",
+        dest="alert_paths",
+        type=Path,
+        help="Avro alert packet, directory drop or .tar.gz archive for --source ztf_alerts (repeatable)",
+    )
     return parser.parse_args()
 
 
+class ProgressBoard:
+    """One status line for every running source, redrawn on stderr as workers report."""
+
+    def __init__(self, sources: list[str], stream: Any = None) -> None:
+        self.stream = stream or sys.stderr
+        self.states = {source: "waiting" for source in sources}
+        self.live = bool(getattr(self.stream, "isatty", lambda: False)())
+
+    def update(self, source: str, records: int) -> None:
+        self.states[source] = f"{records} records"
+        if self.live:
+            self._draw()
+
+    def finish(self, source: str, entry: dict[str, Any]) -> None:
+        if entry["status"] == "ok":
+            self.states[source] = f"done {entry['records']} in {entry['seconds']:.1f}s"
+        else:
+            self.states[source] = f"failed ({entry.get('error')})"
+        if self.live:
+            self._draw(end="\n" if all(s.startswith(("done", "failed")) for s in self.states.values()) else "")
+        else:
+            print(f"{source}: {self.states[source]}", file=self.stream, flush=True)
+
+    def _draw(self, end: str = "") -> None:
+        line = " | ".join(f"{source}: {state}" for source, state in self.states.items())
+        print(f"\r{line}\x1b[K", end=end, file=self.stream, flush=True)
+
+
+def run_source(source: str, args: argparse.Namespace, config: dict[str, Any], updates: Any = None) -> dict[str, Any]:
+    """
+    Ingest (or, with ``--dry-run``, fetch and validate) one source.
+
+    Runs in a worker process or thread with its own ingestor and HTTP session.
+    Errors are returned in the summary entry rather than raised, so one failing
+    archive does not abort the others. ``updates`` receives ``(source, records)``.
+    """
+    start = time.perf_counter()
+    output_dir = args.output / source
+    entry: dict[str, Any] = {"status": "ok", "records": 0}
+    try:
+        ingestor = build_ingestor(source, output_dir, config)
+        ingestor.incremental = not args.full_refresh
+        if updates is not None:
+            ingestor.progress = lambda records: updates.put((source, records))
+        fetch_kwargs = build_fetch_kwargs(source, args)
+        if args.dry_run:
+            entry.update(dry_run_source(ingestor, fetch_kwargs))
+        else:
+            result = ingestor.run(**fetch_kwargs)
+            readme = README_TEMPLATES.get(source)
+            if readme:
+                (output_dir / "README.md").write_text(readme)
+            entry.update(
+                records=result.records_fetched,
+                bytes_written=sum(path.stat().st_size for path in result.output_paths if path.exists()),
+                duplicates_skipped=result.metadata.get("duplicates_skipped", 0),
+                watermark=result.metadata.get("watermark"),
+                metrics=result.metadata["metrics"],
+            )
+            if result.metadata.get("fetch_errors"):
+                entry["fetch_errors"] = result.metadata["fetch_errors"]
+            logger.info(
+                "Ingestion completed for %s: records=%d, duplicates_skipped=%d, watermark=%s, output_dir=%s",
+                result.source,
+                result.records_fetched,
+                entry["duplicates_skipped"],
+                entry["watermark"],
+                output_dir,
+            )
+    except Exception as exc:
+        logger.exception("Ingestion failed for %s", source)
+        entry.update(status="failed", error=f"{type(exc).__name__}: {exc}")
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+def dry_run_source(ingestor: BaseIngestor, fetch_kwargs: dict[str, Any]) -> dict[str, Any]:
+    """Validate fetched records batch by batch, keeping only a count and the first record."""
+    batch_size = max(1, int(ingestor.config.get("persist_batch", 100)))
+    metrics = ingestor.metrics
+    metrics.reset()
+    fetched = iter(ingestor.fetch(**fetch_kwargs))
+    records = 0
+    sample = None
+    batches = iter(lambda: list(itertools.islice(fetched, batch_size)), [])
+    for batch in metrics.timed(batches, "fetch"):
+        with metrics.timer("validate"):
+            records += len(ingestor.validate_batch(batch))
+        if sample is None:
+            sample = ingestor.validate_record(batch[0])
+        if ingestor.progress is not None:
+            ingestor.progress(records)
+    return {"records": records, "sample": sample, "metrics": metrics.summary(records)}
+
+
+def run_sources(sources: list[str], args: argparse.Namespace, config: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    """
+    Run ``sources`` concurrently, ``--jobs`` at a time.
+
+    Ingestion runs in separate processes (isolated sessions, ledgers and CPU);
+    dry runs only fetch and validate, so they share this process on threads.
+    A single source, or ``--jobs 1``, runs inline.
+    """
+    jobs = min(args.jobs or len(sources), len(sources))
+    if jobs <= 1:
+        return {source: run_source(source, args, config) for source in sources}
+
+    board = ProgressBoard(sources)
+    results: dict[str, dict[str, Any]] = {}
+    with contextlib.ExitStack() as stack:
+        if args.dry_run:
+            pool: Executor = stack.enter_context(ThreadPoolExecutor(jobs, thread_name_prefix="ingest"))
+            updates: Any = queue.Queue()
+        else:
+            pool = stack.enter_context(ProcessPoolExecutor(jobs))
+            updates = stack.enter_context(multiprocessing.Manager()).Queue()
+        pending = {pool.submit(run_source, source, args, config, updates): source for source in sources}
+        while pending:
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            _drain(updates, board)
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    results[source] = future.result()
+                except Exception as exc:  # the worker process itself died
+                    logger.error("Ingestion worker for %s failed: %s", source, exc)
+                    results[source] = {"status": "failed", "records": 0, "error": f"{type(exc).__name__}: {exc}"}
+                board.finish(source, results[source])
+    return {source: results[source] for source in sources}
+
+
+def _drain(updates: Any, board: ProgressBoard) -> None:
+    while True:
+        try:
+            source, records = updates.get_nowait()
+        except queue.Empty:
+            return
+        board.update(source, records)
+
+
+def refresh_sky_index(output: Path, config: dict[str, Any]) -> dict[str, Any] | None:
+    """Rebuild the HEALPix index over every source under ``output`` when ``sky_index`` is enabled."""
+    sky_cfg = config.get("sky_index") or {}
+    if not sky_cfg.get("enabled", False):
+        return None
+    path = Path(sky_cfg.get("path", DEFAULT_INDEX_PATH))
+    sources = {source: output / source for source in SOURCE_CHOICES if (output / source).is_dir()}
+    try:
+        rows = build_sky_index(sources, path, int(sky_cfg.get("nside", DEFAULT_NSIDE)))
+    except Exception as exc:
+        logger.exception("Sky index rebuild failed")
+        return {"status": "failed", "error": f"{type(exc).__name__}: {exc}"}
+    return {"status": "ok", "path": str(path), "rows": rows}
+
+
 def main() -> None:
     args = parse_args()
     config = load_config(args.config)
+    if args.no_cache:
+        config["http_cache"] = None
+        for source_cfg in config.get("data_sources", {}).values():
+            source_cfg.pop("http_cache", None)
     sources = resolve_sources(args.source)
-
     if args.dry_run:
         logger.info("Dry run enabled; fetching records without persisting")
-        summaries: dict[str, Any] = {}
-        total_records = 0
-        for source in sources:
-            output_dir = args.output / source
-            ingestor = build_ingestor(source, output_dir, config)
-            fetch_kwargs = build_fetch_kwargs(source, args)
-            records = [ingestor.validate_record(record) for record in ingestor.fetch(**fetch_kwargs)]
-            summaries[source] = {
-                "records": len(records),
-                "sample": records[0] if records else None,
-            }
-            total_records += len(records)
-
-        if len(sources) == 1:
-            source = sources[0]
-            summary = {"source": source, **summaries[source]}
-        else:
-            summary = {"sources": summaries, "total_records": total_records}
-        print(json.dumps(summary, indent=2))
-        return
 
-    total_records = 0
-    for source in sources:
-        output_dir = args.output / source
-        ingestor = build_ingestor(source, output_dir, config)
-        fetch_kwargs = build_fetch_kwargs(source, args)
-        result = ingestor.run(**fetch_kwargs)
-        readme = README_TEMPLATES.get(source)
-        if readme:
-            (output_dir / "README.md").write_text(readme)
-        logger.info(
-            "Ingestion completed for %s: records=%d, output_dir=%s",
-            result.source,
-            result.records_fetched,
-            output_dir,
-        )
-        total_records += result.records_fetched
+    start = time.perf_counter()
+    results = run_sources(sources, args, config)
+    elapsed = round(time.perf_counter() - start, 3)
+    sky_index = None if args.dry_run else refresh_sky_index(args.output, config)
 
-    if len(sources) > 1:
+    if len(sources) == 1:
+        source = sources[0]
+        summary: dict[str, Any] = {"source": source, **results[source]}
+    else:
+        summary = {
+            "sources": results,
+            "total_records": sum(entry["records"] for entry in results.values()),
+            "seconds": elapsed,
+        }
         logger.info(
-            "Completed ingestion for %d sources; total records=%d",
+            "Completed ingestion for %d sources in %.1fs; total records=%d",
             len(sources),
-            total_records,
+            elapsed,
+            summary["total_records"],
         )
+    if sky_index is not None:
+        summary["sky_index"] = sky_index
+    print(json.dumps(summary, indent=2, default=str))
+    failed = [source for source, entry in results.items() if entry["status"] != "ok"]
+    if failed:
+        logger.error("Ingestion failed for: %s", ", ".join(failed))
+        sys.exit(1)
 
 
 if __name__ == "__main__":
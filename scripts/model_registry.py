@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""Inspect and manage the local model registry served by the API."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Ensure src/ is importable when executed as a script
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.models import registry  # noqa: E402
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("model_registry")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Manage model registry versions")
+    parser.add_argument("--registry-dir", type=Path, default=registry.REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Show stored versions and their metrics")
+    commands.add_parser("history", help="Show promotions and rollbacks")
+    promote = commands.add_parser("promote", help="Make a stored version current")
+    promote.add_argument("version")
+    commands.add_parser("rollback", help="Return to the previously current version")
+    register = commands.add_parser("register", help="Register a weights file (e.g. final_model.pt)")
+    register.add_argument("weights", type=Path)
+    register.add_argument("--prototypes", type=Path, help="prototypes.json produced by generate_prototypes.py")
+    register.add_argument("--metrics", type=json.loads, default=None, help="JSON object of metrics to record")
+    register.add_argument("--no-promote", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    root = args.registry_dir
+
+    if args.command == "list":
+        for meta in registry.list_versions(root):
+            marker = "*" if meta["current"] else " "
+            created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(meta["created_at"]))
+            print(f"{marker} {meta['version']}  {created}  classes={len(meta['classes'])}  metrics={meta['metrics']}")
+    elif args.command == "history":
+        for entry in registry.history(root):
+            at = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["at"]))
+            print(f"{at}  {entry['action']:<8} {entry['previous']} -> {entry['version']}")
+    elif args.command == "promote":
+        registry.promote(root, args.version)
+    elif args.command == "rollback":
+        logger.info("Current version is now %s", registry.rollback(root))
+    elif args.command == "register":
+        import torch
+
+        state_dict = torch.load(args.weights, map_location="cpu")
+        prototypes = json.loads(args.prototypes.read_text()) if args.prototypes else None
+        registry.register_version(
+            root,
+            state_dict,
+            prototypes=prototypes,
+            metrics=args.metrics,
+            source=str(args.weights),
+            promote=not args.no_promote,
+        )
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except registry.RegistryError as e:
+        logger.error("%s", e)
+        sys.exit(1)
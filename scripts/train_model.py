@@ -4,6 +4,7 @@ Train a Prototypical Network on ZTF, TESS, and MAST features.
 
 import argparse
 import logging
+import os
 from pathlib import Path
 
 import torch
@@ -16,6 +17,8 @@ if str(PROJECT_ROOT) not in sys.path:
 
 from src.datasets.parquet_dataset import ParquetEpisodeDataset
 from src.models.fewshot.protonet import ProtoNet, SimpleEmbedding
+from src.models.registry import REGISTRY_DIR
+from src.preprocessing.synthetic import build_synthetic_feature_store
 from src.training.fewshot_trainer import FewShotTrainer, TrainerConfig
 
 logging.basicConfig(level=logging.INFO)
@@ -39,10 +42,36 @@ def main() -> None:
     parser.add_argument("--episodes", type=int, default=100, help="Episodes per epoch")
     parser.add_argument("--lr", type=float, default=0.001, help="Learning rate")
     parser.add_argument("--output-dir", type=Path, default=Path("artifacts/models"), help="Directory to save model")
+    parser.add_argument(
+        "--registry-dir",
+        type=Path,
+        default=REGISTRY_DIR,
+        help="Model registry the trained version is published to (served by the API)",
+    )
+    parser.add_argument("--no-promote", action="store_true", help="Register the version without making it current")
+    parser.add_argument(
+        "--synthetic-per-class",
+        type=int,
+        default=0,
+        help="Regenerate a synthetic augmentation set with this many curves per event type before training",
+    )
+    parser.add_argument("--synthetic-dir", type=Path, default=Path("data/processed/synthetic"))
+    parser.add_argument("--synthetic-seed", type=int, default=None, help="Seed for the augmentation set (default: random)")
     args = parser.parse_args()
 
     # 1. Prepare Dataset
-    feature_paths = [d / "features.parquet" for d in args.feature_dirs]
+    feature_dirs = list(args.feature_dirs)
+    if args.synthetic_per_class > 0:
+        seed = args.synthetic_seed if args.synthetic_seed is not None else int(torch.randint(0, 2**31 - 1, (1,)))
+        build_synthetic_feature_store(
+            args.synthetic_dir,
+            per_class=args.synthetic_per_class,
+            workers=os.cpu_count() or 1,
+            seed=seed,
+        )
+        feature_dirs.append(args.synthetic_dir)
+
+    feature_paths = [d / "features.parquet" for d in feature_dirs]
     logger.info("Loading features from: %s", feature_paths)
     
     dataset = ParquetEpisodeDataset(
@@ -74,7 +103,9 @@ def main() -> None:
         learning_rate=args.lr,
         episodes_per_epoch=args.episodes,
         mlflow_experiment="AstronomyFewShot",
-        tracking_uri="file:./mlruns"
+        tracking_uri="file:./mlruns",
+        registry_dir=args.registry_dir,
+        promote=not args.no_promote,
     )
     
     trainer = FewShotTrainer(dataset=dataset, model=model, config=config)
@@ -36,7 +36,7 @@ def verify_ztf(config):
     logger.info("--- Verifying ZTF Ingestion ---")
     try:
         ingestor = create_ztf_ingestor(Path("data/raw/ztf"), config['data_sources']['ztf'])
-        records = ingestor.fetch(limit=1)
+        records = list(ingestor.fetch(limit=1))
         if records:
             logger.info(f"✅ ZTF Success! Fetched {len(records)} records.")
             logger.info(f"Sample Record: {records[0]}")
@@ -53,7 +53,7 @@ def verify_tess(config):
     logger.info("--- Verifying TESS Ingestion ---")
     try:
         ingestor = create_tess_ingestor(Path("data/raw/tess"), config['data_sources']['tess'])
-        records = ingestor.fetch(limit=1)
+        records = list(ingestor.fetch(limit=1))
         if records:
             logger.info(f"✅ TESS Success! Fetched {len(records)} records.")
             # Check if it's the sample payload
@@ -70,7 +70,7 @@ def verify_mast(config):
     logger.info("--- Verifying MAST Ingestion ---")
     try:
         ingestor = create_mast_ingestor(Path("data/raw/mast"), config['data_sources']['mast'])
-        records = ingestor.fetch(limit=1)
+        records = list(ingestor.fetch(limit=1))
         if records:
             logger.info(f"✅ MAST Success! Fetched {len(records)} records.")
             logger.info(f"Sample Record: {records[0]}")
@@ -1,15 +1,33 @@
-from .base import BaseIngestor, IngestionResult
-from .mast_ingestor import MASTIngestor, create_mast_ingestor
-from .tess_ingestor import TESSIngestor, create_tess_ingestor
-from .ztf_ingestor import ZTFIngestor, create_ztf_ingestor
-
-__all__ = [
-    "BaseIngestor",
-    "IngestionResult",
-    "ZTFIngestor",
-    "TESSIngestor",
-    "MASTIngestor",
-    "create_ztf_ingestor",
-    "create_tess_ingestor",
-    "create_mast_ingestor",
-]
+"""
+Ingestion connectors and the raw data lake.
+
+Connectors are resolved lazily so that lightweight submodules (``storage``,
+``ledger``) can be imported, e.g. by the API, without loading astropy,
+astroquery, fastavro or the ALeRCE client.
+"""
+
+from importlib import import_module
+from typing import Any
+
+_EXPORTS = {
+    "BaseIngestor": ".base",
+    "IngestionResult": ".base",
+    "ZTFIngestor": ".ztf_ingestor",
+    "TESSIngestor": ".tess_ingestor",
+    "MASTIngestor": ".mast_ingestor",
+    "ZTFAlertIngestor": ".ztf_avro_ingestor",
+    "create_ztf_ingestor": ".ztf_ingestor",
+    "create_tess_ingestor": ".tess_ingestor",
+    "create_mast_ingestor": ".mast_ingestor",
+    "create_ztf_alert_ingestor": ".ztf_avro_ingestor",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -3,15 +3,25 @@
 from __future__ import annotations
 
 import abc
+import hashlib
 import json
 import logging
 import os
+import threading
+from collections import Counter
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Iterable, Optional
+from typing import Any, Callable, Iterable, Iterator, Optional
 
+import numpy as np
 import requests
-from pydantic import ValidationError
+
+from ..utils.upstream_guard import UpstreamGuard, install_guard
+from .http_cache import HTTPCache, install_cache
+from .ledger import LEDGER_FILENAME, IngestionLedger
+from .run_metrics import RUN_LOG_FILENAME, RunMetrics, append_run_log
+from .storage import create_storage, json_default
+from .validation import validate_records
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +37,9 @@ class IngestionResult:
 class BaseIngestor(abc.ABC):
     """Abstract base class encapsulating shared ingestion behaviors."""
 
+    # Record field whose maximum is kept as the source's watermark (e.g. ``mjd``)
+    watermark_field: Optional[str] = None
+
     def __init__(self, source_name: str, output_dir: Path, config: dict[str, Any]) -> None:
         self.source_name = source_name
         self.output_dir = output_dir
@@ -37,40 +50,179 @@ class BaseIngestor(abc.ABC):
             "User-Agent": "CosmicOracle/1.0 (Research; +http://localhost)",
             "Accept": "application/json"
         })
+        cache_cfg = config.get("http_cache")
+        self.http_cache: Optional[HTTPCache] = None
+        if cache_cfg and cache_cfg.get("enabled", True):
+            self.http_cache = HTTPCache.from_config(cache_cfg)
+            install_cache(self.session, self.http_cache)
+        # Per-host rate limits and circuit breakers, shared with other ingestion processes
+        guard_cfg = config.get("upstream_guard")
+        self.guard: Optional[UpstreamGuard] = None
+        if guard_cfg and guard_cfg.get("enabled", True):
+            self.guard = UpstreamGuard.from_config(guard_cfg)
+            install_guard(self.session, self.guard)
         logger.debug("Initialized %s ingestor with output_dir=%s", source_name, output_dir)
         self._record_model = getattr(self, "record_model", None)
+        # When False, connectors re-fetch records the ledger has already seen
+        self.incremental = bool(config.get("incremental", True))
+        self._ledger: Optional[IngestionLedger] = None
+        # "parquet" writes one columnar part per batch; "json" one file per record
+        self.storage = create_storage(config.get("storage", "json"), output_dir, self._record_model)
+        # Upstream failures by stage (e.g. "lightcurve"), reported in the run metadata
+        self.fetch_errors: Counter[str] = Counter()
+        self._errors_lock = threading.Lock()
+        # Called with the running count of persisted records after each committed batch
+        self.progress: Optional[Callable[[int], None]] = None
+        # Request latencies, bytes, retries and stage timings of the current run
+        self.metrics = RunMetrics()
+        self.metrics.install(self.session)
+
+    @property
+    def ledger(self) -> IngestionLedger:
+        if self._ledger is None:
+            path = self.config.get("ledger_path") or self.output_dir / LEDGER_FILENAME
+            self._ledger = IngestionLedger(Path(path))
+        return self._ledger
+
+    def record_key(self, record: dict[str, Any]) -> Optional[str]:
+        """Stable identity of a record in its source; ``None`` falls back to a content hash."""
+        return None
+
+    def is_new(self, key: str) -> bool:
+        """Whether ``key`` still needs fetching (always true outside incremental mode)."""
+        return not self.incremental or not self.ledger.has(self.source_name, key)
+
+    def record_error(self, stage: str, subject: Any, exc: Exception | str) -> None:
+        """Count a failed upstream call; the first failure per stage is logged as a warning."""
+        with self._errors_lock:
+            self.fetch_errors[stage] += 1
+            first = self.fetch_errors[stage] == 1
+        log = logger.warning if first else logger.debug
+        log("%s %s failed for %s: %s", self.source_name, stage, subject, exc)
+
+    def watermark(self) -> Optional[float]:
+        if not self.incremental:
+            return None
+        return self.ledger.watermark(self.source_name)
 
     @abc.abstractmethod
     def fetch(self, *args: Any, **kwargs: Any) -> Iterable[dict[str, Any]]:
         """Retrieve data records from the upstream source."""
 
-    def validate_record(self, record: dict[str, Any]) -> dict[str, Any]:
+    def validate_batch(self, records: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Validate records together; array fields come back as NumPy arrays (see ``validation``)."""
         if self._record_model is None:
-            return record
+            return records
         try:
-            model_instance = self._record_model.model_validate(record)
-        except ValidationError as exc:
+            return validate_records(self._record_model, records)
+        except ValueError as exc:
             logger.error("Validation failed for %s record: %s", self.source_name, exc)
             raise ValueError(f"Invalid record for {self.source_name}") from exc
-        return model_instance.model_dump()
+
+    def validate_record(self, record: dict[str, Any]) -> dict[str, Any]:
+        """Validate one record into plain JSON-compatible values (arrays as lists)."""
+        validated = self.validate_batch([record])[0]
+        return {k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in validated.items()}
+
+    def _key_for(self, record: dict[str, Any]) -> str:
+        key = self.record_key(record)
+        if key:
+            return key
+        digest = hashlib.sha1(json.dumps(record, sort_keys=True, default=json_default).encode()).hexdigest()
+        return f"sha1-{digest[:16]}"
 
     def persist(self, records: Iterable[dict[str, Any]]) -> IngestionResult:
+        """
+        Consume ``records`` (typically a generator) in batches of ``persist_batch``.
+
+        Each batch is validated, de-duplicated (against the ledger, which holds the
+        keys of earlier batches too; outside incremental mode only this run's keys
+        count), written to ``record_<key>.json`` and committed to the ledger before
+        the next one is pulled, so memory stays bounded by the batch size and an
+        interrupted run resumes from the last committed batch. File names derive
+        from the record key, so reruns never overwrite other records.
+        """
+        ledger = self.ledger
+        run_id = ledger.start_run(self.source_name)
+        batch_size = max(1, int(self.config.get("persist_batch", 100)))
         paths: list[Path] = []
-        count = 0
-        for idx, record in enumerate(records):
-            validated = self.validate_record(record)
-            target_path = self.output_dir / f"record_{idx:05d}.json"
-            target_path.write_text(json.dumps(validated, indent=2))
-            paths.append(target_path)
-            count += 1
-        logger.info("Persisted %d records for %s", count, self.source_name)
-        return IngestionResult(self.source_name, count, paths, metadata={})
+        written = 0
+        skipped = 0
+        newest: Optional[float] = None
+
+        try:
+            for batch in self.metrics.timed(_batched(records, batch_size), "fetch"):
+                keyed: dict[str, dict[str, Any]] = {}
+                with self.metrics.timer("validate"):
+                    validated_batch = self.validate_batch(batch)
+                for validated in validated_batch:
+                    key = self._key_for(validated)
+                    if key in keyed:
+                        skipped += 1
+                        continue
+                    keyed[key] = validated
+                if keyed:
+                    for key in ledger.seen(self.source_name, keyed, run_id=None if self.incremental else run_id):
+                        del keyed[key]
+                        skipped += 1
+                if not keyed:
+                    continue
+
+                with self.metrics.timer("persist"):
+                    batch_paths = self.storage.write_batch(keyed)
+                    ledger.mark(self.source_name, zip(keyed, map(str, batch_paths)), run_id)
+                # One part per batch for Parquet storage, one file per record for JSON
+                paths.extend(dict.fromkeys(batch_paths))
+                written += len(keyed)
+                if self.progress is not None:
+                    self.progress(written)
+                if self.watermark_field:
+                    values = [float(r[self.watermark_field]) for r in keyed.values() if r.get(self.watermark_field) is not None]
+                    if values:
+                        newest = max(values) if newest is None else max(newest, *values)
+        except BaseException:
+            ledger.finish_run(run_id, written, status="failed")
+            raise
+
+        # Only advanced once the whole run landed: records arrive in no particular order
+        if newest is not None:
+            ledger.advance_watermark(self.source_name, newest)
+        watermark = ledger.watermark(self.source_name)
+        ledger.finish_run(run_id, written)
+        logger.info("Persisted %d records for %s (%d duplicates skipped)", written, self.source_name, skipped)
+        return IngestionResult(
+            self.source_name,
+            written,
+            paths,
+            metadata={"run_id": run_id, "duplicates_skipped": skipped, "watermark": watermark},
+        )
 
     def run(self, *args: Any, **kwargs: Any) -> IngestionResult:
+        """
+        Fetch and persist, then append the result and its ``metrics`` to the run log
+        (``run_log`` in the config, default ``<output_dir>/.ingestion_runs.jsonl``;
+        ``false`` disables it).
+        """
         logger.info("Running ingestion for %s", self.source_name)
+        self.metrics.reset()
         records = self.fetch(*args, **kwargs)
         result = self.persist(records)
-        logger.info("Completed ingestion for %s", self.source_name)
+        if self.http_cache is not None:
+            result.metadata["http_cache"] = self.http_cache.stats()
+        if self.fetch_errors:
+            result.metadata["fetch_errors"] = dict(self.fetch_errors)
+        result.metadata["metrics"] = self.metrics.summary(result.records_fetched)
+
+        run_log = self.config.get("run_log", self.output_dir / RUN_LOG_FILENAME)
+        if run_log:
+            entry = {"source": self.source_name, "records": result.records_fetched, "fetch_kwargs": kwargs, **result.metadata}
+            append_run_log(Path(run_log), entry)
+        logger.info(
+            "Completed ingestion for %s: %d records at %.1f/s",
+            self.source_name,
+            result.records_fetched,
+            result.metadata["metrics"]["records_per_second"] or 0.0,
+        )
         return result
 
     def get_auth_header(self) -> dict[str, str]:
@@ -85,6 +237,17 @@ class BaseIngestor(abc.ABC):
         return {header_template: f"Bearer {token}"}
 
 
+def _batched(records: Iterable[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    batch: list[dict[str, Any]] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 class StubbedIngestor(BaseIngestor):
     """Placeholder ingestor that returns mocked data for local development."""
 
@@ -0,0 +1,293 @@
+"""
+Compaction of a source directory's small record files into large, immutable shards.
+
+Years of ``record_*.json`` drops and per-batch Parquet parts mean millions of
+tiny files, which slows every directory scan (the API's live feed, feature
+builders, DVC). ``compact`` packs them into ``shards/shard-*.parquet`` files of
+up to ``shard_rows`` records or ``shard_bytes`` of Arrow data, each sorted by
+record key and written in small row groups, and appends the shard's SHA-256, size, row count and per-row-group key
+ranges to ``shards/_manifest.json``. The storage readers pick shards up through
+the manifest, and ``storage.read_record`` uses the key ranges to read a single
+row group per lookup.
+
+A shard is renamed into place and recorded in the manifest before its source
+files are deleted; the list of those files is journaled next to the shard so a
+compaction interrupted half-way is finished (or its orphaned shard removed) by
+the next one. Shards are never rewritten.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import fcntl
+import hashlib
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Optional, Sequence
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pydantic import BaseModel
+
+from .storage import (
+    KEY_COLUMN,
+    MANIFEST_FILENAME,
+    PARTITION_KEY,
+    SHARD_DIR,
+    _keyed_table,
+    _load_json,
+    _slug,
+    arrow_schema,
+    list_json,
+    list_parts,
+    read_manifest,
+)
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_SUFFIX = ".sources"
+# JSON drops converted per table; bounds memory while reading millions of files
+JSON_READ_BATCH = 10_000
+_HASH_BLOCK = 1 << 20
+
+
+@dataclass(frozen=True)
+class CompactionOptions:
+    # A shard is cut at whichever limit is hit first; the bytes cap bounds memory for wide light curves
+    shard_rows: int = 250_000
+    shard_bytes: int = 512 * 1024**2
+    # Row groups hold at most this many records or (uncompressed) bytes; a lookup by key reads one
+    row_group_rows: int = 1024
+    row_group_bytes: int = 1 << 20
+    min_files: int = 2
+    compression: str = "zstd"
+    delete_sources: bool = True
+
+
+@dataclass
+class CompactionResult:
+    root: Path
+    files_compacted: int = 0
+    records: int = 0
+    duplicates_dropped: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+    shards: list[Path] = field(default_factory=list)
+
+
+@contextmanager
+def compaction_lock(root: Path) -> Iterator[None]:
+    """Serialise compactions of one source directory across processes."""
+    shard_dir = root / SHARD_DIR
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    with (shard_dir / ".lock").open("w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def compact(
+    root: Path,
+    record_model: Optional[type[BaseModel]] = None,
+    options: CompactionOptions = CompactionOptions(),
+) -> CompactionResult:
+    """
+    Pack the Parquet parts and JSON drops under ``root`` into new shards.
+
+    Inputs are listed once up front, so parts an ingestion run writes meanwhile
+    are left for the next compaction. They are read newest first and a key's
+    first occurrence is kept, so among the files compacted together a re-ingested
+    record replaces the older copy. Existing shards are not rewritten: a key they
+    already hold ends up in two shards, ``read_record`` returns the newer copy and
+    the full-table readers return both. ``record_model`` types the columns of
+    converted JSON drops.
+    """
+    result = CompactionResult(root)
+    if not root.is_dir():
+        return result
+    with compaction_lock(root):
+        _recover(root)
+        parts, json_paths = list_parts(root), list_json(root)
+        if len(parts) + len(json_paths) < options.min_files:
+            logger.info("Nothing to compact in %s (%d small files)", root, len(parts) + len(json_paths))
+            return result
+
+        seen: set[str] = set()
+        pending: list[pa.Table] = []
+        pending_sources: list[Path] = []
+        pending_rows = pending_bytes = 0
+        for table, sources in _input_tables(parts, json_paths, record_model):
+            table, dropped = _drop_seen(table, seen)
+            result.duplicates_dropped += dropped
+            if table.num_rows:
+                pending.append(table)
+                pending_rows += table.num_rows
+                pending_bytes += table.nbytes
+            pending_sources.extend(sources)
+            if pending_rows >= options.shard_rows or pending_bytes >= options.shard_bytes:
+                _flush(root, pending, pending_sources, options, result)
+                pending, pending_sources, pending_rows, pending_bytes = [], [], 0, 0
+        if pending_sources:
+            _flush(root, pending, pending_sources, options, result)
+
+    logger.info(
+        "Compacted %d files (%d records, %d duplicates dropped) under %s into %d shards: %.1f MB -> %.1f MB",
+        result.files_compacted,
+        result.records,
+        result.duplicates_dropped,
+        root,
+        len(result.shards),
+        result.bytes_before / 1024**2,
+        result.bytes_after / 1024**2,
+    )
+    return result
+
+
+def verify_shards(root: Path) -> list[str]:
+    """Problems with the shards the manifest lists (missing files, size, row count or checksum mismatches)."""
+    problems = []
+    for entry in read_manifest(root)["shards"]:
+        path = root / SHARD_DIR / entry["file"]
+        if not path.exists():
+            problems.append(f"{path}: missing")
+            continue
+        if path.stat().st_size != entry["bytes"]:
+            problems.append(f"{path}: {path.stat().st_size} bytes, manifest says {entry['bytes']}")
+        elif _sha256(path) != entry["sha256"]:
+            problems.append(f"{path}: checksum mismatch")
+        elif pq.ParquetFile(path).metadata.num_rows != entry["rows"]:
+            problems.append(f"{path}: row count differs from manifest")
+    return problems
+
+
+def _input_tables(
+    parts: Sequence[Path], json_paths: Sequence[Path], record_model: Optional[type[BaseModel]]
+) -> Iterator[tuple[pa.Table, list[Path]]]:
+    """Tables of the input files, newest first: Parquet parts, then JSON drops in batches."""
+    for part in reversed(parts):
+        table = pq.read_table(part)
+        ingest_date = part.parent.name.partition("=")[2]
+        yield _set_ingest_date(table, ingest_date), [part]
+
+    schema = arrow_schema(record_model) if record_model is not None else None
+    drops = iter(reversed(json_paths))
+    for batch in iter(lambda: list(itertools.islice(drops, JSON_READ_BATCH)), []):
+        keyed = _load_json(batch)
+        if keyed:
+            # Files that fail to parse are logged by _load_json and left in place
+            loaded = [path for path in batch if path.stem.removeprefix("record_") in keyed]
+            yield _set_ingest_date(_keyed_table(keyed, schema), None), loaded
+
+
+def _set_ingest_date(table: pa.Table, ingest_date: Optional[str]) -> pa.Table:
+    column = pa.array([ingest_date] * table.num_rows, pa.string())
+    if PARTITION_KEY in table.column_names:
+        return table.set_column(table.column_names.index(PARTITION_KEY), PARTITION_KEY, column)
+    return table.append_column(PARTITION_KEY, column)
+
+
+def _drop_seen(table: pa.Table, seen: set[str]) -> tuple[pa.Table, int]:
+    # JSON drops are keyed by their file name, i.e. the slug of the record key
+    keep = []
+    for key in map(_slug, table[KEY_COLUMN].to_pylist()):
+        keep.append(key not in seen)
+        seen.add(key)
+    dropped = keep.count(False)
+    return (table.filter(pa.array(keep, pa.bool_())) if dropped else table), dropped
+
+
+def _flush(
+    root: Path,
+    tables: list[pa.Table],
+    sources: list[Path],
+    options: CompactionOptions,
+    result: CompactionResult,
+) -> None:
+    """Write one shard, record it in the manifest, then delete the files it replaces."""
+    shard_dir = root / SHARD_DIR
+    result.bytes_before += sum(path.stat().st_size for path in sources)
+    result.files_compacted += len(sources)
+    if tables:
+        table = pa.concat_tables(tables, promote_options="permissive").sort_by(KEY_COLUMN)
+        keys = table[KEY_COLUMN].to_pylist()
+        shard = shard_dir / f"shard-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp = shard.with_suffix(".parquet.tmp")
+        # Light curves run to tens of kB a row, so their groups hold far fewer rows than catalog records
+        step = max(1, min(options.row_group_rows, options.row_group_bytes * table.num_rows // max(1, table.nbytes)))
+        pq.write_table(table, tmp, row_group_size=step, compression=options.compression)
+        os.replace(tmp, shard)
+        entry = {
+            "file": shard.name,
+            "rows": table.num_rows,
+            "bytes": shard.stat().st_size,
+            "sha256": _sha256(shard),
+            "min_key": keys[0],
+            "max_key": keys[-1],
+            "row_groups": [[keys[i], keys[min(i + step, len(keys)) - 1]] for i in range(0, len(keys), step)],
+            "created_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        }
+        if options.delete_sources:
+            _write_atomic(shard.with_suffix(JOURNAL_SUFFIX), "\n".join(str(p.relative_to(root)) for p in sources))
+        manifest = read_manifest(root)
+        _write_atomic(shard_dir / MANIFEST_FILENAME, json.dumps({**manifest, "shards": [*manifest["shards"], entry]}))
+        result.shards.append(shard)
+        result.records += table.num_rows
+        result.bytes_after += entry["bytes"]
+        logger.info("Wrote %s (%d records from %d files)", shard, table.num_rows, len(sources))
+    if options.delete_sources:
+        _delete_sources(root, sources)
+        if tables:
+            shard.with_suffix(JOURNAL_SUFFIX).unlink()
+
+
+def _delete_sources(root: Path, sources: Sequence[Path]) -> None:
+    for path in sources:
+        path.unlink(missing_ok=True)
+    for partition in {path.parent for path in sources if path.parent != root}:
+        try:
+            partition.rmdir()
+        except OSError:
+            pass  # still holds parts written after the compaction started
+
+
+def _recover(root: Path) -> None:
+    """Finish deleting the sources of recorded shards; drop shards a crash left out of the manifest."""
+    shard_dir = root / SHARD_DIR
+    recorded = {entry["file"] for entry in read_manifest(root)["shards"]}
+    for journal in shard_dir.glob(f"*{JOURNAL_SUFFIX}"):
+        shard = journal.with_suffix(".parquet")
+        if shard.name in recorded:
+            logger.warning("Finishing interrupted compaction of %s", shard)
+            _delete_sources(root, [root / line for line in journal.read_text().splitlines() if line])
+        else:
+            logger.warning("Removing %s left by an interrupted compaction", shard)
+            shard.unlink(missing_ok=True)
+        journal.unlink()
+    for tmp in shard_dir.glob("*.tmp"):
+        tmp.unlink()
+    for shard in shard_dir.glob("shard-*.parquet"):
+        if shard.name not in recorded:
+            shard.unlink()
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(_HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,283 @@
+"""
+Positional cross-match between data-lake sources (ZTF detections, TESS targets,
+MAST observations).
+
+``crossmatch`` finds every (left, right) pair closer than ``radius_arcsec``
+without comparing all N·M pairs. Both catalogs are bucketed by nested HEALPix
+pixel at a coarse ``partition_nside``. Consecutive left pixels are grouped into
+chunks of at most ``chunk_rows`` rows. Each chunk is matched against the right
+rows in its pixels and their eight neighbours, which also covers pairs across a
+partition edge. The worker builds a KD-tree over the unit vectors of those
+right rows and queries it with the chunk's unit vectors in one vectorized call,
+using the chord length of the radius. Each left row belongs to exactly one
+chunk, so no pair is reported twice. Only one chunk and its neighbourhood are
+in memory per worker, and chunks fan out to a process pool.
+
+The match table (``MATCH_SCHEMA``) has one row per pair, ranked by separation
+for each left record. ``attach_matches`` reduces it to per-object
+counterpart columns that a feature table can join on ``object_id``.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy.spatial import cKDTree
+
+from .fetching import ordered_map
+from .sky_index import (
+    SEPARATION_COLUMN,
+    healpix_grid,
+    lonlat_to_pixels,
+    pixel_resolution,
+    source_positions,
+    unit_vectors,
+)
+from .storage import KEY_COLUMN
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MATCH_DIR = Path("data/processed/crossmatch")
+
+MATCH_SCHEMA = pa.schema(
+    [
+        pa.field("left_source", pa.string()),
+        pa.field("left_record_key", pa.string()),
+        pa.field("left_object_id", pa.string()),
+        pa.field("right_source", pa.string()),
+        pa.field("right_record_key", pa.string()),
+        pa.field("right_object_id", pa.string()),
+        pa.field(SEPARATION_COLUMN, pa.float64()),
+        # 1 for the nearest right record of each left record, 2 for the next, ...
+        pa.field("rank", pa.int32()),
+    ]
+)
+
+
+@dataclass(frozen=True)
+class CrossMatchOptions:
+    radius_arcsec: float = 2.0
+    # ~1.8 deg partitions; coarsened automatically when the radius needs it
+    partition_nside: int = 32
+    # Left rows per task; bounds the memory of one KD-tree query
+    chunk_rows: int = 100_000
+    workers: int = 1
+    # Keep only the closest right record for each left record
+    nearest_only: bool = False
+
+
+def partition_nside(radius_deg: float, nside: int) -> int:
+    """
+    The finest nside up to ``nside`` whose pixels are at least four radii wide, so a
+    pixel's eight neighbours hold every position within the radius of it.
+    """
+    healpix_grid(nside)
+    while nside > 1 and pixel_resolution(nside) < 4 * radius_deg:
+        nside //= 2
+    if pixel_resolution(nside) < 4 * radius_deg:
+        raise ValueError(f"A {radius_deg * 3600:.0f} arcsec radius is too wide to cross-match by partition")
+    return nside
+
+
+def match_chunk(
+    left_ra: np.ndarray,
+    left_dec: np.ndarray,
+    right_ra: np.ndarray,
+    right_dec: np.ndarray,
+    radius_deg: float,
+    nearest_only: bool = False,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Every (left, right) pair within ``radius_deg``, as local row indices and the
+    separation in arcseconds. Positions are compared as unit vectors, where a
+    great-circle radius is the chord ``2 sin(radius / 2)``.
+    """
+    empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+    if not len(left_ra) or not len(right_ra):
+        return empty
+    chord = 2 * np.sin(np.radians(radius_deg) / 2)
+    tree = cKDTree(unit_vectors(right_ra, right_dec))
+    points = unit_vectors(left_ra, left_dec)
+    if nearest_only:
+        distance, right = tree.query(points, k=1, distance_upper_bound=chord)
+        left = np.flatnonzero(np.isfinite(distance))
+        right, distance = right[left].astype(np.int64), distance[left]
+    else:
+        pairs = cKDTree(points).sparse_distance_matrix(tree, chord, output_type="ndarray")
+        left, right, distance = pairs["i"].astype(np.int64), pairs["j"].astype(np.int64), pairs["v"]
+    separation = np.degrees(2 * np.arcsin(np.clip(distance / 2, 0.0, 1.0))) * 3600.0
+    return left, right, separation
+
+
+def crossmatch(left: pa.Table, right: pa.Table, options: CrossMatchOptions = CrossMatchOptions()) -> pa.Table:
+    """
+    Match two position tables with ``source``, ``record_key``, ``object_id``,
+    ``ra`` and ``dec`` columns (as built by ``source_positions``) into a
+    ``MATCH_SCHEMA`` table ordered by left row, then separation.
+    """
+    radius_deg = options.radius_arcsec / 3600.0
+    nside = partition_nside(radius_deg, options.partition_nside)
+    left_ra, left_dec = left["ra"].to_numpy(), left["dec"].to_numpy()
+    right_ra, right_dec = right["ra"].to_numpy(), right["dec"].to_numpy()
+
+    left_index, right_index, separation = [], [], []
+    for rows, candidates, result in _run(_tasks(left_ra, left_dec, right_ra, right_dec, nside, options), radius_deg, options):
+        local_left, local_right, chunk_separation = result
+        left_index.append(rows[local_left])
+        right_index.append(candidates[local_right])
+        separation.append(chunk_separation)
+
+    left_rows = np.concatenate(left_index) if left_index else np.empty(0, dtype=np.int64)
+    right_rows = np.concatenate(right_index) if right_index else np.empty(0, dtype=np.int64)
+    separations = np.concatenate(separation) if separation else np.empty(0)
+    order = np.lexsort((separations, left_rows))
+    left_rows, right_rows, separations = left_rows[order], right_rows[order], separations[order]
+    # Rank within each left row: position minus the index where its run started
+    starts = np.r_[0, np.flatnonzero(np.diff(left_rows)) + 1] if len(left_rows) else np.empty(0, dtype=np.int64)
+    rank = np.arange(len(left_rows)) - np.repeat(starts, np.diff(np.r_[starts, len(left_rows)])) + 1
+
+    columns: dict[str, Any] = {}
+    for side, table, rows in (("left", left, left_rows), ("right", right, right_rows)):
+        for column in ("source", KEY_COLUMN, "object_id"):
+            columns[f"{side}_{column}"] = table[column].take(pa.array(rows, pa.int64()))
+    columns[SEPARATION_COLUMN] = pa.array(separations, pa.float64())
+    columns["rank"] = pa.array(rank, pa.int32())
+    matches = pa.table([columns[field.name].cast(field.type) for field in MATCH_SCHEMA], schema=MATCH_SCHEMA)
+    logger.info(
+        "Cross-matched %d x %d positions within %.2f arcsec: %d pairs (partition nside=%d)",
+        left.num_rows,
+        right.num_rows,
+        options.radius_arcsec,
+        matches.num_rows,
+        nside,
+    )
+    return matches
+
+
+def _tasks(
+    left_ra: np.ndarray,
+    left_dec: np.ndarray,
+    right_ra: np.ndarray,
+    right_dec: np.ndarray,
+    nside: int,
+    options: CrossMatchOptions,
+) -> Iterator[tuple[np.ndarray, np.ndarray, tuple[np.ndarray, ...]]]:
+    """
+    ``(left rows, right candidate rows, match_chunk arguments)`` per chunk of
+    consecutive left pixels, in sky order.
+    """
+    if not len(left_ra) or not len(right_ra):
+        return
+    grid = healpix_grid(nside)
+    left_pixels = lonlat_to_pixels(grid, left_ra, left_dec)
+    right_pixels = lonlat_to_pixels(grid, right_ra, right_dec)
+    left_order = np.argsort(left_pixels, kind="stable")
+    right_order = np.argsort(right_pixels, kind="stable")
+    left_pixels, right_pixels = left_pixels[left_order], right_pixels[right_order]
+
+    pixels, first, counts = np.unique(left_pixels, return_index=True, return_counts=True)
+    with np.errstate(invalid="ignore"):
+        # -1 marks the missing neighbours of the few pixels that have seven
+        neighbours = np.asarray(grid.neighbours(pixels), dtype=np.int64)
+    regions = np.vstack([pixels, neighbours]).T
+
+    chunk_rows = max(1, options.chunk_rows)
+    # Consecutive partitions are packed into chunks; a partition larger than a chunk is split
+    chunk_ids = np.cumsum(counts) // chunk_rows
+    for _, group in itertools.groupby(range(len(pixels)), key=lambda i: chunk_ids[i]):
+        group = list(group)
+        start, stop = first[group[0]], first[group[-1]] + counts[group[-1]]
+        region = np.unique(regions[group])
+        region = region[region >= 0]
+        low = np.searchsorted(right_pixels, region, side="left")
+        high = np.searchsorted(right_pixels, region, side="right")
+        lengths = high - low
+        offsets = np.cumsum(lengths) - lengths
+        candidates = right_order[np.repeat(low - offsets, lengths) + np.arange(lengths.sum())]
+        if not len(candidates):
+            continue
+        for chunk_start in range(start, stop, chunk_rows):
+            rows = left_order[chunk_start : min(stop, chunk_start + chunk_rows)]
+            yield rows, candidates, (left_ra[rows], left_dec[rows], right_ra[candidates], right_dec[candidates])
+
+
+def _run(
+    tasks: Iterator[tuple[np.ndarray, np.ndarray, tuple[np.ndarray, ...]]],
+    radius_deg: float,
+    options: CrossMatchOptions,
+) -> Iterator[tuple[np.ndarray, np.ndarray, tuple[np.ndarray, np.ndarray, np.ndarray]]]:
+    """Chunk results in order; at most ``2 * workers`` chunks are in flight."""
+    # The row indices stay here; only the positions are sent to the workers
+    tasks, chunks = itertools.tee(tasks)
+    args = ((*arrays, radius_deg, options.nearest_only) for _, _, arrays in tasks)
+    with ProcessPoolExecutor(options.workers) if options.workers > 1 else nullcontext() as pool:
+        for (rows, candidates, _), result in zip(chunks, ordered_map(pool, match_chunk, args, 2 * options.workers)):
+            yield rows, candidates, result
+
+
+def crossmatch_sources(
+    left: str,
+    right: str,
+    root: Path = Path("data/raw"),
+    options: CrossMatchOptions = CrossMatchOptions(),
+) -> pa.Table:
+    """Cross-match the ``left`` and ``right`` source directories under ``root``."""
+    return crossmatch(source_positions(left, root / left), source_positions(right, root / right), options)
+
+
+def match_path(left: str, right: str, directory: Path = DEFAULT_MATCH_DIR) -> Path:
+    return directory / f"{left}__{right}.parquet"
+
+
+def write_matches(matches: pa.Table, path: Path, options: Optional[CrossMatchOptions] = None) -> Path:
+    """Atomically replace the match table at ``path``."""
+    if options is not None:
+        matches = matches.replace_schema_metadata(
+            {"radius_arcsec": str(options.radius_arcsec), "nearest_only": str(options.nearest_only).lower()}
+        )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    pq.write_table(matches, tmp, compression="zstd")
+    os.replace(tmp, path)
+    return path
+
+
+def attach_matches(features: pd.DataFrame, matches: pa.Table | pd.DataFrame, id_column: str = "object_id") -> pd.DataFrame:
+    """
+    Join per-object counterpart columns onto a feature table: for each right source,
+    ``<source>_match_count`` (distinct counterparts), ``<source>_nearest_id`` and
+    ``<source>_nearest_arcsec``. Objects without a counterpart get a count of 0.
+    """
+    frame = matches.to_pandas() if isinstance(matches, pa.Table) else matches
+    if features.empty or frame.empty:
+        return features
+    frame = frame.sort_values(SEPARATION_COLUMN, kind="stable")
+    grouped = frame.groupby(["left_object_id", "right_source"], sort=False)
+    summary = pd.DataFrame(
+        {
+            "match_count": grouped["right_object_id"].nunique(),
+            "nearest_id": grouped["right_object_id"].first(),
+            "nearest_arcsec": grouped[SEPARATION_COLUMN].first(),
+        }
+    ).unstack("right_source")
+    summary.columns = [f"{source}_{column}" for column, source in summary.columns]
+
+    keys = features[id_column].astype(str)
+    joined = summary.reindex(keys)
+    joined.index = features.index
+    for column in joined.columns:
+        if column.endswith("_match_count"):
+            joined[column] = joined[column].fillna(0).astype(int)
+    return pd.concat([features.drop(columns=joined.columns, errors="ignore"), joined], axis=1)
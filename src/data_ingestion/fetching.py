@@ -0,0 +1,174 @@
+"""Concurrent fetch helpers shared by the ingestion connectors and the process-pool pipelines."""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, Optional, TypeVar
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter, honouring ``Retry-After``."""
+
+    max_attempts: int = 4
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    statuses: frozenset[int] = RETRY_STATUSES
+
+    @classmethod
+    def from_config(cls, config: Optional[dict[str, Any]]) -> "RetryPolicy":
+        config = config or {}
+        return cls(
+            max_attempts=int(config.get("max_attempts", cls.max_attempts)),
+            backoff_base=float(config.get("backoff_base", cls.backoff_base)),
+            backoff_max=float(config.get("backoff_max", cls.backoff_max)),
+        )
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(self.backoff_max, max(0.0, float(retry_after)))
+            except ValueError:
+                pass  # HTTP-date form; fall back to our own schedule
+        return random.uniform(0.0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+class HostLimiter:
+    """Caps in-flight requests per host across every thread sharing the limiter."""
+
+    def __init__(self, per_host: int) -> None:
+        self.per_host = max(1, per_host)
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def limit(self, url: str) -> Iterator[None]:
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+        with semaphore:
+            yield
+
+
+def size_connection_pool(session: requests.Session, size: int) -> None:
+    """Let ``size`` threads share ``session`` without queueing on urllib3's default pool of 10."""
+    for prefix in ("https://", "http://"):
+        adapter = session.get_adapter(prefix)
+        if isinstance(adapter, HTTPAdapter):
+            # Resize in place so mounted subclasses (e.g. the HTTP cache) stay in front
+            adapter.init_poolmanager(size, size)
+        else:
+            session.mount(prefix, HTTPAdapter(pool_connections=size, pool_maxsize=size))
+
+
+def ordered_map(
+    pool: Optional[Executor], fn: Callable[..., T], items: Iterable[tuple[Any, ...]], ahead: int
+) -> Iterator[T]:
+    """
+    ``fn(*args)`` for each argument tuple in ``items``, yielded in input order.
+
+    At most ``ahead`` calls are submitted to ``pool`` ahead of the consumer, so
+    neither inputs nor results pile up in memory; calls still queued when the
+    consumer stops are cancelled. Without a pool the calls run inline.
+    """
+    if pool is None:
+        for args in items:
+            yield fn(*args)
+        return
+
+    window: deque[Future[T]] = deque()
+    try:
+        for args in items:
+            window.append(pool.submit(fn, *args))
+            if len(window) >= max(1, ahead):
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+    finally:
+        for future in window:
+            future.cancel()
+
+
+def request_with_retries(
+    session: requests.Session,
+    method: str,
+    url: str,
+    policy: RetryPolicy = RetryPolicy(),
+    limiter: Optional[HostLimiter] = None,
+    sleep: Callable[[float], None] = time.sleep,
+    on_retry: Optional[Callable[[], None]] = None,
+    **kwargs: Any,
+) -> requests.Response:
+    """
+    Send a request, retrying connection errors and ``policy.statuses`` responses.
+
+    The host slot is only held while a request is in flight, not while backing off.
+    The last response is returned once attempts run out; the last connection error
+    is re-raised. ``on_retry`` is called before each retry (e.g. ``RunMetrics.retry``).
+    """
+    for attempt in range(policy.max_attempts):
+        try:
+            if limiter is not None:
+                with limiter.limit(url):
+                    response = session.request(method, url, **kwargs)
+            else:
+                response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            if attempt + 1 >= policy.max_attempts:
+                raise
+            delay = policy.backoff(attempt)
+            logger.debug("%s %s failed (%s); retrying in %.2fs", method, url, exc, delay)
+        else:
+            if response.status_code not in policy.statuses or attempt + 1 >= policy.max_attempts:
+                return response
+            delay = policy.backoff(attempt, response.headers.get("Retry-After"))
+            response.close()  # hand the connection back to the pool (matters with stream=True)
+            logger.debug("%s %s returned %d; retrying in %.2fs", method, url, response.status_code, delay)
+        if on_retry is not None:
+            on_retry()
+        sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover
+
+
+def call_with_retries(
+    fn: Callable[[], T],
+    policy: RetryPolicy,
+    retryable: Callable[[Exception], bool],
+    sleep: Callable[[float], None] = time.sleep,
+    on_retry: Optional[Callable[[], None]] = None,
+) -> T:
+    """
+    Call ``fn``, retrying exceptions ``retryable`` accepts, for client SDKs that raise
+    rather than return responses. The last exception is re-raised.
+    """
+    for attempt in range(policy.max_attempts):
+        try:
+            return fn()
+        except Exception as exc:
+            if attempt + 1 >= policy.max_attempts or not retryable(exc):
+                raise
+            delay = policy.backoff(attempt)
+            logger.debug("%s failed (%s); retrying in %.2fs", getattr(fn, "__name__", fn), exc, delay)
+        if on_retry is not None:
+            on_retry()
+        sleep(delay)
+    raise AssertionError("unreachable")  # pragma: no cover
@@ -0,0 +1,408 @@
+"""
+On-disk HTTP cache mounted under the ingestion ``requests`` sessions.
+
+Responses are keyed on method, normalised URL (sorted query parameters) and a
+hash of any request body, so the same archive query or cutout request maps to the
+same entry across runs. Bodies are stored content-addressed (SHA-256) under
+``objects/``, so identical payloads are kept once; a SQLite index holds headers,
+validators and expiry. Fresh entries are served without touching the network.
+Stale entries carrying an ``ETag``/``Last-Modified`` are revalidated with a
+conditional request, and a ``304`` refreshes them in place. TTLs are set per URL
+pattern, and the least recently used entries are evicted once the cache grows
+past ``max_bytes``. ``stream=True`` bodies are never buffered: they are copied to
+the object store while the caller reads them, and the entry is added at EOF.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from ..utils.upstream_guard import GuardedAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path("data/cache/http")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+"""
+
+
+def normalise_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+def cache_key(request: requests.PreparedRequest) -> str:
+    body = request.body or b""
+    if isinstance(body, str):
+        body = body.encode()
+    # Different credentials must never share an entry
+    auth = request.headers.get("Authorization", "")
+    material = "\n".join([request.method or "GET", normalise_url(request.url or ""), hashlib.sha256(body).hexdigest(), auth])
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class HTTPCache:
+    """Content-addressed response store with TTLs and LRU eviction."""
+
+    def __init__(
+        self,
+        root: Path = DEFAULT_CACHE_DIR,
+        max_bytes: int = 2 * 1024**3,
+        default_ttl: float = 86400.0,
+        ttl_rules: Optional[list[tuple[str, float]]] = None,
+    ) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # First matching regex wins, e.g. [("/astrocut", 30 * 86400)]
+        self.ttl_rules = [(re.compile(pattern), float(ttl)) for pattern, ttl in (ttl_rules or [])]
+        self.hits = self.revalidated = self.misses = 0
+        (root / "objects").mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(root / "index.sqlite", check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config: Optional[dict[str, Any]]) -> "HTTPCache":
+        config = config or {}
+        rules = [(rule["pattern"], rule["ttl"]) for rule in config.get("ttl_rules", [])]
+        return cls(
+            root=Path(config.get("dir", DEFAULT_CACHE_DIR)),
+            max_bytes=int(float(config.get("max_mb", 2048)) * 1024**2),
+            default_ttl=float(config.get("ttl", 86400)),
+            ttl_rules=rules,
+        )
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def ttl_for(self, url: str) -> float:
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses, "entries": entries, "bytes": size}
+
+    # ------------------------------------------------------------------
+    # Entries
+    # ------------------------------------------------------------------
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest[2:]
+
+    def get(self, key: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, digest, etag, last_modified, expires_at FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            body = self._object_path(row[3]).read_bytes()
+        except FileNotFoundError:
+            return None
+        return {
+            "url": row[0],
+            "status": row[1],
+            "headers": json.loads(row[2]),
+            "body": body,
+            "etag": row[4],
+            "last_modified": row[5],
+            "expires_at": row[6],
+        }
+
+    def put(self, key: str, url: str, response: requests.Response) -> None:
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        if not self._object_path(digest).exists():
+            tmp_path = self._tmp_path()
+            tmp_path.write_bytes(body)
+            self._store_object(tmp_path, digest)
+        self._index(key, url, response, digest, len(body))
+
+    def put_stream(self, key: str, url: str, response: requests.Response) -> None:
+        """Tee a streamed body into the cache as the caller reads it; the entry is added at EOF."""
+
+        def complete(tmp_path: Path, digest: str, size: int) -> None:
+            self._store_object(tmp_path, digest)
+            self._index(key, url, response, digest, size)
+
+        response.raw = _TeeReader(response.raw, self._tmp_path(), complete, self.max_bytes)
+
+    def _tmp_path(self) -> Path:
+        path = self.root / "objects" / "tmp" / f"{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _store_object(self, tmp_path: Path, digest: str) -> None:
+        path = self._object_path(digest)
+        if path.exists():
+            tmp_path.unlink(missing_ok=True)
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def _index(self, key: str, url: str, response: requests.Response, digest: str, size: int) -> None:
+        now = time.time()
+        # Transport-level headers describe the original transfer, not the stored body
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in ("content-encoding", "transfer-encoding", "connection")}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key, url, response.status_code, json.dumps(headers), digest, size,
+                    response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                    now, now + self.ttl_for(url), now,
+                ),
+            )
+        self.evict()
+
+    def touch(self, key: str, refresh_url: Optional[str] = None) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            if refresh_url is None:
+                self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+            else:
+                self._conn.execute(
+                    "UPDATE entries SET last_access = ?, expires_at = ? WHERE key = ?",
+                    (now, now + self.ttl_for(refresh_url), key),
+                )
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits in ``max_bytes``."""
+        removed: list[str] = []
+        with self._lock, self._conn:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+                if total <= self.max_bytes:
+                    break
+                removed.append(key)
+                total -= size
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in removed])
+            live = {row[0] for row in self._conn.execute("SELECT DISTINCT digest FROM entries")}
+        for path in (self.root / "objects").glob("*/*"):
+            if path.parent.name + path.name not in live and not path.name.endswith(".tmp"):
+                path.unlink(missing_ok=True)
+        logger.debug("Evicted %d HTTP cache entries", len(removed))
+        return len(removed)
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+        for path in (self.root / "objects").glob("*/*"):
+            path.unlink(missing_ok=True)
+
+
+class _TeeReader:
+    """
+    Stand-in for a streamed ``response.raw`` that copies the decoded bytes the
+    caller reads to ``tmp_path`` and hands the file to ``on_complete`` at EOF.
+    Bodies closed early, read undecoded or larger than ``max_bytes`` are dropped.
+    """
+
+    def __init__(self, raw: Any, tmp_path: Path, on_complete: Callable[[Path, str, int], None], max_bytes: int) -> None:
+        self._raw = raw
+        self._tmp_path = tmp_path
+        self._on_complete = on_complete
+        self._max_bytes = max_bytes
+        self._file: Any = tmp_path.open("wb")
+        self._digest = hashlib.sha256()
+        self._size = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._raw, name)
+
+    def stream(self, amt: int = 2**16, decode_content: Optional[bool] = None) -> Iterator[bytes]:
+        for chunk in self._raw.stream(amt, decode_content=decode_content):
+            self._write(chunk, decode_content)
+            yield chunk
+        self._finish()
+
+    def read(self, amt: Optional[int] = None, decode_content: Optional[bool] = None, **kwargs: Any) -> bytes:
+        data = self._raw.read(amt, decode_content=decode_content, **kwargs)
+        self._write(data, decode_content)
+        if amt is None or not data:
+            self._finish()
+        return data
+
+    def close(self) -> None:
+        self._abort()
+        self._raw.close()
+
+    def _write(self, data: bytes, decode_content: Optional[bool]) -> None:
+        if self._file is None or not data:
+            return
+        decoded = decode_content if decode_content is not None else getattr(self._raw, "decode_content", True)
+        # The entry is stored without Content-Encoding, so encoded bytes can't be kept
+        if not decoded and self._raw.headers.get("Content-Encoding", "identity") != "identity":
+            self._abort()
+            return
+        self._size += len(data)
+        if self._size > self._max_bytes:
+            self._abort()
+            return
+        self._digest.update(data)
+        self._file.write(data)
+
+    def _finish(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        try:
+            self._on_complete(self._tmp_path, self._digest.hexdigest(), self._size)
+        except OSError as exc:
+            logger.debug("Could not cache streamed response: %s", exc)
+            self._tmp_path.unlink(missing_ok=True)
+
+    def _abort(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self._tmp_path.unlink(missing_ok=True)
+
+
+def _cacheable(response: requests.Response, stream: bool, max_bytes: int) -> bool:
+    if response.status_code != 200:
+        return False
+    if "no-store" in response.headers.get("Cache-Control", ""):
+        return False
+    length = response.headers.get("Content-Length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        return False
+    # MAST portal queries answer "EXECUTING" until the result is ready; only keep the final answer
+    if "json" in response.headers.get("Content-Type", ""):
+        if stream:
+            return False  # telling the two apart would mean reading the body here
+        if len(response.content) < 4096:
+            try:
+                return json.loads(response.content).get("status") != "EXECUTING"
+            except (ValueError, AttributeError):
+                return True
+    return True
+
+
+class CachingAdapter(GuardedAdapter):
+    """
+    ``HTTPAdapter`` that answers from, and fills, an ``HTTPCache``. Only requests
+    that reach the network pass through its upstream guard, so cache hits neither
+    spend rate-limit tokens nor fail while a host's circuit is open.
+    """
+
+    def __init__(self, cache: HTTPCache, methods: tuple[str, ...] = ("GET", "POST"), **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.cache = cache
+        self.methods = methods
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        if request.method not in self.methods:
+            return super().send(request, **kwargs)
+
+        key = cache_key(request)
+        entry = self.cache.get(key)
+        if entry is not None and entry["expires_at"] > time.time():
+            self.cache.count("hits")
+            self.cache.touch(key)
+            return self._from_cache(request, entry)
+
+        if entry is not None:
+            if entry["etag"]:
+                request.headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                request.headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = super().send(request, **kwargs)
+        if entry is not None and response.status_code == 304:
+            self.cache.count("revalidated")
+            self.cache.touch(key, refresh_url=request.url)
+            return self._from_cache(request, entry)
+
+        self.cache.count("misses")
+        stream = bool(kwargs.get("stream"))
+        if _cacheable(response, stream, self.cache.max_bytes):
+            if stream:
+                self.cache.put_stream(key, request.url or "", response)
+            else:
+                self.cache.put(key, request.url or "", response)
+        return response
+
+    def _from_cache(self, request: requests.PreparedRequest, entry: dict[str, Any]) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = entry["body"]
+        response._content_consumed = True  # lets iter_content/stream=True callers read the body
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url or entry["url"]
+        response.reason = "OK"
+        response.request = request
+        response.connection = self
+        response.from_cache = True  # type: ignore[attr-defined]
+        return response
+
+
+def install_cache(session: requests.Session, cache: HTTPCache) -> CachingAdapter:
+    """Mount a caching adapter for http(s) on ``session``, keeping its pool size and upstream guard."""
+    current = session.get_adapter("https://")
+    adapter = CachingAdapter(
+        cache,
+        guard=getattr(current, "guard", None),
+        max_wait=getattr(current, "max_wait", None),
+        pool_connections=getattr(current, "_pool_connections", 10),
+        pool_maxsize=getattr(current, "_pool_maxsize", 10),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return adapter
+
+
+def install_astroquery_cache(service: Any, cache: HTTPCache) -> None:
+    """Route an astroquery service (e.g. ``Observations``) through ``cache``."""
+    sessions = [getattr(service, "_session", None)]
+    portal = getattr(service, "_portal_api_connection", None)
+    sessions.append(getattr(portal, "_session", None))
+    for session in sessions:
+        if isinstance(session, requests.Session) and not isinstance(session.get_adapter("https://"), CachingAdapter):
+            install_cache(session, cache)
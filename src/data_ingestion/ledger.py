@@ -0,0 +1,168 @@
+"""
+Persistent record of what each ingestion source has already fetched.
+
+The ledger is a small SQLite database holding one row per ingested record key
+(ZTF ``candid``, TESS ``tic_id``+``sector``, MAST ``obs_id``), a watermark per
+source (e.g. the newest ZTF detection MJD), and a row per run. Connectors consult
+it before downloading so repeated runs only pay for new data, and because keys
+are committed as records are written, a crashed run resumes where it stopped.
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FILENAME = ".ingestion_ledger.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (
+    source TEXT NOT NULL,
+    record_key TEXT NOT NULL,
+    path TEXT,
+    run_id TEXT,
+    ingested_at REAL NOT NULL,
+    PRIMARY KEY (source, record_key)
+);
+CREATE TABLE IF NOT EXISTS watermarks (
+    source TEXT PRIMARY KEY,
+    value REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    status TEXT NOT NULL,
+    records INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class IngestionLedger:
+    """Thread-safe handle on the ledger database at ``path``."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Download threads check keys while the main thread records them
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Record keys
+    # ------------------------------------------------------------------
+
+    def has(self, source: str, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM seen WHERE source = ? AND record_key = ?", (source, key)
+            ).fetchone()
+        return row is not None
+
+    def seen(self, source: str, keys: Iterable[str], run_id: Optional[str] = None) -> set[str]:
+        """The subset of ``keys`` already ingested for ``source`` (by run ``run_id`` if given)."""
+        keys = list(keys)
+        found: set[str] = set()
+        run_filter, run_args = (" AND run_id = ?", (run_id,)) if run_id is not None else ("", ())
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT record_key FROM seen WHERE source = ?{run_filter} AND record_key IN ({placeholders})",
+                    (source, *run_args, *chunk),
+                )
+                found.update(row[0] for row in rows)
+        return found
+
+    def mark(self, source: str, entries: Iterable[tuple[str, Optional[str]]], run_id: Optional[str] = None) -> None:
+        """Record ``(key, path)`` pairs as ingested, committing them as one transaction."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO seen (source, record_key, path, run_id, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                [(source, key, path, run_id, now) for key, path in entries],
+            )
+
+    def count(self, source: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM seen WHERE source = ?", (source,)).fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Watermarks
+    # ------------------------------------------------------------------
+
+    def watermark(self, source: str) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM watermarks WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else None
+
+    def advance_watermark(self, source: str, value: float) -> float:
+        """Move the watermark forward to ``value``; it never moves backwards."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO watermarks (source, value, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(source) DO UPDATE SET
+                    value = MAX(value, excluded.value),
+                    updated_at = excluded.updated_at
+                """,
+                (source, value, time.time()),
+            )
+            return self._conn.execute("SELECT value FROM watermarks WHERE source = ?", (source,)).fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Runs
+    # ------------------------------------------------------------------
+
+    def start_run(self, source: str) -> str:
+        run_id = uuid.uuid4().hex[:12]
+        with self._lock, self._conn:
+            interrupted = self._conn.execute(
+                "SELECT run_id FROM runs WHERE source = ? AND status = 'running'", (source,)
+            ).fetchall()
+            for (previous,) in interrupted:
+                logger.warning("Run %s for %s did not finish; resuming from its ledger entries", previous, source)
+            self._conn.execute("UPDATE runs SET status = 'interrupted' WHERE source = ? AND status = 'running'", (source,))
+            self._conn.execute(
+                "INSERT INTO runs (run_id, source, started_at, status) VALUES (?, ?, ?, 'running')",
+                (run_id, source, time.time()),
+            )
+        return run_id
+
+    def finish_run(self, run_id: str, records: int, status: str = "completed") -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE runs SET finished_at = ?, status = ?, records = ? WHERE run_id = ?",
+                (time.time(), status, records, run_id),
+            )
+
+    def runs(self, source: str) -> list[dict[str, object]]:
+        """Runs for ``source``, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id, started_at, finished_at, status, records FROM runs WHERE source = ? ORDER BY started_at",
+                (source,),
+            ).fetchall()
+        return [
+            {"run_id": r[0], "started_at": r[1], "finished_at": r[2], "status": r[3], "records": r[4]}
+            for r in rows
+        ]
@@ -1,72 +1,175 @@
-"""MAST metadata ingestion connector scaffolding."""
+"""
+MAST metadata ingestion connector.
+
+Observations are queried through the MAST ``invoke`` API (``Mast.Caom.Filtered``)
+with the limit, page size, column list and filters sent to the server, so a
+small run transfers a single page of the configured columns rather than the
+whole matching observation table. Later pages are requested concurrently and
+streamed to the normaliser in page order; incremental runs keep paging past
+observations the ledger already holds until ``limit`` new ones are found.
+"""
 
 from __future__ import annotations
 
+import json
 import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Callable, Iterator, Optional
 
 from .base import BaseIngestor
+from .fetching import RetryPolicy, ordered_map, request_with_retries, size_connection_pool
 from .schemas import MASTRecord
 
-try:
-    from astroquery.mast import Observations
-except ImportError:
-    Observations = None
-    logging.getLogger("mast_ingestor").warning("astroquery not installed. MAST ingestion disabled.")
-
 logger = logging.getLogger(__name__)
 
+DEFAULT_INVOKE_URL = "https://mast.stsci.edu/api/v0/invoke"
+DEFAULT_SERVICE = "Mast.Caom.Filtered"
+DEFAULT_FILTERS: dict[str, Any] = {
+    "obs_collection": ["HST"],
+    "dataproduct_type": ["image"],
+    "intentType": ["science"],
+}
+# Columns the normaliser reads; always requested on top of the configured ones
+RECORD_COLUMNS = ("obs_id", "instrument_name", "target_name", "t_exptime", "wavelength_region", "s_ra", "s_dec")
+
 
 class MASTIngestor(BaseIngestor):
-    """Ingests metadata entries from the MAST archive via Astroquery."""
+    """Ingests observation metadata from the MAST archive via its ``invoke`` API."""
 
     record_model = MASTRecord
 
-    def fetch(self, limit: int = 20, **_: Any) -> Iterable[dict[str, Any]]:
-        logger.debug("Fetching MAST records with limit=%d via astroquery.mast", limit)
-        
-        # Use astroquery.mast instead of the broken CAOM API
+    def __init__(self, source_name: str, output_dir: Path, config: dict[str, Any]) -> None:
+        super().__init__(source_name, output_dir, config)
+        self._retry = RetryPolicy.from_config(config.get("retry"))
+        # Polling a query the server is still executing is not a transport retry
+        self._poll_attempts = max(1, int(config.get("poll_attempts", 30)))
+        self._poll_seconds = float(config.get("poll_seconds", 2.0))
+        token = os.getenv(config.get("auth_env", "MAST_API_TOKEN"))
+        if token:
+            self.session.headers["Authorization"] = f"token {token}"
+
+    def fetch(self, limit: Optional[int] = 20, **_: Any) -> Iterator[dict[str, Any]]:
+        """
+        Yield up to ``limit`` new observations (every match when ``limit`` is ``None``).
+
+        The first page reports how many rows match; the remaining pages are then
+        requested by ``concurrency`` threads and yielded in page order, at most
+        ``2 * concurrency`` pages ahead of the consumer. ``limit`` counts records
+        left after the ledger filter, so when known rows fill a round of pages the
+        next round covers the shortfall until the matches run out. Failed pages
+        are counted in ``fetch_errors``.
+        """
+        query = self.config.get("query", {})
+        page_size = max(1, int(query.get("pagesize", 500)))
+        if limit is not None:
+            page_size = min(page_size, max(1, limit))
+        concurrency = max(1, int(self.config.get("concurrency", 4)))
+        size_connection_pool(self.session, concurrency)
+        logger.debug("Fetching MAST records with limit=%s, pagesize=%d", limit, page_size)
+
+        first = self._query_page(1, page_size)
+        if first is None:
+            return
+        paging = first.get("paging") or {}
+        matched = int(paging.get("rowsFiltered", len(first.get("data") or [])))
+        pages = int(paging.get("pagesFiltered", math.ceil(matched / page_size)))
+        remaining = matched if limit is None else min(limit, matched)
+        logger.info("Fetching %d of %d matching MAST observations in pages of %d", remaining, matched, page_size)
+
+        fetched = 0
+        for rows in self._pages(first, pages, page_size, concurrency, lambda: remaining):
+            records = self._normalise_page(rows)[:remaining]
+            remaining -= len(records)
+            fetched += len(records)
+            yield from records
+            if remaining <= 0:
+                break
+
+        logger.info("Fetched %d MAST observations (errors: %s)", fetched, dict(self.fetch_errors) or "none")
+
+    def record_key(self, record: dict[str, Any]) -> str | None:
+        return record.get("observation_id") or None
+
+    def _pages(
+        self,
+        first: dict[str, Any],
+        pages: int,
+        page_size: int,
+        concurrency: int,
+        remaining: Callable[[], int],
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        Rows of pages ``1..pages`` in order; pages after the first are fetched on a thread pool.
+
+        Pages are requested in rounds just large enough for the ``remaining()``
+        records still wanted, so a limited run never queries pages it will not read.
+        """
+        yield _rows(first)
+        page = 2
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="mast") as pool:
+            while page <= pages and remaining() > 0:
+                last = min(pages, page + math.ceil(remaining() / page_size) - 1)
+                args = ((number, page_size) for number in range(page, last + 1))
+                for response in ordered_map(pool, self._query_page, args, 2 * concurrency):
+                    yield _rows(response)
+                page = last + 1
+
+    def _query_page(self, page: int, page_size: int) -> dict[str, Any] | None:
+        """One page of the filtered query, or ``None`` once retries are exhausted."""
+        query = self.config.get("query", {})
+        params = {
+            "columns": _column_list(query.get("columns")),
+            "filters": _build_filter_list(query.get("filters") or DEFAULT_FILTERS),
+        }
+        payload = _build_invoke_payload(self.config.get("service", DEFAULT_SERVICE), params)
+        payload.update(page=page, pagesize=page_size, removenullcolumns=False)
+        url = self.config.get("invoke_url", DEFAULT_INVOKE_URL)
         try:
-            # Query for observations with filters
-            # Default to HST collection, images
-            obs_table = Observations.query_criteria(
-                obs_collection=["HST"],
-                dataproduct_type=["image"],
-                intentType="science"
-            )
-            
-            if obs_table is None or len(obs_table) == 0:
-                logger.warning("No MAST observations found")
-                return []
-            
-            # Limit results
-            obs_table = obs_table[:limit]
-            logger.info("Fetched %d MAST observations via astroquery", len(obs_table))
-            
-            records = []
-            for row in obs_table:
-                record = self._normalise_astroquery_record(row)
-                if record:
-                    records.append(record)
-            
-            return records
-            
+            for _ in range(self._poll_attempts):
+                response = request_with_retries(
+                    self.session,
+                    "POST",
+                    url,
+                    self._retry,
+                    data={"request": json.dumps(payload)},
+                    timeout=self.config.get("timeout", 60),
+                    on_retry=self.metrics.retry,
+                )
+                response.raise_for_status()
+                body = response.json()
+                # Long queries answer "EXECUTING" until the server-side result is ready
+                if body.get("status") != "EXECUTING":
+                    if body.get("status") == "ERROR":
+                        raise ValueError(body.get("msg") or "MAST query failed")
+                    return body
+                time.sleep(self._poll_seconds)
+            raise TimeoutError(f"MAST query still executing after {self._poll_attempts} polls")
         except Exception as exc:
-            logger.error("astroquery.mast fetch failed: %s", exc)
-            return []
+            self.record_error("page", page, exc)
+            return None
+
+    def _normalise_page(self, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        records = [record for record in map(self._normalise_row, rows) if record is not None]
+        if self.incremental and records:
+            known = self.ledger.seen(self.source_name, [r["observation_id"] for r in records])
+            if known:
+                records = [r for r in records if r["observation_id"] not in known]
+        return records
 
-    def _normalise_astroquery_record(self, row: Any) -> dict[str, Any] | None:
+    def _normalise_row(self, row: dict[str, Any]) -> dict[str, Any] | None:
         try:
-            # Map Astroquery table columns to MASTRecord schema
-            # Common columns: obs_id, instrument_name, target_name, t_exptime, wavelength_region
-            
             return {
-                "observation_id": str(row.get("obs_id", "unknown")),
-                "instrument": str(row.get("instrument_name", "unknown")),
-                "target": str(row.get("target_name", "unknown")),
-                "exposure_time": float(row.get("t_exptime", 0.0)),
+                "observation_id": str(row.get("obs_id") or "unknown"),
+                "instrument": str(row.get("instrument_name") or "unknown"),
+                "target": str(row.get("target_name") or "unknown"),
+                "exposure_time": float(row.get("t_exptime") or 0.0),
                 "spectral_range": self._parse_wavelength_region(row.get("wavelength_region")),
+                "ra": float(row["s_ra"]) if row.get("s_ra") is not None else None,
+                "dec": float(row["s_dec"]) if row.get("s_dec") is not None else None,
             }
         except Exception as e:
             logger.warning("Failed to parse MAST observation: %s", e)
@@ -76,12 +179,50 @@ class MASTIngestor(BaseIngestor):
         """Parse wavelength region string or use defaults."""
         if not region:
             return []
-        
+
         # Wavelength region is typically a string like "Optical" or "Infrared"
         # MAST doesn't provide specific ranges in the general query, so we return empty
         # Advanced queries could use t_min/t_max wavelength columns if available
         return []
 
 
+def _rows(body: dict[str, Any] | None) -> list[dict[str, Any]]:
+    return (body or {}).get("data") or []
+
+
+def _column_list(columns: Any) -> str:
+    """Configured columns (comma string or list) plus the ones the normaliser needs."""
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(",")]
+    selected = [c for c in columns or () if c]
+    if not selected or "*" in selected:
+        return "*"
+    return ",".join(dict.fromkeys([*selected, *RECORD_COLUMNS]))
+
+
+def _build_filter_list(filters_cfg: dict[str, Any]) -> list[dict[str, Any]]:
+    filters: list[dict[str, Any]] = []
+    for name, values in filters_cfg.items():
+        if values is None:
+            continue
+        value_list = values if isinstance(values, list) else [values]
+        filters.append(
+            {
+                "paramName": name,
+                "values": value_list,
+            }
+        )
+    return filters
+
+
+def _build_invoke_payload(service: str, params: dict[str, Any]) -> dict[str, Any]:
+    payload: dict[str, Any] = {
+        "service": service,
+        "format": "json",
+        "params": params,
+    }
+    return payload
+
+
 def create_mast_ingestor(output_dir: Path, config: dict[str, Any]) -> MASTIngestor:
     return MASTIngestor(source_name="mast", output_dir=output_dir, config=config)
@@ -0,0 +1,150 @@
+"""
+Per-run ingestion metrics and the run log they are appended to.
+
+A ``RunMetrics`` instance hangs off every ingestor. A ``requests`` response hook
+records each HTTP call's latency (time to response headers), bytes and cache
+status; connectors report retries and time spent decoding; ``persist`` times
+the fetch, validation and write stages. ``summary()`` is stored under
+``IngestionResult.metadata["metrics"]`` and appended, with the rest of the
+result, to ``.ingestion_runs.jsonl`` in the source's output directory, where
+``scripts/compare_ingestion_runs.py`` reads it back.
+
+Stage seconds are summed over the threads that ran them, so for concurrent
+stages (downloads, decoding) they can exceed the run's wall time.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Iterator, TypeVar
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+
+RUN_LOG_FILENAME = ".ingestion_runs.jsonl"
+LATENCY_PERCENTILES = (50, 90, 99)
+
+T = TypeVar("T")
+
+
+class RunMetrics:
+    """Thread-safe counters and timers for one ingestion run."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.perf_counter()
+            self.latencies: list[float] = []
+            self.bytes_downloaded = 0
+            self.cache_hits = 0
+            self.retries = 0
+            self.statuses: Counter[int] = Counter()
+            self.hosts: Counter[str] = Counter()
+            self.stages: Counter[str] = Counter()
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def install(self, session: requests.Session) -> None:
+        """Record every response ``session`` receives."""
+        session.hooks["response"].append(self._on_response)
+
+    def _on_response(self, response: requests.Response, *args: Any, stream: bool = False, **kwargs: Any) -> None:
+        if getattr(response, "from_cache", False):
+            with self._lock:
+                self.cache_hits += 1
+            return
+        length = response.headers.get("Content-Length")
+        # Streamed bodies without a length are not read here (that would defeat streaming)
+        size = int(length) if length and length.isdigit() else (0 if stream else len(response.content))
+        with self._lock:
+            self.latencies.append(response.elapsed.total_seconds())
+            self.bytes_downloaded += size
+            self.statuses[response.status_code] += 1
+            self.hosts[urlsplit(response.url or "").netloc] += 1
+
+    def retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[stage] += seconds
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def timed(self, items: Iterable[T], stage: str) -> Iterator[T]:
+        """Yield from ``items``, charging the time spent waiting for each item to ``stage``."""
+        iterator = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(stage, time.perf_counter() - start)
+                return
+            self.add(stage, time.perf_counter() - start)
+            yield item
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def summary(self, records: int) -> dict[str, Any]:
+        with self._lock:
+            wall = time.perf_counter() - self.started
+            latencies = np.asarray(self.latencies) * 1000.0
+            requests_summary: dict[str, Any] = {
+                "count": len(latencies),
+                "cache_hits": self.cache_hits,
+                "bytes_downloaded": self.bytes_downloaded,
+                "statuses": {str(code): count for code, count in sorted(self.statuses.items())},
+                "hosts": dict(self.hosts),
+            }
+            if len(latencies):
+                for percentile, value in zip(LATENCY_PERCENTILES, np.percentile(latencies, LATENCY_PERCENTILES)):
+                    requests_summary[f"p{percentile}_ms"] = round(float(value), 2)
+                requests_summary["max_ms"] = round(float(latencies.max()), 2)
+            return {
+                "wall_seconds": round(wall, 3),
+                "records_per_second": round(records / wall, 2) if wall > 0 else None,
+                "requests": requests_summary,
+                "retries": self.retries,
+                "stages": {stage: round(seconds, 3) for stage, seconds in sorted(self.stages.items())},
+            }
+
+
+def append_run_log(path: Path, entry: dict[str, Any]) -> None:
+    """Append one run as a JSON line (a single ``write``, so concurrent sources do not interleave)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = json.dumps({"logged_at": datetime.now(timezone.utc).isoformat(), **entry}, default=str)
+    with path.open("a", encoding="utf-8") as handle:
+        handle.write(line + "\n")
+
+
+def read_run_log(paths: Iterable[Path]) -> list[dict[str, Any]]:
+    """Runs from run-log files (or output directories holding one), oldest first."""
+    runs: list[dict[str, Any]] = []
+    for path in paths:
+        candidates = sorted(path.rglob(RUN_LOG_FILENAME)) if path.is_dir() else [path]
+        for candidate in candidates:
+            with candidate.open(encoding="utf-8") as handle:
+                runs.extend(json.loads(line) for line in handle if line.strip())
+    return sorted(runs, key=lambda run: run.get("logged_at", ""))
@@ -2,7 +2,7 @@
 
 from __future__ import annotations
 
-from typing import List
+from typing import ClassVar, List
 
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
@@ -24,13 +24,24 @@ class TESSRecord(BaseModel):
     cadence: str
     time: List[float] = Field(default_factory=list)
     flux: List[float] = Field(default_factory=list)
+    binned_time: List[float] = Field(default_factory=list)
+    binned_flux: List[float] = Field(default_factory=list)
+    bin_minutes: float | None = None
+    bin_statistic: str | None = None
+    ra: float | None = None
+    dec: float | None = None
 
     model_config = ConfigDict(extra="allow")
 
+    # Float arrays checked as NumPy arrays by batch validation; arrays in a group share a length
+    aligned_arrays: ClassVar[tuple[tuple[str, ...], ...]] = (("time", "flux"), ("binned_time", "binned_flux"))
+
     @model_validator(mode="after")
     def validate_time_flux_alignment(self) -> "TESSRecord":
         if self.time and self.flux and len(self.time) != len(self.flux):
             raise ValueError("time and flux arrays must be the same length")
+        if len(self.binned_time) != len(self.binned_flux):
+            raise ValueError("binned_time and binned_flux arrays must be the same length")
         return self
 
 
@@ -40,6 +51,8 @@ class MASTRecord(BaseModel):
     target: str
     exposure_time: float
     spectral_range: List[float] = Field(default_factory=list)
+    ra: float | None = None
+    dec: float | None = None
 
     model_config = ConfigDict(extra="allow")
 
@@ -0,0 +1,241 @@
+"""
+HEALPix sky index over the positions of ingested records.
+
+``build_sky_index`` reads only the coordinate, key and identifier columns of
+each data-lake source, assigns every record its nested HEALPix pixel at
+``nside`` and writes one Arrow IPC file sorted by pixel. ``SkyIndex``
+memory-maps that file, so every API worker shares the same pages, and answers
+cone and convex-polygon queries by turning the region into runs of pixels,
+binary-searching those runs in the sorted pixel column and keeping the
+candidates whose exact angular distance (or edge test) passes.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import functools
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Mapping, Optional, Sequence
+
+import astropy.units as u
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from astropy_healpix import HEALPix
+
+from .storage import KEY_COLUMN, read_table
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NSIDE = 256  # ~13.7 arcmin pixels
+DEFAULT_INDEX_PATH = Path("data/processed/sky_index.arrow")
+PIXEL_COLUMN = "healpix"
+SEPARATION_COLUMN = "separation_arcsec"
+# Column naming each source's object; stored as ``object_id`` in the index
+ID_COLUMNS = {"ztf": "object_id", "ztf_alerts": "object_id", "tess": "tic_id", "mast": "observation_id"}
+PAYLOAD_COLUMNS = ("mjd", "mag_psf", "filter")
+
+INDEX_SCHEMA = pa.schema(
+    [
+        pa.field(PIXEL_COLUMN, pa.int64()),
+        pa.field("ra", pa.float64()),
+        pa.field("dec", pa.float64()),
+        pa.field("source", pa.string()),
+        pa.field(KEY_COLUMN, pa.string()),
+        pa.field("object_id", pa.string()),
+        pa.field("mjd", pa.float64()),
+        pa.field("mag_psf", pa.float64()),
+        pa.field("filter", pa.string()),
+    ]
+)
+
+
+@functools.lru_cache(maxsize=32)
+def healpix_grid(nside: int) -> HEALPix:
+    if nside < 1 or nside & (nside - 1):
+        raise ValueError(f"nside must be a power of two, got {nside}")
+    return HEALPix(nside=nside, order="nested")
+
+
+def pixel_resolution(nside: int) -> float:
+    """Approximate pixel size in degrees."""
+    return float(np.sqrt(4 * np.pi / (12 * nside**2))) * 180.0 / np.pi
+
+
+def lonlat_to_pixels(grid: HEALPix, ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+    return np.asarray(grid.lonlat_to_healpix(ra * u.deg, dec * u.deg), dtype=np.int64)
+
+
+def unit_vectors(ra: np.ndarray, dec: np.ndarray) -> np.ndarray:
+    """``[n, 3]`` Cartesian unit vectors for positions in degrees."""
+    ra_rad, dec_rad = np.radians(ra), np.radians(dec)
+    cos_dec = np.cos(dec_rad)
+    return np.column_stack([cos_dec * np.cos(ra_rad), cos_dec * np.sin(ra_rad), np.sin(dec_rad)])
+
+
+def angular_separation(ra1: np.ndarray, dec1: np.ndarray, ra2: np.ndarray, dec2: np.ndarray) -> np.ndarray:
+    """Great-circle separation in degrees (haversine, stable at small angles); inputs broadcast."""
+    ra1, dec1, ra2, dec2 = map(np.radians, (ra1, dec1, ra2, dec2))
+    hav = np.sin((dec2 - dec1) / 2) ** 2 + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2) ** 2
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(hav, 0.0, 1.0))))
+
+
+def build_sky_index(
+    sources: Mapping[str, Path],
+    path: Path = DEFAULT_INDEX_PATH,
+    nside: int = DEFAULT_NSIDE,
+) -> int:
+    """
+    Index every record with finite ``ra``/``dec`` in ``sources`` (name -> data-lake
+    directory) and atomically replace the index at ``path``. Returns the row count.
+    """
+    grid = healpix_grid(nside)
+    tables = [table for table in (source_positions(name, root) for name, root in sources.items()) if table.num_rows]
+    table = pa.concat_tables(tables) if tables else INDEX_SCHEMA.empty_table()
+    ra, dec = table["ra"].to_numpy(), table["dec"].to_numpy()
+    pixels = lonlat_to_pixels(grid, ra, dec)
+    order = np.argsort(pixels, kind="stable")
+    table = table.take(order).set_column(0, PIXEL_COLUMN, pa.array(pixels[order]))
+    table = table.replace_schema_metadata(
+        {
+            "nside": str(nside),
+            "order": "nested",
+            "sources": ",".join(sources),
+            "built_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        }
+    )
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    # One record batch, so readers get contiguous zero-copy columns
+    with pa.OSFile(str(tmp), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table.combine_chunks(), max_chunksize=max(1, table.num_rows))
+    os.replace(tmp, path)
+    logger.info("Indexed %d positions from %s at nside=%d into %s", table.num_rows, ", ".join(sources), nside, path)
+    return table.num_rows
+
+
+def source_positions(name: str, root: Path) -> pa.Table:
+    """The index columns of one data-lake source; records without a finite ra/dec are left out."""
+    id_column = ID_COLUMNS.get(name, "object_id")
+    table = read_table(root, columns=[KEY_COLUMN, "ra", "dec", id_column, *PAYLOAD_COLUMNS])
+    if "ra" not in table.column_names or "dec" not in table.column_names:
+        logger.info("Skipping %s: its records carry no ra/dec", name)
+        return INDEX_SCHEMA.empty_table()
+    ra = pc.cast(table["ra"], pa.float64())
+    dec = pc.cast(table["dec"], pa.float64())
+    valid = pc.and_(pc.is_finite(ra), pc.is_finite(dec)).fill_null(False)
+    columns = {
+        PIXEL_COLUMN: pa.nulls(table.num_rows, pa.int64()),
+        "ra": ra,
+        "dec": dec,
+        "source": pa.array([name] * table.num_rows, pa.string()),
+        KEY_COLUMN: table[KEY_COLUMN] if KEY_COLUMN in table.column_names else pa.nulls(table.num_rows, pa.string()),
+        "object_id": table[id_column] if id_column in table.column_names else pa.nulls(table.num_rows, pa.string()),
+    }
+    for column in PAYLOAD_COLUMNS:
+        field_type = INDEX_SCHEMA.field(column).type
+        present = column in table.column_names
+        columns[column] = pc.cast(table[column], field_type) if present else pa.nulls(table.num_rows, field_type)
+        if pa.types.is_floating(field_type):
+            # NaN payloads become nulls so query results serialise as JSON
+            columns[column] = pc.if_else(pc.is_nan(columns[column]), None, columns[column])
+    return pa.table({name: pc.cast(column, INDEX_SCHEMA.field(name).type) for name, column in columns.items()}).filter(valid)
+
+
+class SkyIndex:
+    """Memory-mapped, pixel-sorted positions answering cone and polygon queries."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        metadata = self.table.schema.metadata or {}
+        self.nside = int(metadata.get(b"nside", DEFAULT_NSIDE))
+        healpix_grid(self.nside)  # rejects a corrupt nside up front
+        self._pixels = self.table[PIXEL_COLUMN].to_numpy()
+        self._ra = self.table["ra"].to_numpy()
+        self._dec = self.table["dec"].to_numpy()
+
+    def __len__(self) -> int:
+        return self.table.num_rows
+
+    def cone(self, ra: float, dec: float, radius: float, sources: Optional[Sequence[str]] = None) -> pa.Table:
+        """Rows within ``radius`` degrees of (``ra``, ``dec``), nearest first, with their separation."""
+        rows = self._rows_in_cone(ra, dec, radius)
+        separation = angular_separation(ra, dec, self._ra[rows], self._dec[rows])
+        inside = separation <= radius
+        rows, separation = rows[inside], separation[inside]
+        order = np.argsort(separation, kind="stable")
+        return self._result(rows[order], separation[order], sources)
+
+    def polygon(self, vertices: Sequence[tuple[float, float]], sources: Optional[Sequence[str]] = None) -> pa.Table:
+        """
+        Rows inside a convex polygon given as (ra, dec) vertices in degrees, in either
+        winding order. Edges are great-circle arcs; separations are from the centroid.
+        """
+        corners = unit_vectors(*np.asarray(vertices, dtype=float).T)
+        if len(corners) < 3:
+            raise ValueError("A polygon needs at least three vertices")
+        normals = np.cross(corners, np.roll(corners, -1, axis=0))
+        centre = corners.sum(axis=0)
+        centre /= np.linalg.norm(centre)
+        sides = normals @ centre
+        if np.all(sides < 0):
+            normals, sides = -normals, -sides
+        if not np.all(sides > 0):
+            raise ValueError("Polygon vertices must describe a convex polygon")
+
+        centre_ra = float(np.degrees(np.arctan2(centre[1], centre[0])) % 360.0)
+        centre_dec = float(np.degrees(np.arcsin(np.clip(centre[2], -1.0, 1.0))))
+        radius = float(angular_separation(centre_ra, centre_dec, *np.asarray(vertices, dtype=float).T).max())
+        rows = self._rows_in_cone(centre_ra, centre_dec, radius)
+        points = unit_vectors(self._ra[rows], self._dec[rows])
+        rows = rows[np.all(points @ normals.T >= 0.0, axis=1)]
+        separation = angular_separation(centre_ra, centre_dec, self._ra[rows], self._dec[rows])
+        return self._result(rows, separation, sources)
+
+    def _rows_in_cone(self, ra: float, dec: float, radius: float) -> np.ndarray:
+        """
+        Row indices in every pixel overlapping the cone. Wide cones are searched on a
+        coarser grid, whose nested pixels each cover ``4**levels`` consecutive index
+        pixels, so the pixel list stays short; the exact filter drops the extra rows.
+        """
+        levels = 0
+        while self.nside >> (levels + 1) and pixel_resolution(self.nside >> (levels + 1)) <= radius / 2:
+            levels += 1
+        grid = healpix_grid(self.nside >> levels)
+        pixels = np.unique(np.asarray(grid.cone_search_lonlat(ra * u.deg, dec * u.deg, radius=radius * u.deg), dtype=np.int64))
+        if not len(pixels):
+            return np.empty(0, dtype=np.int64)
+        # Runs of consecutive pixels need one binary search each
+        breaks = np.flatnonzero(np.diff(pixels) != 1) + 1
+        starts = pixels[np.r_[0, breaks]] << (2 * levels)
+        ends = (pixels[np.r_[breaks - 1, len(pixels) - 1]] + 1) << (2 * levels)
+        low = np.searchsorted(self._pixels, starts, side="left")
+        high = np.searchsorted(self._pixels, ends, side="left")
+        lengths = high - low
+        offsets = np.cumsum(lengths) - lengths
+        return np.repeat(low - offsets, lengths) + np.arange(lengths.sum())
+
+    def _result(self, rows: np.ndarray, separation: np.ndarray, sources: Optional[Sequence[str]]) -> pa.Table:
+        table = self.table.take(rows).append_column(SEPARATION_COLUMN, pa.array(separation * 3600.0))
+        if sources:
+            table = table.filter(pc.is_in(table["source"], pa.array(list(sources), pa.string())))
+        return table
+
+
+def open_sky_index(path: Path = DEFAULT_INDEX_PATH) -> Optional[SkyIndex]:
+    """The index at ``path`` (re-opened when it is rebuilt), or ``None`` if it has not been built."""
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    return _open(path, mtime_ns)
+
+
+@functools.lru_cache(maxsize=4)
+def _open(path: Path, mtime_ns: int) -> SkyIndex:
+    return SkyIndex(path)
@@ -0,0 +1,408 @@
+"""
+Raw record storage for the data lake.
+
+``ParquetStorage`` writes each persisted batch as one Parquet part under
+``<source dir>/ingest_date=YYYY-MM-DD/``. Columns follow the source's pydantic
+record model, so float arrays such as TESS ``time``/``flux`` are stored as native
+``list<double>`` rather than JSON text; fields outside the model go to a JSON
+``extra`` column. ``JSONStorage`` keeps the original one-file-per-record layout.
+
+Readers (``read_table``, ``iter_records``, ``read_random_record``) accept a
+source directory and return Parquet parts and legacy ``record_*.json`` drops
+alike, so feature builders and the API don't care which format a run used.
+They also read the immutable shards ``compaction.compact`` packs those small
+files into (``shards/`` plus a ``_manifest.json`` of checksums and per-row-group
+key ranges), which is what lets ``read_record`` look a record up by key.
+"""
+
+from __future__ import annotations
+
+import bisect
+import datetime as dt
+import functools
+import json
+import logging
+import os
+import random
+import re
+import time
+import types
+import uuid
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Sequence, Union, get_args, get_origin
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+PARTITION_KEY = "ingest_date"
+KEY_COLUMN = "record_key"
+EXTRA_COLUMN = "extra"
+SHARD_DIR = "shards"
+MANIFEST_FILENAME = "_manifest.json"
+
+_SCALAR_TYPES = {str: pa.string(), float: pa.float64(), int: pa.int64(), bool: pa.bool_()}
+
+
+def _arrow_type(annotation: Any) -> Optional[pa.DataType]:
+    origin = get_origin(annotation)
+    if origin in (Union, types.UnionType):
+        args = [a for a in get_args(annotation) if a is not type(None)]
+        return _arrow_type(args[0]) if len(args) == 1 else None
+    if origin in (list, Sequence):
+        item = _arrow_type(get_args(annotation)[0]) if get_args(annotation) else None
+        return pa.list_(item) if item is not None else None
+    return _SCALAR_TYPES.get(annotation)
+
+
+def arrow_schema(record_model: Optional[type[BaseModel]]) -> pa.Schema:
+    """Columns for a record model: key, every representable model field, then ``extra``."""
+    fields = [pa.field(KEY_COLUMN, pa.string(), nullable=False)]
+    if record_model is not None:
+        for name, info in record_model.model_fields.items():
+            arrow_type = _arrow_type(info.annotation)
+            if arrow_type is not None:
+                fields.append(pa.field(name, arrow_type))
+    fields.append(pa.field(EXTRA_COLUMN, pa.string()))
+    return pa.schema(fields)
+
+
+def records_to_table(keyed: dict[str, dict[str, Any]], schema: pa.Schema) -> pa.Table:
+    """Build a table in ``schema``; fields it has no column for are folded into ``extra``."""
+    names = [name for name in schema.names if name not in (KEY_COLUMN, EXTRA_COLUMN)]
+    columns: dict[str, Any] = {KEY_COLUMN: list(keyed), EXTRA_COLUMN: []}
+    for name in names:
+        columns[name] = []
+    for record in keyed.values():
+        for name in names:
+            columns[name].append(record.get(name))
+        extra = {k: v for k, v in record.items() if k not in columns}
+        columns[EXTRA_COLUMN].append(json.dumps(extra, default=json_default) if extra else None)
+    for name in names:
+        field_type = schema.field(name).type
+        if pa.types.is_list(field_type) and all(isinstance(v, np.ndarray) for v in columns[name]):
+            columns[name] = _list_array(columns[name], field_type)
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+def _list_array(values: list[np.ndarray], list_type: pa.DataType) -> pa.Array:
+    """A list column built from one concatenated buffer instead of element by element."""
+    offsets = np.zeros(len(values) + 1, dtype=np.int32)
+    np.cumsum([len(v) for v in values], out=offsets[1:])
+    flat = np.concatenate(values) if values else np.empty(0)
+    return pa.ListArray.from_arrays(pa.array(offsets), pa.array(flat, type=list_type.value_type))
+
+
+def json_default(value: Any) -> Any:
+    """``json.dumps`` fallback: arrays as lists, anything else as its string form."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class JSONStorage:
+    """One pretty-printed ``record_<key>.json`` per record (the original layout)."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def write_batch(self, keyed: dict[str, dict[str, Any]]) -> list[Path]:
+        paths = []
+        for key, record in keyed.items():
+            target_path = self.root / f"record_{_slug(key)}.json"
+            tmp_path = target_path.with_suffix(".json.tmp")
+            tmp_path.write_text(json.dumps(record, indent=2, default=json_default))
+            os.replace(tmp_path, target_path)
+            paths.append(target_path)
+        return paths
+
+
+class ParquetStorage:
+    """One Parquet part per batch, partitioned by ingestion date."""
+
+    def __init__(
+        self,
+        root: Path,
+        record_model: Optional[type[BaseModel]] = None,
+        compression: str = "zstd",
+    ) -> None:
+        self.root = root
+        self.schema = arrow_schema(record_model)
+        self.compression = compression
+
+    def write_batch(self, keyed: dict[str, dict[str, Any]]) -> list[Path]:
+        table = records_to_table(keyed, self.schema)
+        partition = self.root / f"{PARTITION_KEY}={dt.date.today().isoformat()}"
+        partition.mkdir(parents=True, exist_ok=True)
+        # Time-ordered names: sorted parts read back in write order
+        target_path = partition / f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+        tmp_path = target_path.with_suffix(".parquet.tmp")
+        pq.write_table(table, tmp_path, compression=self.compression)
+        os.replace(tmp_path, target_path)
+        return [target_path] * len(keyed)
+
+
+def create_storage(kind: str, root: Path, record_model: Optional[type[BaseModel]] = None) -> JSONStorage | ParquetStorage:
+    if kind == "json":
+        return JSONStorage(root)
+    if kind == "parquet":
+        return ParquetStorage(root, record_model)
+    raise ValueError(f"Unsupported storage '{kind}'. Expected 'json' or 'parquet'")
+
+
+# ----------------------------------------------------------------------
+# Readers
+# ----------------------------------------------------------------------
+
+
+def list_parts(root: Path) -> list[Path]:
+    return sorted(root.glob(f"{PARTITION_KEY}=*/*.parquet"))
+
+
+def list_json(root: Path) -> list[Path]:
+    return sorted(root.glob("record_*.json"))
+
+
+def read_manifest(root: Path) -> dict[str, Any]:
+    """The shard manifest of a source directory (no shards if it has never been compacted)."""
+    path = root / SHARD_DIR / MANIFEST_FILENAME
+    try:
+        return _load_manifest(path, path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        return {"shards": []}
+
+
+@functools.lru_cache(maxsize=32)
+def _load_manifest(path: Path, mtime_ns: int) -> dict[str, Any]:
+    return json.loads(path.read_text())
+
+
+def list_shards(root: Path) -> list[Path]:
+    """Shards listed in the manifest, oldest first (files a crashed compaction left behind are not)."""
+    return [root / SHARD_DIR / entry["file"] for entry in read_manifest(root)["shards"]]
+
+
+def count_records(root: Path) -> int:
+    """Records under ``root`` from shard and part metadata, without reading any rows."""
+    shards = sum(entry["rows"] for entry in read_manifest(root)["shards"])
+    parts = sum(pq.ParquetFile(p).metadata.num_rows for p in list_parts(root))
+    return shards + parts + len(list_json(root))
+
+
+def read_table(
+    root: Path,
+    columns: Optional[Sequence[str]] = None,
+    record_model: Optional[type[BaseModel]] = None,
+) -> pa.Table:
+    """Every record under ``root`` as one table (shards, Parquet parts, then converted JSON drops)."""
+    tables = []
+    schema = None
+    shards = list_shards(root)
+    if shards:
+        dataset = ds.dataset([str(p) for p in shards], schema=_dataset_schema(shards, record_model), format="parquet")
+        schema = dataset.schema
+        tables.append(dataset.to_table(columns=_present(columns, schema)))
+
+    parts = list_parts(root)
+    if parts:
+        dataset = ds.dataset(
+            [str(p) for p in parts],
+            schema=_dataset_schema(parts, record_model),
+            format="parquet",
+            partitioning=ds.partitioning(flavor="hive"),
+            partition_base_dir=str(root),
+        )
+        schema = dataset.schema
+        tables.append(dataset.to_table(columns=_present(columns, schema)))
+
+    json_paths = list_json(root)
+    if json_paths:
+        if schema is None:
+            schema = arrow_schema(record_model) if record_model is not None else None
+        tables.append(_json_table(json_paths, schema, columns))
+
+    if not tables:
+        return pa.table({})
+    if len(tables) == 1:
+        return tables[0]
+    return pa.concat_tables(tables, promote_options="default")
+
+
+def iter_tables(
+    root: Path,
+    columns: Optional[Sequence[str]] = None,
+    record_model: Optional[type[BaseModel]] = None,
+    batch_rows: int = 4096,
+) -> Iterator[pa.Table]:
+    """
+    The records under ``root`` as tables of about ``batch_rows`` rows, in ``read_table``
+    order, reading one batch at a time so a whole source never has to fit in memory.
+    """
+    schema = None
+    shards, parts = list_shards(root), list_parts(root)
+    datasets = []
+    if shards:
+        datasets.append(ds.dataset([str(p) for p in shards], schema=_dataset_schema(shards, record_model), format="parquet"))
+    if parts:
+        datasets.append(
+            ds.dataset(
+                [str(p) for p in parts],
+                schema=_dataset_schema(parts, record_model),
+                format="parquet",
+                partitioning=ds.partitioning(flavor="hive"),
+                partition_base_dir=str(root),
+            )
+        )
+    for dataset in datasets:
+        schema = dataset.schema
+        pending: list[pa.RecordBatch] = []
+        rows = 0
+        # Row groups can be smaller than a batch, so fragments are regrouped
+        for batch in dataset.to_batches(columns=_present(columns, schema), batch_size=batch_rows):
+            pending.append(batch)
+            rows += batch.num_rows
+            if rows >= batch_rows:
+                yield pa.Table.from_batches(pending)
+                pending, rows = [], 0
+        if rows:
+            yield pa.Table.from_batches(pending)
+
+    json_paths = list_json(root)
+    if json_paths and schema is None and record_model is not None:
+        schema = arrow_schema(record_model)
+    for start in range(0, len(json_paths), batch_rows):
+        yield _json_table(json_paths[start : start + batch_rows], schema, columns)
+
+
+def iter_records(
+    root: Path,
+    columns: Optional[Sequence[str]] = None,
+    record_model: Optional[type[BaseModel]] = None,
+) -> Iterator[dict[str, Any]]:
+    """
+    Yield records under ``root`` as dicts.
+
+    List columns come back as NumPy views over the Arrow buffers (no per-element
+    Python floats); ``extra`` is merged back into the record.
+    """
+    yield from table_records(read_table(root, columns, record_model))
+
+
+def table_records(table: pa.Table, batch_rows: int = 1024) -> Iterator[dict[str, Any]]:
+    for batch in table.to_batches(max_chunksize=batch_rows):
+        columns: dict[str, Any] = {}
+        for name, column in zip(batch.schema.names, batch.columns):
+            if pa.types.is_list(column.type) or pa.types.is_large_list(column.type):
+                offsets = column.offsets.to_numpy()
+                values = column.values.to_numpy(zero_copy_only=False)
+                columns[name] = [values[offsets[i]:offsets[i + 1]] for i in range(len(column))]
+            else:
+                columns[name] = column.to_pylist()
+        for i in range(batch.num_rows):
+            record = {name: values[i] for name, values in columns.items()}
+            extra = record.pop(EXTRA_COLUMN, None)
+            if extra:
+                for key, value in json.loads(extra).items():
+                    record.setdefault(key, value)
+            yield record
+
+
+def read_record(root: Path, key: str) -> Optional[dict[str, Any]]:
+    """
+    The record stored under ``key``, or ``None``.
+
+    Uncompacted files are newer than every shard, so they are checked first: the
+    JSON drop is opened by name and Parquet parts are scanned with the key pushed
+    down to row-group statistics (the newest part wins). Shards are sorted by key,
+    so the manifest's row-group key ranges point at the one row group to read;
+    newer shards win. Records compacted from JSON drops are keyed by file-name
+    slug and found under that too.
+    """
+    json_path = root / f"record_{_slug(key)}.json"
+    if json_path.exists():
+        return json.loads(json_path.read_text())
+
+    parts = list_parts(root)
+    if parts:
+        dataset = ds.dataset([str(p) for p in parts], schema=_dataset_schema(parts, None), format="parquet")
+        match = dataset.to_table(filter=ds.field(KEY_COLUMN) == key)
+        if match.num_rows:
+            return next(table_records(match.slice(match.num_rows - 1, 1)))
+
+    for entry in reversed(read_manifest(root)["shards"]):
+        for candidate in dict.fromkeys([key, _slug(key)]):
+            if not entry["min_key"] <= candidate <= entry["max_key"]:
+                continue
+            groups = entry["row_groups"]
+            group = bisect.bisect_left([high for _, high in groups], candidate)
+            if group == len(groups) or groups[group][0] > candidate:
+                continue
+            table = pq.ParquetFile(root / SHARD_DIR / entry["file"]).read_row_group(group)
+            match = table.filter(pc.equal(table[KEY_COLUMN], candidate))
+            if match.num_rows:
+                return next(table_records(match.slice(0, 1)))
+    return None
+
+
+def read_random_record(path: Path) -> Optional[dict[str, Any]]:
+    """One random record from a Parquet part, reading a single row group."""
+    parquet_file = pq.ParquetFile(path)
+    if parquet_file.metadata.num_rows == 0:
+        return None
+    group = random.randrange(parquet_file.num_row_groups)
+    table = parquet_file.read_row_group(group)
+    row = random.randrange(table.num_rows)
+    return next(table_records(table.slice(row, 1)))
+
+
+def _dataset_schema(parts: Sequence[Path], record_model: Optional[type[BaseModel]]) -> pa.Schema:
+    """One schema across parts written before and after a record model gained fields."""
+    if record_model is not None:
+        schema = arrow_schema(record_model)
+    else:
+        schema = pa.unify_schemas([pq.read_schema(p) for p in parts], promote_options="permissive")
+    return schema.append(pa.field(PARTITION_KEY, pa.string())) if PARTITION_KEY not in schema.names else schema
+
+
+def _present(columns: Optional[Sequence[str]], schema: pa.Schema) -> Optional[list[str]]:
+    if columns is None:
+        return None
+    return [c for c in columns if c in schema.names]
+
+
+def _json_table(paths: Iterable[Path], schema: Optional[pa.Schema], columns: Optional[Sequence[str]]) -> pa.Table:
+    return _keyed_table(_load_json(paths), schema, columns)
+
+
+def _load_json(paths: Iterable[Path]) -> dict[str, dict[str, Any]]:
+    """Records of ``record_<key>.json`` drops by key; unreadable files are logged and left out."""
+    keyed: dict[str, dict[str, Any]] = {}
+    for path in paths:
+        try:
+            keyed[path.stem.removeprefix("record_")] = json.loads(path.read_text())
+        except Exception as exc:
+            logger.warning("Failed to load %s: %s", path, exc)
+    return keyed
+
+
+def _keyed_table(
+    keyed: dict[str, dict[str, Any]], schema: Optional[pa.Schema], columns: Optional[Sequence[str]] = None
+) -> pa.Table:
+    if schema is None:
+        rows = [{KEY_COLUMN: key, **record} for key, record in keyed.items()]
+        table = pa.Table.from_pylist(rows)
+    else:
+        schema = pa.schema([f for f in schema if f.name != PARTITION_KEY])
+        table = records_to_table(keyed, schema)
+    return table.select(_present(columns, table.schema)) if columns is not None else table
+
+
+def _slug(key: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", key).strip("_")
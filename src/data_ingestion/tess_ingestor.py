@@ -4,10 +4,14 @@ from __future__ import annotations
 
 import logging
 import math
-import json
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from io import BytesIO
 from pathlib import Path
-from typing import Any, Iterable, Sequence
+from typing import Any, Iterator, Sequence
 
 import numpy as np
 try:
@@ -20,212 +24,349 @@ except ImportError:
     logger.warning("astropy not installed. TESS ingestion disabled.")
 
 from .base import BaseIngestor
+from .http_cache import install_astroquery_cache
+from .fetching import HostLimiter, RetryPolicy, ordered_map, request_with_retries, size_connection_pool
 from .schemas import TESSRecord
 
 logger = logging.getLogger(__name__)
 
+_COPY_BLOCK = 1 << 20  # bytes per read when spooling cutouts to disk
+
+
+DEFAULT_TARGETS = [
+    "Tic 25155310", "Tic 261136679", "Tic 441462736", "Tic 233087856",
+    "Tic 251630511", "Tic 100100827", "Tic 38846515", "Tic 470710327",
+    "Tic 307210830", "Tic 150428135", "Tic 149603524", "Tic 277539431"
+]
+
 
 class TESSIngestor(BaseIngestor):
     """Ingests light-curve segments from TESS archives."""
 
     record_model = TESSRecord
 
-    def fetch(self, limit: int = 5, **_: Any) -> Iterable[dict[str, Any]]:
+    def fetch(self, limit: int = 5, targets: Sequence[str] | None = None, **_: Any) -> Iterator[dict[str, Any]]:
         logger.debug("Fetching TESS records via TESScut with limit=%d", limit)
-        records = self._fetch_from_tesscut(limit)
-        if records:
-            logger.info("Fetched %d TESS light curves via TESScut", len(records))
-            return records
+        fetched = 0
+        for record in self._fetch_from_tesscut(limit, targets):
+            fetched += 1
+            yield record
 
-        logger.warning("No TESS records found via TESScut.")
-        return []
+        if fetched:
+            logger.info("Fetched %d TESS light curves via TESScut", fetched)
+        else:
+            logger.warning("No TESS records found via TESScut.")
 
     # ------------------------------------------------------------------
     # Internal helpers (TESScut)
     # ------------------------------------------------------------------
 
-    def _fetch_from_tesscut(self, limit: int) -> list[dict[str, Any]]:
+    def _resolve_targets(self, limit: int) -> list[str]:
         # Use astroquery to find many TESS observations if possible, or fallback to expanded hardcoded list
-        records: list[dict[str, Any]] = []
-        
+        target_names: list[str] = []
         try:
             from astroquery.mast import Observations
-            
+
+            if self.http_cache is not None:
+                install_astroquery_cache(Observations, self.http_cache)
             # 1. Search for TESS Time Series
             logger.info(f"Querying MAST for TESS timeseries (limit={limit})...")
-            # Query for TESS project, Sector 1 (good starting point), or just random large query
+            # Sector 1 is a good starting point; Observations.query_criteria has no limit, so slice
             obs_table = Observations.query_criteria(
                 obs_collection="TESS",
                 dataproduct_type="timeseries",
-                target_name="*", # Wildcard? Or just don't specify target
-                sequence_number=1 # Sector 1 to start
+                target_name="*",
+                sequence_number=1
             )
-            
-            # That might be huge, let's limit in python or use a smaller criteria if possible
-            # Observations.query_criteria doesn't support 'limit' natively in all versions?
-            # We can slice the result.
-            
-            target_names = []
             if len(obs_table) > 0:
-                # Get unique target names from the results
-                # Column might be 'target_name'
                 target_names = list(set(obs_table['target_name']))[:limit]
-            
             logger.info(f"Found {len(obs_table)} observations, selecting {len(target_names)} targets")
-            
-            # Fallback if astroquery returns empty or fails
-            if not target_names:
-                target_names = [
-                    "Tic 25155310", "Tic 261136679", "Tic 441462736", "Tic 233087856",
-                    "Tic 251630511", "Tic 100100827", "Tic 38846515", "Tic 470710327",
-                    "Tic 307210830", "Tic 150428135", "Tic 149603524", "Tic 277539431"
-                ]
-
-            headers = self.get_auth_header()
-            tesscut_url = self.config.get("tesscut_url", "https://mast.stsci.edu/tesscut/api/v0.1")
-
-            for target in target_names[:limit]:
-                 try:
-                    # Resolve to coordinates using MAST resolve (or just try sector search by name)
-                    # Use provided coordinate resolver or name lookup
-                    
-                    # For simplicity in mass ingestion, we will try to get the sector for the object name directly
-                    sector_url = f"{tesscut_url}/sector"
-                    params = {"obj_id": target}
-                    
-                    resp = self.session.get(sector_url, params=params, headers=headers, timeout=20)
-                    if resp.status_code != 200:
-                         continue
-                         
-                    results = resp.json().get("results", [])
-                    if not results:
-                        continue
-                        
-                    sector_info = results[0]
-                    sector_num = sector_info.get("sector")
-                    ra = float(sector_info.get("ra", 0)) # string from JSON?
-                    dec = float(sector_info.get("dec", 0))
-                    
-                    # Request Cutout (Astrocut)
-                    cutout_url = f"{tesscut_url}/astrocut"
-                    cutout_params = {
-                        "ra": ra,
-                        "dec": dec,
-                        "y": 5, "x": 5, # Minimize size for speed
-                        "units": "px",
-                        "sector": sector_num
-                    }
-                    
-                    # Remove auth header if empty/stubbed to avoid 401s if API is public
-                    req_headers = {k:v for k,v in headers.items() if v}
-                    
-                    logger.info("Downloading cutout for %s (Sector %s)...", target, sector_num)
-                    try:
-                        cutout_resp = self.session.get(cutout_url, params=cutout_params, headers=req_headers, timeout=30)
-                        
-                        if cutout_resp.status_code == 200:
-                             record = self._process_zip_response(cutout_resp.content, str(target), sector_num)
-                             if record:
-                                 records.append(record)
-                                 logger.info(f"✅ Downloaded TESS record for {target}")
-                        else:
-                            logger.warning(f"Failed to download cutout for {target}: {cutout_resp.status_code} {cutout_resp.text[:100]}")
-                    except Exception as e:
-                        logger.warning(f"Request failed for {target}: {e}")
-                             
-                 except Exception as e:
-                     logger.warning(f"Error processing {target}: {e}")
-                     continue
-
         except ImportError:
-             logger.error("astroquery not installed")
+            logger.error("astroquery not installed")
         except Exception as e:
-             logger.error(f"MAST query failed: {e}")
-
-        return records
+            logger.error(f"MAST query failed: {e}")
+
+        return target_names or DEFAULT_TARGETS
+
+    def _fetch_from_tesscut(self, limit: int, targets: Sequence[str] | None = None) -> Iterator[dict[str, Any]]:
+        """
+        Download and decode cutouts for up to ``limit`` targets, yielding in target order.
+
+        Sector lookups and cutout downloads run on a thread pool (``concurrency``
+        in-flight requests per host, retried with jittered backoff on 429/5xx). Each
+        finished download is handed straight to a process pool for FITS decoding,
+        so decoding overlaps with the remaining transfers. At most ``2 * concurrency``
+        targets are in the pipeline at once, so memory does not grow with ``limit``.
+        Cutouts larger than ``spool_mb`` are streamed to temporary files rather than
+        held in memory, and decoding memory-maps them (see ``LightCurveOptions``).
+        """
+        target_list = list(targets if targets is not None else self._resolve_targets(limit))[:limit]
+        if not target_list:
+            return
+
+        concurrency = int(self.config.get("concurrency", 8))
+        fits_workers = int(self.config.get("fits_workers", os.cpu_count() or 1))
+        options = LightCurveOptions.from_config(self.config)
+        self._retry = RetryPolicy.from_config(self.config.get("retry"))
+        self._limiter = HostLimiter(concurrency)
+        size_connection_pool(self.session, concurrency)
+
+        # Small batches are not worth spawning worker processes for
+        decoder = ProcessPoolExecutor(fits_workers) if fits_workers > 1 and len(target_list) > 1 else None
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="tesscut") as downloads:
+                args = ((target, decoder, options) for target in target_list)
+                for record in ordered_map(downloads, self._fetch_target, args, 2 * concurrency):
+                    if record:
+                        yield record
+        finally:
+            if decoder is not None:
+                decoder.shutdown(cancel_futures=True)
+
+    def _fetch_target(
+        self, target: str, decoder: ProcessPoolExecutor | None, options: LightCurveOptions
+    ) -> dict[str, Any] | None:
+        download = self._download_cutout(target)
+        if download is None:
+            return None
+        cutout, position = download
+        try:
+            with self.metrics.timer("decode"):
+                if decoder is None:
+                    record = decode_cutout(*cutout, options)
+                else:
+                    # The download thread waits on its decode so the window bounds both stages
+                    record = decoder.submit(decode_cutout, *cutout, options).result()
+        finally:
+            if isinstance(cutout[0], str):
+                Path(cutout[0]).unlink(missing_ok=True)
+        if record is not None:
+            # The target's position from the sector lookup, so light curves can be cross-matched
+            record["ra"], record["dec"] = position
+        return record
+
+    def _download_cutout(
+        self, target: str
+    ) -> tuple[tuple[bytes | str, str, Any], tuple[float | None, float | None]] | None:
+        headers = self.get_auth_header()
+        # Remove auth header if empty/stubbed to avoid 401s if API is public
+        req_headers = {k: v for k, v in headers.items() if v}
+        tesscut_url = self.config.get("tesscut_url", "https://mast.stsci.edu/tesscut/api/v0.1")
+        timeout = float(self.config.get("timeout", 30))
+        cutout_size = int(self.config.get("cutout_size", 5))
 
-    def _process_zip_response(self, content: bytes, target: str, sector: Any) -> dict[str, Any] | None:
-        import zipfile
-        
         try:
-            with zipfile.ZipFile(BytesIO(content)) as z:
-                # There should be one or more FITS files. Pick the first one.
-                fits_files = [f for f in z.namelist() if f.endswith(".fits")]
-                if not fits_files:
+            resp = request_with_retries(
+                self.session, "GET", f"{tesscut_url}/sector", self._retry, self._limiter,
+                params={"obj_id": target}, headers=req_headers, timeout=timeout, on_retry=self.metrics.retry,
+            )
+            if resp.status_code != 200:
+                logger.warning(f"Sector lookup failed for {target}: {resp.status_code}")
+                return None
+            results = resp.json().get("results", [])
+            if not results:
+                return None
+
+            sector_info = results[0]
+            sector_num = sector_info.get("sector")
+            if not self.is_new(self.record_key({"tic_id": str(target), "sector": sector_num})):
+                logger.debug("Skipping %s sector %s; already ingested", target, sector_num)
+                return None
+            position = (_float_or_none(sector_info.get("ra")), _float_or_none(sector_info.get("dec")))
+            cutout_params = {
+                "ra": float(sector_info.get("ra", 0)),
+                "dec": float(sector_info.get("dec", 0)),
+                "y": cutout_size, "x": cutout_size,
+                "units": "px",
+                "sector": sector_num,
+            }
+
+            logger.info("Downloading cutout for %s (Sector %s)...", target, sector_num)
+            cutout_resp = request_with_retries(
+                self.session, "GET", f"{tesscut_url}/astrocut", self._retry, self._limiter,
+                params=cutout_params, headers=req_headers, timeout=timeout, stream=True,
+                on_retry=self.metrics.retry,
+            )
+            with cutout_resp:
+                if cutout_resp.status_code != 200:
+                    logger.warning(f"Failed to download cutout for {target}: {cutout_resp.status_code} {cutout_resp.text[:100]}")
                     return None
-                
-                with z.open(fits_files[0]) as f:
-                    return self._extract_lightcurve_from_fits(f.read(), target, sector)
+                with self.metrics.timer("download"):
+                    return (self._spool(cutout_resp), str(target), sector_num), position
         except Exception as e:
-            logger.error("Failed to process ZIP: %s", e)
+            logger.warning(f"Error processing {target}: {e}")
             return None
 
-    def _extract_lightcurve_from_fits(self, fits_data: bytes, target: str, sector: Any) -> dict[str, Any] | None:
+    def _spool(self, response: Any) -> bytes | str:
+        """Small bodies stay in memory; large or unsized ones are streamed to a temp file."""
+        threshold = float(self.config.get("spool_mb", 8)) * 1024**2
+        length = response.headers.get("Content-Length")
+        if length is not None and int(length) <= threshold:
+            return response.content
+        fd, path = tempfile.mkstemp(prefix="tesscut-", suffix=".zip", dir=self.config.get("spool_dir"))
         try:
-            with fits.open(BytesIO(fits_data), memmap=False) as hdulist:
-                # TESS cutouts usually have the data in extension 1
-                if len(hdulist) < 2:
-                    return None
-                
-                data = hdulist[1].data
-                
-                # Fields: TIME, FLUX (3D array), FLUX_ERR, etc.
-                # Verify columns
-                if "TIME" not in data.columns.names or "FLUX" not in data.columns.names:
-                    return None
-                    
-                time_arr = data["TIME"]
-                flux_cube = data["FLUX"] # Shape: (Time, Y, X)
-                
-                # Aperture Photometry: Sum all pixels in the cutout for each time step
-                # Handle NaNs in flux
-                flux_cube_filled = np.nan_to_num(flux_cube, nan=0.0)
-                flux_arr = np.sum(flux_cube_filled, axis=(1, 2))
-                
-                # Clean up bad quality points (optional, but good for visualization)
-                valid_mask = (np.isfinite(time_arr)) & (flux_arr > 0)
-                
-                final_time = time_arr[valid_mask]
-                final_flux = flux_arr[valid_mask]
-
-                # Downsample if too large
-                max_points = 500
-                if len(final_time) > max_points:
-                    step = len(final_time) // max_points
-                    final_time = final_time[::step]
-                    final_flux = final_flux[::step]
-
-                return {
-                    "tic_id": target,
-                    "sector": int(sector) if sector else 0,
-                    "cadence": "custom_cutout",
-                    "time": final_time.astype(float).tolist(),
-                    "flux": final_flux.astype(float).tolist(),
-                    "mast_data_uri": "tesscut_api"
-                }
+            with os.fdopen(fd, "wb") as spooled:
+                for block in response.iter_content(_COPY_BLOCK):
+                    spooled.write(block)
+        except BaseException:
+            Path(path).unlink(missing_ok=True)
+            raise
+        return path
+
+    def record_key(self, record: dict[str, Any]) -> str | None:
+        return f"{record['tic_id']}:s{int(record['sector'] or 0)}"
+
+    def _process_zip_response(self, content: bytes | str, target: str, sector: Any) -> dict[str, Any] | None:
+        return decode_cutout(content, target, sector, LightCurveOptions.from_config(self.config))
+
+    def _extract_lightcurve_from_fits(self, fits_data: bytes | str, target: str, sector: Any) -> dict[str, Any] | None:
+        return extract_lightcurve_from_fits(fits_data, target, sector, LightCurveOptions.from_config(self.config))
+
+
+@dataclass(frozen=True)
+class LightCurveOptions:
+    """How cutouts are reduced to light curves; picklable so worker processes get a copy."""
+
+    chunk_cadences: int = 1024
+    bin_minutes: float | None = None
+    bin_statistic: str = "mean"
+    spool_dir: str | None = None
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "LightCurveOptions":
+        lightcurve = config.get("lightcurve", {})
+        bin_minutes = lightcurve.get("bin_minutes")
+        statistic = lightcurve.get("bin_statistic", cls.bin_statistic)
+        if statistic not in ("mean", "median"):
+            raise ValueError(f"Unsupported bin_statistic '{statistic}'. Expected 'mean' or 'median'")
+        return cls(
+            chunk_cadences=max(1, int(lightcurve.get("chunk_cadences", cls.chunk_cadences))),
+            bin_minutes=float(bin_minutes) if bin_minutes else None,
+            bin_statistic=statistic,
+            spool_dir=config.get("spool_dir"),
+        )
 
-        except Exception as e:
-            logger.error("Failed to extract lightcurve from FITS: %s", e)
-            return None
 
+def decode_cutout(
+    content: bytes | str, target: str, sector: Any, options: LightCurveOptions = LightCurveOptions()
+) -> dict[str, Any] | None:
+    """
+    Turn a TESScut ZIP (bytes, or the path of a spooled download) into a light-curve record.
 
-def create_tess_ingestor(output_dir: Path, config: dict[str, Any]) -> TESSIngestor:
-    return TESSIngestor(source_name="tess", output_dir=output_dir, config=config)
+    Runs in worker processes. The FITS member is copied out of the archive to a
+    temporary file in fixed-size blocks and memory-mapped from there, so neither
+    the archive nor the flux cube has to fit in memory.
+    """
+    import zipfile
 
+    try:
+        with zipfile.ZipFile(BytesIO(content) if isinstance(content, bytes) else content) as z:
+            # There should be one or more FITS files. Pick the first one.
+            fits_files = [f for f in z.namelist() if f.endswith(".fits")]
+            if not fits_files:
+                return None
+
+            with tempfile.NamedTemporaryFile(suffix=".fits", dir=options.spool_dir) as spooled:
+                with z.open(fits_files[0]) as member:
+                    shutil.copyfileobj(member, spooled, _COPY_BLOCK)
+                spooled.flush()
+                return extract_lightcurve_from_fits(spooled.name, target, sector, options)
+    except Exception as e:
+        logger.error("Failed to process ZIP: %s", e)
+        return None
 
-def _build_filter_list(filters_cfg: dict[str, Any]) -> list[dict[str, Any]]:
-    filters: list[dict[str, Any]] = []
-    for name, values in filters_cfg.items():
-        if values is None:
-            continue
-        value_list = values if isinstance(values, list) else [values]
-        filters.append(
-            {
-                "paramName": name,
-                "values": value_list,
-            }
+
+def extract_lightcurve_from_fits(
+    fits_data: bytes | str, target: str, sector: Any, options: LightCurveOptions = LightCurveOptions()
+) -> dict[str, Any] | None:
+    """
+    Full-cadence aperture light curve (sum over every cutout pixel) from a target pixel file.
+
+    ``fits_data`` may be raw bytes or a path; paths are memory-mapped and the flux
+    cube is summed ``options.chunk_cadences`` frames at a time, so peak memory
+    depends on the chunk size rather than on the cutout size or sector length.
+    """
+    try:
+        source = BytesIO(fits_data) if isinstance(fits_data, bytes) else fits_data
+        with fits.open(source, memmap=not isinstance(fits_data, bytes)) as hdulist:
+            # TESS cutouts usually have the data in extension 1
+            if len(hdulist) < 2:
+                return None
+
+            data = hdulist[1].data
+
+            # Fields: TIME, FLUX (3D array), FLUX_ERR, etc.
+            if "TIME" not in data.columns.names or "FLUX" not in data.columns.names:
+                return None
+
+            time_arr = np.asarray(data["TIME"], dtype=np.float64)
+            flux_arr = aperture_flux(data["FLUX"], options.chunk_cadences)  # FLUX shape: (Time, Y, X)
+            del data  # release the memmap before the file closes
+
+        # Clean up bad quality points (optional, but good for visualization)
+        valid_mask = np.isfinite(time_arr) & (flux_arr > 0)
+        final_time = time_arr[valid_mask]
+        final_flux = flux_arr[valid_mask]
+
+        record = {
+            "tic_id": target,
+            "sector": int(sector) if sector else 0,
+            "cadence": "custom_cutout",
+            "time": final_time,
+            "flux": final_flux,
+            "mast_data_uri": "tesscut_api",
+        }
+        if options.bin_minutes:
+            binned_time, binned_flux = bin_lightcurve(final_time, final_flux, options.bin_minutes, options.bin_statistic)
+            record.update(
+                binned_time=binned_time,
+                binned_flux=binned_flux,
+                bin_minutes=options.bin_minutes,
+                bin_statistic=options.bin_statistic,
+            )
+        return record
+
+    except Exception as e:
+        logger.error("Failed to extract lightcurve from FITS: %s", e)
+        return None
+
+
+def aperture_flux(flux_cube: np.ndarray, chunk_cadences: int = 1024) -> np.ndarray:
+    """Per-cadence sum over all pixels, ignoring NaNs, reading ``chunk_cadences`` frames at a time."""
+    total = np.empty(flux_cube.shape[0], dtype=np.float64)
+    for start in range(0, flux_cube.shape[0], chunk_cadences):
+        stop = start + chunk_cadences
+        total[start:stop] = np.nansum(flux_cube[start:stop], axis=(1, 2), dtype=np.float64)
+    return total
+
+
+def bin_lightcurve(
+    time_arr: np.ndarray, flux_arr: np.ndarray, bin_minutes: float, statistic: str = "mean"
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Average a light curve into fixed-width time bins (days in, minutes of width).
+
+    Bins are anchored at the first sample and empty bins (data gaps) are dropped;
+    each output point sits at the mean/median time of the samples it covers.
+    """
+    if len(time_arr) == 0:
+        return np.empty(0), np.empty(0)
+    order = np.argsort(time_arr, kind="stable")
+    time_arr, flux_arr = time_arr[order], flux_arr[order]
+    bin_index = np.floor((time_arr - time_arr[0]) / (bin_minutes / 1440.0)).astype(np.int64)
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(bin_index)) + 1))
+    if statistic == "median":
+        bounds = starts[1:]
+        return (
+            np.array([np.median(chunk) for chunk in np.split(time_arr, bounds)]),
+            np.array([np.median(chunk) for chunk in np.split(flux_arr, bounds)]),
         )
-    return filters
+    counts = np.diff(np.append(starts, len(time_arr)))
+    return np.add.reduceat(time_arr, starts) / counts, np.add.reduceat(flux_arr, starts) / counts
+
+
+def create_tess_ingestor(output_dir: Path, config: dict[str, Any]) -> TESSIngestor:
+    return TESSIngestor(source_name="tess", output_dir=output_dir, config=config)
 
 
 def _extract_column(table: Any, column: str) -> np.ndarray | None:
@@ -307,6 +448,13 @@ def _coerce_int(value: Any) -> int | None:
         return None
 
 
+def _float_or_none(value: Any) -> float | None:
+    try:
+        return float(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
 def _get_first(entry: dict[str, Any], *keys: str) -> Any:
     for key in keys:
         if key in entry and entry[key] not in (None, ""):
@@ -317,11 +465,3 @@ def _get_first(entry: dict[str, Any], *keys: str) -> Any:
                 return entry[candidate_key]
     return None
 
-
-def _build_invoke_payload(service: str, params: dict[str, Any]) -> dict[str, Any]:
-    payload: dict[str, Any] = {
-        "service": service,
-        "format": "json",
-        "params": params,
-    }
-    return payload
@@ -0,0 +1,78 @@
+"""
+Batch validation of ingestion records.
+
+Scalar fields are validated by pydantic. Float array fields that a record model
+lists in ``aligned_arrays`` are checked as NumPy arrays instead: each is converted
+once to ``float64`` (a no-op for arrays that already are) and must be
+one-dimensional, finite, and the same length as the other non-empty arrays in its
+group. Validated records keep those fields as ``ndarray``s, so long light curves
+are neither coerced element by element nor copied back into Python lists.
+"""
+
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Iterable
+
+import numpy as np
+from pydantic import BaseModel, ValidationError, create_model
+
+
+@lru_cache(maxsize=None)
+def _plan(record_model: type[BaseModel]) -> tuple[type[BaseModel], tuple[tuple[str, ...], ...]]:
+    """The model for the non-array fields, and the array groups."""
+    groups = tuple(getattr(record_model, "aligned_arrays", ()))
+    arrays = {name for group in groups for name in group}
+    if not arrays:
+        return record_model, ()
+    fields = {
+        name: (info.annotation, info)
+        for name, info in record_model.model_fields.items()
+        if name not in arrays
+    }
+    scalar_model = create_model(  # type: ignore[call-overload]
+        f"{record_model.__name__}Scalars", __config__=record_model.model_config, **fields
+    )
+    return scalar_model, groups
+
+
+def validate_records(record_model: type[BaseModel], records: Iterable[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Validate a batch of records against ``record_model``.
+
+    Raises ``ValueError`` naming the offending record's position in the batch.
+    """
+    scalar_model, groups = _plan(record_model)
+    array_names = {name for group in groups for name in group}
+    validated: list[dict[str, Any]] = []
+    for index, record in enumerate(records):
+        scalars = {k: v for k, v in record.items() if k not in array_names} if array_names else record
+        try:
+            result = scalar_model.model_validate(scalars).model_dump()
+        except ValidationError as exc:
+            raise ValueError(f"record {index}: {exc}") from exc
+        for group in groups:
+            result.update(_check_group(index, record, group))
+        validated.append(result)
+    return validated
+
+
+def _check_group(index: int, record: dict[str, Any], group: tuple[str, ...]) -> dict[str, np.ndarray]:
+    arrays: dict[str, np.ndarray] = {}
+    length = None
+    for name in group:
+        value = record.get(name)
+        try:
+            array = np.asarray(value if value is not None else (), dtype=np.float64)
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"record {index}: {name} is not a float array ({exc})") from exc
+        if array.ndim != 1:
+            raise ValueError(f"record {index}: {name} must be one-dimensional, got shape {array.shape}")
+        if len(array):
+            if length is not None and len(array) != length:
+                raise ValueError(f"record {index}: {' and '.join(group)} arrays must be the same length")
+            length = len(array)
+            if not np.isfinite(array).all():
+                raise ValueError(f"record {index}: {name} contains NaN or infinite values")
+        arrays[name] = array
+    return arrays
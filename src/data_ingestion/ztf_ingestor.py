@@ -3,115 +3,199 @@
 from __future__ import annotations
 
 import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterator
 
+import numpy as np
 import pandas as pd
+import requests
 try:
     from alerce.core import Alerce
 except ImportError:
     Alerce = None
     logging.getLogger("ztf_ingestor").warning("alerce not installed. ZTF live fetching disabled.")
 
+from ..utils.upstream_guard import install_guard
 from .base import BaseIngestor
+from .fetching import RETRY_STATUSES, RetryPolicy, call_with_retries, ordered_map, size_connection_pool
 from .schemas import ZTFRecord
 
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_CLASSES = ["SN", "AGN", "Variable", "Asteroid", "Periodic-Other"]
+# Numeric detection fields parsed as columns (candid is kept as a string)
+DETECTION_COLUMNS = ["magpsf", "sigmapsf", "mjd", "fid"]
+
+
 class ZTFIngestor(BaseIngestor):
     """Ingests alert packets and imagery metadata from ZTF via ALeRCE."""
 
     record_model = ZTFRecord
+    watermark_field = "mjd"
 
     def __init__(self, source_name: str, output_dir: Path, config: dict[str, Any]) -> None:
         super().__init__(source_name, output_dir, config)
         self.client = Alerce()
+        # Newer clients route ZTF queries through a legacy sub-client
+        self._ztf_client = getattr(self.client, "legacy_ztf_client", self.client)
+        if config.get("alerce_url"):
+            self._ztf_client.load_config_from_object({"ZTF_API_URL": config["alerce_url"]})
+        if self.guard is not None:
+            install_guard(self._ztf_client.session, self.guard)
+        self.metrics.install(self._ztf_client.session)
+        self._retry = RetryPolicy.from_config(config.get("retry"))
 
     def fetch(
         self,
         limit: int = 10,
         filters: list[str] | None = None,
         **_: Any,
-    ) -> Iterable[dict[str, Any]]:
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yield detections for up to ``limit`` objects spread across ``classes``.
+
+        Object pages for every class are queried concurrently and merged on ``oid``,
+        so an object listed under several classes is fetched once. Light curves are
+        then fetched by ``concurrency`` threads (retried with jittered backoff on
+        429/5xx and connection errors) and yielded in object order; failures are
+        counted in ``fetch_errors`` rather than dropped silently.
+        """
         logger.debug("Fetching ZTF records via ALeRCE client")
-        
-        # ALeRCE allows querying by classifier, probability, etc.
-        # For general stream ingestion, we can just query latest objects
-        # or a specific class like 'Periodic-Other' or 'Variable'. 
-        # Limits apply to objects, not rows.
-        
+        classes = list(self.config.get("classes", DEFAULT_CLASSES))
+        concurrency = int(self.config.get("concurrency", 8))
+        size_connection_pool(self._ztf_client.session, concurrency)
+
+        # Distribute limit across classes
+        per_class_limit = max(10, limit // len(classes))
+        objects = self._query_objects(classes, per_class_limit, concurrency)
+        if objects.empty:
+            logger.warning("No ZTF objects returned for classes %s", classes)
+            return
+
+        # No prefilter on ``lastmjd``: the watermark is the newest MJD of any object, so an
+        # object whose new detections are older than it would be skipped for good. Known
+        # detections are dropped per candid in ``_parse_alerce_detections`` instead.
+        fetched = 0
+        rows = objects.to_dict("records")
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="alerce") as pool:
+            for records in ordered_map(pool, self._fetch_object, ((obj,) for obj in rows), 2 * concurrency):
+                for record in records:
+                    fetched += 1
+                    yield record
+
+        logger.info(
+            "Fetched %d ZTF detection records for %d objects via ALeRCE (errors: %s)",
+            fetched, len(rows), dict(self.fetch_errors) or "none",
+        )
+
+    def record_key(self, record: dict[str, Any]) -> str | None:
+        return record.get("candidate_id") or None
+
+    def _query_objects(self, classes: list[str], per_class_limit: int, concurrency: int) -> pd.DataFrame:
+        """Objects for every class, one row per ``oid`` (first class listed wins)."""
+        page_count = math.ceil(per_class_limit / min(per_class_limit, int(self.config.get("page_size", 100))))
+        # Even pages (250 at 100 per page -> 3 x 84) keep the overshoot below one row per page
+        page_size = math.ceil(per_class_limit / page_count)
+        pages = [(cls, page) for cls in classes for page in range(1, page_count + 1)]
+        logger.info("Querying %d ZTF object pages for classes %s (limit=%d per class)", len(pages), classes, per_class_limit)
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(pages)), thread_name_prefix="alerce") as pool:
+            frames = list(pool.map(lambda args: self._query_page(*args, page_size), pages))
+        # The last page of each class is trimmed so no class exceeds its limit
+        frames = [
+            frame.head(per_class_limit - (page - 1) * page_size) if frame is not None and page == page_count else frame
+            for frame, (_, page) in zip(frames, pages)
+        ]
+
+        frames = [frame for frame in frames if frame is not None and not frame.empty]
+        if not frames:
+            return pd.DataFrame()
+        objects = pd.concat(frames, ignore_index=True)
+        unique = objects.drop_duplicates("oid", keep="first")
+        if len(unique) < len(objects):
+            logger.info("Skipping %d objects listed under more than one class", len(objects) - len(unique))
+        return unique
+
+    def _query_page(self, cls: str, page: int, page_size: int) -> pd.DataFrame | None:
         try:
-            # Step 1: Query Objects from multiple classes for diversity
-            classes_of_interest = ["SN", "AGN", "Variable", "Asteroid", "Periodic-Other"]
-            records = []
-            
-            # Distribute limit across classes
-            per_class_limit = max(10, limit // len(classes_of_interest))
-            
-            for cls in classes_of_interest:
-                logger.info(f"Querying ZTF objects for class: {cls} (limit={per_class_limit})")
-                try:
-                    # Note: class_name parameter might vary by classifier version, using generic query if possible
-                    # or iterating common ALeRCE taxonomy classes
-                    objects = self.client.query_objects(
-                        classifier="lc_classifier", 
-                        class_name=cls, 
-                        limit=per_class_limit
-                    )
-                    
-                    if objects is not None and not objects.empty:
-                        logger.info(f"Found {len(objects)} objects for class {cls}")
-                        
-                        # Step 2: For each object, get lightcurve
-                        for _, obj_row in objects.iterrows():
-                            oid = obj_row["oid"]
-                            try:
-                                lc = self.client.query_lightcurve(oid)
-                                detections = lc.get("detections", [])
-                                
-                                if detections:
-                                    for det in detections:
-                                        record = self._parse_alerce_detection(obj_row, det)
-                                        if record:
-                                            # Inject the ALeRCE class label into the record for training usage maybe?
-                                            # The current schema might not support it, but we can rely on AutoLabeler later
-                                            # or just trust the diversity of input features.
-                                            records.append(record)
-                            except Exception as e:
-                                continue
-                except Exception as e:
-                    logger.warning(f"Failed to query class {cls}: {e}")
-                    continue
-            
-            logger.info(f"Fetched {len(records)} ZTF detection records via ALeRCE")
-            return records
+            return call_with_retries(
+                lambda: self._ztf_client.query_objects(
+                    classifier="lc_classifier", class_name=cls, page=page, page_size=page_size
+                ),
+                self._retry,
+                _retryable,
+                on_retry=self.metrics.retry,
+            )
+        except Exception as e:
+            self.record_error("query_objects", f"{cls} page {page}", e)
+            return None
 
+    def _fetch_object(self, obj: dict[str, Any]) -> list[dict[str, Any]]:
+        oid = obj["oid"]
+        try:
+            lc = call_with_retries(
+                lambda: self._ztf_client.query_lightcurve(oid), self._retry, _retryable, on_retry=self.metrics.retry
+            )
         except Exception as e:
-            logger.error(f"ALeRCE API failed: {e}")
+            self.record_error("lightcurve", oid, e)
             return []
-
-    def _parse_alerce_detection(self, obj_row: pd.Series, det: dict[str, Any]) -> dict[str, Any] | None:
-        """Convert ALeRCE detection dict + object metadata to ZTFRecord."""
         try:
-            # Basic validation
-            if not det.get("magpsf"):
-                return None
-                
-            return {
-                "object_id": str(obj_row["oid"]),
-                "candidate_id": str(det.get("candid", "")),
-                "ra": float(obj_row["meanra"]),
-                "dec": float(obj_row["meandec"]),
-                "filter": "g" if det.get("fid") == 1 else "r", # 1=g, 2=r roughly
-                "mag_psf": float(det["magpsf"]),
-                "mag_err": float(det.get("sigmapsf", 0.0)),
-                "mjd": float(det["mjd"]),
-                "raw_payload": det # Store full payload if needed
-            }
+            return self._parse_alerce_detections(obj, lc.get("detections") or [])
         except Exception as e:
-            logger.debug(f"Error parsing detection: {e}")
-            return None
+            self.record_error("parse", oid, e)
+            return []
+
+    def _parse_alerce_detections(self, obj: dict[str, Any], detections: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Convert one object's ALeRCE detections to ZTFRecord dicts in a single columnar pass."""
+        if not detections:
+            return []
+        frame = pd.DataFrame.from_records(detections, columns=DETECTION_COLUMNS)
+        magpsf = pd.to_numeric(frame["magpsf"], errors="coerce")
+        mjd = pd.to_numeric(frame["mjd"], errors="coerce")
+        # Built from the dicts: a NaN in the column would turn 19-digit candids into floats
+        candid = pd.Series(["" if d.get("candid") is None else str(d["candid"]) for d in detections])
+        # Detections without a PSF magnitude (or a time) carry nothing to train on
+        keep = (magpsf.fillna(0) != 0) & mjd.notna()
+        if self.incremental:
+            known = self.ledger.seen(self.source_name, candid[keep])
+            if known:
+                keep &= ~candid.isin(known)
+        if not keep.any():
+            return []
+
+        index = np.flatnonzero(keep.to_numpy())
+        sigmapsf = pd.to_numeric(frame["sigmapsf"], errors="coerce").fillna(0.0).to_numpy()[index]
+        filters = np.where(frame["fid"].to_numpy()[index] == 1, "g", "r")  # 1=g, 2=r roughly
+        oid, ra, dec = str(obj["oid"]), float(obj["meanra"]), float(obj["meandec"])
+        keep_raw = bool(self.config.get("keep_raw_payload", False))
+        records = []
+        for i, key, band, mag, err, t in zip(
+            index, candid.to_numpy()[index], filters, magpsf.to_numpy()[index], sigmapsf, mjd.to_numpy()[index]
+        ):
+            record = {
+                "object_id": oid,
+                "candidate_id": key,
+                "ra": ra,
+                "dec": dec,
+                "filter": str(band),
+                "mag_psf": float(mag),
+                "mag_err": float(err),
+                "mjd": float(t),
+            }
+            if keep_raw:
+                record["raw_payload"] = detections[i]
+            records.append(record)
+        return records
+
+
+def _retryable(exc: Exception) -> bool:
+    """Throttling, server errors and dropped connections are worth another attempt."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    return getattr(exc, "code", None) in RETRY_STATUSES
+
 
 def create_ztf_ingestor(output_dir: Path, config: dict[str, Any]) -> ZTFIngestor:
     return ZTFIngestor(source_name="ztf", output_dir=output_dir, config=config)
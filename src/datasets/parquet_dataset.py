@@ -79,6 +79,8 @@ class ParquetEpisodeDataset(IterableDataset):
         
         logger.info("Feature columns: %s", feature_cols)
         
+        self.feature_columns = feature_cols
+
         # Fill NaNs with 0 (padding for missing features across sources)
         self.features = torch.tensor(full_df[feature_cols].fillna(0.0).values, dtype=torch.float32)
         
@@ -3,7 +3,10 @@ ALeRCE API Integration for Real Astronomical Event Classifications
 """
 from typing import List, Dict, Optional
 import logging
+import os
 import pandas as pd
+
+from src.utils.upstream_guard import UpstreamGuard, install_guard
 try:
     from alerce.core import Alerce
 except ImportError:
@@ -11,6 +14,9 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Override the ZTF API base URL (e.g. a local stand-in during load tests)
+ALERCE_API_URL = os.getenv("ALERCE_API_URL")
+
 # Map ALeRCE classes to our event types
 # ALeRCE Taxonomy: https://alerce.readthedocs.io/en/latest/taxonomy.html
 CLASS_MAPPING = {
@@ -33,9 +39,14 @@ CLASS_MAPPING = {
 }
 
 
-def fetch_alerce_predictions(limit: int = 10) -> List[Dict]:
+def fetch_alerce_predictions(
+    limit: int = 10, guard: Optional[UpstreamGuard] = None, max_wait: Optional[float] = None
+) -> List[Dict]:
     """
     Fetch real astronomical event predictions from ALeRCE API using official client.
+
+    With a ``guard``, every client request is rate limited and fails fast while
+    ALeRCE's circuit is open.
     """
     if Alerce is None:
         logger.error("ALeRCE client not installed")
@@ -43,6 +54,12 @@ def fetch_alerce_predictions(limit: int = 10) -> List[Dict]:
 
     predictions = []
     client = Alerce()
+    # Newer clients route ZTF queries through a legacy sub-client
+    ztf_client = getattr(client, "legacy_ztf_client", client)
+    if ALERCE_API_URL:
+        ztf_client.load_config_from_object({"ZTF_API_URL": ALERCE_API_URL})
+    if guard is not None:
+        install_guard(ztf_client.session, guard, max_wait)
     
     try:
         # Query objects capable of being classified
@@ -0,0 +1,232 @@
+"""
+Local model registry of immutable, versioned ProtoNet artifacts.
+
+Each version is a directory holding the weights as raw ``.npy`` files (so serving
+workers can memory-map them), the prototype matrix, the feature schema the model
+was trained on and its training metrics. A ``CURRENT`` file names the version
+being served and ``history.jsonl`` records every promotion, which is what
+``rollback`` walks back through. Versions are written to a staging directory and
+renamed into place, and ``CURRENT`` is replaced atomically, so readers never see a
+half-written version.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence
+
+import numpy as np
+import torch
+from torch import nn
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", "artifacts/models/registry"))
+CURRENT_FILE = "CURRENT"
+HISTORY_FILE = "history.jsonl"
+KEEP_VERSIONS = int(os.getenv("MODEL_REGISTRY_KEEP", "5"))
+
+
+class RegistryError(RuntimeError):
+    """Raised when a version is missing or there is nothing to roll back to."""
+
+
+@contextmanager
+def registry_lock(root: Path) -> Iterator[None]:
+    """Serialise writers (trainers, CLI, API workers) across processes."""
+    root.mkdir(parents=True, exist_ok=True)
+    with (root / ".lock").open("w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _write_text_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def _embedding_dims(state_dict: dict[str, torch.Tensor]) -> tuple[int, int]:
+    input_dim = state_dict["embedding.mlp.1.weight"].shape[1]
+    feature_dim = state_dict["embedding.mlp.3.weight"].shape[0]
+    return int(input_dim), int(feature_dim)
+
+
+def current_version(root: Path = REGISTRY_DIR) -> Optional[str]:
+    try:
+        return (root / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_meta(root: Path, version: str) -> dict[str, Any]:
+    try:
+        return json.loads((root / version / "meta.json").read_text())
+    except FileNotFoundError:
+        raise RegistryError(f"Model version '{version}' is not in the registry at {root}") from None
+
+
+def list_versions(root: Path = REGISTRY_DIR) -> list[dict[str, Any]]:
+    """Metadata for every stored version, newest first, flagging the current one."""
+    if not root.exists():
+        return []
+    current = current_version(root)
+    versions = []
+    for path in sorted((p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")), reverse=True):
+        meta = read_meta(root, path.name)
+        meta["current"] = path.name == current
+        versions.append(meta)
+    return versions
+
+
+def history(root: Path = REGISTRY_DIR) -> list[dict[str, Any]]:
+    try:
+        lines = (root / HISTORY_FILE).read_text().splitlines()
+    except FileNotFoundError:
+        return []
+    return [json.loads(line) for line in lines if line.strip()]
+
+
+def register_version(
+    root: Path,
+    state_dict: dict[str, torch.Tensor],
+    prototypes: Optional[dict[str, Sequence[float]]] = None,
+    feature_schema: Optional[Sequence[str]] = None,
+    metrics: Optional[dict[str, float]] = None,
+    source: Optional[str] = None,
+    promote: bool = True,
+) -> str:
+    """Store a new immutable version and, unless ``promote=False``, make it current."""
+    with registry_lock(root):
+        version = _write_version(root, state_dict, prototypes, feature_schema, metrics, source)
+        if promote:
+            _set_current(root, version, action="register")
+        _prune_versions(root)
+    return version
+
+
+def import_legacy(root: Path, weights_path: Path, prototypes_path: Optional[Path] = None) -> Optional[str]:
+    """Register ``final_model.pt``/``prototypes.json`` if the registry is still empty."""
+    with registry_lock(root):
+        if list_versions(root) or not weights_path.exists():
+            return None
+        state_dict = torch.load(weights_path, map_location="cpu")
+        prototypes = None
+        if prototypes_path is not None and prototypes_path.exists():
+            prototypes = json.loads(prototypes_path.read_text())
+        version = _write_version(root, state_dict, prototypes, None, None, str(weights_path))
+        _set_current(root, version, action="import")
+    return version
+
+
+def _write_version(
+    root: Path,
+    state_dict: dict[str, torch.Tensor],
+    prototypes: Optional[dict[str, Sequence[float]]],
+    feature_schema: Optional[Sequence[str]],
+    metrics: Optional[dict[str, float]],
+    source: Optional[str],
+) -> str:
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    staging = root / f".staging-{version}"
+    weights_dir = staging / "weights"
+    weights_dir.mkdir(parents=True)
+
+    for name, tensor in state_dict.items():
+        np.save(weights_dir / f"{name}.npy", tensor.detach().cpu().numpy())
+
+    class_names = list(prototypes or {})
+    if prototypes:
+        matrix = np.asarray([prototypes[name] for name in class_names], dtype=np.float32)
+        np.save(staging / "prototypes.npy", matrix)
+
+    input_dim, feature_dim = _embedding_dims(state_dict)
+    meta = {
+        "version": version,
+        "input_dim": input_dim,
+        "feature_dim": feature_dim,
+        "params": list(state_dict),
+        "classes": class_names,
+        "feature_schema": list(feature_schema) if feature_schema is not None else None,
+        "metrics": metrics or {},
+        "source": source,
+        "created_at": time.time(),
+    }
+    (staging / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    # Versions are immutable once published
+    for path in staging.rglob("*"):
+        if path.is_file():
+            path.chmod(0o444)
+    os.replace(staging, root / version)
+    logger.info("Registered model version %s in %s", version, root)
+    return version
+
+
+def _set_current(root: Path, version: str, action: str) -> None:
+    previous = current_version(root)
+    _write_text_atomic(root / CURRENT_FILE, version)
+    entry = {"version": version, "previous": previous, "action": action, "at": time.time()}
+    with (root / HISTORY_FILE).open("a") as f:
+        f.write(json.dumps(entry) + "\n")
+    logger.info("Model registry %s: %s -> %s", action, previous, version)
+
+
+def promote(root: Path, version: str) -> str:
+    """Point ``CURRENT`` at an existing version."""
+    with registry_lock(root):
+        read_meta(root, version)
+        _set_current(root, version, action="promote")
+    return version
+
+
+def rollback(root: Path = REGISTRY_DIR) -> str:
+    """Make the version that was current before the present one current again."""
+    with registry_lock(root):
+        current = current_version(root)
+        # Replay history as a stack: promotions push, rollbacks unwind to their target
+        stack: list[str] = []
+        for entry in history(root):
+            if entry["action"] == "rollback":
+                while stack and stack[-1] != entry["version"]:
+                    stack.pop()
+            else:
+                stack.append(entry["version"])
+        for candidate in reversed(stack[:-1]):
+            if candidate != current and (root / candidate).is_dir():
+                _set_current(root, candidate, action="rollback")
+                return candidate
+        raise RegistryError(f"No earlier version to roll back to from '{current}'")
+
+
+def _prune_versions(root: Path) -> None:
+    current = current_version(root)
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for stale in versions[:-KEEP_VERSIONS]:
+        if stale.name != current:
+            # Workers still mapping the files keep their pages until they unmap
+            shutil.rmtree(stale, ignore_errors=True)
+
+
+def dataset_prototypes(model: nn.Module, features: torch.Tensor, classes: torch.Tensor, label_map: dict) -> dict[str, list[float]]:
+    """Mean embedding of every class in a labelled feature matrix."""
+    prototypes = {}
+    was_training = model.training
+    model.eval()
+    with torch.no_grad():
+        embeddings = model.embedding(features)
+        for idx in torch.unique(classes):
+            prototypes[str(label_map[idx.item()])] = embeddings[classes == idx].mean(dim=0).tolist()
+    model.train(was_training)
+    return prototypes
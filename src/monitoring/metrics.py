@@ -0,0 +1,341 @@
+"""
+Lightweight in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms keep their samples in plain dicts guarded by a
+lock, so recording a sample costs a dict lookup and a ``bisect``. ``render`` produces
+the ``text/plain; version=0.0.4`` format scraped from ``/metrics``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Sequence
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> LabelValues:
+        try:
+            if len(labels) == len(self.labelnames):
+                return tuple(str(labels[name]) for name in self.labelnames)
+        except KeyError:
+            pass
+        raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+        self._functions: dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn: Callable[[], float], **labels: Any) -> None:
+        """Evaluate ``fn`` at scrape time instead of storing a value."""
+        self._functions[self._key(labels)] = fn
+
+    def value(self, **labels: Any) -> float:
+        key = self._key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        items += [(key, fn()) for key, fn in list(self._functions.items())]
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[idx] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: Any) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        bounds = self.buckets + (math.inf,)
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+REGISTRY = Registry()
+
+# --- Serving ---------------------------------------------------------------
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge("http_requests_in_flight", "HTTP requests currently being served", ("route",))
+
+# --- Inference -------------------------------------------------------------
+MODEL_FORWARD_SECONDS = REGISTRY.histogram(
+    "model_forward_seconds", "Embedding network forward-pass latency", ("endpoint",)
+)
+MODEL_BATCH_SIZE = REGISTRY.histogram(
+    "model_batch_size", "Rows per embedding forward pass", ("endpoint",), buckets=SIZE_BUCKETS
+)
+PROTOTYPE_DISTANCE_SECONDS = REGISTRY.histogram(
+    "prototype_distance_seconds", "Time spent scoring embeddings against class prototypes", ("endpoint",)
+)
+
+# --- Dependencies ----------------------------------------------------------
+UPSTREAM_REQUEST_SECONDS = REGISTRY.histogram(
+    "upstream_request_duration_seconds", "Latency of calls to external services", ("service", "outcome")
+)
+DB_QUERY_SECONDS = REGISTRY.histogram("db_query_duration_seconds", "Database statement execution time", ("operation",))
+
+# --- Caches and runtime ----------------------------------------------------
+CACHE_REQUESTS = REGISTRY.counter("cache_requests_total", "Cache lookups by outcome", ("cache", "result"))
+CACHE_HIT_RATIO = REGISTRY.gauge("cache_hit_ratio", "Fraction of cache lookups served from cache", ("cache",))
+EVENT_LOOP_LAG_SECONDS = REGISTRY.gauge("event_loop_lag_seconds", "Delay observed by the event-loop lag probe")
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup and expose the running hit ratio for ``cache``."""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    if (cache,) not in CACHE_HIT_RATIO._functions:
+
+        def ratio() -> float:
+            hits = CACHE_REQUESTS.value(cache=cache, result="hit")
+            total = hits + CACHE_REQUESTS.value(cache=cache, result="miss")
+            return hits / total if total else 0.0
+
+        CACHE_HIT_RATIO.set_function(ratio, cache=cache)
+
+
+@contextmanager
+def track_upstream(service: str) -> Iterator[None]:
+    """Time a call to an external service, labelling failures by exception."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        UPSTREAM_REQUEST_SECONDS.observe(time.perf_counter() - start, service=service, outcome=outcome)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Sleep for ``interval`` repeatedly and publish how late each wake-up was."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.set(max(0.0, loop.time() - start - interval))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+def _route_label(router: Any, method: str, path: str) -> str:
+    from starlette.routing import Match, Mount
+
+    scope = {"type": "http", "method": method, "path": path, "root_path": ""}
+    for route in router.routes:
+        match, _ = route.matches(scope)
+        if match != Match.NONE:
+            if isinstance(route, Mount):
+                return route.path or "/"
+            return getattr(route, "path", path)
+    return "<unmatched>"
+
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware recording per-route latency and in-flight requests."""
+
+    ROUTE_CACHE_SIZE = 4096
+
+    def __init__(self, app: Any) -> None:
+        self.app = app
+        # (method, path) -> route template; routes are fixed once the app is serving
+        self._routes: dict[tuple[str, str], str] = {}
+
+    def _route(self, scope: dict) -> str:
+        key = (scope["method"], scope["path"])
+        route = self._routes.get(key)
+        if route is None:
+            if len(self._routes) >= self.ROUTE_CACHE_SIZE:
+                self._routes.clear()
+            route = self._routes[key] = _route_label(scope["app"].router, *key)
+        return route
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        route = self._route(scope)
+        status_code = 500
+
+        async def send_wrapper(message: dict) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(route=route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec(route=route)
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=method, route=route, status=status_code)
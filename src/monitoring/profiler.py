@@ -0,0 +1,210 @@
+"""
+Statistical sampling profiler for the live serving process.
+
+A background thread snapshots every thread's Python stack via ``sys._current_frames``
+at a fixed interval and aggregates identical stacks. Results export as collapsed
+stacks (``flamegraph.pl``/speedscope compatible) or speedscope JSON. Overhead is one
+stack walk per thread per interval and nothing at all while no profile is running.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "artifacts/profiles"))
+DEBUG_HEADER = b"x-debug-profile"
+FORMATS = ("collapsed", "speedscope")
+
+Frame = tuple[str, str, int]  # (function, filename, first line)
+
+# Only one profile may run at a time; concurrent samplers would skew each other
+_active = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, max_depth: int = 128) -> None:
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples: Counter[tuple[Frame, ...]] = Counter()
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        if not _active.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        if self._thread is None:
+            return self
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.duration = time.perf_counter() - self.started_at
+        _active.release()
+        return self
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack: list[Frame] = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                stack.append((f"thread:{names.get(thread_id, thread_id)}", "", 0))
+                stack.reverse()
+                self.samples[tuple(stack)] += 1
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.samples.values())
+
+    def collapsed(self) -> str:
+        """Render ``root;...;leaf count`` lines, one per distinct stack."""
+        lines = []
+        for stack, count in self.samples.most_common():
+            names = [_frame_label(frame).replace(";", ":") for frame in stack]
+            lines.append(f"{';'.join(names)} {count}")
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def speedscope(self, name: str = "profile") -> dict[str, Any]:
+        """Render the profile in speedscope's file format (one sampled profile)."""
+        frame_index: dict[Frame, int] = {}
+        frames: list[dict[str, Any]] = []
+        samples: list[list[int]] = []
+        weights: list[float] = []
+        for stack, count in self.samples.most_common():
+            indices = []
+            for frame in stack:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    entry: dict[str, Any] = {"name": frame[0]}
+                    if frame[1]:
+                        entry.update(file=frame[1], line=frame[2])
+                    frames.append(entry)
+                indices.append(frame_index[frame])
+            samples.append(indices)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "cosmic-oracle-sampling-profiler",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+    def export(self, fmt: str, name: str = "profile") -> tuple[str, str]:
+        """Return ``(body, media_type)`` for ``fmt``."""
+        if fmt == "speedscope":
+            return json.dumps(self.speedscope(name)), "application/json"
+        if fmt == "collapsed":
+            return self.collapsed(), "text/plain; charset=utf-8"
+        raise ValueError(f"Unknown profile format '{fmt}', expected one of {FORMATS}")
+
+
+def _frame_label(frame: Frame) -> str:
+    function, filename, line = frame
+    if not filename:
+        return function
+    return f"{function} ({Path(filename).name}:{line})"
+
+
+def save_profile(profiler: SamplingProfiler, name: str, directory: Path = PROFILE_DIR) -> str:
+    """Persist both export formats and return the profile id."""
+    directory.mkdir(parents=True, exist_ok=True)
+    profile_id = uuid.uuid4().hex[:12]
+    (directory / f"{profile_id}.collapsed").write_text(profiler.collapsed())
+    (directory / f"{profile_id}.speedscope.json").write_text(json.dumps(profiler.speedscope(name)))
+    return profile_id
+
+
+def load_profile(profile_id: str, fmt: str, directory: Path = PROFILE_DIR) -> Optional[Path]:
+    if not profile_id.isalnum():
+        return None
+    suffix = ".speedscope.json" if fmt == "speedscope" else ".collapsed"
+    path = directory / f"{profile_id}{suffix}"
+    return path if path.exists() else None
+
+
+class RequestProfilerMiddleware:
+    """
+    Profile a single request when it carries ``X-Debug-Profile``.
+
+    ``authorize`` receives the ASGI scope and decides whether the caller may profile
+    (e.g. an admin JWT). The profile id is returned in the ``X-Profile-Id`` header and
+    the files are kept under ``PROFILE_DIR``. Samples cover every thread, so concurrent
+    requests can show up in the stacks.
+    """
+
+    def __init__(self, app: Any, authorize: Callable[[dict], bool], interval: float = 0.001) -> None:
+        self.app = app
+        self.authorize = authorize
+        self.interval = interval
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or not any(key == DEBUG_HEADER for key, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+        if not self.authorize(scope):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            profiler = SamplingProfiler(interval=self.interval).start()
+        except ProfilerBusy:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: dict) -> None:
+            if message["type"] == "http.response.start" and profiler._thread is not None:
+                profiler.stop()
+                profile_id = save_profile(profiler, f"{scope['method']} {scope['path']}")
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+                logger.info("Profiled %s %s -> %s (%d samples)", scope["method"], scope["path"], profile_id, profiler.sample_count)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
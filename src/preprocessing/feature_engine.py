@@ -0,0 +1,361 @@
+"""
+Multiprocess feature extraction from the raw data lake.
+
+One engine replaces the per-survey feature scripts. A ``FeatureExtractor``
+declares its source, the raw columns it reads, an output Arrow ``schema`` and a
+``version``, and turns a table of raw records into a table of feature rows.
+``build_features`` streams the source directory in chunks of ``chunk_rows``
+records (``storage.iter_tables``) and fans them out to a process pool, with at
+most ``2 * workers`` chunks in flight. Each worker writes its chunk as one
+``part-*.parquet`` file cast to the declared schema.
+
+The parts are staged next to the output and swapped in as
+``<output_dir>/features.parquet/`` once every chunk has been written, so
+readers (``pd.read_parquet``, ``ParquetEpisodeDataset``) never see a
+half-built table. ``_feature_manifest.json`` records the extractor, its version,
+the schema, row counts and the label distribution.
+
+Extractors are looked up by source name in ``EXTRACTORS``; new sources plug in
+with ``@register_extractor``.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import logging
+import os
+import shutil
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, ClassVar, Iterable, Iterator, Optional
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pydantic import BaseModel
+
+from src.data_ingestion.fetching import ordered_map
+from src.data_ingestion.schemas import MASTRecord, TESSRecord, ZTFRecord
+from src.data_ingestion.storage import iter_tables, table_records
+from src.preprocessing.auto_labeler import AutoLabeler
+
+logger = logging.getLogger(__name__)
+
+DATASET_NAME = "features.parquet"
+MANIFEST_FILENAME = "_feature_manifest.json"
+
+# The magnitude summary shared with the synthetic store and the API's model input
+MAGNITUDE_FIELDS = [
+    pa.field("detections", pa.float64()),
+    pa.field("mean_mag", pa.float64()),
+    pa.field("std_mag", pa.float64()),
+    pa.field("min_mag", pa.float64()),
+    pa.field("max_mag", pa.float64()),
+    pa.field("filters", pa.string()),
+]
+
+
+class FeatureExtractor:
+    """
+    Base class for per-source extractors. Subclasses set the class attributes and
+    implement ``extract_record`` (one raw record to one feature row, or ``None`` to
+    skip it) or override ``extract`` to work on a whole chunk at once.
+    """
+
+    source: ClassVar[str]
+    record_model: ClassVar[Optional[type[BaseModel]]] = None
+    version: ClassVar[str] = "1"
+    schema: ClassVar[pa.Schema]
+    # Raw columns to read; ``None`` reads every column
+    columns: ClassVar[Optional[tuple[str, ...]]] = None
+
+    def extract(self, table: pa.Table) -> tuple[pa.Table, int]:
+        """Feature rows for a chunk of raw records, and how many records were skipped or failed."""
+        rows: list[dict[str, Any]] = []
+        skipped = 0
+        for record in table_records(table):
+            try:
+                row = self.extract_record(record)
+            except Exception as exc:
+                logger.warning("Failed to extract %s features from %s: %s", self.source, record.get("record_key"), exc)
+                row = None
+            if row is None:
+                skipped += 1
+            else:
+                rows.append(row)
+        return pa.Table.from_pylist(rows, schema=self.schema), skipped
+
+    def extract_record(self, record: dict[str, Any]) -> Optional[dict[str, Any]]:
+        raise NotImplementedError
+
+
+EXTRACTORS: dict[str, type[FeatureExtractor]] = {}
+
+
+def register_extractor(cls: type[FeatureExtractor]) -> type[FeatureExtractor]:
+    EXTRACTORS[cls.source] = cls
+    return cls
+
+
+def _label(time: Any, mags: Any, mag: float, filter_band: str) -> str:
+    return AutoLabeler.classify(time, mags, metadata={"mag_psf": mag, "filter": filter_band}).label.value
+
+
+def _floats(table: pa.Table, column: str, default: float) -> np.ndarray:
+    """A numeric column as float64 with nulls as NaN, or ``default`` everywhere when it is absent."""
+    if column not in table.column_names:
+        return np.full(table.num_rows, default)
+    return table[column].to_numpy(zero_copy_only=False).astype(float)
+
+
+@register_extractor
+class ZTFExtractor(FeatureExtractor):
+    """
+    One row per detection. A single detection has no variability of its own, so
+    ``std_mag`` is a synthetic spread that grows with distance from the median
+    magnitude (17.5), which keeps the magnitude-binned classes separable.
+    """
+
+    source = "ztf"
+    record_model = ZTFRecord
+    columns = ("object_id", "mjd", "mag_psf", "filter")
+    schema = pa.schema([pa.field("object_id", pa.string()), *MAGNITUDE_FIELDS, pa.field("label", pa.string())])
+
+    def extract(self, table: pa.Table) -> tuple[pa.Table, int]:
+        mag = _floats(table, "mag_psf", np.nan)
+        mjd = _floats(table, "mjd", 0.0)
+        filters = table["filter"].to_pylist() if "filter" in table.column_names else ["unknown"] * table.num_rows
+        spread = np.abs(mag - 17.5) * 0.15
+        features = {
+            "object_id": table["object_id"],
+            "detections": np.ones(table.num_rows),
+            "mean_mag": mag,
+            "std_mag": spread,
+            "min_mag": mag - spread,
+            "max_mag": mag + spread,
+            "filters": filters,
+            "label": [_label([t], [m], m, f) for t, m, f in zip(mjd, mag, filters)],
+        }
+        return pa.table(features, schema=self.schema), 0
+
+
+@register_extractor
+class TESSExtractor(FeatureExtractor):
+    """
+    One row per light curve: the flux converted to magnitudes (non-positive samples
+    replaced by the median of the positive ones) and summarised like ZTF.
+    """
+
+    source = "tess"
+    record_model = TESSRecord
+    columns = ("record_key", "tic_id", "sector", "time", "flux")
+    schema = pa.schema(
+        [
+            pa.field("object_id", pa.string()),
+            pa.field("tic_id", pa.string()),
+            pa.field("sector", pa.int64()),
+            *MAGNITUDE_FIELDS,
+            pa.field("label", pa.string()),
+        ]
+    )
+    # Light curves with fewer positive flux samples are skipped
+    min_points: ClassVar[int] = 10
+
+    def extract_record(self, record: dict[str, Any]) -> Optional[dict[str, Any]]:
+        time = np.asarray(record.get("time") if record.get("time") is not None else [], dtype=float)
+        flux = np.asarray(record.get("flux") if record.get("flux") is not None else [], dtype=float)
+        positive = flux > 0
+        if len(time) < self.min_points or positive.sum() < self.min_points:
+            return None
+        flux = np.where(positive, flux, np.median(flux[positive]))
+        mags = -2.5 * np.log10(flux)
+        mean_mag = float(np.mean(mags))
+        return {
+            "object_id": record.get("tic_id") or record.get("record_key"),
+            "tic_id": record.get("tic_id"),
+            "sector": record.get("sector"),
+            "detections": float(len(mags)),
+            "mean_mag": mean_mag,
+            "std_mag": float(np.std(mags)),
+            "min_mag": float(np.min(mags)),
+            "max_mag": float(np.max(mags)),
+            "filters": "TESS",
+            "label": _label(time, mags, mean_mag, "TESS"),
+        }
+
+
+@register_extractor
+class MASTExtractor(FeatureExtractor):
+    """Observation metadata; MAST rows carry no light curve, so they are not labeled."""
+
+    source = "mast"
+    record_model = MASTRecord
+    columns = ("observation_id", "instrument", "target", "exposure_time", "spectral_range")
+    schema = pa.schema(
+        [
+            pa.field("object_id", pa.string()),
+            pa.field("observation_id", pa.string()),
+            pa.field("instrument", pa.string()),
+            pa.field("target", pa.string()),
+            pa.field("exposure_time", pa.float64()),
+            pa.field("wavelength_min", pa.float64()),
+            pa.field("wavelength_max", pa.float64()),
+            pa.field("wavelength_span", pa.float64()),
+        ]
+    )
+
+    def extract_record(self, record: dict[str, Any]) -> Optional[dict[str, Any]]:
+        spectral_range = record.get("spectral_range")
+        has_range = spectral_range is not None and len(spectral_range) >= 2
+        low, high = (float(spectral_range[0]), float(spectral_range[1])) if has_range else (None, None)
+        return {
+            "object_id": record.get("observation_id"),
+            "observation_id": record.get("observation_id"),
+            "instrument": record.get("instrument"),
+            "target": record.get("target"),
+            "exposure_time": float(record.get("exposure_time") or 0.0),
+            "wavelength_min": low,
+            "wavelength_max": high,
+            "wavelength_span": high - low if has_range else None,
+        }
+
+
+@dataclass(frozen=True)
+class FeatureOptions:
+    # Raw records per task; each task becomes one part file
+    chunk_rows: int = 4096
+    workers: int = field(default_factory=lambda: os.cpu_count() or 1)
+    compression: str = "zstd"
+    name: str = DATASET_NAME
+
+
+@dataclass
+class FeatureBuildResult:
+    path: Path
+    source: str
+    version: str
+    records: int = 0
+    rows: int = 0
+    skipped: int = 0
+    parts: int = 0
+    labels: Counter = field(default_factory=Counter)
+
+
+def extract_chunk(
+    source: str, chunk_idx: int, table: pa.Table, output_dir: Path, compression: str
+) -> tuple[int, int, dict[str, int]]:
+    """Extract one chunk and write it as a part; returns rows written, records skipped and label counts."""
+    extractor = EXTRACTORS[source]()
+    features, skipped = extractor.extract(table)
+    features = features.cast(extractor.schema).replace_schema_metadata(
+        {"extractor": type(extractor).__name__, "feature_version": extractor.version}
+    )
+    pq.write_table(features, output_dir / f"part-{chunk_idx:06d}.parquet", compression=compression)
+    labels = Counter(features["label"].to_pylist()) if "label" in features.column_names else Counter()
+    return features.num_rows, skipped, dict(labels)
+
+
+def build_features(
+    source: str,
+    input_dir: Path,
+    output_dir: Path,
+    options: FeatureOptions = FeatureOptions(),
+) -> FeatureBuildResult:
+    """
+    Rebuild ``<output_dir>/<options.name>`` from the raw records of ``source`` under
+    ``input_dir``, replacing the previous table (file or dataset) in one swap.
+    """
+    if source not in EXTRACTORS:
+        raise ValueError(f"No feature extractor for {source!r}; known: {', '.join(sorted(EXTRACTORS))}")
+    extractor = EXTRACTORS[source]()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    target = output_dir / options.name
+    staging = output_dir / f".{options.name}.{uuid.uuid4().hex}.tmp"
+    staging.mkdir()
+    result = FeatureBuildResult(path=target, source=source, version=extractor.version)
+
+    try:
+        chunks = iter_tables(input_dir, extractor.columns, extractor.record_model, options.chunk_rows) if input_dir.exists() else iter([])
+        tasks = ((source, idx, table, staging, options.compression) for idx, table in enumerate(_counted(chunks, result)))
+        logger.info("Extracting %s features (v%s) from %s (workers=%d)", source, extractor.version, input_dir, options.workers)
+        for rows, skipped, labels in _run(tasks, options.workers):
+            result.rows += rows
+            result.skipped += skipped
+            result.labels.update(labels)
+            result.parts += 1
+        if not result.parts:
+            logger.warning("No raw %s records under %s; writing an empty feature table", source, input_dir)
+            pq.write_table(extractor.schema.empty_table(), staging / "part-000000.parquet")
+            result.parts = 1
+        _write_manifest(staging, extractor, result)
+        _swap(staging, target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    logger.info(
+        "Wrote %d %s feature rows from %d records to %s (%d skipped, %d parts)",
+        result.rows,
+        source,
+        result.records,
+        target,
+        result.skipped,
+        result.parts,
+    )
+    if result.labels:
+        logger.info("Label distribution: %s", dict(result.labels.most_common()))
+    return result
+
+
+def _counted(chunks: Iterable[pa.Table], result: FeatureBuildResult) -> Iterator[pa.Table]:
+    for table in chunks:
+        result.records += table.num_rows
+        yield table
+
+
+def _run(tasks: Iterable[tuple[Any, ...]], workers: int) -> Iterator[tuple[int, int, dict[str, int]]]:
+    """Chunk results in order; at most ``2 * workers`` chunks are read ahead of the pool."""
+    with ProcessPoolExecutor(workers) if workers > 1 else nullcontext() as pool:
+        yield from ordered_map(pool, extract_chunk, tasks, 2 * workers)
+
+
+def _write_manifest(staging: Path, extractor: FeatureExtractor, result: FeatureBuildResult) -> None:
+    manifest = {
+        "source": result.source,
+        "extractor": type(extractor).__name__,
+        "feature_version": extractor.version,
+        "schema": [{"name": f.name, "type": str(f.type)} for f in extractor.schema],
+        "records": result.records,
+        "rows": result.rows,
+        "skipped": result.skipped,
+        "parts": result.parts,
+        "labels": dict(result.labels),
+        "built_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+    }
+    (staging / MANIFEST_FILENAME).write_text(json.dumps(manifest, indent=2))
+
+
+def _swap(staging: Path, target: Path) -> None:
+    """Put the staged dataset at ``target``; the previous table (a file or a dataset) is removed after the rename."""
+    previous = None
+    if target.exists():
+        previous = target.with_name(f".{target.name}.{uuid.uuid4().hex}.old")
+        target.rename(previous)
+    staging.rename(target)
+    if previous is not None:
+        if previous.is_dir():
+            shutil.rmtree(previous, ignore_errors=True)
+        else:
+            previous.unlink(missing_ok=True)
+
+
+def read_feature_manifest(path: Path) -> Optional[dict[str, Any]]:
+    """The manifest of a feature dataset built by ``build_features``, or ``None`` for older tables."""
+    try:
+        return json.loads((path / MANIFEST_FILENAME).read_text())
+    except (FileNotFoundError, NotADirectoryError):
+        return None
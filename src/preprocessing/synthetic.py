@@ -0,0 +1,282 @@
+"""
+Vectorized synthetic light-curve generator used to augment the few-shot feature store.
+
+Every ``EventType`` has a template that adds an event signature on top of a noisy
+baseline. Templates operate on whole batches (``[n, length]`` arrays) so millions of
+labeled curves can be produced per training run.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Sequence
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.preprocessing.auto_labeler import EventType
+
+logger = logging.getLogger(__name__)
+
+# Names used by the API's synthetic endpoints before every EventType had a template
+TEMPLATE_ALIASES = {
+    "Transit": EventType.EXOPLANET_TRANSIT,
+    "Anomaly": EventType.UNKNOWN_ANOMALY,
+    "Flare": EventType.SOLAR_FLARE,
+}
+
+FEATURE_COLUMNS = ["detections", "mean_mag", "std_mag", "min_mag", "max_mag"]
+
+Template = Callable[[np.ndarray, np.ndarray, np.random.Generator, int], np.ndarray]
+
+
+def _uniform(rng: np.random.Generator, low: float, high: float, n: int) -> np.ndarray:
+    return rng.uniform(low, high, size=(n, 1))
+
+
+def _supernova(t: np.ndarray, amp: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    # Linear rise to peak followed by a slow exponential decline
+    t0 = _uniform(rng, 0.3, 0.5, n)
+    rise = _uniform(rng, 0.05, 0.2, n)
+    decay = _uniform(rng, 0.2, 0.5, n)
+    rising = np.clip((t - (t0 - rise)) / rise, 0.0, 1.0)
+    falling = np.exp(-np.clip(t - t0, 0.0, None) / decay)
+    return amp * rising * falling
+
+
+def _gamma_ray_burst(t: np.ndarray, amp: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    # Near-instant rise with a power-law afterglow
+    t0 = _uniform(rng, 0.2, 0.6, n)
+    dt = np.clip(t - t0, 0.0, None)
+    return np.where(t >= t0, amp * (1.0 + dt / 0.01) ** -1.2, 0.0)
+
+
+def _fast_radio_burst(t: np.ndarray, amp: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    # Single-sample spike
+    idx = rng.integers(0, t.shape[-1], size=n)
+    signal = np.zeros((n, t.shape[-1]))
+    signal[np.arange(n), idx] = 3.0 * amp[:, 0]
+    return signal
+
+
+def _solar_flare(t: np.ndarray, amp: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    # Fast-rise exponential decay (FRED)
+    t0 = _uniform(rng, 0.2, 0.7, n)
+    rise = _uniform(rng, 0.005, 0.02, n)
+    decay = _uniform(rng, 0.03, 0.1, n)
+    before = np.exp((t - t0) / rise)
+    after = np.exp(-(t - t0) / decay)
+    return amp * np.where(t < t0, np.minimum(before, 1.0), after)
+
+
+def _coronal_mass_ejection(t: np.ndarray, amp: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    # Broad, gradual brightening
+    t0 = _uniform(rng, 0.3, 0.7, n)
+    width = _uniform(rng, 0.1, 0.25, n)
+    return 0.5 * amp * np.exp(-0.5 * ((t - t0) / width) ** 2)
+
+
+def _chirp(t: np.ndarray, amp: np.ndarray, tc: np.ndarray) -> np.ndarray:
+    # Rising frequency and amplitude up to coalescence at ``tc``
+    tau = np.clip(tc - t, 1e-3, None)
+    phase = -2.0 * np.pi * 6.0 * tau ** 0.625 / 0.625
+    envelope = np.where(t < tc, (tau / tc) ** -0.25, 0.0)
+    return 0.3 * amp * np.clip(envelope, 0.0, 4.0) * np.cos(phase)
+
+
+def _gravitational_wave(t: np.ndarray, amp: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    return _chirp(t, amp, _uniform(rng, 0.7, 0.95, n))
+
+
+def _black_hole_merger(t: np.ndarray, amp: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    # Chirp followed by a damped ringdown starting at the same coalescence time
+    tc = _uniform(rng, 0.5, 0.8, n)
+    chirp = _chirp(t, amp, tc)
+    ringdown = np.where(t >= tc, amp * np.exp(-(t - tc) / 0.05) * np.cos(80.0 * (t - tc)), 0.0)
+    return chirp + ringdown
+
+
+def _kilonova(t: np.ndarray, amp: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    # Fast rise and rapid fade, shorter-lived than a supernova
+    t0 = _uniform(rng, 0.2, 0.5, n)
+    rise = _uniform(rng, 0.01, 0.04, n)
+    decay = _uniform(rng, 0.04, 0.1, n)
+    rising = np.clip((t - (t0 - rise)) / rise, 0.0, 1.0)
+    falling = np.exp(-np.clip(t - t0, 0.0, None) / decay)
+    return 0.8 * amp * rising * falling
+
+
+def _exoplanet_transit(t: np.ndarray, amp: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    # Periodic box-shaped dips
+    period = _uniform(rng, 0.25, 1.2, n)
+    phase = _uniform(rng, 0.0, 1.0, n)
+    duration = _uniform(rng, 0.03, 0.12, n)
+    folded = np.mod(t / period + phase, 1.0) * period
+    return -0.3 * amp * (folded < duration)
+
+
+def _asteroid_flyby(t: np.ndarray, amp: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    # Narrow symmetric brightening as the object crosses the aperture
+    t0 = _uniform(rng, 0.1, 0.9, n)
+    width = _uniform(rng, 0.01, 0.03, n)
+    return amp * np.exp(-0.5 * ((t - t0) / width) ** 2)
+
+
+def _unknown_anomaly(t: np.ndarray, amp: np.ndarray, rng: np.random.Generator, n: int) -> np.ndarray:
+    # Random outlier spikes of either sign
+    length = t.shape[-1]
+    signal = np.zeros((n, length))
+    n_spikes = rng.integers(1, 4, size=n)
+    for spike in range(3):
+        active = n_spikes > spike
+        idx = rng.integers(0, length, size=n)
+        sign = rng.choice([-1.0, 1.0], size=n)
+        signal[np.arange(n)[active], idx[active]] += (sign * 4.0 * amp[:, 0])[active]
+    return signal
+
+
+TEMPLATES: dict[EventType, Template] = {
+    EventType.SUPERNOVA: _supernova,
+    EventType.GRB: _gamma_ray_burst,
+    EventType.FRB: _fast_radio_burst,
+    EventType.SOLAR_FLARE: _solar_flare,
+    EventType.CME: _coronal_mass_ejection,
+    EventType.GRAVITATIONAL_WAVE: _gravitational_wave,
+    EventType.BLACK_HOLE_MERGER: _black_hole_merger,
+    EventType.KILONOVA: _kilonova,
+    EventType.EXOPLANET_TRANSIT: _exoplanet_transit,
+    EventType.ASTEROID_FLYBY: _asteroid_flyby,
+    EventType.UNKNOWN_ANOMALY: _unknown_anomaly,
+}
+
+
+def resolve_event_type(event_type: EventType | str) -> EventType:
+    """Map an ``EventType``, its value, its name or a legacy alias to an ``EventType``."""
+    if isinstance(event_type, EventType):
+        return event_type
+    if event_type in TEMPLATE_ALIASES:
+        return TEMPLATE_ALIASES[event_type]
+    try:
+        return EventType(event_type)
+    except ValueError:
+        pass
+    try:
+        return EventType[str(event_type).upper()]
+    except KeyError as exc:
+        raise ValueError(f"Unknown synthetic event type '{event_type}'") from exc
+
+
+def generate_light_curves(
+    event_type: EventType | str,
+    n: int,
+    length: int = 100,
+    noise_level: float | np.ndarray = 0.5,
+    amplitude: float | np.ndarray = 5.0,
+    baseline: float = 10.0,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """Return an ``[n, length]`` flux array for ``event_type`` on a noisy baseline."""
+    rng = rng or np.random.default_rng()
+    template = TEMPLATES[resolve_event_type(event_type)]
+    t = np.linspace(0.0, 1.0, length)[None, :]
+    noise = np.broadcast_to(np.asarray(noise_level, dtype=float).reshape(-1, 1), (n, 1))
+    amp = np.broadcast_to(np.asarray(amplitude, dtype=float).reshape(-1, 1), (n, 1))
+    flux = baseline + noise * rng.standard_normal((n, length))
+    flux += template(t, amp, rng, n)
+    return flux
+
+
+def light_curve_features(flux: np.ndarray, base_mag: np.ndarray, baseline: float = 10.0) -> dict[str, np.ndarray]:
+    """Compute the 5-feature magnitude summary used by ``features.parquet`` tables."""
+    relative = np.clip(flux / baseline, 1e-3, None)
+    mags = base_mag[:, None] - 2.5 * np.log10(relative)
+    return {
+        "detections": np.full(len(flux), float(flux.shape[1])),
+        "mean_mag": mags.mean(axis=1),
+        "std_mag": mags.std(axis=1),
+        "min_mag": mags.min(axis=1),
+        "max_mag": mags.max(axis=1),
+    }
+
+
+def _slug(event_type: EventType) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", event_type.name.lower()).strip("_")
+
+
+def _write_chunk(
+    event_type: EventType,
+    chunk_idx: int,
+    n: int,
+    length: int,
+    seed: np.random.SeedSequence,
+    output_dir: Path,
+    keep_flux: bool,
+) -> int:
+    rng = np.random.default_rng(seed)
+    noise = rng.uniform(0.1, 2.0, size=n)
+    amplitude = rng.uniform(1.0, 15.0, size=n)
+    base_mag = rng.uniform(16.5, 19.0, size=n)
+    flux = generate_light_curves(event_type, n, length, noise, amplitude, rng=rng)
+
+    slug = _slug(event_type)
+    columns: dict[str, pa.Array] = {
+        "object_id": pa.array([f"SYNTH-{slug}-{chunk_idx:05d}-{i:07d}" for i in range(n)]),
+    }
+    for name, values in light_curve_features(flux, base_mag).items():
+        columns[name] = pa.array(values.astype(np.float32))
+    columns["filters"] = pa.array(["synthetic"] * n)
+    columns["label"] = pa.array([event_type.value] * n)
+    if keep_flux:
+        columns["flux"] = pa.FixedSizeListArray.from_arrays(pa.array(flux.astype(np.float32).ravel()), length)
+
+    path = output_dir / f"part-{slug}-{chunk_idx:05d}.parquet"
+    pq.write_table(pa.table(columns), path)
+    return n
+
+
+def build_synthetic_feature_store(
+    output_dir: Path,
+    per_class: int,
+    length: int = 100,
+    workers: int = 1,
+    chunk_size: int = 50_000,
+    seed: int = 42,
+    event_types: Optional[Sequence[EventType | str]] = None,
+    keep_flux: bool = False,
+) -> Path:
+    """
+    Generate ``per_class`` labeled curves for each event type into a Parquet dataset.
+
+    The dataset is written as ``<output_dir>/features.parquet/part-*.parquet`` so it can be
+    read like the other ``data/processed/*/features.parquet`` tables. Any previous parts are
+    removed first, so each call produces a fresh augmentation set.
+    """
+    selected = [resolve_event_type(e) for e in (event_types or list(EventType))]
+    dataset_dir = output_dir / "features.parquet"
+    dataset_dir.mkdir(parents=True, exist_ok=True)
+    for stale in dataset_dir.glob("part-*.parquet"):
+        stale.unlink()
+
+    tasks: list[tuple[EventType, int, int]] = []
+    for event_type in selected:
+        for chunk_idx, start in enumerate(range(0, per_class, chunk_size)):
+            tasks.append((event_type, chunk_idx, min(chunk_size, per_class - start)))
+    seeds = np.random.SeedSequence(seed).spawn(len(tasks))
+    logger.info("Generating %d synthetic curves in %d chunks (workers=%d)", per_class * len(selected), len(tasks), workers)
+
+    args: Iterable[tuple] = (
+        (event_type, chunk_idx, n, length, chunk_seed, dataset_dir, keep_flux)
+        for (event_type, chunk_idx, n), chunk_seed in zip(tasks, seeds)
+    )
+    if workers <= 1:
+        total = sum(_write_chunk(*a) for a in args)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            total = sum(pool.map(_write_chunk, *zip(*args)))
+
+    logger.info("Wrote %d synthetic feature rows to %s", total, dataset_dir)
+    return dataset_dir
@@ -2,6 +2,7 @@
 FastAPI service for Few-Shot Model Inference.
 """
 
+import asyncio
 import logging
 import sys
 import os
@@ -10,6 +11,8 @@ from pathlib import Path
 from typing import List, Dict, Any
 import json
 import subprocess
+import time
+from functools import lru_cache, partial
 
 import httpx
 from datetime import datetime, timedelta
@@ -26,11 +29,12 @@ except ImportError:
     logger.warning("Torch not found. Model features disabled.")
 
 from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 # Ensure src/ is importable
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
@@ -43,9 +47,13 @@ if "." not in sys.path:
 
 try:
     from src.models.fewshot.protonet import ProtoNet, SimpleEmbedding
+    from src.models import registry as model_registry
+    from src.serving.model_store import ModelStore, warm_up
 except ImportError:
     ProtoNet = None
     SimpleEmbedding = None
+    ModelStore = None
+    model_registry = None
 
 try:
     from src.serving.chat_agent import ChatAgent
@@ -53,29 +61,180 @@ except ImportError:
     ChatAgent = None
     logger.warning("ChatAgent module missing (groq not installed). Chat disabled.")
 
-
-# Global model variable
-model = None
-embedding = None
+from src.data_ingestion.storage import (
+    MANIFEST_FILENAME,
+    PARTITION_KEY,
+    SHARD_DIR,
+    list_parts,
+    list_shards,
+    read_random_record,
+    read_table,
+    table_records,
+)
+from src.monitoring.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    MODEL_BATCH_SIZE,
+    MODEL_FORWARD_SECONDS,
+    PROTOTYPE_DISTANCE_SECONDS,
+    PrometheusMiddleware,
+    monitor_event_loop_lag,
+    record_cache,
+    render as render_metrics,
+    track_upstream,
+)
+from src.monitoring.profiler import (
+    FORMATS as PROFILE_FORMATS,
+    ProfilerBusy,
+    RequestProfilerMiddleware,
+    SamplingProfiler,
+    load_profile,
+)
+from src.utils.upstream_guard import HostPolicy, UpstreamGuard, UpstreamUnavailable
+
+MAX_PROFILE_SECONDS = float(os.getenv("MAX_PROFILE_SECONDS", "60"))
+MODEL_REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", str(PROJECT_ROOT / "artifacts/models/registry")))
+SKY_INDEX_PATH = Path(os.getenv("SKY_INDEX_PATH", str(PROJECT_ROOT / "data/processed/sky_index.arrow")))
+SKY_CONE_MAX_RADIUS = float(os.getenv("SKY_CONE_MAX_RADIUS", "5"))  # degrees
+SKY_CONE_MAX_RESULTS = int(os.getenv("SKY_CONE_MAX_RESULTS", "1000"))
+
+# Upstream endpoints, overridable so load tests can point them at local stand-ins
+NOAA_XRAY_URL = os.getenv("NOAA_XRAY_URL", "https://services.swpc.noaa.gov/json/goes/primary/xrays-6-hour.json")
+SPACE_NEWS_URL = os.getenv("SPACE_NEWS_URL", "https://api.spaceflightnewsapi.net/v4/articles/?limit=30")
+BREVO_API_URL = os.getenv("BREVO_API_URL", "https://api.brevo.com/v3/smtp/email")
+
+# Per-host token buckets and circuit breakers, shared by every worker (and with ingestion runs)
+UPSTREAM_GUARD_DB = Path(os.getenv("UPSTREAM_GUARD_DB", str(PROJECT_ROOT / "data/cache/upstream_guard.sqlite")))
+UPSTREAM_RATE = float(os.getenv("UPSTREAM_RATE", "10"))
+UPSTREAM_BURST = float(os.getenv("UPSTREAM_BURST", "20"))
+# Requests give up rather than queue behind a throttled host for longer than this
+UPSTREAM_MAX_WAIT = float(os.getenv("UPSTREAM_MAX_WAIT", "1.0"))
+
+# Startup warm-up; /ready stays 503 until it has finished
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") != "0"
+WARMUP_BATCH_SIZES = tuple(int(b) for b in os.getenv("WARMUP_BATCH_SIZES", "1,8,32").split(",") if b.strip())
+WARMUP_ITERATIONS = int(os.getenv("WARMUP_ITERATIONS", "3"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "1"))
+WARMUP_RETRY_MAX_SECONDS = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", "60"))
+STREAM_SOURCES = ("tess", "ztf", "synthetic")
+
+
+@lru_cache(maxsize=1)
+def upstream_guard() -> UpstreamGuard:
+    return UpstreamGuard(UPSTREAM_GUARD_DB, HostPolicy(rate=UPSTREAM_RATE, burst=UPSTREAM_BURST))
+
+
+# Global model store: memory-mapped registry versions shared by every worker process
+model_store = None
 chat_agent = None
+readiness = {"ready": False, "model_version": None, "warmup_seconds": None, "checks": {}}
+
+# data/raw/<source> file listings, keyed by directory mtime (adding/removing files bumps it)
+_stream_index: Dict[str, tuple] = {}
+_recent_index: Dict[tuple, tuple] = {}
 
 
+def _stream_signature(base_path: Path) -> tuple[float, float, float]:
+    # Ingestion only adds Parquet parts to today's partition; new partitions touch the base dir,
+    # and compaction replaces the shard manifest
+    mtimes = []
+    for path in (
+        base_path / f"{PARTITION_KEY}={datetime.now().date().isoformat()}",
+        base_path / SHARD_DIR / MANIFEST_FILENAME,
+    ):
+        try:
+            mtimes.append(path.stat().st_mtime)
+        except FileNotFoundError:
+            mtimes.append(0.0)
+    return (base_path.stat().st_mtime, *mtimes)
 
 
+def _stream_files(source: str) -> List[Path]:
+    """Raw files the live feed samples from, re-listed only when the directory changes."""
+    base_path = PROJECT_ROOT / "data/raw" / source
+    try:
+        signature = _stream_signature(base_path)
+    except FileNotFoundError:
+        return []
+    cached = _stream_index.get(source)
+    hit = cached is not None and cached[0] == signature
+    record_cache("stream_index", hit)
+    if not hit:
+        files = (
+            list(base_path.glob("*.json")) + list(base_path.glob("*.ndjson")) + list_parts(base_path) + list_shards(base_path)
+        )
+        cached = _stream_index[source] = (signature, files)
+    return cached[1]
+
+
+def _recent_records(source: str, limit: int, columns: List[str], order_by: str = "mjd") -> List[Dict[str, Any]]:
+    """Newest ``limit`` raw records of a source, re-read only when its files change."""
+    _stream_files(source)
+    signature = _stream_index.get(source, (None,))[0]
+    cached = _recent_index.get((source, limit))
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    table = read_table(PROJECT_ROOT / "data/raw" / source, columns=[*columns, order_by])
+    if table.num_rows and order_by in table.column_names:
+        table = table.sort_by([(order_by, "descending")])
+    records = list(table_records(table.slice(0, limit)))
+    _recent_index[(source, limit)] = (signature, records)
+    return records
+
+
+def _warm_up() -> None:
+    """Prime the model, raw-file index and DB pool, then mark this worker ready."""
+    start = time.perf_counter()
+    checks = {}
+    step = "model"
+    try:
+        loaded = model_store.get() if model_store else None
+        if loaded is not None and WARMUP_ENABLED:
+            checks["model_seconds"] = round(warm_up(loaded, WARMUP_BATCH_SIZES, WARMUP_ITERATIONS), 4)
+        step = "stream_files"
+        checks["stream_files"] = {source: len(_stream_files(source)) for source in STREAM_SOURCES}
+        if engine is not None:
+            from sqlalchemy import text
+
+            step = "database"
+            # Open the pool's first connection so the first login doesn't pay for it
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            checks["database"] = "ok"
+    except Exception as exc:
+        checks[step] = f"failed: {exc}"
+        readiness["checks"] = checks
+        raise
+    readiness.update(
+        ready=True,
+        model_version=loaded.version if loaded else None,
+        warmup_seconds=round(time.perf_counter() - start, 4),
+        checks=checks,
+    )
+    logger.info("Warm-up finished in %.3fs: %s", readiness["warmup_seconds"], checks)
+
+
+async def _warm_up_until_ready() -> None:
+    """Run the warm-up, retrying with exponential backoff while /ready keeps answering 503."""
+    delay = WARMUP_RETRY_SECONDS
+    attempt = 1
+    while True:
+        try:
+            await run_in_threadpool(_warm_up)
+            return
+        except Exception as exc:
+            logger.error("Warm-up attempt %d failed, retrying in %.1fs: %s", attempt, delay, exc)
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, WARMUP_RETRY_MAX_SECONDS)
+        attempt += 1
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Load model on startup."""
-    global model, embedding
+    global model_store
     model_path = PROJECT_ROOT / "artifacts/models/final_model.pt"
-    
-    # Initialize model structure regardless of file existence (for structure)
-    if torch and SimpleEmbedding:
-        embedding = SimpleEmbedding(feature_dim=64)
-        model = ProtoNet(embedding=embedding)
-    
-    # Initialize Chat Agent
-    global chat_agent
+    proto_path = PROJECT_ROOT / "artifacts/models/prototypes.json"
+
     # Initialize Chat Agent
     global chat_agent
     if ChatAgent:
@@ -87,22 +246,35 @@ async def lifespan(app: FastAPI):
     else:
         chat_agent = None
 
-    if model_path.exists() and model:
-        logger.info("Loading model from %s...", model_path)
+    if ModelStore:
+        model_store = ModelStore(MODEL_REGISTRY_DIR)
         try:
-            state_dict = torch.load(model_path, map_location=torch.device('cpu'))
-            model.load_state_dict(state_dict)
-            model.eval()
-            logger.info("Model loaded successfully.")
+            await run_in_threadpool(model_store.bootstrap, model_path, proto_path)
         except Exception as e:
             logger.error("Failed to load model: %s", e)
+        if await model_store.get_async() is None:
+            logger.warning("No trained model at %s. Serving an untrained model.", model_path)
+            # Initialize model structure regardless of file existence (for structure)
+            model_store.set_fallback(ProtoNet(embedding=SimpleEmbedding(feature_dim=64)))
+        else:
+            logger.info("Model version %s loaded successfully.", (await model_store.get_async()).version)
+        if WARMUP_ENABLED:
+            # Versions promoted later are warmed before they start serving
+            model_store.on_load = partial(warm_up, batch_sizes=WARMUP_BATCH_SIZES, iterations=WARMUP_ITERATIONS)
     else:
         logger.warning("Model not found or Torch missing. Running in mock mode.")
+
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    # Warm up after startup so /health answers immediately while /ready gates traffic
+    warmup_task = asyncio.create_task(_warm_up_until_ready())
     
     yield
     
     # Cleanup
-    model = None
+    lag_monitor.cancel()
+    warmup_task.cancel()
+    readiness["ready"] = False
+    model_store = None
 
 
 # Initialize FastAPI app
@@ -113,6 +285,20 @@ async def health_check():
     """Lightweight health check for Render/UptimeRobot."""
     return {"status": "active", "uplink": "stable", "commander": "online"}
 
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until the model is loaded and the warm-up has run."""
+    if not readiness["ready"]:
+        return JSONResponse(status_code=503, content={**readiness, "status": "warming_up"})
+    return {**readiness, "status": "ready"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 # Add CORS middleware to allow requests from the dashboard
 app.add_middleware(
     CORSMiddleware,
@@ -121,6 +307,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(PrometheusMiddleware)
 
 # Mount static files
 app.mount("/src", StaticFiles(directory=PROJECT_ROOT / "src"), name="src")
@@ -155,7 +342,7 @@ try:
     from sqlalchemy.orm import Session
     from passlib.context import CryptContext
     from jose import JWTError, jwt
-    from src.serving.database import get_db, User
+    from src.serving.database import engine, get_db, User
     
     SECRET_KEY = "cosmic-secret-key-change-in-production"
     ALGORITHM = "HS256"
@@ -169,6 +356,8 @@ except ImportError:
     AUTH_ENABLED = False
     logger.warning("Auth modules (passlib, jose, sqlalchemy) missing. Auth disabled.")
     
+    engine = None
+
     # Mock Auth dependencies for endpoints
     async def get_db():
         yield None
@@ -286,7 +475,7 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
 # Helper: Send Email via Brevo (formerly Sendinblue)
 async def send_otp_email(to_email: str, otp_code: str):
     api_key = os.getenv("BREVO_API_KEY")
-    url = "https://api.brevo.com/v3/smtp/email"
+    url = BREVO_API_URL
     
     headers = {
         "api-key": api_key,
@@ -348,7 +537,8 @@ async def send_otp_email(to_email: str, otp_code: str):
     
     async with httpx.AsyncClient() as client:
         try:
-            resp = await client.post(url, headers=headers, json=data, timeout=5.0)
+            with track_upstream("brevo"):
+                resp = await client.post(url, headers=headers, json=data, timeout=5.0)
             if resp.status_code not in [200, 201, 202]:
                 print(f"Brevo Error: {resp.status_code} - {resp.text}")
                 return False
@@ -519,6 +709,113 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 
+async def require_admin(current_user: User = Depends(get_current_user)):
+    if current_user.role != "Admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin clearance required")
+    return current_user
+
+
+def _has_admin_token(scope: dict) -> bool:
+    """Check the bearer token's role claim without a DB round-trip (used by middleware)."""
+    if not AUTH_ENABLED:
+        return True
+    headers = dict(scope.get("headers", []))
+    auth = headers.get(b"authorization", b"").decode()
+    if not auth.lower().startswith("bearer "):
+        return False
+    try:
+        payload = jwt.decode(auth[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return False
+    return payload.get("role") == "Admin"
+
+
+app.add_middleware(RequestProfilerMiddleware, authorize=_has_admin_token)
+
+
+@app.get("/api/admin/profile")
+async def profile_process(
+    seconds: float = 10.0,
+    format: str = "collapsed",
+    interval_ms: float = 5.0,
+    current_user: User = Depends(require_admin),
+):
+    """Sample every thread of the live process for ``seconds`` and return the profile."""
+    if format not in PROFILE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {PROFILE_FORMATS}")
+    seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+    profiler = SamplingProfiler(interval=max(interval_ms, 1.0) / 1000.0)
+    try:
+        profiler.start()
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+
+    logger.info("Profiled process for %.1fs (%d samples) for %s", seconds, profiler.sample_count, current_user.username)
+    body, media_type = profiler.export(format, name=f"process {seconds:.0f}s")
+    extension = "json" if format == "speedscope" else "txt"
+    return Response(
+        content=body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="profile.{format}.{extension}"'},
+    )
+
+
+@app.get("/api/admin/profile/{profile_id}")
+async def get_request_profile(profile_id: str, format: str = "collapsed", current_user: User = Depends(require_admin)):
+    """Fetch a per-request profile captured via the X-Debug-Profile header."""
+    path = load_profile(profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json" if format == "speedscope" else "text/plain")
+
+
+def _require_registry():
+    if model_registry is None or model_store is None:
+        raise HTTPException(status_code=503, detail="Model registry unavailable (torch missing)")
+
+
+@app.get("/api/admin/models")
+async def list_model_versions(current_user: User = Depends(require_admin)):
+    """List registry versions with their metrics and which one this worker serves."""
+    _require_registry()
+    loaded = await model_store.get_async()
+    return {
+        "current": model_registry.current_version(MODEL_REGISTRY_DIR),
+        "serving": loaded.version if loaded else None,
+        "versions": model_registry.list_versions(MODEL_REGISTRY_DIR),
+    }
+
+
+@app.post("/api/admin/models/{version}/promote")
+async def promote_model_version(version: str, current_user: User = Depends(require_admin)):
+    """Make ``version`` current; every worker swaps to it within a few seconds."""
+    _require_registry()
+    try:
+        await run_in_threadpool(model_registry.promote, MODEL_REGISTRY_DIR, version)
+    except model_registry.RegistryError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    loaded = await run_in_threadpool(model_store.refresh, True)
+    logger.info("Model version %s promoted by %s", version, current_user.username)
+    return {"current": version, "serving": loaded.version if loaded else None}
+
+
+@app.post("/api/admin/models/rollback")
+async def rollback_model_version(current_user: User = Depends(require_admin)):
+    """Return to the previously current version."""
+    _require_registry()
+    try:
+        version = await run_in_threadpool(model_registry.rollback, MODEL_REGISTRY_DIR)
+    except model_registry.RegistryError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    loaded = await run_in_threadpool(model_store.refresh, True)
+    logger.info("Model rolled back to %s by %s", version, current_user.username)
+    return {"current": version, "serving": loaded.version if loaded else None}
+
+
 
 
 # Prediction Endpoint
@@ -537,8 +834,7 @@ async def predict_events():
     
     # 1. Select a Data Source (TESS, ZTF, or SYNTHETIC)
     # Check if synthetic data exists
-    synth_path = Path("data/raw/synthetic")
-    has_synth = synth_path.exists() and any(synth_path.glob("*.json"))
+    has_synth = bool(_stream_files("synthetic"))
     
     choices = ["tess", "ztf"]
     if has_synth:
@@ -547,19 +843,25 @@ async def predict_events():
     source = random.choice(choices)
     
     # 2. Load a Real File (Simulating the Stream)
-    base_path = Path(f"data/raw/{source}")
+    base_path = PROJECT_ROOT / "data/raw" / source
     if not base_path.exists():
          return {"event": "System Calibration", "confidence": 0.0, "timestamp": time.time(), "coordinates": {"ra": 0, "dec": 0}}
          
-    files = list(base_path.glob("*.json"))
+    files = _stream_files(source)
     if not files:
         return {"event": "Scanning Sky...", "confidence": 0.0, "timestamp": time.time(), "coordinates": {"ra": 0, "dec": 0}}
 
     selected_file = random.choice(files)
     
     try:
-        with open(selected_file, "r") as f:
-            record = json.load(f)
+        if selected_file.suffix == ".ndjson":
+            from src.serving.uploads import read_random_segment_record
+            record = read_random_segment_record(selected_file) or {}
+        elif selected_file.suffix == ".parquet":
+            record = read_random_record(selected_file) or {}
+        else:
+            with open(selected_file, "r") as f:
+                record = json.load(f)
             
         flux = np.array(record.get("flux", []))
         if len(flux) == 0:
@@ -571,14 +873,11 @@ async def predict_events():
         # 3. MLOps Inference: Load Trained Prototypes
         # If training finished, we use the Model. If not, we fallback to Heuristic Teacher.
         
-        model_path = PROJECT_ROOT / "artifacts/models/final_model.pt" # Or custom path
-        proto_path = PROJECT_ROOT / "artifacts/models/prototypes.json"
+        loaded = await model_store.get_async() if model_store else None
         
-        if proto_path.exists():
+        if loaded is not None and loaded.prototypes is not None:
             # === MODEL-BASED INFERENCE (The "Student" decides) ===
-            # === MODEL-BASED INFERENCE ===
-            with open(proto_path, "r") as f:
-                prototypes = json.load(f) # Dict[ClassName, List[float]]
+            # Prototypes are memory-mapped with the weights; no per-request file reads
             
             # Prepare Input Tensor
             # ProtoNet expects [Batch, 1, Length] if we used Conv, but here SimpleEmbedding uses [Batch, Dim]
@@ -599,20 +898,18 @@ async def predict_events():
             input_tensor = torch.tensor([features], dtype=torch.float32) # [1, 5]
             
             # Get Embedding
-            with torch.no_grad():
-                query_emb = model.embedding(input_tensor) # [1, 64]
+            MODEL_BATCH_SIZE.observe(input_tensor.shape[0], endpoint="predict_events")
+            with torch.no_grad(), MODEL_FORWARD_SECONDS.time(endpoint="predict_events"):
+                query_emb = loaded.model.embedding(input_tensor) # [1, 64]
             
-            # Compute Distances
-            dists = {}
-            for cls_name, proto_vec in prototypes.items():
-                proto_tensor = torch.tensor([proto_vec], dtype=torch.float32)
-                # Euclidean distance
-                dist = torch.dist(query_emb, proto_tensor).item()
-                dists[cls_name] = dist
+            # Compute Distances (Euclidean, all prototypes at once)
+            with PROTOTYPE_DISTANCE_SECONDS.time(endpoint="predict_events"):
+                dists = loaded.distances(query_emb)[0]
             
             # Find closest
-            best_class = min(dists, key=dists.get)
-            min_dist = dists[best_class]
+            best_idx = int(torch.argmin(dists))
+            best_class = loaded.class_names[best_idx]
+            min_dist = float(dists[best_idx])
             
             # Convert distance to confidence (heuristic: exp(-dist))
             model_confidence = np.exp(-min_dist)
@@ -718,7 +1015,7 @@ async def get_dataset_status():
 async def get_solar_flux():
     """Proxies NOAA SWPC 6-hour X-ray flux data (Real-time only)."""
     try:
-        url = "https://services.swpc.noaa.gov/json/goes/primary/xrays-6-hour.json"
+        url = NOAA_XRAY_URL
         headers = {
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
             "Accept": "application/json"
@@ -727,7 +1024,10 @@ async def get_solar_flux():
             logger.info("Fetching NOAA data from %s...", url)
             try:
                 # 10s timeout for real-world conditions
-                resp = await client.get(url, timeout=10.0, headers=headers)
+                with track_upstream("noaa"):
+                    async with upstream_guard().call(url, UPSTREAM_MAX_WAIT) as call:
+                        resp = await client.get(url, timeout=10.0, headers=headers)
+                        call.status(resp.status_code, resp.headers.get("Retry-After"))
                 
                 if resp.status_code == 200:
                     data = resp.json()
@@ -737,6 +1037,9 @@ async def get_solar_flux():
                 logger.error(f"NOAA fetch failed status: {resp.status_code}")
                 return [{"error": f"NOAA API Error {resp.status_code}"}]
                 
+            except UpstreamUnavailable as exc:
+                logger.warning("NOAA fetch skipped: %s", exc)
+                return [{"error": "NOAA temporarily unavailable"}]
             except httpx.TimeoutException:
                 logger.error("NOAA fetch timed out")
                 return [{"error": "Connection Timed Out"}]
@@ -863,6 +1166,35 @@ async def get_stars():
     return {"stars": stars}
 
 
+@app.get("/api/sky/cone")
+async def sky_cone(ra: float, dec: float, radius: float = 0.05, limit: int = 100, source: str | None = None):
+    """Ingested records within ``radius`` degrees of (``ra``, ``dec``), nearest first, from the HEALPix index."""
+    if not (0.0 <= ra < 360.0 and -90.0 <= dec <= 90.0):
+        raise HTTPException(status_code=422, detail="ra must be in [0, 360) and dec in [-90, 90] degrees")
+    if not 0.0 < radius <= SKY_CONE_MAX_RADIUS:
+        raise HTTPException(status_code=422, detail=f"radius must be in (0, {SKY_CONE_MAX_RADIUS}] degrees")
+    try:
+        # Imported here: astropy and astropy_healpix are only needed by cone searches
+        from src.data_ingestion.sky_index import open_sky_index
+    except ImportError as exc:
+        raise HTTPException(status_code=503, detail=f"Cone search unavailable: {exc}")
+    index = open_sky_index(SKY_INDEX_PATH)
+    if index is None:
+        raise HTTPException(status_code=503, detail="Sky index not built yet; run scripts/build_sky_index.py")
+    start = time.perf_counter()
+    sources = [name.strip() for name in source.split(",")] if source else None
+    matches = await run_in_threadpool(index.cone, ra, dec, radius, sources)
+    limit = max(1, min(limit, SKY_CONE_MAX_RESULTS))
+    return {
+        "ra": ra,
+        "dec": dec,
+        "radius": radius,
+        "nside": index.nside,
+        "count": matches.num_rows,
+        "results": matches.slice(0, limit).to_pylist(),
+        "query_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
 
 # In-memory cache for news
 news_cache = {
@@ -885,11 +1217,16 @@ async def get_space_news():
     CACHE_DURATION = 600  # 10 minutes
     
     # Re-fetch if cache expired or empty
-    if not news_cache["data"] or (now - news_cache["last_fetch"] > CACHE_DURATION):
-        url = "https://api.spaceflightnewsapi.net/v4/articles/?limit=30"
+    cache_fresh = bool(news_cache["data"]) and (now - news_cache["last_fetch"] <= CACHE_DURATION)
+    record_cache("news", hit=cache_fresh)
+    if not cache_fresh:
+        url = SPACE_NEWS_URL
         try:
             async with httpx.AsyncClient() as client:
-                resp = await client.get(url, timeout=5.0)
+                with track_upstream("news"):
+                    async with upstream_guard().call(url, UPSTREAM_MAX_WAIT) as call:
+                        resp = await client.get(url, timeout=5.0)
+                        call.status(resp.status_code, resp.headers.get("Retry-After"))
                 if resp.status_code == 200:
                     data = resp.json()
                     results = data.get("results", [])
@@ -951,7 +1288,10 @@ async def get_upcoming_predictions():
         import asyncio
         loop = asyncio.get_event_loop()
         # Run blocking synchronous call in a thread pool
-        alerce_preds = await loop.run_in_executor(None, lambda: fetch_alerce_predictions(limit=5))
+        with track_upstream("alerce"):
+            alerce_preds = await loop.run_in_executor(
+                None, lambda: fetch_alerce_predictions(limit=5, guard=upstream_guard(), max_wait=UPSTREAM_MAX_WAIT)
+            )
         
         if alerce_preds:
             all_predictions.extend(alerce_preds)
@@ -962,19 +1302,14 @@ async def get_upcoming_predictions():
     # === 2. PROTONET FEW-SHOT LEARNING (Your Model - Rare Events) ===
     try:
         ztf_dir = PROJECT_ROOT / "data/raw/ztf"
-        if ztf_dir.exists() and model:
-            proto_path = PROJECT_ROOT / "artifacts/models/prototypes.json"
-            
-            if proto_path.exists():
-                with open(proto_path, "r") as pf:
-                    prototypes = json.load(pf)
-                
-                files_sorted = sorted(ztf_dir.glob("record_*.json"), reverse=True)[:5]
+        loaded = await model_store.get_async() if model_store else None
+        if ztf_dir.exists() and loaded is not None:
+            if loaded.prototypes is not None:
+                recent = _recent_records("ztf", 5, ["object_id", "mag_psf", "ra", "dec"])
                 
-                for idx, f in enumerate(files_sorted):
+                for idx, data in enumerate(recent):
                     try:
-                        data = json.loads(f.read_text())
-                        mag = data.get("mag_psf", 20)
+                        mag = data.get("mag_psf") or 20
                         obj_id = data.get("object_id", "Unknown")
                         mjd = data.get("mjd", 0)
                         
@@ -984,15 +1319,13 @@ async def get_upcoming_predictions():
                         
                         # ProtoNet inference
                         input_tensor = torch.tensor([features], dtype=torch.float32)
-                        with torch.no_grad():
-                            query_emb = model.embedding(input_tensor)
+                        MODEL_BATCH_SIZE.observe(input_tensor.shape[0], endpoint="upcoming")
+                        with torch.no_grad(), MODEL_FORWARD_SECONDS.time(endpoint="upcoming"):
+                            query_emb = loaded.model.embedding(input_tensor)
                         
                         # Compute distances to prototypes
-                        dists = {}
-                        for cls_name, proto_vec in prototypes.items():
-                            proto_tensor = torch.tensor([proto_vec], dtype=torch.float32)
-                            dist = torch.dist(query_emb, proto_tensor).item()
-                            dists[cls_name] = dist
+                        with PROTOTYPE_DISTANCE_SECONDS.time(endpoint="upcoming"):
+                            dists = dict(zip(loaded.class_names, loaded.distances(query_emb)[0].tolist()))
                         
                         # --- DIVERSITY RERANKING ---
                         # Get top 3 predictions for this object
@@ -1101,20 +1434,15 @@ def _create_synthetic_file(event_type: str, noise_level: float = 0.5, amplitude:
     import numpy as np
     import tempfile
     import os
+    from src.preprocessing.synthetic import generate_light_curves
     
-    # Determine flux shape based on event type
+    # Determine flux shape based on event type (shared with the training-set generator)
     length = 100
-    flux = np.random.normal(10, noise_level, length)
-    
-    if event_type == "Supernova":
-        # Add a surge
-        flux[50:] += np.linspace(0, amplitude, 50)
-    elif event_type == "Transit":
-        # Add a dip
-        flux[40:60] -= amplitude
-    elif event_type == "Anomaly":
-            # Random noise spike
-            flux[random.randint(20, 80)] = 50.0
+    try:
+        flux = generate_light_curves(event_type, 1, length, noise_level=noise_level, amplitude=amplitude)[0]
+    except ValueError:
+        # Unrecognised types keep the plain noisy baseline
+        flux = np.random.normal(10, noise_level, length)
             
     # Create a temporary file for download
     temp_dir = PROJECT_ROOT / "data/temp"
@@ -1127,6 +1455,8 @@ def _create_synthetic_file(event_type: str, noise_level: float = 0.5, amplitude:
         "object_id": f"SYNTH-{str(time.time())[-5:]}",
         "ra": random.uniform(0, 360),
         "dec": random.uniform(-90, 90),
+        "mjd": time.time() / 86400.0 + 40587.0,
+        "filter": "synthetic",
         "time": time.time(),
         "event_type": event_type,
         "data_source": "SYNTHETIC",
@@ -1186,15 +1516,16 @@ RULES:
 - High amplitude: massive, strong, huge. Low amplitude: faint, weak.
 Respond ONLY with the JSON object."""
         
-        response = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": request.prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-            max_tokens=150,
-            temperature=0.3
-        )
+        with track_upstream("groq"):
+            response = client.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": request.prompt}
+                ],
+                model="llama-3.3-70b-versatile",
+                max_tokens=150,
+                temperature=0.3
+            )
         
         text = response.choices[0].message.content.strip()
         
@@ -1254,26 +1585,42 @@ async def _generate_heuristic_fallback(request: SyntheticAIRequest):
 
 
 @app.post("/api/synthetic/upload")
-async def upload_synthetic_data(file: UploadFile = File(...)):
-    """Upload a synthetic data file to inject it into the live stream."""
+async def upload_synthetic_data(file: UploadFile = File(...), record_type: str = "auto"):
+    """
+    Bulk-inject records into the live stream.
+
+    Accepts NDJSON, Parquet or a single JSON document. Records are validated against
+    ``ZTFRecord``/``TESSRecord`` (``record_type=auto|ztf|tess``) and accepted ones are
+    appended to an indexed segment under ``data/raw/synthetic``.
+    """
+    from src.serving.uploads import MAX_UPLOAD_BYTES, UploadTooLarge, ingest_upload
+
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes")
+
+    data_dir = PROJECT_ROOT / "data/raw/synthetic"
     try:
-        data_dir = PROJECT_ROOT / "data/raw/synthetic"
-        data_dir.mkdir(parents=True, exist_ok=True)
-        
-        file_path = data_dir / file.filename
-        
-        # Write the uploaded file
-        with open(file_path, "wb") as buffer:
-            import shutil
-            shutil.copyfileobj(file.file, buffer)
-            
-        logger.info(f"Uploaded synthetic file: {file_path}")
-        return {"status": "success", "file": str(file_path)}
-        
+        report = await run_in_threadpool(
+            ingest_upload, file.file, file.filename or "upload.json", data_dir, record_type
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Failed to upload synthetic data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    content = {
+        "status": "success" if report.accepted else "rejected",
+        "file": str(report.path) if report.path else None,
+        "accepted": report.accepted,
+        "rejected": report.rejected,
+        "errors": report.errors,
+    }
+    logger.info(f"Uploaded synthetic records: accepted={report.accepted} rejected={report.rejected}")
+    return JSONResponse(status_code=200 if report.accepted else 422, content=content)
+
 
 
 @app.post("/api/chat")
@@ -1287,13 +1634,15 @@ async def chat_with_avatar(request: ChatRequest):
 @app.post("/predict", response_model=EmbeddingResponse)
 async def predict(request: PredictionRequest):
     """Model prediction endpoint."""
-    if model is None or torch is None:
+    loaded = await model_store.get_async() if model_store else None
+    if loaded is None or torch is None:
         raise HTTPException(status_code=503, detail="Model not loaded or torch missing")
     
     try:
         input_tensor = torch.tensor(request.features, dtype=torch.float32).unsqueeze(0)  # [1, dim]
-        with torch.no_grad():
-            embedding_vector = model.embedding(input_tensor)
+        MODEL_BATCH_SIZE.observe(input_tensor.shape[0], endpoint="predict")
+        with torch.no_grad(), MODEL_FORWARD_SECONDS.time(endpoint="predict"):
+            embedding_vector = loaded.model.embedding(input_tensor)
         return EmbeddingResponse(embedding=embedding_vector.squeeze(0).tolist())
     except Exception as e:
         logger.error("Prediction failed: %s", e)
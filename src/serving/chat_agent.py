@@ -9,6 +9,9 @@ from typing import Dict, Any, List
 from pathlib import Path
 import json
 
+from src.data_ingestion.storage import count_records
+from src.monitoring.metrics import track_upstream
+
 # Ensure src/ is importable
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
 
@@ -51,7 +54,7 @@ class ChatAgent:
         # 2. Live Data Status
         # We'll read the directory structure directly as a fast check
         data_dir = PROJECT_ROOT / "data/raw"
-        ztf_count = len(list((data_dir / "ztf").glob("*.json"))) if (data_dir / "ztf").exists() else 0
+        ztf_count = count_records(data_dir / "ztf") if (data_dir / "ztf").exists() else 0
         
         context.append(f"LIVE TELEMETRY:\n- ZTF Alerts Collected: {ztf_count}")
         
@@ -101,15 +104,16 @@ class ChatAgent:
             system_prompt = self._build_system_prompt(context)
             
             # 3. Call API
-            response = self.client.chat.completions.create(
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_query}
-                ],
-                model=self.model_name,
-                max_tokens=256,
-                temperature=0.7
-            )
+            with track_upstream("groq"):
+                response = self.client.chat.completions.create(
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_query}
+                    ],
+                    model=self.model_name,
+                    max_tokens=256,
+                    temperature=0.7
+                )
             return response.choices[0].message.content
             
         except Exception as e:
@@ -1,9 +1,12 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean
+from sqlalchemy import create_engine, event, Column, Integer, String, DateTime, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 
 import os
+import time
+
+from src.monitoring.metrics import DB_QUERY_SECONDS
 
 # Database Configuration
 # Use DATABASE_URL for PostgreSQL (Render/Prod), otherwise fallback to SQLite
@@ -23,6 +26,27 @@ else:
         SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
     )
 
+@event.listens_for(engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "UNKNOWN"
+    DB_QUERY_SECONDS.observe(elapsed, operation=operation)
+
+
+@event.listens_for(engine, "handle_error")
+def _discard_query_timer(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time so pooled
+    # connections don't accumulate entries and later statements pop the right one
+    starts = context.connection.info.get("query_start_time") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
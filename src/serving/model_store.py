@@ -0,0 +1,152 @@
+"""
+Memory-mapped model artifacts shared by every serving worker.
+
+Versions live in the model registry (``src.models.registry``) as raw ``.npy``
+files. Each uvicorn worker maps them read-only, so the pages live once in the OS
+page cache no matter how many workers run. Workers poll the registry's ``CURRENT``
+pointer (a cheap ``stat``) and swap to a newly promoted or rolled-back version
+without restarting; requests already running keep the version they started with.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+import numpy as np
+import torch
+
+from src.models.fewshot.protonet import ProtoNet, SimpleEmbedding
+from src.models.registry import CURRENT_FILE, current_version, import_legacy, read_meta
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    version: str
+    model: ProtoNet
+    class_names: tuple[str, ...]
+    prototypes: Optional[torch.Tensor]  # [classes, feature_dim], read-only mapping
+    feature_schema: Optional[tuple[str, ...]] = None
+
+    def distances(self, embeddings: torch.Tensor) -> torch.Tensor:
+        """Euclidean distance from each embedding to every prototype, ``[batch, classes]``."""
+        return torch.cdist(embeddings, self.prototypes)
+
+
+def load_version(root: Path, version: str) -> LoadedModel:
+    """Map a version's weights and prototypes read-only and build the model around them."""
+    version_dir = root / version
+    meta = read_meta(root, version)
+
+    with warnings.catch_warnings():
+        # torch warns that the mapped arrays are not writable; inference never writes them
+        warnings.simplefilter("ignore", UserWarning)
+        state = {
+            name: torch.from_numpy(np.load(version_dir / "weights" / f"{name}.npy", mmap_mode="r"))
+            for name in meta["params"]
+        }
+        prototypes = None
+        if (version_dir / "prototypes.npy").exists():
+            prototypes = torch.from_numpy(np.load(version_dir / "prototypes.npy", mmap_mode="r"))
+
+    model = ProtoNet(embedding=SimpleEmbedding(input_dim=meta["input_dim"], feature_dim=meta["feature_dim"]))
+    model.load_state_dict(state, assign=True)
+    model.eval()
+    schema = meta.get("feature_schema")
+    return LoadedModel(version, model, tuple(meta["classes"]), prototypes, tuple(schema) if schema else None)
+
+
+def warm_up(loaded: LoadedModel, batch_sizes: Sequence[int] = (1, 8, 32), iterations: int = 2) -> float:
+    """
+    Run synthetic forward passes so first requests don't pay for lazy initialisation.
+
+    Faults in the mapped weight and prototype pages and lets torch pick kernels and
+    size its allocator for each batch size. Returns the elapsed seconds.
+    """
+    start = time.perf_counter()
+    input_dim = loaded.model.embedding.mlp[1].in_features
+    with torch.no_grad():
+        for tensor in loaded.model.state_dict().values():
+            tensor.sum()
+        for batch in batch_sizes:
+            inputs = torch.randn(batch, input_dim)
+            for _ in range(iterations):
+                embeddings = loaded.model.embedding(inputs)
+                if loaded.prototypes is not None:
+                    loaded.distances(embeddings)
+    return time.perf_counter() - start
+
+
+class ModelStore:
+    """Per-worker handle on the registry, reloading when ``CURRENT`` changes."""
+
+    def __init__(
+        self,
+        root: Path,
+        check_interval: float = 2.0,
+        on_load: Optional[Callable[[LoadedModel], object]] = None,
+    ) -> None:
+        self.root = root
+        self.check_interval = check_interval
+        # Runs on a newly loaded version before it starts serving (e.g. ``warm_up``)
+        self.on_load = on_load
+        self._current: Optional[LoadedModel] = None
+        self._pointer_mtime = 0.0
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def bootstrap(self, weights_path: Path, prototypes_path: Path) -> None:
+        """Import a legacy ``final_model.pt``/``prototypes.json`` into an empty registry, then load."""
+        # The first worker to take the registry lock imports; the rest find it populated
+        import_legacy(self.root, weights_path, prototypes_path)
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False) -> Optional[LoadedModel]:
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return self._current
+        with self._lock:
+            self._next_check = now + self.check_interval
+            try:
+                mtime = (self.root / CURRENT_FILE).stat().st_mtime
+            except FileNotFoundError:
+                return self._current
+            if not force and mtime == self._pointer_mtime:
+                return self._current
+            version = current_version(self.root)
+            if version and (self._current is None or self._current.version != version):
+                try:
+                    loaded = load_version(self.root, version)
+                    if self.on_load is not None:
+                        self.on_load(loaded)
+                except Exception as e:
+                    logger.error("Failed to load model version %s: %s", version, e)
+                    return self._current
+                # Single reference assignment: in-flight requests keep the snapshot they took
+                self._current = loaded
+                logger.info("Serving model version %s", version)
+            self._pointer_mtime = mtime
+        return self._current
+
+    def get(self) -> Optional[LoadedModel]:
+        return self.refresh()
+
+    async def get_async(self) -> Optional[LoadedModel]:
+        """``get`` for async handlers: a due registry check, and any load and warm-up, run in a thread."""
+        if time.monotonic() < self._next_check:
+            return self._current
+        return await asyncio.to_thread(self.refresh)
+
+    def set_fallback(self, model: ProtoNet) -> None:
+        """Serve an untrained model until a real version is registered."""
+        if self._current is None:
+            model.eval()
+            self._current = LoadedModel("untrained", model, (), None)
@@ -0,0 +1,236 @@
+"""
+Streaming bulk ingestion of uploaded records into the live synthetic stream.
+
+Uploads are parsed record by record (NDJSON, Parquet or a single JSON document),
+validated in batches against the ingestion schemas and appended to an NDJSON segment
+under ``data/raw/synthetic`` together with a byte-offset index so the stream can pick
+random records without loading the segment.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import re
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Iterator, Optional
+
+import numpy as np
+from pydantic import BaseModel, ValidationError
+
+from src.data_ingestion.schemas import TESSRecord, ZTFRecord
+
+logger = logging.getLogger(__name__)
+
+MAX_UPLOAD_BYTES = int(os.getenv("SYNTHETIC_UPLOAD_MAX_BYTES", str(512 * 1024 * 1024)))
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+INDEX_DTYPE = np.dtype("<i8")
+
+RECORD_MODELS: dict[str, type[BaseModel]] = {
+    "ztf": ZTFRecord,
+    "tess": TESSRecord,
+}
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds ``MAX_UPLOAD_BYTES``."""
+
+
+@dataclass
+class UploadReport:
+    path: Optional[Path] = None
+    accepted: int = 0
+    rejected: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+
+    def reject(self, position: int, reason: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"record": position, "error": reason})
+
+
+def detect_format(filename: str) -> str:
+    suffix = Path(filename).suffix.lower()
+    if suffix in {".ndjson", ".jsonl"}:
+        return "ndjson"
+    if suffix in {".parquet", ".pq"}:
+        return "parquet"
+    return "json"
+
+
+def iter_upload_records(fileobj: IO[bytes], fmt: str, max_bytes: int = MAX_UPLOAD_BYTES) -> Iterator[Any]:
+    """Yield raw records from ``fileobj``; malformed entries are yielded as exceptions."""
+    if fmt == "ndjson":
+        consumed = 0
+        while True:
+            # A single newline-free line is never buffered past the remaining cap
+            line = fileobj.readline(max_bytes - consumed + 1)
+            if not line:
+                break
+            consumed += len(line)
+            if consumed > max_bytes:
+                raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as exc:  # JSONDecodeError and UnicodeDecodeError
+                yield exc
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(_CappedReader(fileobj, max_bytes))
+        for batch in parquet_file.iter_batches(batch_size=BATCH_SIZE):
+            yield from batch.to_pylist()
+    else:
+        payload = fileobj.read(max_bytes + 1)
+        if len(payload) > max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+        try:
+            document = json.loads(payload)
+        except ValueError as exc:
+            yield exc
+            return
+        if isinstance(document, list):
+            yield from document
+        else:
+            yield document
+
+
+class _CappedReader:
+    """Seekable reader that raises ``UploadTooLarge`` once more than ``max_bytes`` have been read."""
+
+    def __init__(self, fileobj: IO[bytes], max_bytes: int) -> None:
+        self._fileobj = fileobj
+        self._max_bytes = max_bytes
+        self._consumed = 0
+        self.closed = False
+
+    def read(self, size: int = -1) -> bytes:
+        # An unbounded read is capped so the whole upload is never pulled into memory
+        limit = self._max_bytes - self._consumed + 1
+        data = self._fileobj.read(limit if size is None or size < 0 else min(size, limit))
+        self._consumed += len(data)
+        if self._consumed > self._max_bytes:
+            raise UploadTooLarge(f"Upload exceeds {self._max_bytes} bytes")
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._fileobj.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._fileobj.tell()
+
+    def seekable(self) -> bool:
+        return True
+
+    def readable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def _model_for(record: dict[str, Any], record_type: str) -> type[BaseModel]:
+    if record_type == "auto":
+        return TESSRecord if "tic_id" in record else ZTFRecord
+    return RECORD_MODELS[record_type]
+
+
+class SegmentWriter:
+    """Appends validated records to an NDJSON segment and its offset index."""
+
+    def __init__(self, directory: Path, stem: str) -> None:
+        directory.mkdir(parents=True, exist_ok=True)
+        safe_stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", stem)[:64] or "upload"
+        self.path = directory / f"bulk_{safe_stem}_{uuid.uuid4().hex[:8]}.ndjson"
+        self.index_path = self.path.with_suffix(".idx")
+        self._data = self.path.open("ab")
+        self._index = self.index_path.open("ab")
+        self._offset = self._data.tell()
+
+    def append(self, records: list[dict[str, Any]]) -> None:
+        offsets = np.empty(len(records), dtype=INDEX_DTYPE)
+        chunks = []
+        for idx, record in enumerate(records):
+            line = (json.dumps(record) + "\n").encode()
+            offsets[idx] = self._offset
+            self._offset += len(line)
+            chunks.append(line)
+        self._data.write(b"".join(chunks))
+        self._data.flush()
+        self._index.write(offsets.tobytes())
+        self._index.flush()
+
+    def close(self) -> None:
+        self._data.close()
+        self._index.close()
+
+
+def ingest_upload(
+    fileobj: IO[bytes],
+    filename: str,
+    directory: Path,
+    record_type: str = "auto",
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> UploadReport:
+    """Validate every record in the upload and append the accepted ones to a new segment."""
+    if record_type != "auto" and record_type not in RECORD_MODELS:
+        raise ValueError(f"Unsupported record type '{record_type}'")
+
+    report = UploadReport()
+    writer = SegmentWriter(directory, Path(filename).stem)
+    batch: list[dict[str, Any]] = []
+
+    def flush() -> None:
+        if batch:
+            writer.append(batch)
+            report.accepted += len(batch)
+            batch.clear()
+
+    try:
+        for position, raw in enumerate(iter_upload_records(fileobj, detect_format(filename), max_bytes)):
+            if isinstance(raw, Exception):
+                report.reject(position, f"Malformed record: {raw}")
+                continue
+            if not isinstance(raw, dict):
+                report.reject(position, "Record is not an object")
+                continue
+            try:
+                batch.append(_model_for(raw, record_type).model_validate(raw).model_dump())
+            except ValidationError as exc:
+                report.reject(position, str(exc.errors()[0].get("msg", exc)))
+                continue
+            if len(batch) >= BATCH_SIZE:
+                flush()
+        flush()
+    except BaseException:
+        report.accepted = 0
+        raise
+    finally:
+        writer.close()
+        if report.accepted:
+            report.path = writer.path
+        else:
+            writer.path.unlink(missing_ok=True)
+            writer.index_path.unlink(missing_ok=True)
+
+    logger.info("Ingested upload %s: accepted=%d rejected=%d", filename, report.accepted, report.rejected)
+    return report
+
+
+def read_random_segment_record(path: Path) -> Optional[dict[str, Any]]:
+    """Return a random record from an NDJSON segment using its offset index."""
+    index_path = path.with_suffix(".idx")
+    if not index_path.exists() or index_path.stat().st_size == 0:
+        return None
+    offsets = np.memmap(index_path, dtype=INDEX_DTYPE, mode="r")
+    offset = int(offsets[random.randrange(len(offsets))])
+    with path.open("rb") as f:
+        f.seek(offset)
+        return json.loads(f.readline())
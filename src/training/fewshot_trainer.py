@@ -18,6 +18,7 @@ import mlflow
 
 from src.datasets import EpisodeDataset
 from src.models.fewshot.protonet import Episode, ProtoNet, episode_loss
+from src.models.registry import dataset_prototypes, register_version
 
 
 @dataclass
@@ -28,6 +29,8 @@ class TrainerConfig:
     log_every: int = 10
     mlflow_experiment: str = "FewShotPrototype"
     tracking_uri: Optional[str] = "file:./mlruns"
+    registry_dir: Optional[Path] = None  # register each finished run as a model version
+    promote: bool = True
 
 
 class FewShotTrainer:
@@ -90,7 +93,7 @@ class FewShotTrainer:
                 )
                 time.sleep(1.0) # Artificial delay to make progress visible in UI
                 
-            self._save_checkpoint()
+            self._save_checkpoint(metrics={"training_accuracy": accuracy, "loss": loss})
             self._update_status("completed", progress=100, metrics={"training_accuracy": accuracy, "loss": loss})
         
         if self.use_mlflow:
@@ -111,13 +114,33 @@ class FewShotTrainer:
     def _iter_episodes(self) -> Iterable:
         yield from self.dataset
 
-    def _save_checkpoint(self) -> None:
+    def _save_checkpoint(self, metrics: dict | None = None) -> None:
         checkpoint_dir = Path("artifacts/models")
         checkpoint_dir.mkdir(parents=True, exist_ok=True)
         path = checkpoint_dir / "fewshot_protonet.pt"
         torch.save(self.model.state_dict(), path)
         if self.use_mlflow:
             mlflow.log_artifact(str(path), artifact_path="checkpoints")
+        if self.config.registry_dir is not None:
+            self.register(metrics)
+
+    def register(self, metrics: dict | None = None) -> str:
+        """Publish the current weights, class prototypes and feature schema to the model registry."""
+        prototypes = None
+        if all(hasattr(self.dataset, attr) for attr in ("features", "classes", "label_map")):
+            prototypes = dataset_prototypes(self.model, self.dataset.features, self.dataset.classes, self.dataset.label_map)
+        version = register_version(
+            Path(self.config.registry_dir),
+            self.model.state_dict(),
+            prototypes=prototypes,
+            feature_schema=getattr(self.dataset, "feature_columns", None),
+            metrics=metrics,
+            source="fewshot_trainer",
+            promote=self.config.promote,
+        )
+        if self.use_mlflow:
+            mlflow.set_tag("model_version", version)
+        return version
 
     def evaluate(self, episodes: int = 20) -> dict[str, float]:
         self.model.eval()
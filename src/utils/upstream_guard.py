@@ -0,0 +1,363 @@
+"""
+Per-host rate limiting and circuit breaking for third-party archives.
+
+Every call to an upstream host first takes a token from that host's bucket
+(``rate`` requests per second, up to ``burst`` at once) and then reports how it
+went. ``failure_threshold`` consecutive failures (connection errors, timeouts,
+5xx) open the host's circuit: callers fail fast with ``CircuitOpenError`` for
+``reset_seconds``, after which a single probe request is let through
+(half-open). A successful probe closes the circuit again, a failed one re-opens
+it. A ``429`` halves the host's rate and honours ``Retry-After``; successes
+raise the rate back towards the configured one (additive increase,
+multiplicative decrease).
+
+State lives in a small SQLite database, so ingestion worker processes, their
+download threads and the API share one view of each host.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GUARD_PATH = Path("data/cache/upstream_guard.sqlite")
+FAILURE_STATUSES = frozenset({500, 502, 503, 504})
+THROTTLE_STATUS = 429
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    host TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    rate REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    blocked_until REAL NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'closed',
+    failures INTEGER NOT NULL DEFAULT 0,
+    opened_at REAL,
+    probe_at REAL
+);
+"""
+
+
+class UpstreamUnavailable(RuntimeError):
+    """The guard refused a call; ``retry_in`` is the earliest sensible retry, in seconds."""
+
+    def __init__(self, host: str, retry_in: float, reason: str) -> None:
+        super().__init__(f"{host} {reason} (retry in {retry_in:.1f}s)")
+        self.host = host
+        self.retry_in = retry_in
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """The host's circuit is open (or its half-open probe is still in flight)."""
+
+
+class RateLimitExceeded(UpstreamUnavailable):
+    """Waiting for a token would take longer than the caller allows."""
+
+
+@dataclass(frozen=True)
+class HostPolicy:
+    """Token-bucket settings for one host; ``min_rate`` bounds how far 429s can push it down."""
+
+    rate: float = 10.0
+    burst: float = 20.0
+    min_rate: float = 0.2
+
+    @classmethod
+    def from_config(cls, config: Optional[dict[str, Any]], default: Optional["HostPolicy"] = None) -> "HostPolicy":
+        config = config or {}
+        default = default or cls()
+        return cls(
+            rate=float(config.get("rate", default.rate)),
+            burst=float(config.get("burst", default.burst)),
+            min_rate=float(config.get("min_rate", default.min_rate)),
+        )
+
+
+class UpstreamGuard:
+    """Token buckets and circuit breakers for every host, backed by the SQLite file at ``path``."""
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_GUARD_PATH,
+        default: HostPolicy = HostPolicy(),
+        hosts: Optional[dict[str, HostPolicy]] = None,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+    ) -> None:
+        self.path = path
+        self.default = default
+        # Keyed by host, with or without the port, e.g. {"mast.stsci.edu": HostPolicy(rate=5)}
+        self.hosts = hosts or {}
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Explicit transactions (BEGIN IMMEDIATE) serialise updates across processes
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: Optional[dict[str, Any]]) -> "UpstreamGuard":
+        config = config or {}
+        default = HostPolicy.from_config(config)
+        return cls(
+            path=Path(config.get("path", DEFAULT_GUARD_PATH)),
+            default=default,
+            hosts={host: HostPolicy.from_config(cfg, default) for host, cfg in (config.get("hosts") or {}).items()},
+            failure_threshold=int(config.get("failure_threshold", 5)),
+            reset_seconds=float(config.get("reset_seconds", 30.0)),
+        )
+
+    def policy(self, host: str) -> HostPolicy:
+        return self.hosts.get(host) or self.hosts.get(host.rpartition(":")[0]) or self.default
+
+    # ------------------------------------------------------------------
+    # Acquiring
+    # ------------------------------------------------------------------
+
+    def acquire(self, target: str, max_wait: Optional[float] = None) -> None:
+        """Block until ``target`` (a URL or host) may be called; raises ``UpstreamUnavailable``."""
+        host = _host(target)
+        waited = 0.0
+        while True:
+            wait = self._take(host)
+            if wait <= 0:
+                return
+            if max_wait is not None and waited + wait > max_wait:
+                raise RateLimitExceeded(host, wait, "is rate limited")
+            time.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, target: str, max_wait: Optional[float] = None) -> None:
+        """``acquire`` for the event loop: the SQLite update runs in a thread and waits use ``asyncio.sleep``."""
+        host = _host(target)
+        waited = 0.0
+        while True:
+            wait = await asyncio.to_thread(self._take, host)
+            if wait <= 0:
+                return
+            if max_wait is not None and waited + wait > max_wait:
+                raise RateLimitExceeded(host, wait, "is rate limited")
+            await asyncio.sleep(wait)
+            waited += wait
+
+    def call(self, target: str, max_wait: Optional[float] = None) -> "GuardedCall":
+        """Context manager (sync or async) that acquires on entry and records the outcome on exit."""
+        return GuardedCall(self, _host(target), max_wait)
+
+    def _take(self, host: str) -> float:
+        """Take a token if one is free (returns 0), else the seconds until one is."""
+        policy = self.policy(host)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT tokens, rate, updated_at, blocked_until, state, opened_at, probe_at FROM hosts WHERE host = ?",
+                    (host,),
+                ).fetchone()
+                if row is None:
+                    row = (policy.burst, policy.rate, now, 0.0, CLOSED, None, None)
+                    self._conn.execute(
+                        "INSERT INTO hosts (host, tokens, rate, updated_at) VALUES (?, ?, ?, ?)",
+                        (host, policy.burst, policy.rate, now),
+                    )
+                tokens, rate, updated_at, blocked_until, state, opened_at, probe_at = row
+                rate = min(rate, policy.rate)
+
+                if state == OPEN and now < opened_at + self.reset_seconds:
+                    raise CircuitOpenError(host, opened_at + self.reset_seconds - now, "circuit is open")
+                if state != CLOSED and probe_at is not None and now < probe_at + self.reset_seconds:
+                    raise CircuitOpenError(host, probe_at + self.reset_seconds - now, "is being probed")
+
+                tokens = min(policy.burst, tokens + max(0.0, now - updated_at) * rate)
+                if blocked_until > now:
+                    wait = blocked_until - now
+                elif tokens >= 1.0:
+                    wait = 0.0
+                    tokens -= 1.0
+                else:
+                    wait = (1.0 - tokens) / rate
+                if wait == 0.0 and state != CLOSED:
+                    # This caller is the half-open probe; everyone else fails fast until it reports
+                    state, probe_at = HALF_OPEN, now
+                self._conn.execute(
+                    "UPDATE hosts SET tokens = ?, rate = ?, updated_at = ?, state = ?, probe_at = ? WHERE host = ?",
+                    (tokens, rate, now, state, probe_at, host),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    # ------------------------------------------------------------------
+    # Outcomes
+    # ------------------------------------------------------------------
+
+    def record(self, target: str, status: Optional[int] = None, retry_after: Optional[str] = None) -> None:
+        """
+        Report a finished call: ``status`` is the HTTP status, or ``None`` when the
+        call failed without one (connection error, timeout).
+        """
+        host = _host(target)
+        policy = self.policy(host)
+        now = time.time()
+        with self._lock:
+            if status == THROTTLE_STATUS:
+                delay = _seconds(retry_after)
+                self._conn.execute(
+                    "UPDATE hosts SET rate = MAX(?, rate / 2), tokens = MIN(tokens, 0), blocked_until = MAX(blocked_until, ?),"
+                    " state = ?, failures = 0, probe_at = NULL WHERE host = ?",
+                    (policy.min_rate, now + delay, CLOSED, host),
+                )
+                logger.info("%s throttled us; halving its request rate", host)
+            elif status is None or status in FAILURE_STATUSES:
+                self._record_failure(host, now)
+            else:
+                # Only written when something changes, so the healthy path stays cheap
+                self._conn.execute(
+                    "UPDATE hosts SET failures = 0, state = ?, probe_at = NULL, rate = MIN(?, rate + ?)"
+                    " WHERE host = ? AND (failures > 0 OR state != ? OR rate < ?)",
+                    (CLOSED, policy.rate, policy.rate / 10, host, CLOSED, policy.rate),
+                )
+
+    def _record_failure(self, host: str, now: float) -> None:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._conn.execute("SELECT state, failures FROM hosts WHERE host = ?", (host,)).fetchone()
+            state, failures = row if row is not None else (CLOSED, 0)
+            failures += 1
+            if state == HALF_OPEN or failures >= self.failure_threshold:
+                if state != OPEN:
+                    logger.warning("Opening circuit for %s after %d failures", host, failures)
+                self._conn.execute(
+                    "UPDATE hosts SET state = ?, failures = ?, opened_at = ?, probe_at = NULL WHERE host = ?",
+                    (OPEN, failures, now, host),
+                )
+            else:
+                self._conn.execute("UPDATE hosts SET failures = ? WHERE host = ?", (failures, host))
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def state(self, target: str) -> dict[str, Any]:
+        """The stored state for a host (for diagnostics and tests)."""
+        host = _host(target)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, failures, rate, tokens, blocked_until FROM hosts WHERE host = ?", (host,)
+            ).fetchone()
+        if row is None:
+            return {"state": CLOSED, "failures": 0, "rate": self.policy(host).rate}
+        return dict(zip(("state", "failures", "rate", "tokens", "blocked_until"), row))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class GuardedCall:
+    """
+    One guarded call. Report the response with ``status()``; leaving the block
+    without it counts as a success, and leaving it with an exception as a failure.
+    """
+
+    def __init__(self, guard: UpstreamGuard, host: str, max_wait: Optional[float]) -> None:
+        self.guard = guard
+        self.host = host
+        self.max_wait = max_wait
+        self._status: Optional[int] = 200
+        self._retry_after: Optional[str] = None
+
+    def status(self, code: int, retry_after: Optional[str] = None) -> None:
+        self._status, self._retry_after = code, retry_after
+
+    def __enter__(self) -> "GuardedCall":
+        self.guard.acquire(self.host, self.max_wait)
+        return self
+
+    async def __aenter__(self) -> "GuardedCall":
+        await self.guard.acquire_async(self.host, self.max_wait)
+        return self
+
+    def __exit__(self, exc_type: Optional[type[BaseException]], exc: Optional[BaseException], tb: Optional[TracebackType]) -> None:
+        if exc_type is None:
+            self.guard.record(self.host, self._status, self._retry_after)
+        elif not issubclass(exc_type, (UpstreamUnavailable, asyncio.CancelledError)):
+            self.guard.record(self.host, None)
+
+    async def __aexit__(self, exc_type: Optional[type[BaseException]], exc: Optional[BaseException], tb: Optional[TracebackType]) -> None:
+        # Recording writes to SQLite, which must not block the event loop
+        await asyncio.to_thread(self.__exit__, exc_type, exc, tb)
+
+
+class GuardedAdapter(HTTPAdapter):
+    """``HTTPAdapter`` that sends every request through an ``UpstreamGuard`` (when one is set)."""
+
+    def __init__(self, guard: Optional[UpstreamGuard] = None, max_wait: Optional[float] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.guard = guard
+        self.max_wait = max_wait
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        if self.guard is None:
+            return super().send(request, **kwargs)
+        host = _host(request.url or "")
+        self.guard.acquire(host, self.max_wait)
+        try:
+            response = super().send(request, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self.guard.record(host, None)
+            raise
+        self.guard.record(host, response.status_code, response.headers.get("Retry-After"))
+        return response
+
+
+def install_guard(session: requests.Session, guard: UpstreamGuard, max_wait: Optional[float] = None) -> None:
+    """Route ``session``'s http(s) traffic through ``guard``, keeping any mounted guarded adapter (e.g. the HTTP cache)."""
+    created: dict[int, GuardedAdapter] = {}
+    for prefix in ("https://", "http://"):
+        current = session.get_adapter(prefix)
+        if isinstance(current, GuardedAdapter):
+            current.guard, current.max_wait = guard, max_wait
+            continue
+        if id(current) not in created:
+            created[id(current)] = GuardedAdapter(
+                guard,
+                max_wait,
+                pool_connections=getattr(current, "_pool_connections", 10),
+                pool_maxsize=getattr(current, "_pool_maxsize", 10),
+            )
+        session.mount(prefix, created[id(current)])
+
+
+def _host(target: str) -> str:
+    return urlsplit(target).netloc if "://" in target else target
+
+
+def _seconds(retry_after: Optional[str], default: float = 1.0) -> float:
+    try:
+        return max(0.0, float(retry_after)) if retry_after else default
+    except ValueError:
+        return default  # HTTP-date form
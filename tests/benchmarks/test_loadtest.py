@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+
+import httpx
+
+from benchmarks.loadtest import Recorder, Scenario, Step, compare, drive, summarise
+from benchmarks.stub_upstreams import StubUpstreams
+
+SCENARIO_DIR = Path(__file__).resolve().parents[2] / "benchmarks/scenarios"
+
+
+def test_bundled_scenarios_parse() -> None:
+    for path in SCENARIO_DIR.glob("*.yaml"):
+        scenario = Scenario.load(path)
+        assert scenario.steps and all(step.weight > 0 for step in scenario.steps)
+
+
+def test_stub_upstreams_capture_otp_and_serve_feeds() -> None:
+    with StubUpstreams() as stubs:
+        env = stubs.env()
+        assert httpx.get(env["NOAA_XRAY_URL"]).json()[0]["flux"] > 0
+        assert len(httpx.get(env["SPACE_NEWS_URL"]).json()["results"]) == 30
+        resp = httpx.post(
+            env["BREVO_API_URL"],
+            json={"to": [{"email": "a@b.c"}], "textContent": "Your secure uplink code is: 123456"},
+        )
+        assert resp.status_code == 201
+        assert stubs.latest_otp("a@b.c") == "123456"
+        assert stubs.hits == {"noaa": 1, "news": 1, "brevo": 1}
+
+
+def test_drive_summarises_per_route_and_flags_regressions() -> None:
+    async def app(scope, receive, send):
+        status = 200 if scope["path"] == "/ok" else 500
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    scenario = Scenario(
+        name="unit",
+        steps=[Step(name="ok", weight=3, path="/ok"), Step(name="broken", weight=1, path="/broken")],
+        duration=0.3,
+        warmup=0.0,
+        concurrency=4,
+    )
+    summary = asyncio.run(drive(scenario, "http://test", transport=httpx.ASGITransport(app=app)))
+
+    assert summary["routes"]["ok"]["error_rate"] == 0.0
+    assert summary["routes"]["broken"]["error_rate"] == 1.0
+    assert "HTTP 500" in summary["routes"]["broken"]["error_sample"]
+
+    ok = summary["routes"]["ok"]
+    slower = {"routes": {**summary["routes"], "ok": {**ok, "p95_ms": ok["p95_ms"] * 3 + 10}}}
+    assert compare(slower, summary, tolerance=0.2) == [f"ok: p95 {ok['p95_ms']}ms -> {ok['p95_ms'] * 3 + 10}ms"]
+    assert compare(summary, summary) == []
+
+
+def test_warmup_samples_are_dropped() -> None:
+    recorder = Recorder(started_at=100.0, warmup=5.0)
+    recorder.record("a", 101.0, ok=False)
+    assert not recorder.latencies
+    scenario = Scenario(name="w", steps=[])
+    assert summarise(scenario, recorder, elapsed=1.0)["total_requests"] == 0
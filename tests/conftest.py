@@ -2,9 +2,48 @@ from __future__ import annotations
 
 import sys
 from pathlib import Path
+from typing import Any, Optional, Sequence
+
+import numpy as np
 
 # Ensure src package is importable when running tests without installation
 ROOT = Path(__file__).resolve().parents[1]
 ROOT_STR = ROOT.as_posix()
 if ROOT_STR not in sys.path:
     sys.path.insert(0, ROOT_STR)
+
+from src.data_ingestion.base import StubbedIngestor  # noqa: E402
+from src.data_ingestion.schemas import MASTRecord, TESSRecord, ZTFRecord  # noqa: E402
+
+
+# Stub ingestors keyed like the real connectors, for building small data lakes in tests
+class ZTFStub(StubbedIngestor):
+    record_model = ZTFRecord
+
+    def record_key(self, record: dict[str, Any]) -> str | None:
+        return f"{record['object_id']}:{record['mjd']}"
+
+
+class TESSStub(StubbedIngestor):
+    record_model = TESSRecord
+
+    def record_key(self, record: dict[str, Any]) -> str | None:
+        return f"{record['tic_id']}:s{record['sector']}"
+
+
+class MASTStub(StubbedIngestor):
+    record_model = MASTRecord
+
+    def record_key(self, record: dict[str, Any]) -> str | None:
+        return record["observation_id"]
+
+
+def lightcurve(i: int, points: int = 50, sector: int = 1, flux: Optional[Sequence[float]] = None) -> dict[str, Any]:
+    """A TESS light curve of ``TIC{i:04d}``; the flux is constant at ``i`` unless given."""
+    return {
+        "tic_id": f"TIC{i:04d}",
+        "sector": sector,
+        "cadence": "custom_cutout",
+        "time": np.linspace(0, 1, points).tolist(),
+        "flux": list(flux) if flux is not None else (np.ones(points) * i).tolist(),
+    }
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from conftest import TESSStub, lightcurve
+from src.data_ingestion import compaction
+from src.data_ingestion.compaction import CompactionOptions, compact, verify_shards
+from src.data_ingestion.schemas import TESSRecord
+from src.data_ingestion.storage import count_records, iter_records, list_json, list_parts, list_shards, read_record
+
+
+def _drop_lake(root: Path) -> None:
+    """Parquet parts for records 0-29, legacy JSON drops for 25-39 (25-29 overlap) and one broken drop."""
+    TESSStub("tess", root, {"storage": "parquet", "persist_batch": 4, "run_log": False}).run(
+        sample_payload=[lightcurve(i, points=20) for i in range(30)]
+    )
+    for i in range(25, 40):
+        (root / f"record_TIC{i:04d}_s1.json").write_text(json.dumps(lightcurve(i, points=20, flux=[-1.0] * 20)))
+    (root / "record_broken.json").write_text("{")
+
+
+def test_compaction_packs_files_into_indexed_shards(tmp_path: Path) -> None:
+    _drop_lake(tmp_path)
+    options = CompactionOptions(shard_rows=16, row_group_rows=4)
+    result = compact(tmp_path, TESSRecord, options)
+
+    assert result.files_compacted == 8 + 15 and result.records == 40 and result.duplicates_dropped == 5
+    assert not list_parts(tmp_path) and list_json(tmp_path) == [tmp_path / "record_broken.json"]
+    assert not list(tmp_path.glob("ingest_date=*")) and len(list_shards(tmp_path)) == 2
+    assert verify_shards(tmp_path) == [] and count_records(tmp_path) == 41
+
+    records = {r["tic_id"]: r for r in iter_records(tmp_path, record_model=TESSRecord) if r.get("tic_id")}
+    assert sorted(records) == [f"TIC{i:04d}" for i in range(40)]
+    # Parquet parts are newer than the legacy drops, so their copy of 25-29 is kept
+    assert records["TIC0027"]["flux"].tolist() == [27.0] * 20 and records["TIC0033"]["flux"][0] == -1.0
+
+    assert read_record(tmp_path, "TIC0007:s1")["flux"].tolist() == [7.0] * 20
+    assert read_record(tmp_path, "TIC0036:s1")["tic_id"] == "TIC0036"
+    assert read_record(tmp_path, "TIC9999:s1") is None
+
+    # New parts after compaction are read alongside the shards and compacted next time
+    TESSStub("tess", tmp_path, {"storage": "parquet", "run_log": False}).run(sample_payload=[lightcurve(50, points=20)])
+    assert read_record(tmp_path, "TIC0050:s1")["tic_id"] == "TIC0050"
+    assert compact(tmp_path, TESSRecord, CompactionOptions(min_files=1)).records == 1
+    assert count_records(tmp_path) == 42 and not list_parts(tmp_path)
+
+    shard = list_shards(tmp_path)[0]
+    data = bytearray(shard.read_bytes())
+    data[100] ^= 0xFF
+    shard.write_bytes(bytes(data))
+    assert verify_shards(tmp_path) == [f"{shard}: checksum mismatch"]
+
+
+def test_read_record_prefers_a_reingested_part_over_the_shard(tmp_path: Path) -> None:
+    def ingest(flux: float) -> None:
+        TESSStub("tess", tmp_path, {"storage": "parquet", "incremental": False, "run_log": False}).run(
+            sample_payload=[lightcurve(1, points=20, flux=[flux] * 20)]
+        )
+
+    ingest(1.0)
+    compact(tmp_path, TESSRecord, CompactionOptions(min_files=1))
+    ingest(2.0)
+
+    assert list_parts(tmp_path) and list_shards(tmp_path)
+    assert read_record(tmp_path, "TIC0001:s1")["flux"].tolist() == [2.0] * 20
+
+
+def test_shards_are_cut_at_the_byte_limit(tmp_path: Path) -> None:
+    _drop_lake(tmp_path)
+    result = compact(tmp_path, TESSRecord, CompactionOptions(shard_bytes=1))
+    # One shard per input table: 8 Parquet parts and one batch of JSON drops
+    assert len(result.shards) == 9 and result.records == 40 and verify_shards(tmp_path) == []
+
+
+def test_interrupted_compaction_is_finished_by_the_next_run(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    _drop_lake(tmp_path)
+
+    def crash(root: Path, sources: list[Path]) -> None:
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as patch:
+        patch.setattr(compaction, "_delete_sources", crash)
+        with pytest.raises(KeyboardInterrupt):
+            compact(tmp_path, TESSRecord)
+    # The shard is in the manifest, so readers would see its records twice until recovery
+    assert len(list_shards(tmp_path)) == 1 and list_parts(tmp_path)
+
+    result = compact(tmp_path, TESSRecord)
+    assert result.files_compacted == 0 and len(list_shards(tmp_path)) == 1
+    assert not list_parts(tmp_path) and len(list_json(tmp_path)) == 1
+    assert sum(1 for r in iter_records(tmp_path) if r.get("tic_id")) == 40
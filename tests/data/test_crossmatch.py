@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pytest
+
+from conftest import MASTStub, ZTFStub
+from src.data_ingestion.crossmatch import (
+    CrossMatchOptions,
+    attach_matches,
+    crossmatch,
+    crossmatch_sources,
+    match_path,
+    write_matches,
+)
+from src.data_ingestion.sky_index import angular_separation, source_positions
+
+
+@pytest.fixture(scope="module")
+def lake(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """3000 ZTF detections (clusters at ra=0 and the pole) and MAST observations scattered around a third of them."""
+    root = tmp_path_factory.mktemp("raw")
+    rng = np.random.default_rng(5)
+    ra = rng.uniform(0.0, 360.0, 3000)
+    dec = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, 3000)))
+    ra[:300] = rng.uniform(-0.005, 0.005, 300) % 360.0
+    dec[:300] = rng.uniform(-0.005, 0.005, 300)
+    dec[300:400] = rng.uniform(89.995, 90.0, 100)
+    detections = [
+        {"object_id": f"ZTF{i % 1500:05d}", "ra": float(r), "dec": float(d), "mjd": 60000.0 + i, "filter": "g"}
+        for i, (r, d) in enumerate(zip(ra, dec))
+    ]
+    ZTFStub("ztf", root / "ztf", {"storage": "parquet", "run_log": False}).run(sample_payload=detections)
+
+    picks = np.r_[np.arange(400), rng.choice(3000, 600)]
+    offsets = rng.normal(0.0, 2.0 / 3600.0, (2, len(picks)))
+    observations = [
+        {
+            "observation_id": f"hst_{j}",
+            "instrument": "ACS",
+            "target": "field",
+            "exposure_time": 1.0,
+            "ra": float((ra[i] + offsets[0, j]) % 360.0),
+            "dec": float(np.clip(dec[i] + offsets[1, j], -90.0, 90.0)),
+        }
+        for j, i in enumerate(picks)
+    ]
+    observations.append({"observation_id": "hst_nopos", "instrument": "ACS", "target": "field", "exposure_time": 1.0})
+    MASTStub("mast", root / "mast", {"storage": "parquet", "run_log": False}).run(sample_payload=observations)
+    return root
+
+
+@pytest.mark.parametrize("options", [CrossMatchOptions(radius_arcsec=5.0), CrossMatchOptions(radius_arcsec=5.0, chunk_rows=64, workers=2)])
+def test_crossmatch_matches_brute_force(lake: Path, options: CrossMatchOptions) -> None:
+    ztf, mast = source_positions("ztf", lake / "ztf"), source_positions("mast", lake / "mast")
+    assert mast.num_rows == 1000  # the observation without a position is left out
+
+    matches = crossmatch_sources("ztf", "mast", lake, options)
+    separation = angular_separation(
+        ztf["ra"].to_numpy()[:, None], ztf["dec"].to_numpy()[:, None], mast["ra"].to_numpy(), mast["dec"].to_numpy()
+    ) * 3600.0
+    left, right = np.nonzero(separation <= 5.0)
+    keys, observations = np.array(ztf["record_key"].to_pylist()), np.array(mast["object_id"].to_pylist())
+    expected = sorted(zip(keys[left], observations[right]))
+    assert sorted(zip(matches["left_record_key"].to_pylist(), matches["right_object_id"].to_pylist())) == expected
+    assert len(expected) > 1000
+    assert np.allclose(np.sort(matches["separation_arcsec"].to_numpy()), np.sort(separation[left, right]))
+
+    frame = matches.to_pandas()
+    assert set(frame["left_source"]) == {"ztf"} and set(frame["right_source"]) == {"mast"}
+    first = frame.groupby("left_record_key", sort=False).first()
+    nearest = frame.groupby("left_record_key")["separation_arcsec"].min()
+    assert (first["rank"] == 1).all() and np.allclose(first["separation_arcsec"], nearest[first.index])
+
+
+def test_nearest_only_and_attach_matches(lake: Path, tmp_path: Path) -> None:
+    matches = crossmatch_sources("ztf", "mast", lake, CrossMatchOptions(radius_arcsec=5.0))
+    nearest = crossmatch_sources("ztf", "mast", lake, CrossMatchOptions(radius_arcsec=5.0, nearest_only=True))
+    assert nearest.num_rows == len(set(matches["left_record_key"].to_pylist()))
+    best = matches.filter(pc.equal(matches["rank"], 1)).sort_by("left_record_key")
+    assert nearest.sort_by("left_record_key")["separation_arcsec"].equals(best["separation_arcsec"])
+
+    path = write_matches(matches, match_path("ztf", "mast", tmp_path / "crossmatch"), CrossMatchOptions(radius_arcsec=5.0))
+    assert path.name == "ztf__mast.parquet" and pd.read_parquet(path).shape[0] == matches.num_rows
+
+    features = pd.DataFrame({"object_id": ["ZTF00000", "ZTF01499", "ZTF99999"], "amplitude": [1.0, 2.0, 3.0]})
+    joined = attach_matches(features, pd.read_parquet(path))
+    frame = matches.to_pandas()
+    own = frame[frame["left_object_id"] == "ZTF00000"]
+    assert list(joined.columns) == ["object_id", "amplitude", "mast_match_count", "mast_nearest_id", "mast_nearest_arcsec"]
+    assert joined.loc[0, "mast_match_count"] == own["right_object_id"].nunique()
+    assert joined.loc[0, "mast_nearest_arcsec"] == own["separation_arcsec"].min()
+    assert joined.loc[2, "mast_match_count"] == 0 and pd.isna(joined.loc[2, "mast_nearest_id"])
+
+    with pytest.raises(ValueError):
+        crossmatch(source_positions("ztf", lake / "ztf"), source_positions("mast", lake / "mast"), CrossMatchOptions(radius_arcsec=20 * 3600.0))
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import requests
+
+from benchmarks.stub_upstreams import StubUpstreams
+from src.data_ingestion.http_cache import HTTPCache, install_cache, normalise_url
+from src.data_ingestion.tess_ingestor import create_tess_ingestor
+
+
+def test_normalised_urls_ignore_parameter_order() -> None:
+    assert normalise_url("HTTP://Example.org/a?b=2&a=1") == normalise_url("http://example.org/a?a=1&b=2")
+
+
+def test_rerun_is_served_from_disk(tmp_path: Path) -> None:
+    targets = ["Tic 1", "Tic 2"]
+    with StubUpstreams() as stubs:
+        config = {
+            "tesscut_url": f"{stubs.url}/tesscut",
+            "fits_workers": 1,
+            "incremental": False,
+            "http_cache": {"dir": str(tmp_path / "cache")},
+        }
+        first = create_tess_ingestor(tmp_path / "a", config)
+        assert len(list(first.fetch(limit=2, targets=targets))) == 2
+        network_hits = stubs.hits["tesscut"]
+
+        second = create_tess_ingestor(tmp_path / "b", config)
+        assert len(list(second.fetch(limit=2, targets=targets))) == 2
+        assert stubs.hits["tesscut"] == network_hits
+        # Both targets share one sector answer and one cutout body on disk
+        assert second.http_cache.stats()["hits"] == 4
+        assert len(list((tmp_path / "cache/objects").glob("*/*"))) == 2
+
+
+def test_stale_entries_revalidate_with_etag(tmp_path: Path) -> None:
+    cache = HTTPCache(tmp_path, default_ttl=0.0)
+    session = requests.Session()
+    install_cache(session, cache)
+    with StubUpstreams() as stubs:
+        url = f"{stubs.url}/tesscut/astrocut?ra=1&dec=2"
+        body = session.get(url).content
+        revalidated = session.get(url)
+    assert revalidated.status_code == 200 and revalidated.content == body
+    assert getattr(revalidated, "from_cache", False)
+    assert (cache.misses, cache.revalidated) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path) -> None:
+    session = requests.Session()
+    with StubUpstreams() as stubs:
+        size = len(requests.get(f"{stubs.url}/noaa/x").content)
+        cache = HTTPCache(tmp_path, max_bytes=int(size * 2.5))  # room for two responses
+        install_cache(session, cache)
+        for name in ("a", "b", "a", "c"):  # the second "a" makes "b" least recently used
+            session.get(f"{stubs.url}/noaa/{name}")
+        served = {name: getattr(session.get(f"{stubs.url}/noaa/{name}"), "from_cache", False) for name in ("a", "c", "b")}
+    assert served == {"a": True, "c": True, "b": False}
+    assert cache.stats()["entries"] == 2
+
+
+def test_streamed_bodies_are_cached_once_read_to_the_end(tmp_path: Path) -> None:
+    cache = HTTPCache(tmp_path)
+    session = requests.Session()
+    install_cache(session, cache)
+    with StubUpstreams() as stubs:
+        url = f"{stubs.url}/tesscut/astrocut?ra=1&dec=2"
+        with session.get(url, stream=True) as partial:
+            next(partial.iter_content(64))
+        assert cache.stats()["entries"] == 0 and not list((tmp_path / "objects/tmp").iterdir())
+
+        with session.get(url, stream=True) as streamed:
+            assert cache.stats()["entries"] == 0  # nothing is read before the caller does
+            body = b"".join(streamed.iter_content(1024))
+        cached = session.get(url, stream=True)
+    assert getattr(cached, "from_cache", False) and cached.content == body
+    assert cache.stats() == {"hits": 1, "revalidated": 0, "misses": 2, "entries": 1, "bytes": len(body)}
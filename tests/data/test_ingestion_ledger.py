@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+
+from src.data_ingestion.base import StubbedIngestor
+from src.data_ingestion.ledger import IngestionLedger
+
+
+class KeyedIngestor(StubbedIngestor):
+    watermark_field = "mjd"
+
+    def record_key(self, record: dict[str, Any]) -> str | None:
+        return record.get("candidate_id")
+
+
+def _records(*candids: int) -> list[dict[str, Any]]:
+    return [{"candidate_id": str(c), "object_id": "ZTF21abc", "mjd": 59800.0 + c} for c in candids]
+
+
+def test_reruns_only_write_new_records_and_advance_watermark(tmp_path: Path) -> None:
+    ingestor = KeyedIngestor("ztf", tmp_path, config={})
+    first = ingestor.run(sample_payload=_records(1, 2, 2, 3))
+    assert first.records_fetched == 3
+    assert first.metadata["duplicates_skipped"] == 1
+    assert first.metadata["watermark"] == 59803.0
+
+    second = KeyedIngestor("ztf", tmp_path, config={}).run(sample_payload=_records(2, 3, 4))
+    assert [p.name for p in second.output_paths] == ["record_4.json"]
+    assert second.metadata["watermark"] == 59804.0
+    # Earlier files are untouched rather than overwritten by index
+    assert sorted(p.name for p in tmp_path.glob("record_*.json")) == [f"record_{i}.json" for i in range(1, 5)]
+
+    # Outside incremental mode known keys are re-written, but only once per run across batches
+    refresh = KeyedIngestor("ztf", tmp_path, config={"incremental": False, "persist_batch": 1}).run(
+        sample_payload=_records(1, 1, 2)
+    )
+    assert refresh.records_fetched == 2 and refresh.metadata["duplicates_skipped"] == 1
+    assert refresh.metadata["watermark"] == 59804.0  # never moves backwards
+
+
+def test_interrupted_run_resumes_from_committed_keys(tmp_path: Path) -> None:
+    def crashing() -> Iterator[dict[str, Any]]:
+        yield from _records(1, 2)
+        raise ConnectionError("upstream went away")
+
+    ingestor = KeyedIngestor("ztf", tmp_path, config={"persist_batch": 1})
+    with pytest.raises(ConnectionError):
+        ingestor.persist(crashing())
+
+    resumed = KeyedIngestor("ztf", tmp_path, config={}).run(sample_payload=_records(1, 2, 3))
+    assert resumed.records_fetched == 1
+    assert resumed.metadata["duplicates_skipped"] == 2
+
+    ledger = IngestionLedger(tmp_path / ".ingestion_ledger.sqlite")
+    assert ledger.count("ztf") == 3
+    assert ledger.seen("ztf", ["1", "3", "9"]) == {"1", "3"}
+    assert [run["status"] for run in ledger.runs("ztf")] == ["failed", "completed"]
+
+
+def test_records_without_keys_are_deduplicated_by_content(tmp_path: Path) -> None:
+    payload = [{"object_id": "ZTF21abc", "ra": 10.5, "dec": -5.2}]
+    assert StubbedIngestor("stub", tmp_path, config={}).run(sample_payload=payload).records_fetched == 1
+    assert StubbedIngestor("stub", tmp_path, config={}).run(sample_payload=payload).records_fetched == 0
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from pathlib import Path
+from unittest.mock import Mock
+
+from benchmarks.stub_upstreams import StubUpstreams
+from src.data_ingestion.mast_ingestor import _column_list, create_mast_ingestor
+
+
+def _config(stubs: StubUpstreams, **overrides: object) -> dict[str, object]:
+    return {
+        "invoke_url": f"{stubs.url}/mast/api/v0/invoke",
+        "concurrency": 4,
+        "retry": {"max_attempts": 3, "backoff_base": 0.01},
+        "query": {"pagesize": 100, "columns": "obsid"},
+        **overrides,
+    }
+
+
+def test_small_limit_fetches_one_projected_page(tmp_path: Path) -> None:
+    with StubUpstreams(mast_rows=100_000) as stubs:
+        ingestor = create_mast_ingestor(tmp_path, {**_config(stubs), "storage": "parquet"})
+        first = ingestor.run(limit=20)
+        hits, sent = stubs.hits["mast"], stubs.bytes_sent["mast"]
+        rerun = create_mast_ingestor(tmp_path, {**_config(stubs), "storage": "parquet"})
+        records = list(rerun.fetch(limit=20))
+        rerun_hits = stubs.hits["mast"] - hits
+
+    assert first.records_fetched == 20 and hits == 1
+    # 20 rows of the six requested columns, not the matching table
+    assert sent < 5_000
+    # The known first page is skipped and the next page supplies 20 new records
+    assert [r["observation_id"] for r in records] == [f"hst_stub_{i:06d}" for i in range(20, 40)]
+    assert rerun_hits == 2
+    assert _column_list("obsid, target_name") == "obsid,target_name,obs_id,instrument_name,t_exptime,wavelength_region,s_ra,s_dec"
+    assert _column_list(None) == "*"
+
+
+def test_harvest_fetches_pages_in_parallel_and_in_order(tmp_path: Path) -> None:
+    with StubUpstreams(latency_ms=20, mast_rows=1_050) as stubs:
+        stubs.fail("mast", 2)
+        records = list(create_mast_ingestor(tmp_path, _config(stubs)).fetch(limit=None))
+        hits, peak = stubs.hits["mast"], stubs.peak_in_flight["mast"]
+
+    assert [r["observation_id"] for r in records] == [f"hst_stub_{i:06d}" for i in range(1_050)]
+    assert records[1]["instrument"] == "ACS/WFC" and records[1]["exposure_time"] == 301.0
+    assert hits == 11 + 2
+    assert 1 < peak <= 4
+
+
+def test_executing_queries_are_polled_on_their_own_budget(tmp_path: Path) -> None:
+    ingestor = create_mast_ingestor(
+        tmp_path, {"retry": {"max_attempts": 5}, "poll_attempts": 3, "poll_seconds": 0, "query": {"pagesize": 10}}
+    )
+    response = Mock(status_code=200)
+    response.json.return_value = {"status": "EXECUTING"}
+    ingestor.session.request = Mock(return_value=response)
+
+    assert list(ingestor.fetch(limit=10)) == []
+    assert ingestor.session.request.call_count == 3
+    assert ingestor.fetch_errors["page"] == 1
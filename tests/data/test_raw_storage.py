@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from conftest import TESSStub, lightcurve
+from src.data_ingestion.storage import iter_records, list_parts, read_random_record, read_table
+
+
+def _lightcurve(i: int, points: int = 50) -> dict[str, Any]:
+    return {**lightcurve(i, points), "mast_data_uri": "tesscut_api"}
+
+
+def test_parquet_storage_keeps_arrays_native_and_round_trips(tmp_path: Path) -> None:
+    ingestor = TESSStub("tess", tmp_path, config={"storage": "parquet", "persist_batch": 2})
+    result = ingestor.run(sample_payload=[_lightcurve(i) for i in range(5)])
+
+    parts = list_parts(tmp_path)
+    assert result.records_fetched == 5
+    assert sorted(result.output_paths) == parts and len(parts) == 3
+    assert all(p.parent.name.startswith("ingest_date=") for p in parts)
+    assert pq.read_schema(parts[0]).field("flux").type == pa.list_(pa.float64())
+
+    records = list(iter_records(tmp_path))
+    assert [r["tic_id"] for r in records] == [f"TIC{i:04d}" for i in range(5)]
+    assert isinstance(records[3]["flux"], np.ndarray) and records[3]["flux"].tolist() == [3.0] * 50
+    assert records[0]["mast_data_uri"] == "tesscut_api"  # extra field survives via the JSON column
+
+    random_record = read_random_record(parts[0])
+    assert random_record is not None and len(random_record["time"]) == 50
+
+
+def test_readers_merge_parquet_parts_with_legacy_json(tmp_path: Path) -> None:
+    TESSStub("tess", tmp_path, config={"storage": "parquet"}).run(sample_payload=[_lightcurve(0)])
+    (tmp_path / "record_00000.json").write_text(json.dumps(_lightcurve(7, points=3), indent=2))
+
+    table = read_table(tmp_path, columns=["tic_id", "flux"])
+    assert table.column_names == ["tic_id", "flux"]
+    assert sorted(table.column("tic_id").to_pylist()) == ["TIC0000", "TIC0007"]
+
+    legacy = [r for r in iter_records(tmp_path) if r["tic_id"] == "TIC0007"][0]
+    assert legacy["record_key"] == "00000"
+    assert legacy["flux"].tolist() == [7.0, 7.0, 7.0]
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src.data_ingestion.base import StubbedIngestor
+from src.data_ingestion.schemas import TESSRecord, ZTFRecord
+from src.data_ingestion.validation import validate_records
+
+
+def _tess(points: int = 5, **overrides: object) -> dict[str, object]:
+    record: dict[str, object] = {
+        "tic_id": "Tic 1",
+        "sector": "3",
+        "cadence": "custom_cutout",
+        "time": np.arange(points, dtype=np.float64),
+        "flux": [100.0 + i for i in range(points)],
+    }
+    record.update(overrides)
+    return record
+
+
+def test_arrays_are_validated_as_numpy_without_copies() -> None:
+    time_arr = np.linspace(0.0, 1.0, 1000)
+    [validated] = validate_records(TESSRecord, [_tess(1000, time=time_arr)])
+
+    assert validated["sector"] == 3
+    assert validated["time"] is time_arr or np.shares_memory(validated["time"], time_arr)
+    assert validated["flux"].dtype == np.float64 and len(validated["flux"]) == 1000
+    assert len(validated["binned_time"]) == 0 and validated["bin_minutes"] is None
+    assert validate_records(ZTFRecord, [{"object_id": "a", "ra": "1", "dec": 2, "mjd": 3, "filter": "g"}])[0]["ra"] == 1.0
+
+
+@pytest.mark.parametrize(
+    ("overrides", "message"),
+    [
+        ({"flux": [1.0, 2.0]}, "time and flux arrays must be the same length"),
+        ({"flux": [1.0, np.nan, 3.0, 4.0, 5.0]}, "flux contains NaN"),
+        ({"time": np.zeros((5, 2))}, "time must be one-dimensional"),
+        ({"flux": ["a"] * 5}, "flux is not a float array"),
+        ({"sector": "three"}, "sector"),
+    ],
+)
+def test_invalid_records_name_their_position(overrides: dict[str, object], message: str) -> None:
+    with pytest.raises(ValueError, match=message) as excinfo:
+        validate_records(TESSRecord, [_tess(), _tess(**overrides)])
+    assert str(excinfo.value).startswith("record 1:")
+
+
+def test_persist_writes_validated_arrays_to_json_and_parquet(tmp_path: Path) -> None:
+    for storage in ("json", "parquet"):
+        ingestor = StubbedIngestor("tess", tmp_path / storage, config={"storage": storage})
+        ingestor._record_model = TESSRecord
+        ingestor.record_key = lambda record: record["tic_id"]  # type: ignore[method-assign]
+        result = ingestor.run(sample_payload=[_tess(), _tess(tic_id="Tic 2")])
+        assert result.records_fetched == 2
+
+    stored = json.loads((tmp_path / "json" / "record_Tic_1.json").read_text())
+    assert stored["time"] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert ingestor.validate_record(_tess())["flux"] == [100.0, 101.0, 102.0, 103.0, 104.0]
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from conftest import MASTStub, ZTFStub
+from src.data_ingestion.sky_index import angular_separation, build_sky_index, open_sky_index, unit_vectors
+
+
+def _positions(count: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(3)
+    ra = rng.uniform(0.0, 360.0, count)
+    dec = np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, count)))
+    # A cluster straddling ra=0 and one at the pole
+    ra[:200] = rng.uniform(-0.5, 0.5, 200) % 360.0
+    dec[:200] = rng.uniform(-0.5, 0.5, 200)
+    dec[200:300] = rng.uniform(89.5, 90.0, 100)
+    return ra, dec
+
+
+@pytest.fixture(scope="module")
+def lake(tmp_path_factory: pytest.TempPathFactory) -> tuple[Path, np.ndarray, np.ndarray]:
+    root = tmp_path_factory.mktemp("raw")
+    ra, dec = _positions(20_000)
+    detections = [
+        {"object_id": f"ZTF{i:06d}", "ra": float(r), "dec": float(d), "mjd": 60000.0 + i, "mag_psf": float("nan"), "filter": "g"}
+        for i, (r, d) in enumerate(zip(ra, dec))
+    ]
+    ZTFStub("ztf", root / "ztf", {"storage": "parquet", "persist_batch": 5000, "run_log": False}).run(sample_payload=detections)
+    MASTStub("mast", root / "mast", {"storage": "parquet", "run_log": False}).run(
+        sample_payload=[{"observation_id": "hst_1", "instrument": "ACS", "target": "M31", "exposure_time": 1.0}]
+    )
+    rows = build_sky_index({"ztf": root / "ztf", "mast": root / "mast"}, root / "sky.arrow", nside=64)
+    assert rows == len(ra)
+    return root / "sky.arrow", ra, dec
+
+
+@pytest.mark.parametrize("centre, radius", [((150.0, 2.0), 3.0), ((0.1, 0.0), 0.4), ((10.0, 89.9), 0.3), ((75.0, -40.0), 0.01)])
+def test_cone_matches_brute_force(lake: tuple[Path, np.ndarray, np.ndarray], centre: tuple[float, float], radius: float) -> None:
+    path, ra, dec = lake
+    index = open_sky_index(path)
+    assert index is not None and index.nside == 64 and open_sky_index(path) is index
+
+    matches = index.cone(*centre, radius)
+    expected = np.flatnonzero(angular_separation(*centre, ra, dec) <= radius)
+    assert sorted(matches["object_id"].to_pylist()) == [f"ZTF{i:06d}" for i in expected]
+    separations = matches["separation_arcsec"].to_numpy()
+    assert np.all(np.diff(separations) >= 0) and np.all(separations <= radius * 3600)
+    assert set(matches["source"].to_pylist()) <= {"ztf"} and matches["mag_psf"].null_count == matches.num_rows
+    assert index.cone(*centre, radius, sources=["mast"]).num_rows == 0
+
+
+def test_polygon_matches_brute_force(lake: tuple[Path, np.ndarray, np.ndarray]) -> None:
+    path, ra, dec = lake
+    index = open_sky_index(path)
+    square = [(359.0, -1.0), (1.0, -1.0), (1.0, 1.0), (359.0, 1.0)]
+
+    matches = index.polygon(square)
+    corners = unit_vectors(*np.array(square).T)
+    normals = np.cross(corners, np.roll(corners, -1, axis=0))
+    inside = np.all(unit_vectors(ra, dec) @ normals.T >= 0, axis=1)
+    assert sorted(matches["object_id"].to_pylist()) == [f"ZTF{i:06d}" for i in np.flatnonzero(inside)]
+    assert matches.num_rows >= 200
+    assert index.polygon(square[::-1]).num_rows == matches.num_rows
+    with pytest.raises(ValueError):
+        index.polygon([(0.0, 0.0), (2.0, 0.0), (1.0, 0.2), (2.0, 2.0), (0.0, 2.0)])
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import inspect
+from pathlib import Path
+from typing import Any, Iterator
+
+from src.data_ingestion.base import StubbedIngestor
+
+
+class StreamingIngestor(StubbedIngestor):
+    def record_key(self, record: dict[str, Any]) -> str | None:
+        return record["candidate_id"]
+
+    def fetch(self, count: int = 0, **_: Any) -> Iterator[dict[str, Any]]:
+        for i in range(count):
+            if i == 25:
+                # The first two batches are on disk and in the ledger before the stream ends
+                assert len(list(self.output_dir.glob("record_*.json"))) == 20
+                assert self.ledger.count(self.source_name) == 20
+            yield {"candidate_id": f"c{i:03d}", "object_id": "ZTF21abc", "ra": 1.0, "dec": 2.0}
+
+
+def test_persist_writes_generator_output_in_bounded_batches(tmp_path: Path) -> None:
+    ingestor = StreamingIngestor("ztf", tmp_path, config={"persist_batch": 10})
+    assert inspect.isgenerator(ingestor.fetch(count=1))
+
+    result = ingestor.run(count=35)
+    assert result.records_fetched == 35
+    assert [p.name for p in result.output_paths[:2]] == ["record_c000.json", "record_c001.json"]
+
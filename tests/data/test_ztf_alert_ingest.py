@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import io
+from pathlib import Path
+
+import fastavro
+import pytest
+
+from benchmarks.ztf_alert_ingest import ALERT_SCHEMA, make_alert, write_corpus
+from src.data_ingestion.storage import iter_records
+from src.data_ingestion.ztf_avro_ingestor import AlertDecoder, AlertOptions, create_ztf_alert_ingestor
+
+
+def test_packets_and_archives_map_to_deduplicated_detections(tmp_path: Path) -> None:
+    write_corpus(tmp_path / "drop", alerts=4, history=6, stamp_bytes=100)
+    write_corpus(tmp_path / "night", alerts=8, history=6, archive=True, stamp_bytes=100)
+    (tmp_path / "drop" / "broken.avro").write_bytes(b"not avro")
+
+    ingestor = create_ztf_alert_ingestor(tmp_path / "out", {"storage": "parquet", "workers": 2, "packets_per_task": 3})
+    result = ingestor.run(paths=[tmp_path / "drop", tmp_path / "night"])
+
+    # Each alert: its candidate plus 4 history detections (epochs 0 and 3 are upper limits).
+    # The archive repeats the drop's first 4 alerts, so those detections are yielded once.
+    assert result.records_fetched == 8 * 5
+    assert result.metadata["fetch_errors"] == {"decode": 1}
+    records = list(iter_records(tmp_path / "out"))
+    latest = next(r for r in records if r["candidate_id"] == str(2_400_000_000_000_000_000 + 6))
+    assert latest["object_id"] == "ZTF24gen00000"
+    assert latest["mjd"] == 2460300.5 + 6 - 2400000.5
+    assert latest["cutout_science"] == "candid0_sci.fits.gz" and latest["cutout_science_bytes"] == 100
+    assert latest["rb"] == 0.5 and latest["isdiffpos"] == "t"
+
+
+def test_prefix_decoding_matches_full_decoding() -> None:
+    schema = fastavro.parse_schema(ALERT_SCHEMA)
+    single, multi = io.BytesIO(), io.BytesIO()
+    fastavro.writer(single, schema, [make_alert(5, history=3)])
+    # A container with several alerts per block is walked record by record
+    fastavro.writer(multi, schema, [make_alert(n, history=3) for n in range(3)], codec="deflate")
+
+    candidate_only = AlertDecoder(AlertOptions(history=False, cutouts=False))
+    [alert] = candidate_only.alerts(single.getvalue())
+    assert "prv_candidates" not in alert and "cutoutScience" not in alert
+    assert candidate_only.records(alert) == AlertDecoder(AlertOptions(history=False, cutouts=False)).records(
+        next(fastavro.reader(io.BytesIO(single.getvalue())))
+    )
+    assert [a["objectId"] for a in AlertDecoder().alerts(multi.getvalue())] == ["ZTF24gen00000"] * 3
+
+
+def test_corrupt_containers_and_archives_are_reported(tmp_path: Path) -> None:
+    schema = fastavro.parse_schema(ALERT_SCHEMA)
+    packet = io.BytesIO()
+    fastavro.writer(packet, schema, [make_alert(1, history=2, stamp_bytes=10)])
+    data = packet.getvalue()
+    with pytest.raises(ValueError, match="sync marker"):
+        list(AlertDecoder().alerts(data[:-1] + bytes([data[-1] ^ 0xFF])))
+    # Codecs without a local block reader are framed by fastavro
+    bzip2 = io.BytesIO()
+    fastavro.writer(bzip2, schema, [make_alert(n, history=2, stamp_bytes=10) for n in range(2)], codec="bzip2")
+    assert len(list(AlertDecoder().alerts(bzip2.getvalue()))) == 2
+
+    archive = write_corpus(tmp_path / "night", alerts=4, history=2, archive=True, stamp_bytes=10) / "alerts.tar.gz"
+    archive.write_bytes(archive.read_bytes()[:-100])
+    result = create_ztf_alert_ingestor(tmp_path / "out", {"workers": 1}).run(paths=[archive])
+    assert result.metadata["fetch_errors"] == {"archive": 1}
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from benchmarks.stub_upstreams import StubUpstreams
+from src.data_ingestion.ztf_ingestor import create_ztf_ingestor
+
+
+def _config(stubs: StubUpstreams, **overrides: object) -> dict[str, object]:
+    return {
+        "alerce_url": f"{stubs.url}/alerce",
+        "classes": ["SN", "AGN", "Variable"],
+        "concurrency": 4,
+        "page_size": 10,
+        "retry": {"max_attempts": 3, "backoff_base": 0.01},
+        **overrides,
+    }
+
+
+def test_fetch_deduplicates_objects_across_classes_and_parses_columns(tmp_path: Path) -> None:
+    with StubUpstreams(latency_ms=10) as stubs:
+        stubs.fail("alerce", 2)
+        records = list(create_ztf_ingestor(tmp_path, _config(stubs)).fetch(limit=60))
+        hits, peak = stubs.hits["alerce"], stubs.peak_in_flight["alerce"]
+
+    objects = {r["object_id"] for r in records}
+    # 3 classes x 2 pages of 10, with listings shifted by 0/10/20 objects: 40 distinct objects
+    assert len(objects) == 40
+    assert hits == 6 + len(objects) + 2
+    assert 1 < peak <= 4
+    # The stand-in's first detection per object has no magpsf
+    assert len(records) == 11 * len(objects)
+    assert all(len(r["candidate_id"]) == 19 and r["candidate_id"].startswith("24") for r in records)
+    assert "raw_payload" not in records[0]
+
+
+def test_failures_are_counted_in_run_metadata(tmp_path: Path) -> None:
+    with StubUpstreams() as stubs:
+        stubs.fail("alerce", 2)
+        ingestor = create_ztf_ingestor(tmp_path, _config(stubs, concurrency=1, retry={"max_attempts": 1}))
+        result = ingestor.run(limit=30)
+
+    assert result.metadata["fetch_errors"] == {"query_objects": 2}
+    # SN and AGN pages failed; only the Variable page of 10 objects remains
+    assert result.records_fetched == 11 * 10
+
+
+def test_object_pages_stop_at_the_class_limit(tmp_path: Path) -> None:
+    with StubUpstreams() as stubs:
+        records = list(create_ztf_ingestor(tmp_path, _config(stubs, classes=["SN"])).fetch(limit=25))
+    # 3 pages of 9 objects, the last one trimmed to 7
+    assert len({r["object_id"] for r in records}) == 25
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+
+from src.models.fewshot.protonet import ProtoNet, SimpleEmbedding
+from src.models.registry import (
+    RegistryError,
+    current_version,
+    import_legacy,
+    list_versions,
+    promote,
+    register_version,
+    rollback,
+)
+
+
+def _state_dict(seed: int = 0) -> dict[str, torch.Tensor]:
+    torch.manual_seed(seed)
+    return ProtoNet(embedding=SimpleEmbedding(feature_dim=16)).state_dict()
+
+
+def test_register_writes_immutable_version_with_schema_and_metrics(tmp_path: Path) -> None:
+    version = register_version(
+        tmp_path,
+        _state_dict(),
+        prototypes={"Flare": [0.0] * 16},
+        feature_schema=["detections", "mean_mag", "std_mag", "min_mag", "max_mag"],
+        metrics={"training_accuracy": 0.9},
+    )
+
+    assert current_version(tmp_path) == version
+    [meta] = list_versions(tmp_path)
+    assert meta["current"] and meta["classes"] == ["Flare"]
+    assert meta["feature_schema"][0] == "detections"
+    assert meta["metrics"] == {"training_accuracy": 0.9}
+    weights = tmp_path / version / "weights" / "embedding.mlp.1.weight.npy"
+    assert np.load(weights).shape == (128, 5)
+    assert weights.stat().st_mode & 0o222 == 0
+
+
+def test_promote_and_rollback_walk_the_promotion_stack(tmp_path: Path) -> None:
+    first = register_version(tmp_path, _state_dict(0))
+    second = register_version(tmp_path, _state_dict(1))
+    staged = register_version(tmp_path, _state_dict(2), promote=False)
+    assert current_version(tmp_path) == second
+
+    promote(tmp_path, staged)
+    assert rollback(tmp_path) == second
+    assert rollback(tmp_path) == first
+    with pytest.raises(RegistryError):
+        rollback(tmp_path)
+    with pytest.raises(RegistryError):
+        promote(tmp_path, "missing")
+
+
+def test_import_legacy_only_populates_an_empty_registry(tmp_path: Path) -> None:
+    weights = tmp_path / "final_model.pt"
+    torch.save(_state_dict(), weights)
+    prototypes = tmp_path / "prototypes.json"
+    prototypes.write_text(json.dumps({"Transit": [1.0] * 16}))
+    root = tmp_path / "registry"
+
+    version = import_legacy(root, weights, prototypes)
+    assert version is not None and current_version(root) == version
+    assert import_legacy(root, weights, prototypes) is None
+    assert len(list_versions(root)) == 1
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.monitoring.metrics import (
+    HTTP_IN_FLIGHT,
+    HTTP_REQUEST_SECONDS,
+    PrometheusMiddleware,
+    Registry,
+    record_cache,
+    track_upstream,
+    UPSTREAM_REQUEST_SECONDS,
+    CACHE_HIT_RATIO,
+)
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    registry = Registry()
+    hist = registry.histogram("demo_seconds", "Demo latency", ("route",), buckets=(0.1, 1.0))
+    hist.observe(0.05, route="/a")
+    hist.observe(0.5, route="/a")
+    hist.observe(5.0, route="/a")
+
+    text = registry.render()
+
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{route="/a"} 3' in text
+
+
+def test_counter_requires_declared_labels() -> None:
+    registry = Registry()
+    counter = registry.counter("demo_total", "Demo counter", ("kind",))
+    counter.inc(kind="x")
+    counter.inc(2, kind="x")
+
+    assert counter.value(kind="x") == 3
+    with pytest.raises(ValueError):
+        counter.inc(other="y")
+
+
+def test_cache_ratio_and_upstream_tracking() -> None:
+    record_cache("unit-test", hit=True)
+    record_cache("unit-test", hit=False)
+    record_cache("unit-test", hit=True)
+
+    assert CACHE_HIT_RATIO.value(cache="unit-test") == pytest.approx(2 / 3)
+
+    with pytest.raises(RuntimeError):
+        with track_upstream("unit-test"):
+            raise RuntimeError("boom")
+    assert UPSTREAM_REQUEST_SECONDS.count(service="unit-test", outcome="error") == 1
+
+
+def test_middleware_labels_requests_by_route_template() -> None:
+    app = FastAPI()
+    app.add_middleware(PrometheusMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int) -> dict[str, int]:
+        return {"item_id": item_id}
+
+    client = TestClient(app)
+    for item_id in range(3):
+        assert client.get(f"/items/{item_id}").status_code == 200
+    client.get("/missing")
+
+    assert HTTP_REQUEST_SECONDS.count(method="GET", route="/items/{item_id}", status=200) == 3
+    assert HTTP_REQUEST_SECONDS.count(method="GET", route="<unmatched>", status=404) == 1
+    assert HTTP_IN_FLIGHT.value(route="/items/{item_id}") == 0
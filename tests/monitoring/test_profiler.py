@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.monitoring import profiler as profiler_module
+from src.monitoring.profiler import ProfilerBusy, RequestProfilerMiddleware, SamplingProfiler
+
+
+def _busy_loop(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_captures_busy_thread() -> None:
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_loop, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        with SamplingProfiler(interval=0.002) as profiler:
+            time.sleep(0.2)
+    finally:
+        stop.set()
+        worker.join()
+
+    collapsed = profiler.collapsed()
+    assert profiler.sample_count > 0
+    assert "thread:busy-worker" in collapsed
+    assert "_busy_loop (test_profiler.py" in collapsed
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.strip().splitlines())
+
+    document = profiler.speedscope("unit")
+    profile = document["profiles"][0]
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"])
+    frame_count = len(document["shared"]["frames"])
+    assert all(0 <= idx < frame_count for sample in profile["samples"] for idx in sample)
+
+
+def test_only_one_profile_runs_at_a_time() -> None:
+    with SamplingProfiler():
+        with pytest.raises(ProfilerBusy):
+            SamplingProfiler().start()
+    SamplingProfiler().start().stop()
+
+
+def test_request_profiler_middleware_requires_authorization(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(profiler_module, "PROFILE_DIR", tmp_path)
+    monkeypatch.setattr(profiler_module.save_profile, "__defaults__", (tmp_path,))
+
+    app = FastAPI()
+    app.add_middleware(
+        RequestProfilerMiddleware,
+        authorize=lambda scope: dict(scope["headers"]).get(b"authorization") == b"Bearer admin",
+    )
+
+    @app.get("/slow")
+    def slow() -> dict[str, bool]:
+        time.sleep(0.05)
+        return {"ok": True}
+
+    client = TestClient(app)
+
+    anonymous = client.get("/slow", headers={"X-Debug-Profile": "1"})
+    assert "x-profile-id" not in anonymous.headers
+
+    profiled = client.get("/slow", headers={"X-Debug-Profile": "1", "Authorization": "Bearer admin"})
+    profile_id = profiled.headers["x-profile-id"]
+    assert (tmp_path / f"{profile_id}.collapsed").exists()
+    assert (tmp_path / f"{profile_id}.speedscope.json").exists()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from conftest import MASTStub, TESSStub, ZTFStub, lightcurve
+from src.data_ingestion.compaction import CompactionOptions, compact
+from src.data_ingestion.schemas import TESSRecord
+from src.data_ingestion.storage import iter_tables, read_table
+from src.preprocessing.auto_labeler import AutoLabeler
+from src.preprocessing.feature_engine import (
+    EXTRACTORS,
+    FeatureExtractor,
+    FeatureOptions,
+    build_features,
+    read_feature_manifest,
+    register_extractor,
+)
+
+
+def _lightcurve(i: int, points: int = 50) -> dict[str, Any]:
+    flux = 1000.0 + 10.0 * np.sin(np.linspace(0, 6, points)) * (i + 1)
+    flux[::7] = -1.0  # non-positive samples are replaced by the median
+    return lightcurve(i, points, sector=1 + i % 3, flux=flux.tolist())
+
+
+@pytest.fixture(scope="module")
+def lake(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """ZTF detections in parts; TESS light curves in a shard, newer parts and JSON drops; MAST observations."""
+    root = tmp_path_factory.mktemp("raw")
+    rng = np.random.default_rng(2)
+    detections = [
+        {"object_id": f"ZTF{i:05d}", "ra": 1.0, "dec": 2.0, "mjd": 60000.0 + i, "mag_psf": float(m), "filter": "gr"[i % 2]}
+        for i, m in enumerate(rng.uniform(16.0, 19.5, 500))
+    ]
+    detections[3]["mag_psf"] = None
+    ZTFStub("ztf", root / "ztf", {"storage": "parquet", "persist_batch": 64, "run_log": False}).run(sample_payload=detections)
+
+    TESSStub("tess", root / "tess", {"storage": "parquet", "persist_batch": 8, "run_log": False}).run(
+        sample_payload=[_lightcurve(i) for i in range(30)]
+    )
+    compact(root / "tess", TESSRecord, CompactionOptions(row_group_rows=4))
+    TESSStub("tess", root / "tess", {"storage": "parquet", "persist_batch": 8, "run_log": False}).run(
+        sample_payload=[_lightcurve(i) for i in range(30, 45)] + [_lightcurve(99, points=5)]
+    )
+    for i in range(45, 50):
+        (root / "tess" / f"record_TIC{i:04d}_s1.json").write_text(json.dumps(_lightcurve(i)))
+
+    MASTStub("mast", root / "mast", {"storage": "parquet", "run_log": False}).run(
+        sample_payload=[
+            {"observation_id": "hst_1", "instrument": "ACS", "target": "M31", "exposure_time": 100.0, "spectral_range": [0.4, 0.9]},
+            {"observation_id": "hst_2", "instrument": "WFC3", "target": "M51", "exposure_time": 50.0},
+        ]
+    )
+    return root
+
+
+def test_iter_tables_streams_every_record_in_read_table_order(lake: Path) -> None:
+    tables = list(iter_tables(lake / "tess", columns=["record_key", "tic_id"], record_model=TESSRecord, batch_rows=8))
+    assert all(t.num_rows <= 8 for t in tables[:-1]) and len(tables) > 4
+    streamed = [key for t in tables for key in t["record_key"].to_pylist()]
+    assert streamed == read_table(lake / "tess", columns=["record_key"], record_model=TESSRecord)["record_key"].to_pylist()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_build_features_writes_versioned_dataset(lake: Path, tmp_path: Path, workers: int) -> None:
+    options = FeatureOptions(chunk_rows=16, workers=workers)
+    # A table from the old scripts is replaced by the dataset
+    (tmp_path / "tess").mkdir()
+    pd.DataFrame({"tic_id": ["old"]}).to_parquet(tmp_path / "tess" / "features.parquet")
+
+    result = build_features("tess", lake / "tess", tmp_path / "tess", options)
+    assert (result.records, result.rows, result.skipped) == (51, 50, 1)  # the 5-point curve is skipped
+    df = pd.read_parquet(result.path)
+    assert sorted(df["object_id"]) == [f"TIC{i:04d}" for i in range(50)]
+    assert list(df.columns) == EXTRACTORS["tess"].schema.names
+    assert set(df["filters"]) == {"TESS"} and (df["detections"] == 50).all()
+
+    flux = np.asarray(_lightcurve(7)["flux"])
+    mags = -2.5 * np.log10(np.where(flux > 0, flux, np.median(flux[flux > 0])))
+    row = df.set_index("object_id").loc["TIC0007"]
+    assert row["mean_mag"] == pytest.approx(mags.mean()) and row["std_mag"] == pytest.approx(mags.std())
+    assert row["label"] == AutoLabeler.classify(list(range(50)), mags, {"mag_psf": mags.mean()}).label.value
+
+    manifest = read_feature_manifest(result.path)
+    assert manifest["feature_version"] == EXTRACTORS["tess"].version and manifest["rows"] == 50
+    assert sum(manifest["labels"].values()) == 50 and manifest["parts"] == len(list(result.path.glob("part-*.parquet")))
+    assert pq.read_schema(next(result.path.glob("part-*.parquet"))).metadata[b"feature_version"] == b"1"
+    assert not [p for p in (tmp_path / "tess").iterdir() if p.name != "features.parquet"]
+
+    ztf = pd.read_parquet(build_features("ztf", lake / "ztf", tmp_path / "ztf", options).path).set_index("object_id")
+    assert len(ztf) == 500 and ztf.loc["ZTF00000", "detections"] == 1.0
+    mag = ztf.loc["ZTF00010", "mean_mag"]
+    assert ztf.loc["ZTF00010", "std_mag"] == pytest.approx(abs(mag - 17.5) * 0.15)
+    assert ztf.loc["ZTF00010", "label"] == AutoLabeler.classify([0.0], [mag], {"mag_psf": mag}).label.value
+    assert np.isnan(ztf.loc["ZTF00003", "mean_mag"])
+
+    mast = pd.read_parquet(build_features("mast", lake / "mast", tmp_path / "mast", options).path).set_index("object_id")
+    assert mast.loc["hst_1", "wavelength_span"] == pytest.approx(0.5) and np.isnan(mast.loc["hst_2", "wavelength_min"])
+
+
+def test_registered_extractor_and_empty_source(tmp_path: Path) -> None:
+    @register_extractor
+    class EmptyExtractor(FeatureExtractor):
+        source = "empty"
+        schema = EXTRACTORS["ztf"].schema
+
+    try:
+        result = build_features("empty", tmp_path / "missing", tmp_path / "out")
+        assert result.rows == 0 and list(pd.read_parquet(result.path).columns) == EmptyExtractor.schema.names
+    finally:
+        EXTRACTORS.pop("empty")
+    with pytest.raises(ValueError):
+        build_features("empty", tmp_path / "missing", tmp_path / "out")
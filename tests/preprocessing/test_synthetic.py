@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.preprocessing.auto_labeler import EventType
+from src.preprocessing.synthetic import (
+    TEMPLATES,
+    build_synthetic_feature_store,
+    generate_light_curves,
+    resolve_event_type,
+)
+
+
+def test_every_event_type_has_a_template() -> None:
+    assert set(TEMPLATES) == set(EventType)
+
+
+@pytest.mark.parametrize("event_type", list(EventType))
+def test_generate_light_curves_shapes(event_type: EventType) -> None:
+    flux = generate_light_curves(event_type, n=8, length=64, rng=np.random.default_rng(0))
+
+    assert flux.shape == (8, 64)
+    assert np.isfinite(flux).all()
+
+
+def test_transit_template_dips_below_baseline() -> None:
+    flux = generate_light_curves("Transit", n=4, length=200, noise_level=0.0, amplitude=5.0, rng=np.random.default_rng(1))
+
+    assert (flux.min(axis=1) < 10.0).all()
+    assert flux.max() == pytest.approx(10.0)
+
+
+def test_resolve_event_type_accepts_aliases_and_names() -> None:
+    assert resolve_event_type("Anomaly") is EventType.UNKNOWN_ANOMALY
+    assert resolve_event_type("Supernova") is EventType.SUPERNOVA
+    assert resolve_event_type("solar_flare") is EventType.SOLAR_FLARE
+    with pytest.raises(ValueError):
+        resolve_event_type("Wormhole")
+
+
+def test_build_synthetic_feature_store_writes_labeled_parts(tmp_path: Path) -> None:
+    dataset_dir = build_synthetic_feature_store(
+        tmp_path,
+        per_class=25,
+        length=32,
+        chunk_size=10,
+        event_types=["Supernova", "Transit"],
+    )
+
+    df = pd.read_parquet(dataset_dir)
+
+    assert len(list(dataset_dir.glob("part-*.parquet"))) == 6
+    assert len(df) == 50
+    assert set(df["label"]) == {EventType.SUPERNOVA.value, EventType.EXOPLANET_TRANSIT.value}
+    assert {"detections", "mean_mag", "std_mag", "min_mag", "max_mag"} <= set(df.columns)
+    assert df["object_id"].is_unique
+
+    build_synthetic_feature_store(tmp_path, per_class=5, length=32, event_types=["Supernova"])
+    assert len(pd.read_parquet(dataset_dir)) == 5
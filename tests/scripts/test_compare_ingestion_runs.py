@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from benchmarks.stub_upstreams import StubUpstreams
+from scripts import compare_ingestion_runs
+from src.data_ingestion.mast_ingestor import create_mast_ingestor
+from src.data_ingestion.run_metrics import RUN_LOG_FILENAME, read_run_log
+
+
+def test_runs_record_metrics_and_compare_across_the_log(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    config = {
+        "concurrency": 2,
+        "retry": {"max_attempts": 3, "backoff_base": 0.01},
+        "query": {"pagesize": 10},
+        "storage": "parquet",
+    }
+    with StubUpstreams(mast_rows=50) as stubs:
+        config["invoke_url"] = f"{stubs.url}/mast/api/v0/invoke"
+        stubs.fail("mast", 1)
+        first = create_mast_ingestor(tmp_path / "mast", config).run(limit=30)
+        sent = stubs.bytes_sent["mast"]
+        create_mast_ingestor(tmp_path / "mast", config).run(limit=50)
+
+    metrics = first.metadata["metrics"]
+    assert metrics["retries"] == 1
+    assert metrics["requests"]["count"] == 4 and metrics["requests"]["statuses"] == {"200": 3, "503": 1}
+    assert 0 < metrics["requests"]["bytes_downloaded"] <= sent
+    assert metrics["requests"]["p50_ms"] <= metrics["requests"]["p99_ms"]
+    assert {"fetch", "validate", "persist"} <= set(metrics["stages"])
+    assert metrics["records_per_second"] > 0
+
+    runs = read_run_log([tmp_path])
+    assert [(run["source"], run["records"], run["fetch_kwargs"]) for run in runs] == [
+        ("mast", 30, {"limit": 30}),
+        ("mast", 20, {"limit": 50}),
+    ]
+    assert (tmp_path / "mast" / RUN_LOG_FILENAME).exists()
+
+    compare_ingestion_runs.main([str(tmp_path), "--source", "mast", "--json"])
+    rows = json.loads(capsys.readouterr().out)
+    assert [row["records"] for row in rows] == [30, 20]
+    assert "change" not in rows[0] and "wall" in rows[1]["change"] and "retries -1" in rows[1]["change"]
+
+    compare_ingestion_runs.main([str(tmp_path), "--last", "1"])
+    table = capsys.readouterr().out.splitlines()
+    assert table[0].split()[:3] == ["logged_at", "source", "records"] and len(table) == 3
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import sys
+import time
 from pathlib import Path
 from typing import Any
 
@@ -167,3 +168,52 @@ def test_ingest_stream_dry_run_all_sources(monkeypatch: pytest.MonkeyPatch, tmp_
     }
     assert stores["tess"]["fetch_kwargs"] == {"limit": 3}
     assert stores["mast"]["fetch_kwargs"] == {"limit": 3}
+
+
+class SlowStub(BaseIngestor):
+    """Sleeps like a slow archive; the ``mast`` stand-in fails outright."""
+
+    def fetch(self, limit: int = 10, **_: Any):  # type: ignore[override]
+        if self.source_name == "mast":
+            raise ConnectionError("archive unreachable")
+        time.sleep(0.5)
+        return [
+            {"object_id": f"{self.source_name}-{i}", "ra": 1.0, "dec": 2.0, "mjd": 59800.0 + i, "mag_psf": 18.0, "filter": "g"}
+            for i in range(limit)
+        ]
+
+
+def _slow_factory(source: str):
+    def factory(output_dir: Path, source_cfg: dict[str, Any]) -> SlowStub:
+        return SlowStub(source, output_dir, {**source_cfg, "storage": "parquet"})
+
+    return factory
+
+
+@pytest.mark.parametrize("dry_run", [False, True])
+def test_all_sources_run_concurrently_and_isolate_failures(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path, capsys: pytest.CaptureFixture[str], dry_run: bool
+) -> None:
+    for name in ("ztf", "tess", "mast"):
+        monkeypatch.setitem(ingest_stream.INGESTOR_FACTORY, name, _slow_factory(name))  # type: ignore[arg-type]
+    config_path = tmp_path / "config.yaml"
+    config_path.write_text(json.dumps({"data_sources": {}}))
+    argv = ["ingest_stream.py", "--source", "all", "--config", str(config_path), "--limit", "4", "--output", str(tmp_path / "raw")]
+    monkeypatch.setattr(sys, "argv", argv + (["--dry-run"] if dry_run else []))
+
+    with pytest.raises(SystemExit) as exit_info:
+        ingest_stream.main()
+
+    assert exit_info.value.code == 1
+    summary = json.loads(capsys.readouterr().out)
+    sources = summary["sources"]
+    assert sources["mast"]["status"] == "failed" and "archive unreachable" in sources["mast"]["error"]
+    for name in ("ztf", "tess"):
+        assert sources[name]["status"] == "ok" and sources[name]["records"] == 4
+        assert sources[name]["seconds"] >= 0.5
+    assert summary["total_records"] == 8
+    # The two 0.5 s sources overlapped
+    assert summary["seconds"] < sources["ztf"]["seconds"] + sources["tess"]["seconds"]
+    if not dry_run:
+        assert sources["ztf"]["bytes_written"] > 0
+        assert (tmp_path / "raw" / "tess" / "README.md").exists()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from src.models.fewshot.protonet import ProtoNet, SimpleEmbedding
+from src.models.registry import current_version, promote, register_version, rollback
+from src.serving.model_store import ModelStore, load_version, warm_up
+
+
+def _state_dict() -> dict[str, torch.Tensor]:
+    torch.manual_seed(0)
+    return ProtoNet(embedding=SimpleEmbedding(feature_dim=16)).state_dict()
+
+
+def _prototypes() -> dict[str, list[float]]:
+    return {"Flare": [0.0] * 16, "Transit": [1.0] * 16}
+
+
+def _touch_pointer(root: Path) -> None:
+    # mtime granularity can hide a same-tick rewrite from the stat check
+    future = time.time() + 5
+    os.utime(root / "CURRENT", (future, future))
+
+
+def test_load_version_is_memory_mapped(tmp_path: Path) -> None:
+    state_dict = _state_dict()
+    version = register_version(tmp_path, state_dict, _prototypes(), feature_schema=["a", "b", "c", "d", "e"])
+    loaded = load_version(tmp_path, version)
+
+    assert loaded.class_names == ("Flare", "Transit")
+    assert loaded.feature_schema == ("a", "b", "c", "d", "e")
+    for name, tensor in loaded.model.state_dict().items():
+        assert torch.equal(tensor, state_dict[name])
+    mapped = np.load(tmp_path / version / "weights" / "embedding.mlp.1.weight.npy", mmap_mode="r")
+    assert isinstance(mapped, np.memmap)
+
+    embeddings = loaded.model.embedding(torch.zeros(2, 5))
+    assert loaded.distances(embeddings).shape == (2, 2)
+
+
+def test_store_follows_promotions_and_rollbacks(tmp_path: Path) -> None:
+    first_version = register_version(tmp_path, _state_dict(), _prototypes())
+    store = ModelStore(tmp_path, check_interval=0.0)
+    first = store.refresh(force=True)
+
+    second_version = register_version(tmp_path, _state_dict(), {"Nova": [2.0] * 16})
+    _touch_pointer(tmp_path)
+    current = store.get()
+    assert current.version == second_version
+    assert current.class_names == ("Nova",)
+    # A request holding the old snapshot keeps a consistent model
+    assert first.class_names == ("Flare", "Transit")
+
+    rollback(tmp_path)
+    _touch_pointer(tmp_path)
+    assert store.get().version == first_version
+
+    promote(tmp_path, second_version)
+    assert store.refresh(force=True).version == second_version
+
+
+def test_get_async_loads_off_the_event_loop(tmp_path: Path) -> None:
+    version = register_version(tmp_path, _state_dict(), _prototypes())
+    threads: list[threading.Thread] = []
+    store = ModelStore(tmp_path, check_interval=60.0, on_load=lambda loaded: threads.append(threading.current_thread()))
+
+    async def fetch() -> tuple:
+        return await store.get_async(), await store.get_async(), threading.current_thread()
+
+    first, second, loop_thread = asyncio.run(fetch())
+    assert first.version == version and second is first
+    # Loaded (and warmed) once, in a worker thread; the second call is within the check interval
+    assert len(threads) == 1 and threads[0] is not loop_thread
+
+
+def test_bootstrap_imports_legacy_weights_and_falls_back_without_them(tmp_path: Path) -> None:
+    weights = tmp_path / "final_model.pt"
+    torch.save(_state_dict(), weights)
+    root = tmp_path / "registry"
+
+    store = ModelStore(root)
+    store.bootstrap(weights, tmp_path / "prototypes.json")
+    version = store.get().version
+    ModelStore(root).bootstrap(weights, tmp_path / "prototypes.json")
+
+    assert current_version(root) == version
+    assert store.get().prototypes is None
+
+    empty = ModelStore(tmp_path / "empty")
+    empty.bootstrap(tmp_path / "missing.pt", tmp_path / "missing.json")
+    assert empty.get() is None
+    empty.set_fallback(ProtoNet(embedding=SimpleEmbedding(feature_dim=16)))
+    assert empty.get().version == "untrained"
+
+
+def test_warm_up_runs_each_batch_size_and_hooks_new_versions(tmp_path: Path) -> None:
+    register_version(tmp_path, _state_dict(), _prototypes())
+    warmed = []
+    store = ModelStore(tmp_path, check_interval=0.0, on_load=warmed.append)
+    loaded = store.refresh(force=True)
+
+    assert warmed == [loaded]
+    assert warm_up(loaded, batch_sizes=(1, 4), iterations=1) >= 0.0
+
+    second_version = register_version(tmp_path, _state_dict(), _prototypes())
+    _touch_pointer(tmp_path)
+    store.get()
+    assert [w.version for w in warmed] == [loaded.version, second_version]
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+from io import BytesIO
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.serving.uploads import UploadTooLarge, ingest_upload, read_random_segment_record
+
+
+def _ztf(idx: int) -> dict[str, object]:
+    return {"object_id": f"ZTF{idx}", "ra": 10.0, "dec": -5.0, "mjd": 59800.0 + idx, "filter": "g"}
+
+
+def test_ingest_ndjson_counts_accepted_and_rejected(tmp_path: Path) -> None:
+    lines = [json.dumps(_ztf(i)) for i in range(2500)]
+    lines.insert(3, "{not json")
+    lines.insert(7, json.dumps({"object_id": "ZTF_BAD", "ra": "north"}))
+    payload = BytesIO(("\n".join(lines) + "\n").encode())
+
+    report = ingest_upload(payload, "events.ndjson", tmp_path)
+
+    assert report.accepted == 2500
+    assert report.rejected == 2
+    assert {e["record"] for e in report.errors} == {3, 7}
+    assert report.path is not None
+    assert sum(1 for _ in report.path.open()) == 2500
+    assert report.path.with_suffix(".idx").stat().st_size == 2500 * 8
+    assert read_random_segment_record(report.path)["object_id"].startswith("ZTF")
+
+
+def test_ingest_ndjson_rejects_undecodable_lines_and_keeps_the_rest(tmp_path: Path) -> None:
+    payload = BytesIO(json.dumps(_ztf(1)).encode() + b"\n\xff\xfe{}\n" + json.dumps(_ztf(2)).encode() + b"\n")
+
+    report = ingest_upload(payload, "events.ndjson", tmp_path)
+
+    assert report.accepted == 2
+    assert [e["record"] for e in report.errors] == [1]
+    assert report.path is not None
+
+
+def test_ingest_ndjson_caps_a_single_line_before_buffering_it(tmp_path: Path) -> None:
+    class Recorder(BytesIO):
+        def readline(self, size: int = -1) -> bytes:
+            assert 0 < size <= 501
+            return super().readline(size)
+
+    with pytest.raises(UploadTooLarge):
+        ingest_upload(Recorder(b"x" * 10_000), "big.ndjson", tmp_path, max_bytes=500)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_ingest_parquet_validates_tess_records(tmp_path: Path) -> None:
+    table = pa.table(
+        {
+            "tic_id": ["TIC1", "TIC2"],
+            "sector": [1, 2],
+            "cadence": ["short", "short"],
+            "time": [[1.0, 2.0], [1.0, 2.0, 3.0]],
+            "flux": [[5.0, 6.0], [5.0, 6.0]],
+        }
+    )
+    buffer = BytesIO()
+    pq.write_table(table, buffer)
+    buffer.seek(0)
+
+    report = ingest_upload(buffer, "lightcurves.parquet", tmp_path)
+
+    assert report.accepted == 1
+    assert report.rejected == 1
+
+
+def test_ingest_single_json_document(tmp_path: Path) -> None:
+    report = ingest_upload(BytesIO(json.dumps(_ztf(1)).encode()), "synth_Supernova.json", tmp_path, record_type="ztf")
+
+    assert report.accepted == 1
+    assert report.path is not None and report.path.name.startswith("bulk_synth_Supernova_")
+
+
+def test_ingest_rejects_everything_without_leaving_segments(tmp_path: Path) -> None:
+    report = ingest_upload(BytesIO(b'{"object_id": "x"}\n'), "bad.ndjson", tmp_path)
+
+    assert report.accepted == 0
+    assert report.path is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_ingest_enforces_size_cap(tmp_path: Path) -> None:
+    payload = BytesIO(("\n".join(json.dumps(_ztf(i)) for i in range(100))).encode())
+
+    with pytest.raises(UploadTooLarge):
+        ingest_upload(payload, "big.ndjson", tmp_path, max_bytes=500)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_ingest_enforces_size_cap_on_parquet_bytes_read(tmp_path: Path) -> None:
+    buffer = BytesIO()
+    pq.write_table(pa.table({"object_id": [f"ZTF{i}" for i in range(2000)], "mjd": [float(i) for i in range(2000)]}), buffer)
+    buffer.seek(0)
+
+    with pytest.raises(UploadTooLarge):
+        ingest_upload(buffer, "big.parquet", tmp_path, max_bytes=1000)
+    assert list(tmp_path.iterdir()) == []
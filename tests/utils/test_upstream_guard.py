@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+import requests
+
+from benchmarks.stub_upstreams import StubUpstreams
+from src.data_ingestion.http_cache import HTTPCache, install_cache
+from src.utils.upstream_guard import (
+    CircuitOpenError,
+    HostPolicy,
+    RateLimitExceeded,
+    UpstreamGuard,
+    install_guard,
+)
+
+
+def _acquire_many(path: str, count: int) -> None:
+    guard = UpstreamGuard(Path(path), HostPolicy(rate=50.0, burst=1.0))
+    for _ in range(count):
+        guard.acquire("archive.example")
+
+
+def test_token_bucket_is_shared_across_processes(tmp_path: Path) -> None:
+    start = time.perf_counter()
+    with ProcessPoolExecutor(2) as pool:
+        list(pool.map(_acquire_many, [str(tmp_path / "guard.sqlite")] * 2, [6, 6]))
+    # 12 tokens at 50/s with a burst of one: at least 11 refills between the two processes
+    assert time.perf_counter() - start >= 11 / 50
+
+    guard = UpstreamGuard(tmp_path / "guard.sqlite", HostPolicy(rate=1.0, burst=1.0))
+    with pytest.raises(RateLimitExceeded):
+        guard.acquire("archive.example", max_wait=0.1)
+
+
+def test_circuit_opens_fails_fast_and_recovers_through_a_probe(tmp_path: Path) -> None:
+    guard = UpstreamGuard(tmp_path / "guard.sqlite", failure_threshold=3, reset_seconds=0.3)
+    session = requests.Session()
+    install_cache(session, HTTPCache(tmp_path / "cache"))
+    install_guard(session, guard)
+    with StubUpstreams() as stubs:
+        url = f"{stubs.url}/news/v4/articles/?limit=1"
+        cached = session.get(f"{stubs.url}/noaa/xrays.json")
+        stubs.fail("news", 3)
+        assert [session.get(url).status_code for _ in range(3)] == [503] * 3
+
+        with pytest.raises(CircuitOpenError):
+            session.get(url)
+        assert stubs.hits["news"] == 3
+        # Cache hits never reach the guard, even with the host's circuit open
+        assert session.get(f"{stubs.url}/noaa/xrays.json").content == cached.content
+
+        time.sleep(0.3)
+        assert session.get(url).status_code == 200
+        assert guard.state(url)["state"] == "closed"
+
+        stubs.fail("news", 1, status=429)
+        assert session.get(f"{stubs.url}/news/v4/articles/?limit=2").status_code == 429
+        state = guard.state(url)
+    assert state["rate"] == pytest.approx(5.0) and state["blocked_until"] > 0
+
+
+def test_async_calls_count_exceptions_as_failures(tmp_path: Path) -> None:
+    guard = UpstreamGuard(tmp_path / "guard.sqlite", failure_threshold=1, reset_seconds=60)
+
+    async def call() -> None:
+        async with guard.call("https://noaa.example/flux", max_wait=1.0):
+            raise TimeoutError("upstream timed out")
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(call())
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(call())
+    assert guard.state("noaa.example")["state"] == "open"
+
+
+def test_async_calls_keep_sqlite_off_the_event_loop(tmp_path: Path) -> None:
+    threads: list[int] = []
+
+    class RecordingGuard(UpstreamGuard):
+        def _take(self, host: str) -> float:
+            threads.append(threading.get_ident())
+            return super()._take(host)
+
+        def record(self, target: str, status: int | None = None, retry_after: str | None = None) -> None:
+            threads.append(threading.get_ident())
+            super().record(target, status, retry_after)
+
+    async def call() -> int:
+        async with RecordingGuard(tmp_path / "guard.sqlite").call("https://noaa.example/flux"):
+            pass
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(call())
+    assert len(threads) == 2 and loop_thread not in threads